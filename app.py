@@ -9,10 +9,16 @@ from flask_cors import CORS
 from flask_admin import Admin
 from dotenv import load_dotenv
 from src.Services.ApplicationService import ApplicationService
-from src.Services.DBservices.SafeRegistryInit import initialize_registry_safely
+from src.Services.DBservices.SafeRegistryInit import (
+    initialize_registry_safely,
+    initialize_registry_from_snapshot,
+    refresh_snapshot_in_background,
+)
 from src.Utils.filter_structure import FILTER_STRUCTURE
 from src.core.route_initializer import RouteInitialization
 from src.middlewares.record_processor_middleware import RecordProcessorMiddleware
+from src.Utils.json_provider import FastJSONProvider
+from src.Utils.logging_setup import setup_logging
 from utils.errors import BadRequestException
 from logging.handlers import RotatingFileHandler
 from utils.http import bad_request, not_found, not_allowed, internal_error
@@ -55,12 +61,15 @@ LOGGING_CONFIG = {
 }
 
 logging.config.dictConfig(LOGGING_CONFIG)
+# Handlers run on a background thread; LOG_FORMAT / LOG_LEVELS / LOG_RATE_LIMIT tune it
+setup_logging()
 logger = logging.getLogger(__name__)
 
 
 def create_app():
     """Application factory"""
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
     app.config.from_object(os.getenv('APP_SETTINGS'))
     app.url_map.strict_slashes = False
     
@@ -93,13 +102,19 @@ def create_app():
     log_handler.setLevel(logging.ERROR)
     app.logger.addHandler(log_handler)
     
+    # Fast boot: models and filter structure come from the schema snapshot,
+    # create_all/reflection only run (in the background) when it is stale
+    fast_boot = app.config.get('FAST_BOOT', os.getenv('FAST_BOOT', 'false').lower() in ('1', 'true', 'yes'))
+    boot_started = time.perf_counter()
+    
     # ALL initialization INSIDE app_context
-    with app.app_context():
-        try:
-            db.create_all()
-            logger.info("Database tables created/verified")
-        except Exception as e:
-            logger.error(f"❌ Database creation error: {str(e)}", exc_info=True)
+    if not fast_boot:
+        with app.app_context():
+            try:
+                db.create_all()
+                logger.info("Database tables created/verified")
+            except Exception as e:
+                logger.error(f"❌ Database creation error: {str(e)}", exc_info=True)
     
     RecordProcessorMiddleware(app)
     with app.app_context():
@@ -107,10 +122,20 @@ def create_app():
             logger.info("Starting registry initialization...")
             
             # Initialize registry
-            result = initialize_registry_safely(
-                app,
-                table_names=['all_db']
-            )
+            if fast_boot:
+                result = initialize_registry_from_snapshot(
+                    app,
+                    table_names=['all_db'],
+                    snapshot_path=app.config.get('SCHEMA_SNAPSHOT_PATH')
+                )
+                if not result.get('from_snapshot'):
+                    # First boot / unusable snapshot: tables were not verified yet
+                    db.create_all()
+            else:
+                result = initialize_registry_safely(
+                    app,
+                    table_names=['all_db']
+                )
             
             registry = result['registry']
             app.config['MODEL_REGISTRY'] = registry
@@ -133,6 +158,15 @@ def create_app():
                 logger.info("Application service initialized successfully")
             else:
                 logger.warning(f"⚠️ Application service initialization: {init_result.get('message')}")
+            
+            if fast_boot:
+                refresh_snapshot_in_background(
+                    app, result,
+                    filter_service=app_service.filter_service,
+                    table_names=['all_db']
+                )
+            logger.info(f"Registry and services ready in {time.perf_counter() - boot_started:.2f}s "
+                        f"({'snapshot' if result.get('from_snapshot') else 'reflection'})")
         
         except Exception as e:
             logger.error(f"❌ Service initialization error: {str(e)}", exc_info=True)
@@ -1,8 +1,10 @@
 import os, sys
 # sys.path.append(os.getcwd())
 from celery import Celery
+from celery.signals import after_setup_logger
 from flask import current_app
 from celery.schedules import timedelta
+from kombu import Queue
 
 
 def make_celery(app):
@@ -15,9 +17,21 @@ def make_celery(app):
         backend=app.config["CELERY_RESULT_BACKEND"] if app else "redis://redis:6379/0",
         timezone='UTC',
         include=[
-            "src.Journals.views.tasks"
+            "src.Journals.views.tasks",
+            "src.Journals.views.batch_tasks",
         ]
     )
+    # Short user-facing tasks and long tagging batches don't share a queue:
+    #   celery -A celery_app worker -Q interactive
+    #   celery -A celery_app worker -Q bulk --prefetch-multiplier=1
+    # A worker started without -Q consumes both.
+    celery.conf.task_queues = (Queue("interactive"), Queue("bulk"))
+    celery.conf.task_default_queue = "interactive"
+    celery.conf.worker_prefetch_multiplier = 1
+    # Task events feed the task index read by TaskListAPI / TaskStatusAPI
+    #   python -m src.Journals.views.task_index
+    celery.conf.worker_send_task_events = True
+    celery.conf.task_send_sent_event = True
     # ensure the schedule directory exists
     schedule_path = "./celery-beat/celerybeat-schedule"
     os.makedirs(os.path.dirname(schedule_path), exist_ok=True)
@@ -35,6 +49,13 @@ def make_celery(app):
 
     return celery
 
+@after_setup_logger.connect
+def queue_worker_logging(logger, **kwargs):
+    """Worker log handlers run on a background thread, as in the web app."""
+    from src.Utils.logging_setup import setup_logging
+    setup_logging(logger=logger)
+
+
 celery = make_celery(current_app)
 # Configure periodic tasks (Celery Beat)
 # celery.conf.beat_schedule = {
@@ -55,6 +55,10 @@ class Config(object):
     CELERY_BROKER_URL=os.getenv('CELERY_BROKER_URL')
     CELERY_RESULT_BACKEND=os.getenv('CELERY_RESULT_BACKEND')
 
+    # Fast boot from the persisted schema snapshot (see SchemaSnapshot)
+    FAST_BOOT=str_to_bool(os.getenv('FAST_BOOT', 'false'))
+    SCHEMA_SNAPSHOT_PATH=os.getenv('SCHEMA_SNAPSHOT_PATH', 'temp/schema_snapshot.json')
+
 
 
 class ProductionConfig(Config):
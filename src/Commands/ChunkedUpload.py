@@ -0,0 +1,116 @@
+# src/Commands/ChunkedUpload.py
+"""
+Chunked processing of uploaded CSV files
+
+The upload task used to read the whole file into memory, insert it in one
+go and pass the new DOIs to the tagging pipeline as a string-joined
+IN (...) list. ChunkedUploadProcessor streams the file instead:
+
+    processor = ChunkedUploadProcessor(chunk_size=5000, batch_size=100)
+    for batch_ids in processor.iter_batches(csv_path, output_path):
+        tag_upload_batch_task.delay(batch_ids, ...)
+
+- the CSV is read `chunk_size` rows at a time (only the required columns)
+- each chunk goes through the server-side DOI de-duplication (BulkIngest)
+- the rows that were new are appended to the output CSV
+- the new primary ids are handed out in batches of `batch_size`, ready to
+  be bound as a query parameter by the tagging sub-tasks
+
+Memory stays bounded by the chunk size, whatever the size of the upload.
+"""
+
+import os
+import time
+from typing import Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+from src.Services.DBservices.BulkIngest import normalise_doi
+
+UPLOAD_COLUMNS = [
+    "Authors", "Year", "Title", "DOI", "Open Access", "Abstract",
+    "Id", "Source", "Language", "Country", "Database", "Journal"
+]
+
+
+class ChunkedUploadProcessor:
+    def __init__(self, chunk_size: int = 5000, batch_size: int = 100,
+                 ingest: Optional[Callable[[pd.DataFrame], List[Dict]]] = None):
+        """
+        :param chunk_size: CSV rows read and inserted per round trip
+        :param batch_size: primary ids per tagging batch
+        :param ingest: callable inserting a chunk and returning [{"primary_id", "doi"}]
+                       for the new rows (defaults to BulkIngest on all_db)
+        """
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self._ingest = ingest
+        self.stats = {"rows_read": 0, "rows_inserted": 0, "chunks": 0, "batches": 0, "elapsed": 0.0}
+
+    @property
+    def ingest(self):
+        if self._ingest is None:
+            from src.Services.DBservices.BulkIngest import BulkIngest
+            self._ingest = BulkIngest().ingest
+        return self._ingest
+
+    @staticmethod
+    def validate_columns(csv_path: str) -> None:
+        """Raises ValueError when the upload lacks a required column (reads the header only)."""
+        header = pd.read_csv(csv_path, nrows=0).columns
+        missing = [c for c in UPLOAD_COLUMNS if c not in header]
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(missing)}")
+
+    def iter_chunks(self, csv_path: str) -> Iterator[pd.DataFrame]:
+        self.validate_columns(csv_path)
+        yield from pd.read_csv(csv_path, usecols=UPLOAD_COLUMNS, chunksize=self.chunk_size)
+
+    def iter_batches(self, csv_path: str, output_path: Optional[str] = None,
+                     on_progress: Optional[Callable[[Dict], None]] = None) -> Iterator[List[int]]:
+        """
+        Insert the upload chunk by chunk and yield the new primary ids in batches.
+
+        :param output_path: where the new rows are written (CSV, overwritten)
+        :param on_progress: called with a copy of `stats` after every chunk
+        """
+        started = time.perf_counter()
+        pending: List[int] = []
+        if output_path:
+            os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+            pd.DataFrame(columns=UPLOAD_COLUMNS).to_csv(output_path, index=False)
+
+        for chunk in self.iter_chunks(csv_path):
+            chunk = chunk[UPLOAD_COLUMNS]
+            inserted = self.ingest(chunk)
+            self.stats["chunks"] += 1
+            self.stats["rows_read"] += len(chunk)
+            self.stats["rows_inserted"] += len(inserted)
+
+            if output_path and inserted:
+                self._new_rows(chunk, inserted).to_csv(output_path, mode="a", header=False, index=False)
+
+            pending.extend(int(row["primary_id"]) for row in inserted)
+            while len(pending) >= self.batch_size:
+                yield self._next_batch(pending)
+
+            self.stats["elapsed"] = time.perf_counter() - started
+            if on_progress:
+                on_progress(dict(self.stats))
+
+        if pending:
+            yield self._next_batch(pending)
+        self.stats["elapsed"] = time.perf_counter() - started
+
+    def _next_batch(self, pending: List[int]) -> List[int]:
+        batch = pending[:self.batch_size]
+        del pending[:self.batch_size]
+        self.stats["batches"] += 1
+        return batch
+
+    @staticmethod
+    def _new_rows(chunk: pd.DataFrame, inserted: List[Dict]) -> pd.DataFrame:
+        """The rows of `chunk` that were inserted (first occurrence per DOI, all rows without one)."""
+        doi_keys = chunk["DOI"].map(normalise_doi)
+        new_keys = {normalise_doi(row["doi"]) for row in inserted}
+        return chunk[(doi_keys == "") | (doi_keys.isin(new_keys) & ~doi_keys.duplicated())]
@@ -5,36 +5,39 @@ import pandas as pd
 import requests
 import time
 from urllib.parse import urlparse
+from src.Services.CrossrefClient import get_crossref_client
+
+METADATA_COLUMNS = ["publisher", "language", "citation_count"]
+
 
 class DOIEnricher:
-    def __init__(self, csv_file):
+    def __init__(self, csv_file, crossref=None):
         self.csv_file = csv_file
         self.df = pd.read_csv(csv_file)
         self.not_found_dois = []  # Store DOIs we couldn't enrich
-    
+        self.crossref = crossref or get_crossref_client()
+
+    @staticmethod
+    def metadata_of(work):
+        """The columns we take from a Crossref work."""
+        return {
+            "publisher": work.get("publisher", None),
+            "language": work.get("language", None),
+            "citation_count": work.get("is-referenced-by-count", None),
+        }
+
     def fetch_metadata(self, doi):
         """Fetch metadata from CrossRef using DOI."""
-        url = f"https://api.crossref.org/works/{doi}"
         try:
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            work = data.get("message", {})
-            
-            # If metadata is missing or empty
-            if not work:
-                self.not_found_dois.append(doi)
-                return None
-            
-            return {
-                "publisher": work.get("publisher", None),
-                "language": work.get("language", None),
-                "citation_count": work.get("is-referenced-by-count", None),
-            }
+            work = self.crossref.work(doi)
         except requests.exceptions.RequestException as e:
             print(f"Error fetching metadata for DOI {doi}: {e}")
             self.not_found_dois.append(doi)
-            return {"journal": None, "publisher": None, "publication_year": None, "publication_date": None, "language": None, "abstract": None, "country": None, "citation_Count": None, "keywords": None}
+            return dict.fromkeys(METADATA_COLUMNS)
+        if not work:
+            self.not_found_dois.append(doi)
+            return None
+        return self.metadata_of(work)
     
     def extract_source(self, doi_url):
         """Extract the source from the DOI URL by taking the host without '.com' or other TLDs."""
@@ -42,30 +45,48 @@ class DOIEnricher:
         source = parsed_url.split('.')[-2] if parsed_url else None
         return source
     
-    def enrich_data(self, key="doi"):
-        """Fetch metadata for each DOI and enrich the dataframe."""
-        enriched_data = []
-        
-        # Set up a counter to generate the numeric ID
-        for index, row in self.df.iterrows():
-            # Skip if language is already set
-            if pd.notna(row.get("language")) and str(row["language"]).strip() != "":
-                enriched_data.append(row.to_dict())  # retain the row as is
-                continue
+    def enrich_data(self, key="doi", title_key="title"):
+        """
+        Fetch Crossref metadata for the rows without a language and write it
+        back column by column. Lookups run concurrently through the cached
+        Crossref client; rows without a DOI are matched by title (if there is
+        a `title_key` column) and get the DOI that was found.
+        """
+        started = time.perf_counter()
+        df = self.df
+        if key not in df.columns:
+            df[key] = None
+        language = df["language"] if "language" in df.columns else pd.Series(None, index=df.index, dtype=object)
+        pending = language.isna() | (language.astype(str).str.strip() == "")
+        dois = df[key].where(df[key].notna(), "").astype(str).str.split("/doi.org/").str[-1].str.strip()
 
-            doi = str(row[f"{key}"]).split("/doi.org/")[-1]  # Extract DOI part only
-            # Skip if DOI is empty
-            if doi == "" or pd.isna(doi):
-                enriched_data.append(row.to_dict())
-                continue
+        if title_key in df.columns:
+            untitled = pending & (dois == "") & df[title_key].notna()
+            if untitled.any():
+                matches = self.crossref.search_titles(df.loc[untitled, title_key])
+                found = df.loc[untitled, title_key].map(
+                    {title: work["DOI"] for title, work in matches.items() if isinstance(work, dict) and work.get("DOI")}
+                ).dropna()
+                df.loc[found.index, key] = found
+                dois.loc[found.index] = found
+
+        lookup = pending & (dois != "")
+        works = self.crossref.works(dois[lookup])
+        metadata = pd.DataFrame.from_dict(
+            {doi: self.metadata_of(work) for doi, work in works.items() if isinstance(work, dict)},
+            orient="index", columns=METADATA_COLUMNS,
+        )
+        enriched = lookup & dois.isin(metadata.index)
+        for column in METADATA_COLUMNS:
+            if column not in df.columns:
+                df[column] = None
+            df.loc[enriched, column] = dois[enriched].map(metadata[column])
+        self.not_found_dois.extend(doi for doi, work in works.items() if not isinstance(work, dict))
+
+        elapsed = time.perf_counter() - started
+        print(f"Enriched {int(enriched.sum())} of {int(lookup.sum())} rows looked up "
+              f"({lookup.sum() / max(elapsed, 1e-9) * 60:,.0f} rows/min)")
 
-            metadata = self.fetch_metadata(doi)
-            enriched_row = {**row.to_dict(), **metadata}
-            enriched_data.append(enriched_row)
-            time.sleep(1)  # Respect API rate limits
-        
-        self.df = pd.DataFrame(enriched_data)
-    
     def save_enriched_csv(self, output_file="enriched_output.csv"):
         """Save the enriched dataframe to a CSV file."""
         self.df.to_csv(output_file, index=False)
@@ -1,26 +1,32 @@
 import re
+import logging
+import argparse
 import pandas as pd
 from sqlalchemy import MetaData, Table, String, Integer, Float, Boolean, DateTime, text
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import ProgrammingError
 import sys
 import os
-import traceback
 from datetime import datetime
 
 sys.path.append(os.getcwd())
+from src.Services.DBservices.RecordProcessor import RecordProcessor
+from src.Services.DBservices.ConnectionPool import get_engine
+from src.Utils.logging_setup import BatchSummary
+
+logger = logging.getLogger(__name__)
 
 class DatabaseUpdater:
-    def __init__(self, table_name, column_mapping=None):
-        from app import db, app
-        with app.app_context():
-            self.table_name = table_name
-            self.engine = db.engine
-            self.metadata = MetaData()
-            self._refresh_metadata() # Initial load of schema
+    def __init__(self, table_name, column_mapping=None, database_url=None):
+        # Shared process-wide pool; the Flask app is not needed here
+        self.table_name = table_name
+        self.engine = get_engine(database_url)
+        self.metadata = MetaData()
+        self._refresh_metadata() # Initial load of schema
 
         self.Session = sessionmaker(bind=self.engine)
         self.column_mapping = column_mapping or {}
+        self.record_processor = RecordProcessor(include_empty=True)
 
     # NEW HELPER: A dedicated function to refresh the schema from the database.
     def _refresh_metadata(self):
@@ -37,6 +43,62 @@ class DatabaseUpdater:
         }
         return {column: type_mapping.get(str(dtype), String) for column, dtype in df.dtypes.items()}
 
+    def _has_tag_columns(self, columns):
+        return any('__hash__' in self.sanitize_column_name(col) for col in columns)
+
+    def _stored_tag_values(self, session, id_col, record_ids, chunk_size=1000):
+        """The tag columns currently stored for `record_ids`, as {str(id): {column: value}}."""
+        tag_columns = [c for c in self.table.columns if '__hash__' in c.name]
+        stored = {}
+        if not tag_columns:
+            return stored
+        record_ids = list(record_ids)
+        for start in range(0, len(record_ids), chunk_size):
+            rows = session.execute(
+                self.table.select()
+                .with_only_columns(id_col, *tag_columns)
+                .where(id_col.in_(record_ids[start:start + chunk_size]))
+            ).mappings().all()
+            for row in rows:
+                values = dict(row)
+                stored[str(values.pop(id_col.name))] = values
+        return stored
+
+    def materialise_artificial_columns(self, id_column='primary_id', batch_size=1000):
+        """
+        Backfills research_notes, topic_notes and notes for rows written
+        before they were materialised (NULL values). Run once per table:
+
+            python -m src.Commands.DatabaseUpdater all_db --batch-size 1000
+        """
+        self.ensure_columns_exist({col: String for col in RecordProcessor.MATERIALISED_COLUMNS})
+        tag_columns = [c.name for c in self.table.columns if '__hash__' in c.name]
+        id_col = self.table.c[id_column]
+        pending = self.table.c[RecordProcessor.MATERIALISED_COLUMNS[0]].is_(None)
+        updated = 0
+
+        with self.Session() as session:
+            while True:
+                rows = session.execute(
+                    self.table.select()
+                    .with_only_columns(id_col, *[self.table.c[c] for c in tag_columns])
+                    .where(pending)
+                    .limit(batch_size)
+                ).mappings().all()
+                if not rows:
+                    break
+
+                for row in rows:
+                    values = self.record_processor.compute_artificial_columns(dict(row))
+                    session.execute(
+                        self.table.update().where(id_col == row[id_column]).values(**values)
+                    )
+                session.commit()
+                updated += len(rows)
+                logger.info(f"Materialised artificial columns for {updated} records")
+
+        return updated
+
     def sanitize_column_name(self, column_name):
         return column_name.replace("#", "__hash__")
 
@@ -57,15 +119,15 @@ class DatabaseUpdater:
                             f'ALTER TABLE "{self.table_name}" ADD COLUMN "{sanitized_name}" {column_type_sql}'
                         )
                         conn.execute(alter_query)
-                        print(f"Column '{sanitized_name}' added to the table '{self.table_name}'.")
+                        logger.info(f"Column '{sanitized_name}' added to the table '{self.table_name}'.")
                         schema_changed = True
                     except ProgrammingError as e:
                         # Handle potential race conditions in parallel processing
                         if "already exists" in str(e):
-                            print(f"Column '{sanitized_name}' already exists (likely added by another process).")
+                            logger.debug(f"Column '{sanitized_name}' already exists (likely added by another process).")
                             schema_changed = True
                         else:
-                            print(f"Error adding column '{sanitized_name}': {e}")
+                            logger.error(f"Error adding column '{sanitized_name}': {e}")
         
         # If we added any columns, refresh our knowledge of the table.
         if schema_changed:
@@ -95,14 +157,25 @@ class DatabaseUpdater:
         """
         db_id_column = self.column_mapping.get(id_column, id_column)
         inferred_columns = self.infer_column_types(df)
+        materialise = self._has_tag_columns(df.columns)
+        if materialise:
+            inferred_columns.update({col: String for col in RecordProcessor.MATERIALISED_COLUMNS})
         self.ensure_columns_exist(inferred_columns)
+        # One summary line per call instead of a line per row
+        summary = BatchSummary(logger, "update_columns_for_existing_records", table=self.table_name)
 
         with self.Session() as session:
             try:
+                # Stored tags of the whole frame in one query, not one per row
+                stored_tags = {}
+                if materialise:
+                    ids = {str(i) for i in df[id_column] if not pd.isnull(i)}
+                    stored_tags = self._stored_tag_values(session, self.table.c[db_id_column], ids)
+
                 for _, row in df.iterrows():
                     record_id = row.get(id_column)
                     if pd.isnull(record_id):
-                        print(f"Skipping row with {id_column} = None")
+                        summary.add("skipped_no_id")
                         continue
 
                     # FIX: The restrictive check `in self.table.columns` is removed.
@@ -113,27 +186,36 @@ class DatabaseUpdater:
                         if col != id_column
                     }
 
+                    # Store notes/research_notes/topic_notes alongside the tags
+                    # so responses don't have to derive them on every read.
+                    # A partial tag update only carries some tag columns, so the
+                    # notes are computed from the stored tags with the update on top.
+                    if materialise:
+                        merged = dict(stored_tags.get(str(record_id), {}))
+                        merged.update((col, value) for col, value in row_data.items() if '__hash__' in col)
+                        row_data.update(self.record_processor.compute_artificial_columns(merged))
+
                     if "updated_at" in self.table.columns:
                         row_data["updated_at"] = datetime.utcnow()
 
                     flat_row_data = self.flatten_dict(row_data)
                     
                     if not flat_row_data:
-                        print(f"Skipping update for record ID {record_id}: No columns to update.")
+                        summary.add("skipped_no_columns", record_id)
                     else:
                         session.execute(
                             self.table.update()
                             .where(self.table.c[db_id_column] == str(record_id))
                             .values(**flat_row_data)
                         )
-                    print(f"Updated record with {db_id_column} = {record_id}")
+                        summary.add("updated", record_id)
 
                 session.commit()
-                print("Database records have been updated successfully.")
+                summary.log()
             except Exception as e:
                 session.rollback()
-                print(f"Failed to update records: {e}")
-                print(traceback.format_exc())
+                logger.exception(f"Failed to update records: {e}")
+                summary.log(level=logging.ERROR)
 
     # The insert function is also corrected.
     def insert_new_records(self, df, id_column):
@@ -143,13 +225,14 @@ class DatabaseUpdater:
         db_id_column = self.column_mapping.get(id_column, id_column)
         inferred_columns = self.infer_column_types(df)
         self.ensure_columns_exist(inferred_columns)
+        summary = BatchSummary(logger, "insert_new_records", table=self.table_name)
 
         with self.Session() as session:
             try:
                 for _, row in df.iterrows():
                     record_id = row.get(id_column)
                     if pd.isnull(record_id):
-                        print(f"Skipping row with {id_column} = None")
+                        summary.add("skipped_no_id")
                         continue
 
                     # The restrictive check `in self.table.columns` is removed.
@@ -162,14 +245,38 @@ class DatabaseUpdater:
 
                     if not existing_record:
                         session.execute(self.table.insert().values(**row_data))
-                        print(f"Inserted new record with {db_id_column} = {record_id}")
+                        summary.add("inserted", record_id)
+                    else:
+                        summary.add("existing", record_id)
 
                 session.commit()
-                print("New records have been inserted successfully.")
+                summary.log()
             except Exception as e:
                 session.rollback()
-                print(f"Failed to insert records: {e}")
-                print(traceback.format_exc())
+                logger.exception(f"Failed to insert records: {e}")
+                summary.log(level=logging.ERROR)
 
     def close_connection(self):
-        self.engine.dispose()
\ No newline at end of file
+        # Nothing to release: sessions are closed after every call, and the
+        # engine is the shared process-wide pool, so disposing it here would
+        # drop the connections of every other user in the process.
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Backfill research_notes, topic_notes and notes for records written before they were stored."
+    )
+    parser.add_argument('table_name', type=str, help='Name of the database table.')
+    parser.add_argument('--id-column', type=str, default='primary_id', help='Primary key column.')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Rows per commit.')
+    args = parser.parse_args()
+
+    updater = DatabaseUpdater(args.table_name)
+    updated = updater.materialise_artificial_columns(id_column=args.id_column, batch_size=args.batch_size)
+    logger.info(f"Backfill finished: {updated} records in '{args.table_name}'")
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
\ No newline at end of file
@@ -1,9 +1,39 @@
 import psycopg
 import requests
+from src.Services.HttpClient import get_http_client
 import re
+import os
+import time
 import random
 import string
 import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import quote
+from src.Services.DBservices.BulkIngest import normalise_doi
+from src.Services.DBservices.ConnectionPool import get_pool
+from src.Services.HostHealth import host_health
+from src.Utils.disk_cache import DiskCache
+from src.Utils.logging_setup import BatchSummary
+
+logger = logging.getLogger(__name__)
+
+OA_BATCH_SIZE = int(os.getenv("OA_BATCH_SIZE", "50"))        # DOIs per OpenAlex / Europe PMC request
+OA_DB_BATCH = int(os.getenv("OA_DB_BATCH", "500"))           # records per resolve + UPDATE round
+OA_WORKERS = int(os.getenv("OA_WORKERS", "8"))
+OA_EMAIL = os.getenv("OA_EMAIL")                              # Unpaywall email / OpenAlex polite pool
+SERVICE_RATES = {                                             # requests per second
+    "openalex": float(os.getenv("OA_OPENALEX_RATE", "10")),
+    "europepmc": float(os.getenv("OA_EUROPEPMC_RATE", "10")),
+    "unpaywall": float(os.getenv("OA_UNPAYWALL_RATE", "10")),
+}
+SERVICE_URLS = {
+    "openalex": "https://api.openalex.org",
+    "europepmc": "https://www.ebi.ac.uk/europepmc/webservices/rest",
+    "unpaywall": "https://api.unpaywall.org/v2",
+}
+UPDATE_COLUMNS = ("open_access", "authors", "publication_date", "year", "journal")
 
 class OpenAccessSearch:
     """
@@ -107,7 +137,7 @@ class OpenAccessSearch:
         """
         try:
             api_url = f"https://www.ebi.ac.uk/europepmc/webservices/rest/search?query=DOI:{doi}&format=json"
-            response = requests.get(api_url, timeout=10)
+            response = get_http_client().get(api_url, timeout=10)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -126,7 +156,7 @@ class OpenAccessSearch:
         """
         try:
             api_url = f"https://api.openalex.org/works?filter=doi:{doi}"
-            response = requests.get(api_url, timeout=10)
+            response = get_http_client().get(api_url, timeout=10)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -146,7 +176,7 @@ class OpenAccessSearch:
         email = self.generate_random_email()
         try:
             api_url = f"https://api.unpaywall.org/v2/{doi}?email={email}"
-            response = requests.get(api_url, timeout=10)
+            response = get_http_client().get(api_url, timeout=10)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -191,7 +221,25 @@ class OpenAccessSearch:
 
         print(f"\nSearching for metadata for DOI: {doi}")
         all_data = self.get_all_data(doi)
-        
+        found_data = self.merge_sources(doi, all_data)
+        if found_data.get('message'):
+            print("No data found for this DOI from any source.")
+        else:
+            print(f"Data compiled for DOI {doi} from best available sources.")
+        return found_data
+
+    def merge_sources(self, doi, all_data):
+        """
+        Combines the raw responses of the data sources for one DOI: Unpaywall
+        first, OpenAlex and Europe PMC fill the remaining gaps.
+
+        Args:
+            doi (str): The DOI the responses belong to.
+            all_data (dict): Raw response per source, as returned by get_all_data.
+
+        Returns:
+            dict: The publication details, or a 'message' if no source knew the DOI.
+        """
         # This dictionary will hold the best data we can find.
         found_data = {'doi': doi, 'is_oa': False, 'url': None, 'publication_date': None, 'publication_year': None, 'journal_name': None, 'authors': None, 'source': None}
         
@@ -200,11 +248,12 @@ class OpenAccessSearch:
         if unpaywall_data and not unpaywall_data.get('error'):
             found_data['is_oa'] = unpaywall_data.get('is_oa', False)
             if found_data['is_oa']:
-                 found_data['url'] = unpaywall_data.get('best_oa_location', {}).get('url_for_pdf') or unpaywall_data.get('best_oa_location', {}).get('url')
+                 best_location = unpaywall_data.get('best_oa_location') or {}
+                 found_data['url'] = best_location.get('url_for_pdf') or best_location.get('url')
             found_data['publication_date'] = unpaywall_data.get('published_date')
             found_data['publication_year'] = unpaywall_data.get('year')
             found_data['journal_name'] = unpaywall_data.get('journal_name')
-            authors_list = [f"{author.get('given', '')} {author.get('family', '')}".strip() for author in unpaywall_data.get('z_authors', [])]
+            authors_list = [f"{author.get('given', '')} {author.get('family', '')}".strip() for author in unpaywall_data.get('z_authors') or []]
             found_data['authors'] = ', '.join(filter(None, authors_list))
             found_data['source'] = 'Unpaywall' # Mark that we got data from here
 
@@ -249,10 +298,7 @@ class OpenAccessSearch:
 
         # If we couldn't find any data from any source, return a failure message.
         if not found_data['source']:
-            print("No data found for this DOI from any source.")
             return {"doi": doi, "message": "Record not found in any data source."}
-
-        print(f"Data compiled for DOI {doi} from best available sources.")
         return found_data
 
     def update_db_record(self, table_name, primary_key_column_name, primary_id, access_info):
@@ -317,6 +363,210 @@ class OpenAccessSearch:
                 
                 
                 
+class BulkOpenAccessResolver:
+    """
+    Open access status and metadata for many DOIs at once.
+
+    OpenAlex and Europe PMC are asked for OA_BATCH_SIZE DOIs per request;
+    Unpaywall, which has no batch lookup, is asked per DOI. All requests
+    run on OA_WORKERS threads, within each service's rate (OA_*_RATE per
+    second, enforced per host by HostHealth); `services` limits the lookups
+    to some of them. Responses are cached on disk per service and DOI, so
+    a re-run only asks for what is new. Results are written back with one
+    set-based UPDATE per batch.
+
+    Example:
+        resolver = BulkOpenAccessResolver()
+        stats = resolver.run("all_db", "doi", "primary_id")
+        # {'records': 12000, 'updated': 11384, 'not_found': 616, 'dois_per_minute': 9120.4, ...}
+    """
+
+    def __init__(self, searcher=None, pool=None, batch_size=OA_BATCH_SIZE, workers=OA_WORKERS,
+                 service_urls=None, rates=None, cache_dir=None, http=None, services=None):
+        self.searcher = searcher or OpenAccessSearch()
+        self._pool = pool
+        self.batch_size = batch_size
+        self.workers = workers
+        self.service_urls = {name: url for name, url in {**SERVICE_URLS, **(service_urls or {})}.items()
+                             if services is None or name in services}
+        self.http = http or get_http_client()
+        self.caches = {name: DiskCache(f"open_access/{name}", cache_dir) for name in self.service_urls}
+        self.requests = {name: 0 for name in self.service_urls}
+        self._lock = threading.Lock()
+        for name, rate in {**SERVICE_RATES, **(rates or {})}.items():
+            if name in self.service_urls:
+                host_health.configure(self.service_urls[name], rate=rate, burst=max(rate, 1))
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            self._pool = get_pool()
+        return self._pool
+
+    # --- lookups ---------------------------------------------------------
+    def resolve(self, dois):
+        """
+        Args:
+            dois (iterable): DOIs (or DOI URLs).
+
+        Returns:
+            dict: normalised DOI -> merged result (see OpenAccessSearch.merge_sources).
+        """
+        keys = sorted({normalise_doi(doi) for doi in map(self.searcher._extract_doi, dois) if doi})
+        responses = {key: {} for key in keys}
+        pending = {name: [] for name in self.service_urls}
+        for name, cache in self.caches.items():
+            for key in keys:
+                cached = cache.get(key)
+                if cached is DiskCache.MISSING:
+                    pending[name].append(key)
+                else:
+                    responses[key][name] = cached
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="open-access") as executor:
+            futures = {}
+            for name in ("openalex", "europepmc"):
+                for i in range(0, len(pending.get(name, [])), self.batch_size):
+                    chunk = pending[name][i:i + self.batch_size]
+                    futures[executor.submit(getattr(self, f"_fetch_{name}"), chunk)] = (name, chunk)
+            for key in pending.get("unpaywall", []):
+                futures[executor.submit(self._fetch_unpaywall, key)] = ("unpaywall", [key])
+
+            for future in as_completed(futures):
+                name, chunk = futures[future]
+                try:
+                    found = future.result()
+                except requests.exceptions.RequestException as e:
+                    # Not cached: asked again on the next run
+                    logger.warning(f"{name} lookup failed for {len(chunk)} DOIs: {str(e)}")
+                    for key in chunk:
+                        responses[key][name] = {"error": str(e)}
+                    continue
+                for key in chunk:
+                    data = found.get(key, {})
+                    self.caches[name].set(key, data, negative=not data)
+                    responses[key][name] = data
+
+        return {key: self.searcher.merge_sources(key, data) for key, data in responses.items()}
+
+    def _get(self, name, url, **kwargs):
+        with self._lock:
+            self.requests[name] += 1
+        return self.http.get(url, timeout=kwargs.pop("timeout", 30), **kwargs)
+
+    def _fetch_openalex(self, keys):
+        """One request for a batch of DOIs (at most 100 per filter); returns {doi: {"results": [work]}}."""
+        params = {"filter": "doi:" + "|".join(keys), "per-page": 200}
+        if OA_EMAIL:
+            params["mailto"] = OA_EMAIL
+        response = self._get("openalex", f"{self.service_urls['openalex']}/works", params=params)
+        response.raise_for_status()
+        found = {}
+        for work in response.json().get("results") or []:
+            found.setdefault(normalise_doi(work.get("doi")), {"results": [work]})
+        return found
+
+    def _fetch_europepmc(self, keys):
+        """One search for all `keys`; returns {doi: {"resultList": {"result": [record]}}}."""
+        query = " OR ".join(f'DOI:"{key}"' for key in keys)
+        response = self._get("europepmc", f"{self.service_urls['europepmc']}/search",
+                             params={"query": query, "format": "json", "pageSize": 1000})
+        response.raise_for_status()
+        found = {}
+        for record in (response.json().get("resultList") or {}).get("result") or []:
+            found.setdefault(normalise_doi(record.get("doi")), {"resultList": {"result": [record]}})
+        return found
+
+    def _fetch_unpaywall(self, key):
+        email = OA_EMAIL or self.searcher.generate_random_email()
+        response = self._get("unpaywall", f"{self.service_urls['unpaywall']}/{quote(key, safe='/')}",
+                             params={"email": email})
+        if response.status_code == 404:
+            return {}
+        response.raise_for_status()
+        return {key: response.json()}
+
+    # --- write-back ------------------------------------------------------
+    def update_records(self, table_name, primary_key_column_name, results):
+        """
+        Writes (primary_id, result) pairs with one UPDATE ... FROM a staging
+        table (same column types as the target, filled with COPY).
+        Results without data are skipped, as in update_db_record.
+
+        Returns:
+            int: Number of records updated.
+        """
+        rows = []
+        for primary_id, info in results:
+            if not info or info.get('message') or info.get('error'):
+                continue
+            rows.append((
+                primary_id,
+                "Open Access" if info.get('is_oa') else "Not Open Access",
+                info.get('authors'),
+                info.get('publication_date'),
+                info.get('publication_year'),
+                info.get('journal_name'),
+            ))
+        if not rows:
+            return 0
+
+        key = f'"{primary_key_column_name}"'
+        columns = ", ".join(f'"{c}"' for c in UPDATE_COLUMNS)
+        staging = f"_open_access_{table_name}"
+        with self.pool.cursor("open_access_update") as cursor:
+            cursor.execute(
+                f'CREATE TEMP TABLE "{staging}" ON COMMIT DROP AS '
+                f'SELECT {key}, {columns} FROM "{table_name}" WITH NO DATA'
+            )
+            with cursor.copy(f'COPY "{staging}" ({key}, {columns}) FROM STDIN') as copy:
+                for row in rows:
+                    copy.write_row(row)
+            cursor.execute(f"""
+                UPDATE "{table_name}" t
+                SET {", ".join(f'"{c}" = s."{c}"' for c in UPDATE_COLUMNS)}
+                FROM "{staging}" s
+                WHERE t.{key} = s.{key}
+            """)
+            return cursor.rowcount
+
+    # --- driver ----------------------------------------------------------
+    def run(self, table_name, doi_column_name, primary_key_column_name, db_batch=OA_DB_BATCH):
+        """Resolves and updates every record of `table_name` without open access information."""
+        records = self.pool.fetch_all(
+            f'SELECT "{primary_key_column_name}", "{doi_column_name}" FROM "{table_name}" '
+            f'WHERE "open_access" IS NULL OR "open_access" = \'\'',
+            label="open_access_pending",
+        )
+        records = [(primary_id, doi) for primary_id, doi in records if doi]
+        started = time.perf_counter()
+        updated = not_found = 0
+        for i in range(0, len(records), db_batch):
+            batch = records[i:i + db_batch]
+            summary = BatchSummary(logger, "open_access", table=table_name)
+            resolved = self.resolve(doi for _, doi in batch)
+            results = []
+            for primary_id, doi in batch:
+                extracted = self.searcher._extract_doi(doi)
+                info = resolved.get(normalise_doi(extracted)) if extracted else None
+                results.append((primary_id, info))
+                summary.add("found" if info and not info.get("message") else "not_found", primary_id)
+            updated += self.update_records(table_name, primary_key_column_name, results)
+            not_found += summary.counts["not_found"]
+            summary.log()
+
+        elapsed = time.perf_counter() - started
+        return {
+            "records": len(records),
+            "updated": updated,
+            "not_found": not_found,
+            "requests": dict(self.requests),
+            "cache_hits": {name: cache.hits for name, cache in self.caches.items()},
+            "elapsed_s": round(elapsed, 2),
+            "dois_per_minute": round(len(records) / elapsed * 60, 1) if elapsed > 0 else None,
+        }
+
+
 if __name__ == '__main__':
     # --- Main Execution Block ---
 
@@ -329,29 +579,18 @@ if __name__ == '__main__':
         "port": "5433"
     }
     
-    # 2. Initialize the searcher with DB parameters
-    db_searcher = OpenAccessSearch(db_params=db_connection_params)
-    
-    # 3. Define the table and column names
+    # 2. Define the table and column names
     table = 'all_db'
     doi_column = 'doi'
     primary_key_column = 'primary_id' # Assuming this is your primary key column
-    
-    # 4. Fetch all unprocessed records from the specified table
-    all_records_from_db = db_searcher.get_dois_from_db(table, doi_column, primary_key_column)
-    
-    print(f"\nFetched {len(all_records_from_db)} unprocessed records from the database.")
-    
-    # 5. Process each record
-    for primary_id, single_doi in all_records_from_db:
-        if not single_doi:
-            continue
-            
-        # Find publication information
-        access_info = db_searcher.find_open_access(single_doi)
-        print(f"Result for DOI {single_doi}: {json.dumps(access_info, indent=2)}")
-        
-        # Update the database with the new information using the primary key
-        db_searcher.update_db_record(table, primary_key_column, primary_id, access_info)
 
-    print("\n--- Processing complete. ---")
\ No newline at end of file
+    # 3. Resolve all unprocessed records in batches and write them back per batch
+    from src.Services.DBservices.ConnectionPool import ConnectionPool
+    pool = ConnectionPool(
+        "postgresql+psycopg://{user}:{password}@{host}:{port}/{dbname}".format(**db_connection_params)
+    )
+    resolver = BulkOpenAccessResolver(OpenAccessSearch(db_params=db_connection_params), pool=pool)
+    stats = resolver.run(table, doi_column, primary_key_column)
+    print(f"Processed {stats['records']} records ({stats['dois_per_minute']} DOIs/min): {json.dumps(stats)}")
+
+    print("\n--- Processing complete. ---")
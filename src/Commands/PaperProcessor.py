@@ -3,6 +3,7 @@ import os
 import re
 import fitz
 import ast
+import logging
 import pandas as pd
 import requests
 from itertools import chain
@@ -19,8 +20,13 @@ from src.Services.Factories.scrapers.LOVEPDFWebScraper import LOVEPDFWebScraper
 from src.Services.Factories.scrapers.GeneralPDFWebScraper import GeneralPDFWebScraper
 from src.Services.Factories.scrapers.MedlinePDFWebScraper import MedlinePDFWebScraper
 from src.Services.Factories.scrapers.OVIDPDFWebScraper import OVIDPDFWebScraper
+from src.Utils.logging_setup import BatchSummary
+from src.Services.HostHealth import host_health
+from src.Services.ResolutionCache import get_resolution_cache
 # from src.Commands.TaggingSystemFunctionBased import TaggingSystemFunctionBased
 
+logger = logging.getLogger(__name__)
+
 class PaperProcessor:
     DOI_PREFIX = "https://dx.doi.org/"
 
@@ -33,20 +39,38 @@ class PaperProcessor:
         self.tagger = tagger
 
         self.data = []
+        # primary_ids whose host was unavailable (open circuit); retried later
+        self.deferred_ids = []
+        self.deferred_hosts = set()
 
     def process_papers(self, db_name=None):
         """Processes all papers and saves the extracted data to CSV files."""
         papers = self.db_handler.fetch_papers_with_column_names()
         # print(papers)
         self.tag_columns.update(["id", "doi", "doi_url"])
+        summary = BatchSummary(logger, "process_papers", db_name=db_name)
+        resolutions_before = get_resolution_cache().snapshot()
         for paper in papers:
             db_name = db_name if (db_name and db_name != "all") else paper.get("source", "Cochrane")
-            text, doi_url, paper_id, doi = self._process_single_paper(paper, db_name)
+            with host_health.track_rejections() as rejected:
+                text, doi_url, paper_id, doi = self._process_single_paper(paper, db_name)
             if text:
                 tags = self._apply_tagging(text, doi_url, paper_id, doi)
                 
                 self.data.append(tags)
+                summary.add("tagged", paper_id)
+            elif rejected:
+                # Not a paper without text: its host is failing, try it again later
+                self.deferred_ids.append(paper.get("primary_id"))
+                self.deferred_hosts.update(rejected)
+                summary.add("deferred", paper.get("primary_id"))
+            else:
+                summary.add("no_text", paper.get("primary_id"))
         self._save_data_to_csv()
+        resolutions = get_resolution_cache().snapshot()
+        for counter in ("redirect_lookups_avoided", "selenium_avoided", "selenium_launches"):
+            summary.fields[counter] = resolutions[counter] - resolutions_before[counter]
+        summary.log()
         # print(pd.DataFrame(self.data))
         return pd.DataFrame(self.data)
 
@@ -63,10 +87,10 @@ class PaperProcessor:
                     # Treat the string as a single DOI
                     return [doi_string]
             except (SyntaxError, ValueError, TypeError) as e:
-                print(f"Error extracting DOIs: {e}")
+                logger.warning(f"Error extracting DOIs: {e}")
                 return []
         else:
-            print("DOI not found!!!")
+            logger.warning("DOI not found")
             return []
 
     def _process_single_paper(self, paper, db_name):
@@ -79,11 +103,15 @@ class PaperProcessor:
         doi_url = self._construct_doi_url(doi, doi_link, db_name)
         scraper = self._select_scraper(doi_url, db_name)
         
+        if doi_url and host_health.is_open(doi_url):
+            # Skip the scraper (and its fallbacks) altogether
+            host_health.note_rejection(doi_url)
+            return None, doi_url, paper_id, doi
         if doi_url:
             try:
                 text = scraper.fetch_and_extract_first_valid_pdf_text()
             except Exception as e:
-                print(f"EOFError encountered while processing PDF content for DOI: {doi_url} - {e}")
+                logger.warning(f"EOFError encountered while processing PDF content for DOI: {doi_url} - {e}")
                 text = scraper.fetch_text_from_html()
             return text, doi_url, paper_id, doi
         else:
@@ -117,7 +145,7 @@ class PaperProcessor:
             if doi_list:
                 return self.DOI_PREFIX + doi_list[0]
             else:
-                print("No valid DOI found.")
+                logger.warning("No valid DOI found.")
                 return ""
         return self.format_doi(doi)
 
@@ -136,7 +164,7 @@ class PaperProcessor:
             pdf_url = f"/cdsr/doi/10.1002/{doi_prefix}/pdf/CDSR/{article_code}/{article_code}.pdf"
             return pdf_url
         else:
-            print("Invalid URL format for Cochrane PDF.")
+            logger.warning("Invalid URL format for Cochrane PDF.")
             return ""
 
     def _cochrane_doi_path(self, doi):
@@ -8,6 +8,8 @@ from concurrent.futures import ThreadPoolExecutor
 from src.Services.DatabaseHandler import DatabaseHandler
 from src.Commands.PaperProcessor import PaperProcessor
 from src.Commands.DatabaseUpdater import DatabaseUpdater
+from src.Services.DBservices.WorkLeases import WorkLeases, worker_identity
+from src.Services.HostHealth import host_health
 
 
 class PaperProcessorPipeline:
@@ -51,37 +53,145 @@ class PaperProcessorPipeline:
     def update_tracker(self, db_handler, source_name, new_processed_ids, retry_success_ids, new_failed_ids, last_id, status='in_progress'):
         """
         Updates processed_ids, failed_ids, and last_processed_id in the tracker table.
+        The read-modify-write runs in one transaction holding the tracker row lock,
+        so batches of the same source can finish concurrently.
         """
-        processed_ids, failed_ids, _ = self.get_tracker_info(db_handler, source_name)
+        with db_handler.pool.cursor("update_tracker") as cursor:
+            cursor.execute(
+                f"INSERT INTO {self.tracker_table} (source_name) VALUES (%s) ON CONFLICT (source_name) DO NOTHING",
+                (source_name,)
+            )
+            cursor.execute(
+                f"SELECT processed_ids, failed_ids FROM {self.tracker_table} WHERE source_name = %s FOR UPDATE",
+                (source_name,)
+            )
+            processed_raw, failed_raw = cursor.fetchone()
+            processed_ids = set(map(int, processed_raw.split(','))) if processed_raw else set()
+            failed_ids = set(map(int, failed_raw.split(','))) if failed_raw else set()
 
-        processed_ids.update(new_processed_ids)
-        failed_ids.difference_update(retry_success_ids)
-        failed_ids.update(new_failed_ids)
+            processed_ids.update(new_processed_ids)
+            failed_ids.difference_update(retry_success_ids)
+            failed_ids.update(new_failed_ids)
 
-        processed_str = ",".join(map(str, sorted(map(int, processed_ids))))
-        failed_str = ",".join(map(str, sorted(map(int, failed_ids))))
+            processed_str = ",".join(map(str, sorted(map(int, processed_ids))))
+            failed_str = ",".join(map(str, sorted(map(int, failed_ids))))
 
-        query = f"""
-        INSERT INTO {self.tracker_table} 
-            (source_name, processed_ids, failed_ids, last_processed_id, status, updated_at)
-        VALUES 
-            (%s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
-        ON CONFLICT (source_name)
-        DO UPDATE SET
-            processed_ids = EXCLUDED.processed_ids,
-            failed_ids = EXCLUDED.failed_ids,
-            last_processed_id = EXCLUDED.last_processed_id,
-            status = EXCLUDED.status,
-            updated_at = CURRENT_TIMESTAMP
-        """
-        db_handler.execute_query(query, (source_name, processed_str, failed_str, last_id, status))
-
-    def process_source_in_batches(self, query, csv_file_path, db_name, batch_size=100, tagger: TaggerInterface=None):
+            cursor.execute(f"""
+            UPDATE {self.tracker_table} SET
+                processed_ids = %s,
+                failed_ids = %s,
+                last_processed_id = GREATEST(COALESCE(last_processed_id, 0), %s),
+                status = %s,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE source_name = %s
+            """, (processed_str, failed_str, last_id, status, source_name))
+
+    def process_batch(self, db_handler, updater, query, batch_ids, csv_file_path, db_name,
+                      failed_ids=None, tagger: TaggerInterface=None):
+        """
+        Tags one batch of primary_ids from `query` and records the outcome in the tracker.
+        The ids are bound as a single array parameter, never interpolated.
+        Returns {"processed": n, "failed": n, "failed_ids": [...], "skipped_ids": [...],
+        "deferred_ids": [...], "retry_in": s}; skipped ids are those no text could be retrieved for,
+        deferred ids those whose host was unavailable (open circuit).
+        """
+        failed_ids = failed_ids or set()
+        db_handler.update_query(f"{query} AND primary_id = ANY(%s::bigint[])", (list(map(int, batch_ids)),))
+        processor = PaperProcessor(db_handler=db_handler, csv_file_path=csv_file_path, tagger=tagger)
+        data_return = processor.process_papers(db_name=db_name)
+        # print(data_return)
+        deferred = set(int(i) for i in processor.deferred_ids if i is not None)
+        retry_in = host_health.retry_in(processor.deferred_hosts) if deferred else 0.0
+        if data_return.empty:
+            return {"processed": 0, "failed": 0, "failed_ids": [],
+                    "skipped_ids": sorted(set(map(int, batch_ids)) - deferred),
+                    "deferred_ids": sorted(deferred), "retry_in": retry_in}
+
+        # Mark retry rows
+        data_return["is_retry"] = data_return["id"].isin(failed_ids)
+        retry_ids = set(data_return[data_return["is_retry"]]["id"])
+        new_ids = set(data_return[~data_return["is_retry"]]["id"])
+
+        retry_success = set()
+        failed_this_batch = set()
+
+        try:
+            # Use an iterator to get the first key without creating a new list
+            key = next(iter(self.column_mapping.keys())) if self.column_mapping else 'id'
+            # The rest of your code WHERE GAN
+            updater.update_columns_for_existing_records(data_return.drop(columns="is_retry"), id_column=key)
+            retry_success = retry_ids
+        except Exception as err:
+            print(f"Partial failure during update: {err}")
+            failed_this_batch = retry_ids.union(new_ids)
+
+        # Always update with max ID to keep progress tracking
+        last_id = max(batch_ids)
+
+        self.update_tracker(
+            db_handler,
+            db_name,
+            new_processed_ids=new_ids.union(retry_success),
+            retry_success_ids=retry_success,
+            new_failed_ids=failed_this_batch,
+            last_id=last_id,
+            status='in_progress'
+        )
+        processed = len(new_ids.union(retry_success))
+        skipped = set(map(int, batch_ids)) - set(map(int, retry_ids.union(new_ids))) - deferred
+        return {
+            "processed": processed,
+            "failed": len(failed_this_batch),
+            "failed_ids": sorted(map(int, failed_this_batch)),
+            "skipped_ids": sorted(skipped),
+            "deferred_ids": sorted(deferred),
+            "retry_in": retry_in,
+        }
+
+    def process_ids(self, batch_ids, query, csv_file_path, db_name, tagger: TaggerInterface=None, updater=None):
+        """
+        Processes one self-contained batch of primary_ids, e.g. from a Celery sub-task.
+        A long-lived `updater` (one per worker) can be passed to skip reflecting the table.
+        """
+        db_handler = DatabaseHandler(query)
+        own_updater = updater is None
+        if own_updater:
+            updater = DatabaseUpdater(table_name=self.table_name, column_mapping=self.column_mapping)
+        try:
+            self.ensure_tracker_table_exists(db_handler)
+            _, failed_ids, _ = self.get_tracker_info(db_handler, db_name)
+            return self.process_batch(
+                db_handler, updater, query, batch_ids, csv_file_path, db_name,
+                failed_ids=failed_ids, tagger=tagger
+            )
+        finally:
+            if own_updater:
+                updater.close_connection()
+
+    def pending_id_batches(self, query, db_name, batch_size=100):
+        """
+        Splits the primary_ids of `query` not yet processed for `db_name` into
+        sorted id ranges of `batch_size`.
+        """
+        db_handler = DatabaseHandler(query)
+        self.ensure_tracker_table_exists(db_handler)
+        processed_ids, _, _ = self.get_tracker_info(db_handler, db_name)
+        all_ids_result = db_handler.execute_query(f"SELECT primary_id FROM ({query}) AS subq")
+        all_ids = [row[0] for row in all_ids_result] if all_ids_result else []
+        to_process_ids = sorted(set(all_ids) - processed_ids)
+        return [to_process_ids[i:i + batch_size] for i in range(0, len(to_process_ids), batch_size)]
+
+    def process_source_in_batches(self, query, csv_file_path, db_name, batch_size=100, tagger: TaggerInterface=None,
+                                  worker_id=None, retry_failed=True):
         """
         Dynamically processes all missing primary_ids (including skipped ones).
+        Batches are claimed under a lease (see WorkLeases), so several processes
+        can run this for the same source at once without processing a record twice.
         """
         db_handler = DatabaseHandler(query)
         updater = DatabaseUpdater(table_name=self.table_name, column_mapping=self.column_mapping)
+        leases = WorkLeases(pool=db_handler.pool)
+        owner = worker_id or worker_identity()
 
         try:
             self.ensure_tracker_table_exists(db_handler)
@@ -89,59 +199,38 @@ class PaperProcessorPipeline:
             # 1. Get processed & failed IDs
             processed_ids, failed_ids, _ = self.get_tracker_info(db_handler, db_name)
 
-            # 2. Fetch all candidate primary_ids
-            fetch_ids_query = f"SELECT primary_id FROM ({query}) AS subq"
-            all_ids_result = db_handler.execute_query(fetch_ids_query)
-            all_ids = [row[0] for row in all_ids_result] if all_ids_result else []
-
-            # 3. Filter out already processed
-            to_process_ids = sorted(set(all_ids) - processed_ids)
-
-            for i in range(0, len(to_process_ids), batch_size):
-                batch_ids = to_process_ids[i:i + batch_size]
-                placeholders = ",".join(map(str, batch_ids))
-                batch_query = f"{query} AND primary_id IN ({placeholders})"
-
-                db_handler.query = batch_query
-                processor = PaperProcessor(db_handler=db_handler, csv_file_path=csv_file_path, tagger=tagger)
-                data_return = processor.process_papers(db_name=db_name)
-                # print(data_return)
-                if data_return.empty:
-                    continue
-
-                # Mark retry rows
-                data_return["is_retry"] = data_return["id"].isin(failed_ids)
-                retry_ids = set(data_return[data_return["is_retry"]]["id"])
-                new_ids = set(data_return[~data_return["is_retry"]]["id"])
-
-                retry_success = set()
-                failed_this_batch = set()
+            # 2. Queue every candidate primary_id not processed yet (idempotent)
+            leases.enqueue(db_name, query, exclude_ids=processed_ids)
+            if retry_failed:
+                leases.retry_unfinished(db_name)
 
+            # 3. Claim, process and complete batches until nothing is left
+            while True:
+                batch_ids = leases.claim(db_name, owner, batch_size)
+                if not batch_ids:
+                    break
                 try:
-                    # Use an iterator to get the first key without creating a new list
-                    key = next(iter(self.column_mapping.keys())) if self.column_mapping else 'id'
-                    # The rest of your code WHERE GAN
-                    updater.update_columns_for_existing_records(data_return.drop(columns="is_retry"), id_column=key)
-                    retry_success = retry_ids
-                except Exception as err:
-                    print(f"Partial failure during update: {err}")
-                    failed_this_batch = retry_ids.union(new_ids)
-
-                # Always update with max ID to keep progress tracking
-                last_id = max(batch_ids)
-
-                self.update_tracker(
-                    db_handler,
-                    db_name,
-                    new_processed_ids=new_ids.union(retry_success),
-                    retry_success_ids=retry_success,
-                    new_failed_ids=failed_this_batch,
-                    last_id=last_id,
-                    status='in_progress'
+                    with leases.heartbeat(db_name, owner, batch_ids):
+                        outcome = self.process_batch(
+                            db_handler, updater, query, batch_ids,
+                            csv_file_path, db_name, failed_ids=failed_ids, tagger=tagger
+                        )
+                except Exception:
+                    leases.release(db_name, owner, batch_ids)
+                    raise
+                deferred = set(outcome.get("deferred_ids", []))
+                if deferred:
+                    # Their hosts are open-circuited: re-queue them for when the circuit may close
+                    leases.defer(db_name, owner, deferred, max(outcome.get("retry_in", 0.0), 1.0))
+                leases.complete(
+                    db_name, owner, [i for i in batch_ids if i not in deferred],
+                    failed_ids=outcome["failed_ids"], skipped_ids=outcome["skipped_ids"]
                 )
 
-            # All done
-            self.update_tracker(db_handler, db_name, set(), set(), set(), max(all_ids, default=0), status='completed')
+            # All done (other processes may still hold leases on the last batches)
+            counts = leases.counts(db_name)
+            if not counts.get('pending') and not counts.get('leased'):
+                self.update_tracker(db_handler, db_name, set(), set(), set(), 0, status='completed')
 
         except Exception as e:
             traceback.print_exc()
@@ -95,11 +95,15 @@ class Tagging(TaggerInterface):
             "Project MUSE", "Physiotherapy Evidence", "BioMED", "SIGN", "GIMBE", "NICE"
         ]
     def process(self, text):
+        self.load_document(text)
+        return self.create_columns_from_text()
+
+    def load_document(self, text):
+        """Sets the document (and its sections) the extract_* methods work on."""
         self.document = text # clean_references(text)
         # print(self.document)
         self.sections = SectionExtractor(self.document)
         self.result_columns = defaultdict(list)
-        return self.create_columns_from_text()
     
     def get_combined_text(self, sections: List):
         contents = " ".join(self.sections.get(section, "")
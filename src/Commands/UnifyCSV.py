@@ -2,9 +2,18 @@ import sys
 import os
 import re
 import csv
-from typing import List, Dict, Set
+import time
+import zlib
+import heapq
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, Set
 from datetime import datetime
 
+# Hash partitions of the external-memory de-duplication, and processes de-duplicating them
+UNIFY_PARTITIONS = int(os.getenv("UNIFY_PARTITIONS", "64"))
+UNIFY_WORKERS = int(os.getenv("UNIFY_WORKERS", "1"))
+
 # Set CSV field size limit
 try:
     max_int = sys.maxsize
@@ -38,80 +47,128 @@ class CSVUnifier:
         ordered_cols += sorted(col for col in allowed_columns if col not in ordered_cols)
         return ordered_cols
 
-    def process_and_save(self, unique_output_path: str, duplicate_output_path: str):
+    def _partition(self, all_headers: List[str], partition_paths: List[str], no_doi_path: str) -> int:
+        """
+        Pass 1: renames the rows of every source and appends them, prefixed
+        with their global sequence number, to the partition file of their
+        normalised DOI (rows without a DOI go to `no_doi_path`).
+        """
+        position = {name: i for i, name in enumerate(all_headers)}
+        # _get_all_headers always includes these
+        id_index, source_index = position['id'], position['source']
+        created_index, cleaned_index = position['created_at'], position['cleaned_doi']
+        doi_index = position.get('doi')
+        handles = [open(path, 'w', newline='', encoding='utf-8') for path in partition_paths + [no_doi_path]]
+        writers = [csv.writer(handle) for handle in handles]
+        partitions = len(partition_paths)
+        seq = 0
+        try:
+            for path, source_name in self.csv_sources.items():
+                print(f"Processing file: {path}")
+                row_counter = 1
+                rename_map = self.rename_maps.get(path, {})
+
+                try:
+                    with open(path, 'r', encoding='utf-8', newline='') as infile:
+                        reader = csv.reader(infile)
+                        header = next(reader, [])
+                        # (source column, output column) pairs; later pairs win, as with the dict before
+                        pairs = []
+                        for k_index, k in enumerate(header):
+                            target = rename_map.get(k, k if k in self.common_columns else None)
+                            if target in position:
+                                pairs.append((k_index, position[target]))
+
+                        for row in reader:
+                            if not row:
+                                continue
+                            out = [''] * len(all_headers)
+                            for k_index, out_index in pairs:
+                                if k_index < len(row):
+                                    out[out_index] = row[k_index]
+                            out[id_index] = f"{source_name}_{row_counter}"
+                            out[source_index] = source_name
+                            out[created_index] = datetime.now().isoformat()
+                            row_counter += 1
+
+                            doi = out[doi_index] if doi_index is not None else ''
+                            cleaned_doi = self._normalize_doi(doi)
+                            out[cleaned_index] = cleaned_doi
+
+                            target = zlib.crc32(cleaned_doi.encode('utf-8')) % partitions if cleaned_doi else partitions
+                            seq += 1
+                            writers[target].writerow([seq] + out)
+
+                except FileNotFoundError:
+                    print(f"Warning: File not found and will be skipped: {path}")
+                except csv.Error as e:
+                    print(f"CSV formatting error in {path}: {e}")
+                except Exception as e:
+                    print(f"Unexpected error in {path}: {e}")
+        finally:
+            for handle in handles:
+                handle.close()
+        return seq
+
+    def process_and_save(self, unique_output_path: str, duplicate_output_path: str,
+                         partitions: int = UNIFY_PARTITIONS, workers: int = UNIFY_WORKERS,
+                         temp_dir: Optional[str] = None) -> Dict[str, float]:
+        """
+        External-memory unification, so harvests larger than memory can be
+        de-duplicated:
+
+        1. rows are hash-partitioned by normalised DOI into `partitions`
+           temporary files (every copy of a DOI lands in the same file)
+        2. each partition is de-duplicated on its own, with `workers`
+           processes if > 1; only the DOIs of one partition are in memory
+        3. the partitions are merged back by sequence number
+
+        The first occurrence of a DOI (in csv_sources order, then row order)
+        is the unique record and both outputs keep the input order, so the
+        result doesn't depend on the partitioning. Rows without a DOI are
+        always unique.
+        """
         print("Starting unification process...")
         os.makedirs(os.path.dirname(unique_output_path), exist_ok=True)
         os.makedirs(os.path.dirname(duplicate_output_path), exist_ok=True)
 
         all_headers = self._get_all_headers()
-        seen_dois: Set[str] = set()
-        unique_count = 0
-        duplicate_count = 0
+        stats = {"rows": 0, "unique": 0, "duplicates": 0, "partitions": partitions, "seconds": 0.0}
+        started = time.perf_counter()
 
         try:
-            with open(unique_output_path, 'w', newline='', encoding='utf-8') as unique_file, \
-                 open(duplicate_output_path, 'w', newline='', encoding='utf-8') as duplicate_file:
-
-                unique_writer = csv.DictWriter(unique_file, fieldnames=all_headers, extrasaction='ignore')
-                duplicate_writer = csv.DictWriter(duplicate_file, fieldnames=all_headers, extrasaction='ignore')
-                unique_writer.writeheader()
-                duplicate_writer.writeheader()
-
-                for path, source_name in self.csv_sources.items():
-                    print(f"Processing file: {path}")
-                    row_counter = 1
-                    rename_map = self.rename_maps.get(path, {})
-
-                    try:
-                        with open(path, 'r', encoding='utf-8') as infile:
-                            reader = csv.DictReader(infile)
-
-                            for row in reader:
-                                renamed_row = {}
-
-                                for k, v in row.items():
-                                    if k in rename_map:
-                                        renamed_col = rename_map[k]
-                                        renamed_row[renamed_col] = v
-                                    elif k in self.common_columns:
-                                        renamed_row[k] = v
-
-                                renamed_row['id'] = f"{source_name}_{row_counter}"
-                                renamed_row['source'] = source_name
-                                renamed_row['created_at'] = datetime.now().isoformat()
-                                row_counter += 1
-
-                                doi = renamed_row.get('doi', '')
-                                cleaned_doi = self._normalize_doi(doi)
-                                renamed_row['cleaned_doi'] = cleaned_doi
-
-                                if not cleaned_doi:
-                                    unique_writer.writerow(renamed_row)
-                                    unique_count += 1
-                                elif cleaned_doi in seen_dois:
-                                    duplicate_writer.writerow(renamed_row)
-                                    duplicate_count += 1
-                                else:
-                                    seen_dois.add(cleaned_doi)
-                                    unique_writer.writerow(renamed_row)
-                                    unique_count += 1
-
-                    except FileNotFoundError:
-                        print(f"Warning: File not found and will be skipped: {path}")
-                    except csv.Error as e:
-                        print(f"CSV formatting error in {path}: {e}")
-                    except Exception as e:
-                        print(f"Unexpected error in {path}: {e}")
-
+            with tempfile.TemporaryDirectory(prefix="unify_", dir=temp_dir or os.path.dirname(unique_output_path)) as tmp:
+                partition_paths = [os.path.join(tmp, f"part_{n}.csv") for n in range(partitions)]
+                no_doi_path = os.path.join(tmp, "no_doi.csv")
+                stats["rows"] = self._partition(all_headers, partition_paths, no_doi_path)
+
+                doi_index = all_headers.index('cleaned_doi') + 1
+                jobs = [(path, path + ".unique", path + ".duplicates", doi_index) for path in partition_paths]
+                if workers > 1:
+                    with ProcessPoolExecutor(max_workers=workers) as executor:
+                        list(executor.map(_dedupe_partition, *zip(*jobs)))
+                else:
+                    for job in jobs:
+                        _dedupe_partition(*job)
+
+                stats["unique"] = _merge_by_sequence(
+                    [no_doi_path] + [job[1] for job in jobs], unique_output_path, all_headers)
+                stats["duplicates"] = _merge_by_sequence(
+                    [job[2] for job in jobs], duplicate_output_path, all_headers)
+
+            stats["seconds"] = time.perf_counter() - started
             print("\n--- Process Complete ---")
-            print(f"Saved {unique_count} unique records to {unique_output_path}")
-            if duplicate_count > 0:
-                print(f"  Found and saved {duplicate_count} duplicate records to {duplicate_output_path}")
+            print(f"Saved {stats['unique']} unique records to {unique_output_path}")
+            if stats["duplicates"] > 0:
+                print(f"  Found and saved {stats['duplicates']} duplicate records to {duplicate_output_path}")
             else:
                 print("No duplicate records were found.")
+            print(f"Unified {stats['rows']} rows in {stats['seconds']:.1f}s "
+                  f"({stats['rows'] / max(stats['seconds'], 1e-9) * 60:,.0f} rows/min, {partitions} partitions)")
 
         except Exception as e:
             print(f"Critical error during file writing: {e}")
+        return stats
 
     @staticmethod
     def extract_column_duplicates(input_file: str, output_file: str, column_to_check: str):
@@ -145,6 +202,39 @@ class CSVUnifier:
 
         print(f"Duplicated rows by '{column_to_check}' saved to {output_file} ({count} rows).")
 
+def _dedupe_partition(path: str, unique_path: str, duplicate_path: str, doi_index: int) -> None:
+    """Pass 2: splits one partition (already in sequence order) into first occurrences and repeats."""
+    seen_dois: Set[str] = set()
+    with open(path, 'r', encoding='utf-8', newline='') as infile, \
+         open(unique_path, 'w', newline='', encoding='utf-8') as unique_file, \
+         open(duplicate_path, 'w', newline='', encoding='utf-8') as duplicate_file:
+        unique_writer = csv.writer(unique_file)
+        duplicate_writer = csv.writer(duplicate_file)
+        for row in csv.reader(infile):
+            if row[doi_index] in seen_dois:
+                duplicate_writer.writerow(row)
+            else:
+                seen_dois.add(row[doi_index])
+                unique_writer.writerow(row)
+
+
+def _merge_by_sequence(paths: List[str], output_path: str, all_headers: List[str]) -> int:
+    """Pass 3: k-way merge of sequence-ordered partition files into `output_path`, without the sequence column."""
+    handles = [open(path, 'r', encoding='utf-8', newline='') for path in paths]
+    count = 0
+    try:
+        with open(output_path, 'w', newline='', encoding='utf-8') as outfile:
+            writer = csv.writer(outfile)
+            writer.writerow(all_headers)
+            for row in heapq.merge(*(csv.reader(handle) for handle in handles), key=lambda row: int(row[0])):
+                writer.writerow(row[1:])
+                count += 1
+    finally:
+        for handle in handles:
+            handle.close()
+    return count
+
+
 def get_latest_file(directory: str, prefix: str, suffix: str) -> str | None:
     latest_file = None
     latest_date = None
@@ -0,0 +1,87 @@
+"""
+Single-scan contextual filter counts.
+
+Instead of one GROUP BY per category column (UNION ALL over a CTE), every
+category column is unnested with a LATERAL VALUES list so the filtered rows
+are read once and grouped once:
+
+    SELECT v.category, v.value, COUNT(*) AS count
+    FROM (SELECT "col_a", "col_b" FROM all_db WHERE ...) AS base
+    CROSS JOIN LATERAL (VALUES (:cat_0, CAST(base."col_a" AS TEXT)),
+                               (:cat_1, CAST(base."col_b" AS TEXT))) AS v(category, value)
+    WHERE v.value IS NOT NULL
+    GROUP BY v.category, v.value
+"""
+import logging
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+
+class FilterCountEngine:
+    """Counts filter values for every category column in one pass over the filtered rows."""
+
+    def __init__(self, db_service):
+        self.db_service = db_service
+
+    def build_query(self, builder, categories):
+        """
+        Builds the single-pass count query from a prepared PostgresService builder.
+
+        :param builder: PostgresService with table and conditions already applied.
+        :param categories: Mapping of display name -> database column.
+        :return: (sql, params) or (None, None) when no category column exists.
+        """
+        valid_columns = builder._table_columns_lower
+        column_lookup = {c.lower(): c for c in builder._table_columns}
+
+        params = dict(builder._params)
+        selected_columns = []
+        value_rows = []
+        for i, (display_name, db_column) in enumerate(categories.items()):
+            if db_column.lower() not in valid_columns:
+                continue
+            column = column_lookup.get(db_column.lower(), db_column)
+            quoted = builder._quote(column)
+            if quoted not in selected_columns:
+                selected_columns.append(quoted)
+
+            param_name = f"cat_{i}"
+            params[param_name] = display_name
+            value_rows.append(f"(:{param_name}, CAST(base.{quoted} AS TEXT))")
+
+        if not value_rows:
+            return None, None
+
+        where_clause = builder.build_where_clause()
+        sql = (
+            f"SELECT v.category, v.value, COUNT(*) AS count "
+            f"FROM (SELECT {', '.join(selected_columns)} FROM {builder._table} {where_clause}) AS base "
+            f"CROSS JOIN LATERAL (VALUES {', '.join(value_rows)}) AS v(category, value) "
+            f"WHERE v.value IS NOT NULL "
+            f"GROUP BY v.category, v.value"
+        )
+        return sql, params
+
+    def count(self, builder, categories):
+        """
+        Executes the count query and returns {category: [{"value": ..., "count": ...}]}.
+        The builder is reset afterwards so the shared service can be reused.
+        """
+        try:
+            sql, params = self.build_query(builder, categories)
+        finally:
+            builder.reset_query()
+
+        if sql is None:
+            return {}
+
+        raw_counts = self.db_service.execute_raw_query(sql, params)
+
+        formatted_counts = defaultdict(list)
+        for row in raw_counts:
+            formatted_counts[row['category']].append({
+                "value": row['value'],
+                "count": row['count']
+            })
+        return dict(formatted_counts)
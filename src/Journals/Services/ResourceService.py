@@ -33,7 +33,7 @@ class ResourceService:
         """Serialize list of objects - MUST BE CALLED!"""
         if not items:
             return []
-        return [ModelSerializer.to_dict(item, include_relationships=include_relationships) for item in items]
+        return ModelSerializer.serialize_list(items, include_relationships=include_relationships)
     
     # ========================================================================
     # GET OPERATIONS
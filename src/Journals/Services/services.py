@@ -8,14 +8,24 @@ from src.Utils.Helpers import preprocess_languages
 from src.Services.PostgresService import PostgresService
 from src.Services.ChartService import ChartService
 from src.Journals.Services.APIResponseNormalizer import APIResponseNormalizer
+from src.Journals.Services.FilterCountEngine import FilterCountEngine
+from src.Services.FacetIndex import get_facet_index
+from src.Services.DBservices.RecordProcessor import RecordProcessor
+from src.Services.DBservices.FieldSelection import FieldSelection
 
 
 class JSONService:
     """Service for interacting with the database using JSON payloads for CRUD operations."""
 
+    # Keys of the "others" section returned by get_all_filter_options().
+    OTHER_FILTER_CATEGORIES = ("Language", "Country", "Region", "Year", "AMSTAR 2 Rating")
+
     def __init__(self):
         self.db_service = PostgresService()
         self.chart_service = ChartService()
+        self.count_engine = FilterCountEngine(self.db_service)
+        self._category_mappings_cache = {}
+        self.record_processor = RecordProcessor()
         self.fields_to_extract = [
             "topic__hash__acceptance__hash__kaa", "topic__hash__adm__hash__adm", "topic__hash__coverage__hash__cov", "topic__hash__eco__hash__eco",
             "topic__hash__ethical__issues__hash__eth", "topic__hash__modeling__hash__mod", "topic__hash__risk__factor__hash__rf", "topic__hash__safety__hash__saf",
@@ -39,25 +49,23 @@ class JSONService:
         builder = self.db_service.table(table_name)
         valid_columns_lower = builder._table_columns_lower
 
-        # 1. SELECT clause
-        if cols_to_select := payload.get("columns"):
-            final_cols = [
-                col for col in cols_to_select if col == '*' or col.lower() in valid_columns_lower
-            ]
-            if final_cols:
-                builder.select(*final_cols)
+        # 1. SELECT clause ("columns"/"fields", "exclude", "preset": list | summary | detail)
+        # primary_id is only added to plain listings, not to grouped/aggregated queries
+        aggregated = bool(payload.get("group_by") or payload.get("aggregations"))
+        selected_columns = FieldSelection.resolve(
+            builder._table_columns,
+            fields=payload.get("columns") or payload.get("fields"),
+            exclude=payload.get("exclude"),
+            preset=payload.get("preset"),
+            with_key=not aggregated,
+        )
+        if selected_columns:
+            builder.select(*selected_columns)
 
         # 2. FILTERS
         filters = payload.get("filters", [])
         if filters:
-            def extract_group_key(colname):
-                """
-                Group all topic__hash__... together, same for intervention__hash__, etc.
-                """
-                parts = colname.lower().split("__hash__")
-                if len(parts) >= 2:
-                    return parts[0] + "__hash__"  # only use first prefix
-                return colname.lower()
+            extract_group_key = self._filter_group_key
             # def extract_group_key(colname):
             #     """
             #     Example:
@@ -145,6 +153,71 @@ class JSONService:
 
         return builder
 
+    @staticmethod
+    def _filter_group_key(colname):
+        """
+        Group all topic__hash__... together, same for intervention__hash__, etc.
+        """
+        parts = colname.lower().split("__hash__")
+        if len(parts) >= 2:
+            return parts[0] + "__hash__"  # only use first prefix
+        return colname.lower()
+
+    def _payload_filter_tree(self, payload, valid_columns_lower):
+        """
+        Translates payload filters into a FacetIndex filter tree using the same
+        grouping as _build_from_payload (OR within a group, AND across groups).
+        Returns False when a filter type has no index equivalent.
+        """
+        grouped_filters = defaultdict(list)
+        for f in payload.get("filters", []):
+            column = f.get("column") or (f.get("columns")[
+                0] if f.get("columns") else None)
+            if not column:
+                continue
+            if column.lower() not in valid_columns_lower and not all(
+                c.lower() in valid_columns_lower for c in f.get("columns", [])
+            ):
+                continue
+            grouped_filters[self._filter_group_key(column)].append(f)
+
+        groups = []
+        for group_filters in grouped_filters.values():
+            leaves = []
+            for f in group_filters:
+                column, value = f.get("column"), f.get("value")
+                filter_type = f.get("type", "where").lower()
+                if filter_type == "where":
+                    leaves.append((column, "is_null", None) if value is None
+                                  else (column, "eq", value))
+                elif filter_type == "inwhere":
+                    leaves.append((column, "in", value))
+                elif filter_type == "likewhere":
+                    leaves.append((column, "like_any", [value]))
+                elif filter_type == "betweenwhere":
+                    leaves.append((column, "between", (value[0], value[1])))
+                elif filter_type == "multi_column_like":
+                    leaves.append(("OR", [(c, "like_any", [value])
+                                          for c in f.get("columns") or []]))
+                else:
+                    return False
+            groups.append(("OR", leaves))
+        return ("AND", groups)
+
+    def _indexed_filter_counts(self, payload, facet_index):
+        """Answers get_contextual_filter_counts() from the bitmap index, or None."""
+        if payload.get("table") != facet_index.table:
+            return None
+        valid_columns_lower = {c.lower() for c in facet_index.table_columns}
+        tree = self._payload_filter_tree(payload, valid_columns_lower)
+        if tree is False:
+            return None
+        mask = facet_index.mask_for(tree)
+        if mask is None:
+            return None
+        categories = self._get_filter_category_mappings(facet_index.table_columns)
+        return facet_index.category_counts(categories, mask)
+
     def get_all_filter_options(self, include=None):
         """
         Generates and returns the complete, structured set of all available
@@ -211,80 +284,51 @@ class JSONService:
         currently active filters in the payload.
         """
         try:
-            # Step 1: Get the complete filter configuration.
-            all_filters_response = self.get_all_filter_options()
-            if not all_filters_response.get("success"):
-                return all_filters_response  # Propagate any errors
-            all_filters_config = all_filters_response.get("data", {})
+            # Step 0: Answer from the in-memory bitmap index when it is enabled
+            # and every filter can be evaluated there.
+            facet_index = get_facet_index()
+            if facet_index is not None:
+                counts = self._indexed_filter_counts(payload, facet_index)
+                if counts is not None:
+                    return {"success": True, "data": counts}
+
+            # Step 1: Build the user's filters; values stay bound as parameters.
+            builder = self._build_from_payload(payload)
 
-            # Step 2: Create a simple mapping of display names to database columns.
-            filter_categories = self._generate_filter_category_mappings(
-                all_filters_config)
+            # Step 2: Map display names to database columns. Only the column
+            # names are needed here, so the distinct-value lookups done by
+            # get_all_filter_options() are skipped.
+            filter_categories = self._get_filter_category_mappings(
+                builder._table_columns)
 
-            # Step 3: Get the base query for the user's current search filters.
-            builder = self._build_from_payload(payload)
-            base_query_info = builder.show_sql()
-            base_query_sql = base_query_info['query']
-            base_query_params = base_query_info['params']
-
-            # Isolate the WHERE clause from the base query.
-            where_clause = ""
-            if ' WHERE ' in base_query_sql:
-                # Extract everything from WHERE to the end, then remove ordering/pagination.
-                where_clause = " WHERE " + \
-                    base_query_sql.split(" WHERE ", 1)[1]
-                where_clause = where_clause.split(
-                    " ORDER BY ")[0].split(" LIMIT ")[0]
-
-            # Step 4: Build the final aggregation query.
-            count_subqueries = []
-            for display_name, db_column in filter_categories.items():
-                if db_column.lower() in builder._table_columns_lower:
-
-                    # This is the subquery being built
-                    subquery = f"""
-                        SELECT
-                            '{display_name}' as category,
-                            CAST("{db_column}" AS TEXT) as value, -- ✅ FIX IS HERE
-                            COUNT(*) as count
-                        FROM base_results
-                        WHERE "{db_column}" IS NOT NULL
-                        GROUP BY "{db_column}"
-                    """
-                    count_subqueries.append(subquery)
-
-            if not count_subqueries:
-                # Return empty if no valid categories to count
-                return {"success": True, "data": {}}
-
-            # The final query uses a Common Table Expression (CTE) for efficiency.
-            final_sql = f"""
-                WITH base_results AS (
-                    SELECT * FROM {builder._table}
-                    {where_clause}
-                )
-                {' UNION ALL '.join(count_subqueries)};
-            """
-
-            # Step 5: Execute the query and format the results.
-            raw_counts = self.db_service.execute_raw_query(
-                final_sql, base_query_params)
-
-            # Convert the flat list of counts into a nested dictionary.
-            formatted_counts = defaultdict(list)
-            for row in raw_counts:
-                formatted_counts[row['category']].append({
-                    "value": row['value'],
-                    "count": row['count']
-                })
-
-            return {"success": True, "data": dict(formatted_counts)}
+            # Step 3: Count every category in a single pass over the filtered rows.
+            counts = self.count_engine.count(builder, filter_categories)
+            return {"success": True, "data": counts}
 
         except Exception as e:
             import traceback
             traceback.print_exc()
             return {"error": str(e)}
 
+    def _get_filter_category_mappings(self, table_columns):
+        """
+        Builds the display name -> column mapping used for counting, cached
+        per column set since the schema rarely changes.
+        """
+        cache_key = tuple(table_columns)
+        if self._category_mappings_cache.get("key") != cache_key:
+            tag_filter_data = self.process_columns_with_hash(
+                table_columns, searchRegEx)
+            all_filters_config = {
+                "others": dict.fromkeys(self.OTHER_FILTER_CATEGORIES),
+                "tag_filters": tag_filter_data.get("data", {}),
+            }
+            self._category_mappings_cache = {
+                "key": cache_key,
+                "mappings": self._generate_filter_category_mappings(all_filters_config),
+            }
+        return self._category_mappings_cache["mappings"]
+
     def _generate_filter_category_mappings(self, all_filters_config):
         """
         Helper function to dynamically create a mapping of display names
@@ -344,6 +388,9 @@ class JSONService:
         for record in records:
             if not record:
                 continue
+            # Stored at tagging time (see DatabaseUpdater); nothing to derive.
+            if self.record_processor.has_materialised_columns(record):
+                continue
 
             def extract_values(fields):
                 values = []
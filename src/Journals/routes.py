@@ -15,7 +15,8 @@ from src.Journals.views.data_filters import (
     FetchRecordsByIdsAPI, FilterAPI, ProcessUserSelectionAPI,
     SummaryStatisticsAPI, FetchRecordAPI
 )
-from src.Journals.views.paper_processor_api import PaperProcessorAPI
+from src.Journals.views.paper_processor_api import PaperProcessorAPI, PaperProcessorExecute
+from src.Journals.views.task_status_api import TaskListAPI, TaskStatusAPI, TaskResultDownloadAPI
 from src.Journals.views.visualization_resource import VisualizationDataAPI, VisualizationFiltersAPI
 from src.Utils.filter_structure import FILTER_STRUCTURE
 from src.models_.ModelRegistry import ModelRegistry
@@ -36,6 +37,10 @@ def journal_routes(api):
     # api.add_resource(DataFilterResource, '/data/filter')
     # Add the resource to the API
     api.add_resource(PaperProcessorAPI, '/api/process-uploaded-file')
+    api.add_resource(PaperProcessorExecute, '/api/process-papers')
+    api.add_resource(TaskListAPI, '/api/tasks')
+    api.add_resource(TaskStatusAPI, '/api/tasks/<string:task_id>')
+    api.add_resource(TaskResultDownloadAPI, '/api/tasks/<string:task_id>/download')
     api.add_resource(VisualizationFiltersAPI, '/api/v1/visualizations/filters')
     api.add_resource(VisualizationDataAPI, '/api/v1/visualizations/data')
     
@@ -7,6 +7,7 @@ Single BaseResourceAPI handles ANY table without subclassing
 from flask import request, current_app
 from flask_restful import Resource, Api
 from src.Journals.Services.ResourceService import ResourceService
+from src.Services.DBservices.FieldSelection import FieldSelection
 from src.Utils.response import ApiResponse
 import json
 from typing import Optional, List, Dict, Any
@@ -273,8 +274,10 @@ class DynamicResourceAPI(Resource):
         1. Simple search (auto-detects string columns):
            ?q=search_term
         
-        2. Search specific fields:
-           ?q=search_term&fields=title,abstract,authors
+        2. Sparse fieldsets (only these columns are fetched):
+           ?q=search_term&fields=title,year,authors
+           ?preset=list            (list | summary | detail)
+           ?exclude=abstract,keywords
         
         3. Advanced search (JSON):
            ?search={"conditions":[{"field":"year","operator":"=","value":2023}],"logic":"AND"}
@@ -342,11 +345,18 @@ class DynamicResourceAPI(Resource):
             if sort_by:
                 query.order_by(sort_by, sort_direction)
             
+            # Sparse fieldsets: fetch only the requested columns
+            selected_columns = FieldSelection.from_request(
+                self._get_all_columns(model_class), request.args
+            )
+            if selected_columns:
+                query.only(*selected_columns)
+            
             results = query.paginate(page=page, per_page=per_page)
             
             # Serialize items
             from src.Services.DBservices.ModelSerializer import ModelSerializer
-            serialized_items = [ModelSerializer.to_dict(item) for item in results.items]
+            serialized_items = ModelSerializer.serialize_list(results.items, columns=selected_columns)
             
             return ApiResponse.success(
                 data={
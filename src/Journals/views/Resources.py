@@ -4,7 +4,6 @@ Filter Resources - Using ApplicationService
 
 from flask_restful import Resource
 from flask import current_app
-from src.Services.DBservices.RecordProcessor import RecordProcessor
 from src.Utils.response import ApiResponse
 import logging
 
@@ -62,6 +61,7 @@ Multi-field OR search compatible
 from flask import request, send_file
 from flask_restful import Resource
 from sqlalchemy import and_, or_, func, between, inspect as sql_inspect
+from sqlalchemy.orm import load_only
 from typing import Dict, List, Any, Optional
 import logging
 import io
@@ -75,6 +75,10 @@ from collections import defaultdict
 
 from database.db import db
 from src.Utils.filter_structure import FILTER_STRUCTURE
+from src.Services.FacetIndex import get_facet_index
+from src.Utils.tag_codes import parse_tag_codes
+from src.Services.DBservices.SerializerCompiler import SerializerCompiler
+from src.Services.DBservices.FieldSelection import FieldSelection
 
 logger = logging.getLogger(__name__)
 
@@ -88,7 +92,6 @@ class FilterSearchResource(Resource):
     def __init__(self):
         """Initialize with no external dependencies."""
         self.logger = logger
-        self.record_processor = RecordProcessor() 
     
     def post(self):
         """Search records with filtering, pagination, sorting."""
@@ -141,6 +144,16 @@ class FilterSearchResource(Resource):
             if export_format:
                 return self._handle_export(query, export_format, model_class)
             
+            # Sparse fieldsets: only fetch the requested columns
+            # ("fields" / "exclude" / "preset": list | summary | detail)
+            selected_columns = FieldSelection.from_request(
+                [col.name for col in model_class.__table__.columns], data
+            )
+            if selected_columns:
+                query = query.options(load_only(
+                    *[getattr(model_class, col) for col in selected_columns]
+                ))
+            
             # Apply pagination
             page = pagination.get('page', 1)
             page_size = pagination.get('page_size', 20)
@@ -149,11 +162,8 @@ class FilterSearchResource(Resource):
             
             # Execute query
             records = query.all()
-            serialized_records = [self._serialize_record(r) for r in records]
-            
-            serialized_records = self.record_processor.add_artificial_columns(
-                serialized_records
-            )
+            # Artificial columns are added once, by the JSON serialisation hook
+            serialized_records = [self._serialize_record(r, selected_columns) for r in records]
             
             # Pagination info
             total_pages = (total_records + page_size - 1) // page_size
@@ -626,7 +636,7 @@ class FilterSearchResource(Resource):
         except Exception as e:
             return query
     
-    def _serialize_record(self, record) -> Dict:
+    def _serialize_record(self, record, columns: Optional[List[str]] = None) -> Dict:
         """Serialize ORM instance OR SQLAlchemy Row/RowMapping to dict."""
         try:
             # Case 1: SQLAlchemy Row / RowMapping (SQLAlchemy 1.4/2.0)
@@ -648,11 +658,7 @@ class FilterSearchResource(Resource):
 
             # Case 2: ORM model instance
             if hasattr(record, "__table__"):
-                result = {}
-                for column in record.__table__.columns:
-                    value = getattr(record, column.name)
-                    result[column.name] = value.isoformat() if isinstance(value, datetime) else value
-                return result
+                return SerializerCompiler.compile(record.__class__, columns=columns, profile='record')(record)
 
             # Unknown type
             return {}
@@ -661,50 +667,60 @@ class FilterSearchResource(Resource):
             return {}
         
     
+    # Category patterns for filter counts (prefix-based)
+    FILTER_COUNT_CATEGORIES = {
+        'Country': {'columns': ['country'], 'type': 'standard'},
+        'Year': {'columns': ['year'], 'type': 'standard'},
+        'Amstar_Label': {'columns': ['amstar_label'], 'type': 'standard'},
+        'Topics': {'prefix': 'topic__hash__', 'type': 'hash'},
+        'Interventions': {'prefix': 'intervention__hash__vpd__hash', 'type': 'hash'},
+        'Vaccine Options': {'prefix': 'intervention__hash__vaccine__options__hash', 'type': 'hash'},
+        'Outcomes': {'prefix': 'outcome__hash__', 'type': 'hash'},
+        'Population': {'prefix': 'popu__hash__', 'type': 'hash'}
+    }
+
+    def _discover_field_groups(self, all_columns: List[str]) -> Dict[str, List[str]]:
+        """Build field groups dynamically from the category patterns."""
+        field_groups = {}
+        for category, config in self.FILTER_COUNT_CATEGORIES.items():
+            if 'columns' in config:
+                # Standard fields (explicitly listed)
+                field_groups[category] = config['columns']
+            elif 'prefix' in config:
+                # Dynamic discovery: Find all columns starting with prefix
+                matching_columns = [
+                    col for col in all_columns
+                    if col.startswith(config['prefix'])
+                ]
+                if matching_columns:
+                    field_groups[category] = matching_columns
+        return field_groups
+
+    def _aggregate_category_results(self, category_results: List[Dict]) -> List[Dict]:
+        """Aggregate: Sum counts for duplicate values."""
+        aggregated = {}
+        for item in category_results:
+            key = item['value']
+            if key in aggregated:
+                aggregated[key]['count'] += item['count']
+            else:
+                aggregated[key] = item
+        return list(aggregated.values())
+
     def _get_filter_counts(self, model_class, search: Dict) -> Dict:
         """Get filter counts with dynamic field discovery."""
+        indexed_counts = self._get_indexed_filter_counts(model_class, search)
+        if indexed_counts is not None:
+            return indexed_counts
+
         try:
             counts = {}
-            base_query = db.session.query(model_class)
-            
-            if search and 'conditions' in search:
-                base_query = self._apply_filters_recursive(
-                    base_query, 
-                    model_class, 
-                    search['conditions'], 
-                    search.get('logic', 'AND')
-                )
             
             # ✅ Get all column names from the model
             all_columns = [col.name for col in model_class.__table__.columns]
             
-            # ✅ Define category patterns (prefix-based)
-            category_patterns = {
-                'Country': {'columns': ['country'], 'type': 'standard'},
-                'Year': {'columns': ['year'], 'type': 'standard'},
-                'Amstar_Label': {'columns': ['amstar_label'], 'type': 'standard'},
-                'Topics': {'prefix': 'topic__hash__', 'type': 'hash'},
-                'Interventions': {'prefix': 'intervention__hash__vpd__hash', 'type': 'hash'},
-                'Vaccine Options': {'prefix': 'intervention__hash__vaccine__options__hash', 'type': 'hash'},
-                'Outcomes': {'prefix': 'outcome__hash__', 'type': 'hash'},
-                'Population': {'prefix': 'popu__hash__', 'type': 'hash'}
-            }
-            
             # ✅ Build field groups dynamically
-            field_groups = {}
-            
-            for category, config in category_patterns.items():
-                if 'columns' in config:
-                    # Standard fields (explicitly listed)
-                    field_groups[category] = config['columns']
-                elif 'prefix' in config:
-                    # ✅ Dynamic discovery: Find all columns starting with prefix
-                    matching_columns = [
-                        col for col in all_columns 
-                        if col.startswith(config['prefix'])
-                    ]
-                    if matching_columns:
-                        field_groups[category] = matching_columns
+            field_groups = self._discover_field_groups(all_columns)
             
             self.logger.info(f"📊 Discovered field groups: {list(field_groups.keys())}")
             for category, fields in field_groups.items():
@@ -713,7 +729,7 @@ class FilterSearchResource(Resource):
             # Process each group
             for category, field_list in field_groups.items():
                 category_results = []
-                category_type = category_patterns.get(category, {}).get('type', 'hash')
+                category_type = self.FILTER_COUNT_CATEGORIES.get(category, {}).get('type', 'hash')
                 
                 for filter_col in field_list:
                     if not hasattr(model_class, filter_col):
@@ -759,17 +775,8 @@ class FilterSearchResource(Resource):
                                     'raw_value': str(value)
                                 })
                 
-                # Aggregate: Sum counts for duplicate tag codes
                 if category_results:
-                    aggregated = {}
-                    for item in category_results:
-                        key = item['value']
-                        if key in aggregated:
-                            aggregated[key]['count'] += item['count']
-                        else:
-                            aggregated[key] = item
-                    
-                    counts[category] = list(aggregated.values())
+                    counts[category] = self._aggregate_category_results(category_results)
             
             return counts
         
@@ -777,38 +784,120 @@ class FilterSearchResource(Resource):
             self.logger.error(f"Error getting filter counts: {e}", exc_info=True)
             return {}
 
+    def _get_indexed_filter_counts(self, model_class, search: Dict) -> Optional[Dict]:
+        """
+        Filter counts from the in-memory bitmap index (FACET_INDEX_ENABLED).
+        Returns None when the index is off or a condition is not indexable.
+        """
+        facet_index = get_facet_index(model_class.__tablename__)
+        if facet_index is None:
+            return None
 
-    def _parse_hash_value(self, value: str) -> List[str]:
+        try:
+            tree = None
+            if search and 'conditions' in search:
+                tree = self._search_filter_tree(
+                    model_class, search['conditions'], search.get('logic', 'AND'))
+                if tree is False:
+                    return None
+            mask = facet_index.mask_for(tree)
+            if mask is None:
+                return None
+
+            counts = {}
+            field_groups = self._discover_field_groups(facet_index.columns)
+            for category, field_list in field_groups.items():
+                category_results = []
+                category_type = self.FILTER_COUNT_CATEGORIES.get(category, {}).get('type', 'hash')
+                for filter_col in field_list:
+                    if category_type == 'standard':
+                        for value, count in facet_index.value_counts(filter_col, mask).items():
+                            if value:
+                                category_results.append({
+                                    'value': str(value), 'count': count, 'field': filter_col
+                                })
+                    else:
+                        for tag_code, (count, raw) in facet_index.tag_code_counts(filter_col, mask).items():
+                            category_results.append({
+                                'value': tag_code, 'count': count,
+                                'field': filter_col, 'raw_value': str(raw)
+                            })
+                if category_results:
+                    counts[category] = self._aggregate_category_results(category_results)
+            return counts
+
+        except Exception as e:
+            self.logger.warning(f"Indexed filter counts failed, using SQL: {e}")
+            return None
+
+    def _search_filter_tree(self, model_class, conditions: List[Dict], logic: str = 'AND'):
         """
-        Parse hash field values to extract tag codes.
-        
-        Examples:
-        - "influenza:infl" → ["infl"]
-        - "HPV:hpv; Human papillomavirus:hpv" → ["hpv"]
-        - "death:dea; mortality:dea" → ["dea"]
+        Translate search conditions into a FacetIndex filter tree, mirroring
+        _apply_filters_recursive/_build_single_clause. Returns False when a
+        condition cannot be evaluated from the index.
         """
-        if not value or not isinstance(value, str):
-            return []
-        
-        tag_codes = set()
-        
-        # Split by semicolon first (handles multiple entries)
-        parts = value.split(';')
-        
-        for part in parts:
-            part = part.strip()
-            if not part:
-                continue
-            
-            # Look for "text:code" pattern
-            if ':' in part:
-                tag_code = part.split(':')[-1].strip()
-                
-                # Only add valid tag codes (short, not just numbers)
-                if tag_code and len(tag_code) <= 10 and not tag_code.replace('_', '').isdigit():
-                    tag_codes.add(tag_code)
-        
-        return list(tag_codes)
+        op_map = {
+            '=': 'eq', '==': 'eq', 'equals': 'eq', 'in': 'in', 'not_in': 'not_in',
+            'between': 'between', 'gt': 'gt', 'gte': 'gte', 'lt': 'lt', 'lte': 'lte',
+            'not_equals': 'ne', '!=': 'ne', '<>': 'ne', 'is_null': 'is_null',
+            'is_not_null': 'is_not_null', 'starts_with': 'starts_with', 'ends_with': 'ends_with',
+        }
+
+        def leaf(condition):
+            field = condition.get('field')
+            operator = condition.get('operator', 'contains')
+            value = condition.get('value')
+            values = condition.get('values', [])
+            if not field or not hasattr(model_class, field):
+                return None  # skipped, as in _build_single_clause
+
+            is_hash_field = '__hash__' in field
+            if is_hash_field and operator == 'contains_any' and values:
+                return (field, 'like_any', [f':{code}' for code in values])
+            if is_hash_field and operator == 'equals' and value:
+                return (field, 'like_any', [f"'{value}': true", f'"{value}": true'])
+            if is_hash_field and operator == 'in' and values:
+                return (field, 'like_any', [p for v in values
+                                            for p in (f"'{v}': true", f'"{v}": true')])
+            if operator == 'contains':
+                return (field, 'like_any', [value])
+            if operator in ('in', 'not_in') and not values:
+                return None
+            if operator == 'between' and (not isinstance(value, list) or len(value) != 2):
+                return None
+            if operator in op_map:
+                mapped = op_map[operator]
+                if mapped in ('in', 'not_in'):
+                    return (field, mapped, values)
+                if mapped == 'eq' and value is None:
+                    return (field, 'is_null', None)
+                return (field, mapped, value)
+            return False
+
+        nodes = []
+        for condition in conditions:
+            if 'logic' in condition and 'conditions' in condition:
+                children = [leaf(c) for c in condition['conditions']]
+                if any(c is False for c in children):
+                    return False
+                children = [c for c in children if c is not None]
+                if children:
+                    nodes.append((condition.get('logic', 'AND').upper(), children))
+            else:
+                node = leaf(condition)
+                if node is False:
+                    return False
+                if node is not None:
+                    nodes.append(node)
+
+        if not nodes:
+            return None
+        return ('OR' if logic.upper() == 'OR' else 'AND', nodes)
+
+
+    def _parse_hash_value(self, value: str) -> List[str]:
+        """Parse hash field values to extract tag codes (see parse_tag_codes)."""
+        return parse_tag_codes(value)
 
     def _handle_export(self, query, format: str, model_class):
         """Handle export."""
@@ -0,0 +1,182 @@
+# src/Journals/views/batch_tasks.py
+"""
+Batch-oriented tagging tasks
+
+A source (or an upload) is no longer processed inside one long task:
+
+    tag_source_task           coordinator, "interactive" queue; works out the
+        |                     outstanding primary_ids and splits them into
+        |                     id ranges of `batch_size`
+        +-- tag_batch_task    one per range, "bulk" queue; acks late, so a
+        |                     crashed worker's batch is redelivered
+        +-- aggregate_batches_task
+                              chord callback: sums the batch outcomes, closes
+                              the tracker and stores the coordinator's result
+
+Records whose host was unavailable are sent round again in follow-up
+batches of the same parent; they are counted as dispatched before the
+batch that deferred them reports done, and the chord callback waits for
+them before closing the run.
+
+Progress of the batches is aggregated into the coordinator's state through
+TaskProgress. Each worker process loads the tagger (spaCy/transformers
+models) and the reflected target table once, in the worker_process_init
+hook, instead of once per batch; set CELERY_PRELOAD_MODELS=0 for workers
+that only serve the interactive queue.
+"""
+
+import logging
+import os
+import threading
+
+from celery import chord, shared_task
+from celery.exceptions import Ignore
+from celery.signals import worker_process_init
+
+from src.Journals.views.task_progress import TaskProgress
+from src.Utils.lazy_import import lazy_import
+
+Tagging = lazy_import("src.Commands.TaggingSystem", "Tagging")
+PaperProcessorPipeline = lazy_import("src.Commands.PaperProcessorPipeline", "PaperProcessorPipeline")
+DatabaseUpdater = lazy_import("src.Commands.DatabaseUpdater", "DatabaseUpdater")
+DatabaseHandler = lazy_import("src.Services.DatabaseHandler", "DatabaseHandler")
+
+logger = logging.getLogger(__name__)
+
+INTERACTIVE_QUEUE = "interactive"
+BULK_QUEUE = "bulk"
+TABLE_NAME = "all_db"
+COLUMN_MAPPING = {"Id": "primary_id"}
+# How often papers whose host was unavailable are sent round again
+HOST_DEFER_ROUNDS = int(os.getenv("HOST_DEFER_ROUNDS", "3"))
+# How the chord callback waits for those follow-up batches
+AGGREGATE_POLL_SECONDS = float(os.getenv("AGGREGATE_POLL_SECONDS", "5"))
+AGGREGATE_MAX_POLLS = int(os.getenv("AGGREGATE_MAX_POLLS", "720"))
+
+_worker_cache = {}
+_worker_lock = threading.Lock()
+
+
+def get_worker_tagger():
+    """Per-process tagger; built on first use unless preloaded."""
+    with _worker_lock:
+        if "tagger" not in _worker_cache:
+            _worker_cache["tagger"] = Tagging()
+        return _worker_cache["tagger"]
+
+
+def get_worker_updater(table_name=TABLE_NAME, column_mapping=None):
+    """Per-process DatabaseUpdater, so the wide target table is reflected once."""
+    key = ("updater", table_name)
+    with _worker_lock:
+        if key not in _worker_cache:
+            _worker_cache[key] = DatabaseUpdater(table_name=table_name, column_mapping=column_mapping or COLUMN_MAPPING)
+        return _worker_cache[key]
+
+
+@worker_process_init.connect
+def preload_worker_models(**kwargs):
+    if os.getenv("CELERY_PRELOAD_MODELS", "true").lower() not in ("1", "true", "yes"):
+        return
+    try:
+        get_worker_tagger()
+        get_worker_updater()
+    except Exception:
+        # The batch will try again (and report the error) when it runs
+        logger.exception("Worker preload failed")
+
+
+def run_tag_batch(batch_ids, query, csv_file_path, db_name):
+    """Tags one id range with the worker's preloaded tagger and updater."""
+    pipeline = PaperProcessorPipeline(table_name=TABLE_NAME, column_mapping=COLUMN_MAPPING)
+    return pipeline.process_ids(
+        batch_ids, query, csv_file_path, db_name,
+        tagger=get_worker_tagger(), updater=get_worker_updater()
+    )
+
+
+@shared_task(bind=True, name="tag_batch_task", queue=BULK_QUEUE,
+             acks_late=True, reject_on_worker_lost=True)
+def tag_batch_task(self, batch_ids, query, csv_file_path, db_name, parent_id=None, defer_round=0):
+    """
+    Tags one batch of records (ids bound as a parameter) and reports the
+    outcome to the parent task. Records whose host was unavailable are sent
+    again in a follow-up batch once the host's circuit may have closed.
+    """
+    try:
+        outcome = run_tag_batch(batch_ids, query, csv_file_path, db_name)
+    except Exception:
+        # The batch counts as failed but the run carries on
+        logger.exception(f"Pipeline error for batch of {len(batch_ids)} ids")
+        outcome = {"processed": 0, "failed": len(batch_ids)}
+
+    outcome = {**outcome, "first_id": min(batch_ids), "last_id": max(batch_ids)}
+    progress = TaskProgress(self.backend, parent_id) if parent_id else None
+    deferred = outcome.get("deferred_ids") or []
+    requeue = bool(deferred) and defer_round < HOST_DEFER_ROUNDS
+    if requeue:
+        # Counted before this batch reports done, so the parent can't finish first
+        if progress:
+            progress.dispatched()
+        tag_batch_task.apply_async(
+            args=(deferred, query, csv_file_path, db_name),
+            kwargs={"parent_id": parent_id, "defer_round": defer_round + 1},
+            countdown=max(outcome.get("retry_in", 0.0), 1.0),
+        )
+    outcome["requeued"] = len(deferred) if requeue else 0
+    if progress:
+        progress.batch_done(outcome["processed"], outcome["failed"], deferred=len(deferred) - outcome["requeued"])
+    return outcome
+
+
+@shared_task(bind=True, name="aggregate_batches_task", queue=INTERACTIVE_QUEUE,
+             max_retries=AGGREGATE_MAX_POLLS)
+def aggregate_batches_task(self, outcomes, db_name, parent_id=None):
+    """
+    Chord callback: combine the batch outcomes and close the run. Follow-up
+    batches of deferred records run outside the chord, so with a parent the
+    totals come from its progress counters once every batch has reported.
+    """
+    summary = {
+        "status":    "success",
+        "db_name":   db_name,
+        "batches":   len(outcomes),
+        "processed": sum(o.get("processed", 0) for o in outcomes),
+        "failed":    sum(o.get("failed", 0) for o in outcomes),
+        "deferred":  sum(len(o.get("deferred_ids", [])) - o.get("requeued", 0) for o in outcomes),
+        "last_id":   max((o.get("last_id", 0) for o in outcomes), default=0),
+    }
+    if parent_id:
+        progress = TaskProgress(self.backend, parent_id).snapshot()
+        if progress["batches_done"] < progress["batches_dispatched"]:
+            raise self.retry(countdown=AGGREGATE_POLL_SECONDS)
+        summary.update(batches=progress["batches_done"], processed=progress["processed"],
+                       failed=progress["failed"], deferred=progress["deferred"])
+    pipeline = PaperProcessorPipeline(table_name=TABLE_NAME, column_mapping=COLUMN_MAPPING)
+    pipeline.update_tracker(DatabaseHandler(), db_name, set(), set(), set(), summary["last_id"], status="completed")
+    if parent_id:
+        self.backend.store_result(parent_id, summary, "SUCCESS")
+    return summary
+
+
+@shared_task(bind=True, name="tag_source_task", queue=INTERACTIVE_QUEUE)
+def tag_source_task(self, query, csv_file_path, db_name, batch_size=100):
+    """
+    Coordinator: split the outstanding ids of `query` into ranges and fan
+    them out as tag_batch_task, with aggregate_batches_task as the final step.
+    """
+    pipeline = PaperProcessorPipeline(table_name=TABLE_NAME, column_mapping=COLUMN_MAPPING)
+    id_ranges = pipeline.pending_id_batches(query, db_name, batch_size)
+    if not id_ranges:
+        return {"status": "no_new", "db_name": db_name, "batches": 0}
+
+    parent_id = self.request.id
+    progress = TaskProgress(self.backend, parent_id)
+    progress.dispatched(len(id_ranges))
+    progress.publish()
+    chord(
+        tag_batch_task.s(batch_ids, query, csv_file_path, db_name, parent_id=parent_id)
+        for batch_ids in id_ranges
+    )(aggregate_batches_task.s(db_name, parent_id=parent_id))
+    # aggregate_batches_task stores this task's final result
+    raise Ignore()
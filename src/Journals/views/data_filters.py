@@ -1,9 +1,12 @@
 import json
 import pandas as pd
 from io import BytesIO, StringIO
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+import os
+from src.Utils.lazy_import import lazy_import
+
+# matplotlib is only needed for the chart export; Agg is picked up from MPLBACKEND
+os.environ.setdefault('MPLBACKEND', 'Agg')
+plt = lazy_import('matplotlib.pyplot')
 from flask_restful import Resource
 from src.Utils.response import ApiResponse
 from src.Commands.regexp import searchRegEx
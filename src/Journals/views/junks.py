@@ -48,6 +48,7 @@ from concurrent.futures import ThreadPoolExecutor
 from src.Commands.PaperProcessorPipeline import PaperProcessorPipeline
 from src.Utils.response import ApiResponse
 from src.Services.DatabaseHandler import DatabaseHandler
+from src.Commands.ChunkedUpload import ChunkedUploadProcessor
 import os
 
 class PaperProcessorAPI(Resource):
@@ -93,17 +94,13 @@ class PaperProcessorAPI(Resource):
                     status_code=400
                 )
             data = data[required_columns]
-            # Check for duplicate DOIs in the database
-            existing_dois = self.db_handler.fetch_existing_dois()
-            new_records = data[~data['DOI'].isin(existing_dois)]
-            if new_records.empty:
+            # Insert the records whose DOI is new (de-duplicated in the database)
+            inserted = self.db_handler.insert_new_records(data)
+            if not inserted:
                 return ApiResponse.error(
                     message="All records in the uploaded file already exist in the database.",
                     status_code=400
                 )
-
-            # Insert new records into the database
-            self.db_handler.insert_records(new_records)
             # Prepare sources for parallel processing
             sources = [
                 {
@@ -111,7 +108,7 @@ class PaperProcessorAPI(Resource):
                         SELECT primary_id, "DOI", "Source" 
                         FROM all_db 
                         WHERE "DOI" IS NOT NULL AND "DOI" != '' 
-                        AND "DOI" IN ({','.join([f"'{doi}'" for doi in new_records['DOI'].tolist()])})
+                        AND primary_id IN ({','.join(str(int(row["primary_id"])) for row in inserted)})
                     """,
                     "csv_file_path": temp_file_path,
                     "db_name": "all_db"
@@ -137,7 +134,7 @@ class PaperProcessorAPI(Resource):
             # Save the processed results
             output_file_path = os.path.join("Data/output", f"processed_{file.filename}")
             os.makedirs("Data/output", exist_ok=True)
-            pd.DataFrame(new_records).to_csv(output_file_path, index=False)
+            ChunkedUploadProcessor._new_rows(data, inserted).to_csv(output_file_path, index=False)
 
             return ApiResponse.success(
                 message="File processed successfully",
@@ -3,7 +3,7 @@
 import os
 from flask import request
 from flask_restful import Resource
-from src.Journals.views.tasks import process_uploaded_file_task, process_uploaded_data_task
+from src.Journals.views.tasks import process_uploaded_file_task, process_uploaded_data_task, execute_papers_task
 from src.Utils.response import ApiResponse
 
 class PaperProcessorAPI(Resource):
@@ -46,11 +46,31 @@ class PaperProcessorExecute(Resource):
         if not request.form:
             return ApiResponse.error("No form data provided", 400)
         data = request.form.to_dict()
-        task = process_uploaded_data_task(data)
+        mode = data.pop('mode', request.args.get('mode', 'async'))
+
+        # 2) ?mode=sync keeps the old inline behaviour for a single context
+        if mode == 'sync':
+            task = process_uploaded_data_task(data)
+            return ApiResponse.success(
+                message="Data accepted.",
+                data=task,
+                status_code=200
+            )
+
+        # 3) one paper per 'context' field; tagging runs on a worker
+        contexts = [context for context in request.form.getlist('context') if context]
+        if not contexts:
+            return ApiResponse.error("No 'context' provided", 400)
+        task = execute_papers_task.apply_async(args=[data, contexts])
 
         # 4) return immediately with task info
         return ApiResponse.success(
-            message="Data accepted.",
-            data=task,
-            status_code=200
-        )
\ No newline at end of file
+            message="Data accepted. Processing in background.",
+            data={
+                'task_id':      task.id,
+                'papers':       len(contexts),
+                'status_url':   f"/api/tasks/{task.id}",
+                'download_url': f"/api/tasks/{task.id}/download",
+            },
+            status_code=202
+        )
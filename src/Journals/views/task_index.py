@@ -0,0 +1,270 @@
+# src/Journals/views/task_index.py
+"""
+Task index built from Celery task events
+
+TaskListAPI used to broadcast inspect() active/scheduled/reserved calls and
+wait for every worker to answer. Instead, a small consumer process listens
+to the task events the workers emit and keeps an index of recent tasks in
+Redis, which the API reads directly:
+
+    python -m src.Journals.views.task_index      # next to the workers
+
+    task-index:task:<id>         hash: name, state, worker, args, progress, ...
+    task-index:all               sorted set of ids, scored by first-seen time
+    task-index:state:<STATE>     the same, per state   (filtering)
+    task-index:name:<task name>  the same, per task    (filtering)
+
+Long-running tasks report progress through `send_progress_event`, which
+emits a custom "task-progress" event. Entries older than TASK_INDEX_TTL are
+dropped and the index is trimmed to TASK_INDEX_MAX tasks.
+
+Without a Redis client (eager mode, tests) the index is kept in process
+memory.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from celery import states as celery_states
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "task-index"
+TASK_INDEX_TTL = int(os.getenv("TASK_INDEX_TTL", str(7 * 24 * 3600)))
+TASK_INDEX_MAX = int(os.getenv("TASK_INDEX_MAX", "10000"))
+_TEXT_LIMIT = 2000
+
+EVENT_STATES = {
+    "task-sent":      celery_states.PENDING,
+    "task-received":  celery_states.RECEIVED,
+    "task-started":   celery_states.STARTED,
+    "task-progress":  "PROGRESS",
+    "task-succeeded": celery_states.SUCCESS,
+    "task-failed":    celery_states.FAILURE,
+    "task-retried":   celery_states.RETRY,
+    "task-rejected":  celery_states.REJECTED,
+    "task-revoked":   celery_states.REVOKED,
+}
+# Event field -> index field
+_EVENT_FIELDS = {
+    "name": "name", "args": "args", "kwargs": "kwargs", "hostname": "worker",
+    "queue": "queue", "routing_key": "queue", "runtime": "runtime",
+    "result": "result", "exception": "exception", "retries": "retries",
+}
+_TIMESTAMP_FIELDS = {"task-received": "received", "task-started": "started",
+                     "task-succeeded": "finished", "task-failed": "finished"}
+
+
+def send_progress_event(app, task_id: str, progress: Dict[str, Any]) -> None:
+    """Emit a task-progress event for `task_id` (no-op unless events are enabled)."""
+    if not task_id or app is None or not app.conf.worker_send_task_events:
+        return
+    try:
+        with app.events.default_dispatcher() as dispatcher:
+            dispatcher.send("task-progress", uuid=task_id, progress=progress)
+    except Exception as e:
+        # progress is advisory; never fail the task over it
+        logger.warning(f"Could not send progress event for {task_id}: {str(e)}")
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class TaskIndex:
+    def __init__(self, client=None, ttl: int = TASK_INDEX_TTL, max_tasks: int = TASK_INDEX_MAX):
+        # Only a Redis client has the sorted-set commands (the cache backend has a client too)
+        self.client = client if hasattr(client, "zadd") else None
+        self.ttl = ttl
+        self.max_tasks = max_tasks
+        self._local: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._events = 0
+
+    @classmethod
+    def from_backend(cls, backend, **kwargs) -> "TaskIndex":
+        """Share the Redis connection of the Celery result backend."""
+        try:
+            client = getattr(backend, "client", None)
+        except Exception:
+            client = None
+        return cls(client, **kwargs)
+
+    # --- writing (event consumer) ------------------------------------------
+    def on_event(self, event: Dict[str, Any]) -> None:
+        """Receiver handler: fold one task event into the index."""
+        state = EVENT_STATES.get(event.get("type"))
+        task_id = event.get("uuid")
+        if state is None or not task_id:
+            return
+        timestamp = float(event["timestamp"]) if event.get("timestamp") is not None else time.time()
+
+        fields = {"id": task_id, "updated": timestamp}
+        for source, target in _EVENT_FIELDS.items():
+            if event.get(source) not in (None, ""):
+                value = event[source]
+                fields[target] = value if isinstance(value, (int, float)) else str(value)[:_TEXT_LIMIT]
+        if event.get("type") in _TIMESTAMP_FIELDS:
+            fields[_TIMESTAMP_FIELDS[event["type"]]] = timestamp
+        if "progress" in event:
+            fields["progress"] = json.dumps(event["progress"], default=str)
+
+        current = self.get(task_id)
+        previous_state = current.get("state") if current else None
+        # Events from different workers can arrive out of order; a finished
+        # task keeps its final state
+        if previous_state not in celery_states.READY_STATES or state in celery_states.READY_STATES:
+            fields["state"] = state
+        self._store(task_id, fields, previous_state, timestamp if current is None else None)
+
+        self._events += 1
+        if self._events % 100 == 0:
+            self.trim()
+
+    def _store(self, task_id, fields, previous_state, first_seen) -> None:
+        state = fields.get("state")
+        if self.client is None:
+            with self._lock:
+                record = self._local.setdefault(task_id, {"first_seen": fields["updated"] if first_seen is None else first_seen})
+                record.update(fields)
+            return
+
+        key = f"{KEY_PREFIX}:task:{task_id}"
+        pipe = self.client.pipeline()
+        pipe.hset(key, mapping=fields)
+        pipe.expire(key, self.ttl)
+        if first_seen is not None:
+            pipe.hset(key, "first_seen", first_seen)
+            pipe.zadd(f"{KEY_PREFIX}:all", {task_id: first_seen})
+            if fields.get("name"):
+                pipe.zadd(f"{KEY_PREFIX}:name:{fields['name']}", {task_id: first_seen})
+        if state and state != previous_state:
+            score = first_seen if first_seen is not None else self._first_seen(task_id)
+            if previous_state:
+                pipe.zrem(f"{KEY_PREFIX}:state:{previous_state}", task_id)
+            pipe.zadd(f"{KEY_PREFIX}:state:{state}", {task_id: score})
+        if first_seen is None and fields.get("name"):
+            # the name arrives with task-received, which may follow task-sent
+            pipe.zadd(f"{KEY_PREFIX}:name:{fields['name']}", {task_id: self._first_seen(task_id)}, nx=True)
+        pipe.execute()
+
+    def _first_seen(self, task_id: str) -> float:
+        score = self.client.zscore(f"{KEY_PREFIX}:all", task_id)
+        return float(score) if score is not None else time.time()
+
+    def trim(self) -> int:
+        """Drop expired entries and keep at most `max_tasks`. Returns the number dropped."""
+        cutoff = time.time() - self.ttl
+        if self.client is None:
+            with self._lock:
+                ordered = sorted(self._local, key=lambda i: self._local[i]["first_seen"])
+                stale = [i for i in ordered if self._local[i]["first_seen"] < cutoff]
+                stale += [i for i in ordered[:max(len(ordered) - self.max_tasks, 0)] if i not in stale]
+                for task_id in stale:
+                    del self._local[task_id]
+            return len(stale)
+
+        all_key = f"{KEY_PREFIX}:all"
+        stale = [_decode(i) for i in self.client.zrangebyscore(all_key, "-inf", cutoff)]
+        excess = self.client.zcard(all_key) - len(stale) - self.max_tasks
+        if excess > 0:
+            stale += [_decode(i) for i in self.client.zrange(all_key, len(stale), len(stale) + excess - 1)]
+        if not stale:
+            return 0
+        records = self._fetch(stale)
+        pipe = self.client.pipeline()
+        for task_id, record in zip(stale, records):
+            pipe.zrem(all_key, task_id)
+            if record:
+                pipe.zrem(f"{KEY_PREFIX}:state:{record.get('state')}", task_id)
+                pipe.zrem(f"{KEY_PREFIX}:name:{record.get('name')}", task_id)
+            pipe.delete(f"{KEY_PREFIX}:task:{task_id}")
+        pipe.execute()
+        return len(stale)
+
+    # --- reading (API) -----------------------------------------------------
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        return self._fetch([task_id])[0]
+
+    def list(self, states: Iterable[str] = (), name: Optional[str] = None,
+             page: int = 1, per_page: int = 50) -> Tuple[List[Dict[str, Any]], int]:
+        """Newest first. Returns (tasks on the page, total matching)."""
+        wanted = [s.upper() for s in states if s]
+        start = (max(page, 1) - 1) * per_page
+        if self.client is None:
+            with self._lock:
+                records = [dict(r) for r in self._local.values()
+                           if (not wanted or r.get("state") in wanted) and (not name or r.get("name") == name)]
+            records.sort(key=lambda r: r["first_seen"], reverse=True)
+            return [self._clean(r) for r in records[start:start + per_page]], len(records)
+
+        key = self._filter_key(wanted, name)
+        pipe = self.client.pipeline()
+        pipe.zcard(key)
+        pipe.zrevrange(key, start, start + per_page - 1)
+        total, ids = pipe.execute()
+        records = self._fetch([_decode(i) for i in ids])
+        return [r for r in records if r], total
+
+    def _filter_key(self, wanted: List[str], name: Optional[str]) -> str:
+        keys = []
+        if wanted:
+            keys.append(f"{KEY_PREFIX}:state:{wanted[0]}")
+            if len(wanted) > 1:
+                keys[0] = f"{KEY_PREFIX}:q:states:{','.join(sorted(wanted))}"
+                self.client.zunionstore(keys[0], [f"{KEY_PREFIX}:state:{s}" for s in wanted], aggregate="MAX")
+                self.client.expire(keys[0], 5)
+        if name:
+            keys.append(f"{KEY_PREFIX}:name:{name}")
+        if not keys:
+            return f"{KEY_PREFIX}:all"
+        if len(keys) == 1:
+            return keys[0]
+        combined = f"{KEY_PREFIX}:q:{','.join(sorted(wanted))}:{name}"
+        self.client.zinterstore(combined, keys, aggregate="MAX")
+        self.client.expire(combined, 5)
+        return combined
+
+    def _fetch(self, task_ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        if self.client is None:
+            with self._lock:
+                return [self._clean(dict(self._local[i])) if i in self._local else None for i in task_ids]
+        pipe = self.client.pipeline()
+        for task_id in task_ids:
+            pipe.hgetall(f"{KEY_PREFIX}:task:{task_id}")
+        return [self._clean({_decode(k): _decode(v) for k, v in raw.items()}) if raw else None
+                for raw in pipe.execute()]
+
+    @staticmethod
+    def _clean(record: Dict[str, Any]) -> Dict[str, Any]:
+        for field in ("first_seen", "updated", "received", "started", "finished", "runtime"):
+            if record.get(field) not in (None, ""):
+                record[field] = float(record[field])
+        if isinstance(record.get("progress"), str):
+            record["progress"] = json.loads(record["progress"])
+        return record
+
+
+def consume_events(app, index: Optional[TaskIndex] = None, reconnect_seconds: float = 5.0) -> None:
+    """Run the event consumer (blocking); reconnects when the broker goes away."""
+    index = index or TaskIndex.from_backend(app.backend)
+    while True:
+        try:
+            with app.connection_for_read() as connection:
+                receiver = app.events.Receiver(connection, handlers={"*": index.on_event})
+                receiver.capture(limit=None, timeout=None, wakeup=True)
+        except (KeyboardInterrupt, SystemExit):
+            raise
+        except Exception as e:
+            logger.error(f"Task event consumer lost its connection: {str(e)}")
+            time.sleep(reconnect_seconds)
+
+
+if __name__ == "__main__":
+    from celery_app import celery
+    logging.basicConfig(level=logging.INFO)
+    consume_events(celery)
@@ -0,0 +1,130 @@
+# src/Journals/views/task_progress.py
+"""
+Aggregated progress for a parent task and the sub-tasks it fans out
+
+The parent records what it has dispatched, every sub-task records its
+outcome, and the combined counters are written as the parent's PROGRESS
+state, so TaskStatusAPI shows one figure for the whole upload. The
+counters live in a Redis hash next to the Celery results (HINCRBY keeps
+concurrent sub-tasks from losing updates); whichever side completes the
+last piece of work stores the parent's final SUCCESS result exactly once.
+
+Without a Redis result backend (eager mode, tests) the counters are kept
+in process memory.
+"""
+
+import threading
+from typing import Any, Dict
+
+from src.Journals.views.task_index import send_progress_event
+
+PROGRESS_TTL = 24 * 3600
+
+_COUNTERS = ("rows_read", "rows_inserted", "batches_dispatched", "batches_done",
+             "processed", "failed", "deferred", "total_batches", "ingest_done")
+
+_local: Dict[str, Dict[str, Any]] = {}
+_local_lock = threading.Lock()
+
+
+class TaskProgress:
+    def __init__(self, backend, parent_id: str):
+        self.backend = backend
+        self.parent_id = parent_id
+        self.key = f"task-progress:{parent_id}"
+        try:
+            client = getattr(backend, "client", None)
+        except Exception:
+            client = None
+        # Only a Redis client has the atomic hash commands (the cache backend has a client too)
+        self.client = client if hasattr(client, "hincrby") else None
+
+    # --- parent side -------------------------------------------------------
+    def ingested(self, stats: Dict[str, Any]) -> None:
+        """Record ingest counters (absolute values) and publish them."""
+        self._set(rows_read=stats.get("rows_read", 0), rows_inserted=stats.get("rows_inserted", 0))
+        self.publish()
+
+    def dispatched(self, count: int = 1) -> None:
+        self._incr(batches_dispatched=count)
+
+    def dispatch_finished(self, **result) -> bool:
+        """
+        Mark the fan-out complete. Returns True when every batch is already
+        done, i.e. the final result has been stored.
+        """
+        self._set(total_batches=self.snapshot()["batches_dispatched"], ingest_done=1, **result)
+        return self._maybe_finish()
+
+    # --- sub-task side -----------------------------------------------------
+    def batch_done(self, processed: int = 0, failed: int = 0, deferred: int = 0) -> bool:
+        self._incr(batches_done=1, processed=processed, failed=failed, deferred=deferred)
+        if not self._maybe_finish():
+            self.publish()
+            return False
+        return True
+
+    # --- shared ------------------------------------------------------------
+    def snapshot(self) -> Dict[str, Any]:
+        if self.client is not None:
+            raw = self.client.hgetall(self.key)
+            data = {k.decode() if isinstance(k, bytes) else k: v.decode() if isinstance(v, bytes) else v
+                    for k, v in raw.items()}
+        else:
+            with _local_lock:
+                data = dict(_local.get(self.key, {}))
+        meta = {counter: 0 for counter in _COUNTERS}
+        meta.update(data)
+        return {k: int(v) if k in _COUNTERS else v for k, v in meta.items()}
+
+    def publish(self, state: str = "PROGRESS") -> None:
+        meta = self.snapshot()
+        if meta.pop("finished", None):
+            return  # never overwrite the final result
+        self.backend.store_result(self.parent_id, meta, state)
+        send_progress_event(getattr(self.backend, "app", None), self.parent_id, meta)
+
+    def _maybe_finish(self) -> bool:
+        meta = self.snapshot()
+        # batches_dispatched, not total_batches: sub-tasks may dispatch
+        # follow-up batches after the fan-out was marked complete
+        if not meta["ingest_done"] or meta["batches_done"] < meta["batches_dispatched"]:
+            return False
+        if not self._claim_finish():
+            return False
+        meta.pop("finished", None)
+        meta["total_batches"] = meta["batches_dispatched"]
+        meta["status"] = "success"
+        self.backend.store_result(self.parent_id, meta, "SUCCESS")
+        return True
+
+    def _claim_finish(self) -> bool:
+        if self.client is not None:
+            return bool(self.client.hsetnx(self.key, "finished", 1))
+        with _local_lock:
+            data = _local.setdefault(self.key, {})
+            if data.get("finished"):
+                return False
+            data["finished"] = 1
+            return True
+
+    def _set(self, **values) -> None:
+        if self.client is not None:
+            self.client.hset(self.key, mapping={k: v for k, v in values.items() if v is not None})
+            self.client.expire(self.key, PROGRESS_TTL)
+        else:
+            with _local_lock:
+                _local.setdefault(self.key, {}).update(values)
+
+    def _incr(self, **deltas) -> None:
+        if self.client is not None:
+            pipe = self.client.pipeline()
+            for field, delta in deltas.items():
+                pipe.hincrby(self.key, field, int(delta))
+            pipe.expire(self.key, PROGRESS_TTL)
+            pipe.execute()
+        else:
+            with _local_lock:
+                data = _local.setdefault(self.key, {})
+                for field, delta in deltas.items():
+                    data[field] = int(data.get(field, 0)) + int(delta)
@@ -1,11 +1,55 @@
+import os
+from flask import request, send_file
 from flask_restful import Resource
 from celery_app import celery
+from src.Journals.views.task_index import TaskIndex
+from src.Journals.views.tasks import EXECUTE_OUTPUT_DIR
 from src.Utils.response import ApiResponse
 
+_task_index = None
+
+
+def get_task_index():
+    """The index shares the result backend's Redis connection."""
+    global _task_index
+    if _task_index is None:
+        _task_index = TaskIndex.from_backend(celery.backend)
+    return _task_index
+
+
 class TaskListAPI(Resource):
     def get(self):
         """
-        List all Celery task instances across workers: 
+        List recent Celery tasks from the task index, newest first.
+
+        Query parameters:
+        - state: one or more states (comma separated), e.g. STARTED,PROGRESS
+        - name: task name, e.g. execute_papers_task
+        - page, per_page: pagination (per_page at most 200)
+        - live=true: ask the workers directly (slow; waits for every worker)
+        """
+        if request.args.get('live', '').lower() in ('1', 'true', 'yes'):
+            return ApiResponse.success(
+                message="Current Celery task instances",
+                data={"tasks": self._inspect_tasks()},
+                status_code=200
+            )
+
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = min(max(request.args.get('per_page', 50, type=int), 1), 200)
+        task_states = [s for s in request.args.get('state', '').split(',') if s.strip()]
+        tasks, total = get_task_index().list(
+            states=[s.strip() for s in task_states],
+            name=request.args.get('name') or None,
+            page=page,
+            per_page=per_page
+        )
+        return ApiResponse.paginated(tasks, total, page, per_page, message="Celery tasks")
+
+    @staticmethod
+    def _inspect_tasks():
+        """
+        Broadcast to all workers: 
         - active (currently running) 
         - scheduled (ETA/countdown) 
         - reserved (received but not yet started)
@@ -58,24 +102,24 @@ class TaskListAPI(Resource):
                     "state":   "RESERVED",
                 })
 
-        return ApiResponse.success(
-            message="Current Celery task instances",
-            data={"tasks": tasks},
-            status_code=200
-        )
+        return tasks
     
     
 class TaskStatusAPI(Resource):
     def get(self, task_id):
         """
-        Check the status of a background task.
+        Check the status of a background task. The result backend has the
+        state and result; the task index adds name, worker, timings and the
+        latest progress.
         """
         task = celery.AsyncResult(task_id)
+        record = get_task_index().get(task_id)
 
         if task.state == 'PENDING':
+            # PENDING only means "no result yet"; the index knows whether a worker has it
             return ApiResponse.success(
                 message="Task is still pending.",
-                data={"status": task.state},
+                data={"status": record["state"] if record else task.state, "task": record},
                 status_code=200
             )
         elif task.state == 'SUCCESS':
@@ -87,12 +131,49 @@ class TaskStatusAPI(Resource):
         elif task.state == 'FAILURE':
             return ApiResponse.error(
                 message="Task failed.",
-                data={"status": task.state, "error": str(task.info)},
+                errors={"status": task.state, "error": str(task.info), "task": record},
                 status_code=500
             )
         else:
             return ApiResponse.success(
                 message="Task is in progress.",
-                data={"status": task.state},
+                data={
+                    "status":   task.state,
+                    "progress": task.info if isinstance(task.info, dict) else None,
+                    "task":     record,
+                },
                 status_code=200
-            )
\ No newline at end of file
+            )
+
+
+class TaskResultDownloadAPI(Resource):
+    def get(self, task_id):
+        """
+        Download the result file of a finished background task
+        (e.g. PaperProcessorExecute).
+        """
+        task = celery.AsyncResult(task_id)
+
+        if task.state == 'FAILURE':
+            return ApiResponse.error(
+                message="Task failed.",
+                errors={"status": task.state, "error": str(task.info)},
+                status_code=500
+            )
+        if task.state != 'SUCCESS':
+            return ApiResponse.success(
+                message="Result is not ready yet.",
+                data={"status": task.state, "progress": task.info if isinstance(task.info, dict) else None},
+                status_code=202
+            )
+
+        result_file = task.result.get('result_file') if isinstance(task.result, dict) else None
+        if not result_file:
+            return ApiResponse.error("Task has no result file", status_code=404)
+        # only files written to the output directory are served
+        output_dir = os.path.abspath(EXECUTE_OUTPUT_DIR)
+        path = os.path.abspath(os.path.join(output_dir, os.path.basename(result_file)))
+        if not os.path.isfile(path):
+            return ApiResponse.error("Result file not found", status_code=404)
+        return send_file(path, mimetype='application/json', as_attachment=True,
+                         download_name=os.path.basename(path))
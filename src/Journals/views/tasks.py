@@ -1,102 +1,64 @@
 import os
-import pandas as pd
+import json
 from celery import shared_task
+from celery.exceptions import Ignore
 from src.Commands.regexp import searchRegEx
-from src.Commands.TaggingSystem import Tagging
-from concurrent.futures import ThreadPoolExecutor
-from src.Services.DatabaseHandler import DatabaseHandler
-from src.Commands.PaperProcessorPipeline import PaperProcessorPipeline
+from src.Commands.ChunkedUpload import ChunkedUploadProcessor
+from src.Journals.views.task_progress import TaskProgress
+from src.Journals.views.task_index import send_progress_event
+from src.Journals.views.batch_tasks import tag_batch_task, get_worker_tagger, INTERACTIVE_QUEUE, BULK_QUEUE
+from src.Utils.lazy_import import lazy_import
 
-@shared_task(name="process_uploaded_file_task")
-def process_uploaded_file_task(temp_file_path, output_file_path):
+# The tagging/ML stack loads when a task runs, not when the web app imports this module
+Tagging = lazy_import("src.Commands.TaggingSystem", "Tagging")
+
+EXECUTE_OUTPUT_DIR = os.path.join('Data', 'output')
+UPLOAD_TAGGING_QUERY = "SELECT primary_id, doi, source FROM all_db WHERE doi IS NOT NULL AND doi != ''"
+
+
+@shared_task(bind=True, name="process_uploaded_file_task", queue=INTERACTIVE_QUEUE)
+def process_uploaded_file_task(self, temp_file_path, output_file_path, chunk_size=5000, batch_size=100):
     """
-    1) Load & validate CSV
-    2) Filter out existing DOIs
-    3) Early exit if no new records
-    4) Insert new records
-    5) Build safe IN‐clause
-    6) Run downstream pipeline in parallel
-    7) Write out processed CSV
+    1) Validate the CSV header
+    2) Stream the CSV in chunks; each chunk is de-duplicated and inserted
+       server-side and its new rows are appended to the output CSV
+    3) Fan the new primary ids out as tagging sub-tasks of `batch_size`
+    4) Progress of the ingest and of every sub-task is aggregated into this
+       task's state; the last batch to finish stores the final result
     """
-    # 1) Load CSV and validate columns
-    data = pd.read_csv(temp_file_path)
-    required = [
-        "Authors", "Year", "Title", "DOI", "Open Access", "Abstract",
-        "Id", "Source", "Language", "Country", "Database", "Journal"
-    ]
-    missing = [c for c in required if c not in data.columns]
-    if missing:
-        raise ValueError(f"Missing columns: {', '.join(missing)}")
-    data = data[required]
-
-    # 2) Filter new DOIs
-    db_handler  = DatabaseHandler()
-    existing    = set(db_handler.fetch_existing_dois())
-    new_records = data[~data["DOI"].isin(existing)]
-
-    # 3) Early exit if nothing to do
-    if new_records.empty:
-        os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
-        new_records.to_csv(output_file_path, index=False)
-        return {
-            "status":      "no_new",
-            "message":     "No new records to insert.",
-            "output_file": output_file_path
-        }
+    # 1) Fail fast on a malformed upload
+    ChunkedUploadProcessor.validate_columns(temp_file_path)
 
-    # 4) Insert the new rows
-    db_handler.insert_records(new_records)
-
-    # 5) Build a safe IN‐clause for downstream query
-    dois = new_records["DOI"].tolist()
-    in_clause = ", ".join(f"'{doi}'" for doi in dois)
-    downstream_query = f"""
-        SELECT primary_id, "DOI", "Source"
-        FROM all_db
-        WHERE "DOI" IS NOT NULL
-          AND "DOI" != ''
-          AND "DOI" IN ({in_clause})
-    """
+    parent_id = self.request.id or "local"
+    progress = TaskProgress(self.backend, parent_id)
+    processor = ChunkedUploadProcessor(chunk_size=chunk_size, batch_size=batch_size)
 
-    # 6) Run downstream pipeline in parallel
-    pipeline = PaperProcessorPipeline(
-        table_name="all_db",
-        column_mapping={"Id": "primary_id"}
-    )
-    sources = [{
-        "query":         downstream_query,
-        "csv_file_path": temp_file_path,
-        "db_name":       "all_db"
-    }]
-
-    def _process(source):
-        try:
-            return pipeline.process_source_in_batches(
-                query=source["query"],
-                csv_file_path=source["csv_file_path"],
-                db_name=source["db_name"],
-                batch_size=10
-            )
-        except Exception as e:
-            # log internally, but don’t crash the whole task
-            print(f"Pipeline error for {source['db_name']}: {e}")
-            return None
-
-    with ThreadPoolExecutor(max_workers=4) as executor:
-        pipeline_results = list(executor.map(_process, sources))
-
-    # 7) Write out the processed CSV
-    os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
-    new_records.to_csv(output_file_path, index=False)
+    # 2) + 3) Tagging starts while the rest of the file is still being ingested
+    for batch_ids in processor.iter_batches(temp_file_path, output_file_path, on_progress=progress.ingested):
+        progress.dispatched()
+        tag_batch_task.apply_async(
+            args=[batch_ids, UPLOAD_TAGGING_QUERY, temp_file_path, "all_db"],
+            kwargs={"parent_id": parent_id},
+        )
 
-    return {
-        "status":      "success",
-        "output_file": output_file_path,
-        "pipeline":    pipeline_results
+    result = {
+        "output_file":   output_file_path,
+        "rows_read":     processor.stats["rows_read"],
+        "rows_inserted": processor.stats["rows_inserted"],
+        "batches":       processor.stats["batches"],
     }
+    if processor.stats["rows_inserted"] == 0:
+        progress.dispatch_finished(**result)
+        return {**result, "status": "no_new", "message": "No new records to insert."}
+
+    # 4) Done here when every batch already finished (or ran eagerly);
+    #    otherwise the last sub-task stores the final state
+    if progress.dispatch_finished(**result):
+        return {**progress.snapshot(), "status": "success"}
+    raise Ignore()
+
 
-# @shared_task
-def process_uploaded_data_task(data: dict) -> dict:
+def process_uploaded_data_task(data: dict, tagger=None) -> dict:
     topic = data.get('topic')
     context = data.get('context')
     lastSearch = data.get('lastSearch')
@@ -107,8 +69,9 @@ def process_uploaded_data_task(data: dict) -> dict:
         return {'error': "No 'context' provided"}
 
     try:
-        # Initialize Tagging with provided context
-        tagger = Tagging(context)
+        # Load the provided context into a (reusable) tagger
+        tagger = tagger or Tagging()
+        tagger.load_document(context)
 
         # Get available sections
         available_sections = tagger.sections.available_sections()
@@ -119,11 +82,13 @@ def process_uploaded_data_task(data: dict) -> dict:
         if lastSearch:
             tagging_results["lastSearch"] = tagger.extract_last_literature_search_dates()
         if intervention:
+            tagging_results.setdefault('intervention', {})
             for intervention in search_map.get('intervention'):
                 for items in intervention:
                     for item in items:
                         tagging_results['intervention'][intervention] = tagger.process_generic_terms(item)
         if topic:
+            tagging_results.setdefault('topic', {})
             for topic in search_map.get('topic'):
                 for items in intervention:
                     for item in items:
@@ -141,4 +106,39 @@ def process_uploaded_data_task(data: dict) -> dict:
         import traceback
         traceback.print_exc()
         print(f"Error processing data: {e}")
-        return {'error': str(e)}
\ No newline at end of file
+        return {'error': str(e)}
+
+
+@shared_task(bind=True, name="execute_papers_task", queue=BULK_QUEUE)
+def execute_papers_task(self, data: dict, contexts: list, output_dir=None) -> dict:
+    """
+    Asynchronous PaperProcessorExecute: tags every context (one per paper)
+    with the worker's preloaded tagger, reports per-paper progress in the
+    task state and writes the results to a JSON file for the download
+    endpoint.
+    """
+    tagger = get_worker_tagger()
+    total = len(contexts)
+    results = []
+    for position, context in enumerate(contexts, start=1):
+        results.append(process_uploaded_data_task({**data, 'context': context}, tagger=tagger))
+        progress = {
+            'current': position,
+            'total':   total,
+            'failed':  sum(1 for result in results if 'error' in result),
+        }
+        self.update_state(state='PROGRESS', meta=progress)
+        send_progress_event(self.app, self.request.id, progress)
+
+    output_dir = output_dir or EXECUTE_OUTPUT_DIR
+    os.makedirs(output_dir, exist_ok=True)
+    result_file = f"execute_{self.request.id or 'local'}.json"
+    with open(os.path.join(output_dir, result_file), 'w') as f:
+        json.dump(results, f, default=str)
+
+    return {
+        'status':      'success',
+        'papers':      total,
+        'failed':      sum(1 for result in results if 'error' in result),
+        'result_file': result_file,
+    }
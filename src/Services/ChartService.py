@@ -1,6 +1,5 @@
 import pandas as pd
-import altair as alt
-from vega_datasets import data
+from src.Utils.lazy_import import lazy_import
 from iso3166 import countries as iso_countries
 import math, logging
 from sqlalchemy import text
@@ -8,6 +7,10 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(
 
 from src.Services.PostgresService import PostgresService
 
+# Altair/vega_datasets load on the first chart request
+alt = lazy_import('altair')
+data = lazy_import('vega_datasets', 'data')
+
 class ChartService(PostgresService):
     """Handles the creation of Altair data visualizations."""
 
@@ -0,0 +1,159 @@
+# src/Services/CrossrefClient.py
+"""
+Cached, concurrent Crossref lookups
+
+DOIEnricher and Helpers.getDOI made one blocking Crossref request per row
+(with a fixed one-second sleep in between). Lookups now go through one
+client:
+
+    crossref = get_crossref_client()
+    works = crossref.works(dois)                 # {doi: work or None}, concurrent
+    work = crossref.search_title("Effect of ...")   # best match by title, or None
+
+- responses are cached on disk (see DiskCache) by DOI and by normalised
+  title, found or not, so a re-run asks Crossref only about new records
+- at most CROSSREF_WORKERS requests in flight, at CROSSREF_RATE requests
+  per second (enforced per host by HostHealth)
+- polite pool: a User-Agent with a contact address and `mailto` on every
+  request (CROSSREF_MAILTO)
+- the bulky reference lists are not kept in the cache
+"""
+
+import difflib
+import logging
+import os
+import re
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import quote
+
+import requests
+
+from src.Services.HostHealth import host_health
+from src.Services.HttpClient import HttpClient, get_http_client
+from src.Utils.disk_cache import DiskCache
+
+logger = logging.getLogger(__name__)
+
+CROSSREF_URL = os.getenv("CROSSREF_URL", "https://api.crossref.org")
+CROSSREF_MAILTO = os.getenv("CROSSREF_MAILTO", "")
+CROSSREF_WORKERS = int(os.getenv("CROSSREF_WORKERS", "8"))
+CROSSREF_RATE = float(os.getenv("CROSSREF_RATE", "10"))
+TITLE_MATCH_RATIO = float(os.getenv("CROSSREF_TITLE_MATCH", "0.9"))
+
+_DROPPED_FIELDS = ("reference", "relation")
+
+
+def normalise_title(title: Any) -> str:
+    """Lower-case ASCII words separated by single spaces ('' for missing titles)."""
+    if not isinstance(title, str):
+        return ""
+    text = unicodedata.normalize("NFKD", title).encode("ascii", "ignore").decode("ascii")
+    return " ".join(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+class CrossrefClient:
+    def __init__(self, base_url: str = CROSSREF_URL, mailto: str = CROSSREF_MAILTO,
+                 workers: int = CROSSREF_WORKERS, rate: Optional[float] = CROSSREF_RATE,
+                 cache_dir: Optional[str] = None, http: Optional[HttpClient] = None):
+        self.base_url = base_url.rstrip("/")
+        self.mailto = mailto
+        self.workers = workers
+        self.http = http or get_http_client()
+        self.work_cache = DiskCache("crossref/works", cache_dir)
+        self.title_cache = DiskCache("crossref/titles", cache_dir)
+        self.requests = 0
+        self._lock = threading.Lock()
+        agent = "SenseBackend/1.0"
+        self.headers = {"User-Agent": f"{agent} (mailto:{mailto})" if mailto else agent}
+        if rate:
+            host_health.configure(self.base_url, rate=rate, burst=max(rate, 1))
+
+    def _get(self, path: str, **params) -> requests.Response:
+        if self.mailto:
+            params["mailto"] = self.mailto
+        with self._lock:
+            self.requests += 1
+        return self.http.get(f"{self.base_url}{path}", params=params, headers=self.headers, timeout=(5, 30))
+
+    @staticmethod
+    def _slim(work: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: v for k, v in work.items() if k not in _DROPPED_FIELDS}
+
+    def work(self, doi: str) -> Optional[Dict[str, Any]]:
+        """The Crossref record of `doi`, or None if Crossref doesn't know it. Raises on request errors."""
+        key = doi.strip().lower()
+        cached = self.work_cache.get(key)
+        if cached is not DiskCache.MISSING:
+            return cached
+        response = self._get(f"/works/{quote(key, safe='/')}")
+        if response.status_code == 404:
+            self.work_cache.set(key, None, negative=True)
+            return None
+        response.raise_for_status()
+        work = self._slim(response.json().get("message") or {}) or None
+        self.work_cache.set(key, work, negative=work is None)
+        return work
+
+    def search_title(self, title: str) -> Optional[Dict[str, Any]]:
+        """
+        The best Crossref match for `title`, if its title is close enough
+        (CROSSREF_TITLE_MATCH similarity of the normalised titles).
+        """
+        key = normalise_title(title)
+        if not key:
+            return None
+        cached = self.title_cache.get(key)
+        if cached is not DiskCache.MISSING:
+            return cached
+        response = self._get("/works", **{"query.bibliographic": title, "rows": 1})
+        response.raise_for_status()
+        items = (response.json().get("message") or {}).get("items") or []
+        match = None
+        if items:
+            candidate = normalise_title((items[0].get("title") or [""])[0])
+            if difflib.SequenceMatcher(None, key, candidate).ratio() >= TITLE_MATCH_RATIO:
+                match = self._slim(items[0])
+        self.title_cache.set(key, match, negative=match is None)
+        if match and match.get("DOI"):
+            self.work_cache.set(match["DOI"].lower(), match)
+        return match
+
+    def _map(self, lookup, keys: Iterable[str]) -> Dict[str, Any]:
+        """Run `lookup` over the distinct keys on the worker pool. Failed lookups map to an exception."""
+        keys = list(dict.fromkeys(k for k in keys if k))
+
+        def safe(key):
+            try:
+                return lookup(key)
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"Crossref lookup failed for {key}: {str(e)}")
+                return e
+
+        if self.workers <= 1 or len(keys) <= 1:
+            return {key: safe(key) for key in keys}
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="crossref") as executor:
+            return dict(zip(keys, executor.map(safe, keys)))
+
+    def works(self, dois: Iterable[str]) -> Dict[str, Any]:
+        """{doi: work, None (unknown) or the RequestException it failed with}"""
+        return self._map(self.work, dois)
+
+    def search_titles(self, titles: Iterable[str]) -> Dict[str, Any]:
+        """{title: best match, None or the RequestException it failed with}"""
+        return self._map(self.search_title, titles)
+
+
+_client: Optional[CrossrefClient] = None
+_client_lock = threading.Lock()
+
+
+def get_crossref_client() -> CrossrefClient:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = CrossrefClient()
+    return _client
@@ -0,0 +1,210 @@
+# src/Services/DBservices/BulkIngest.py
+"""
+Server-side DOI de-duplication for uploaded records
+
+The upload path used to pull every DOI of all_db into Python, filter the
+CSV against that set and insert the rest with executemany. BulkIngest
+leaves the comparison to PostgreSQL instead:
+
+1. COPY the incoming rows into a temporary staging table (same column
+   types as the target, dropped on commit)
+2. normalise the DOIs there (trimmed, lower-case, no doi.org / "doi:"
+   prefix)
+3. INSERT ... SELECT only the rows whose normalised DOI is not in the
+   target yet (anti-join on an expression index), keeping the first row
+   per DOI within the upload
+4. RETURNING the new primary ids
+
+Concurrent ingests into the same table are serialised by a transaction-
+level advisory lock taken just before the INSERT, so two uploads of the
+same DOI can't both pass the anti-join. (ON CONFLICT would need a unique
+index on the normalised DOI, which all_db's legacy duplicates rule out.)
+
+Rows without a DOI can't be matched and are always inserted, as before.
+Everything runs in one transaction on a pooled connection. The DOI index
+is not built in that transaction: the first ingest of a process checks
+pg_indexes and, if needed, runs CREATE INDEX CONCURRENTLY on a separate
+autocommit connection, so no ingest holds a SHARE lock on the table.
+"""
+
+import logging
+import math
+import re
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from src.Services.DBservices.ConnectionPool import ConnectionPool, get_pool
+
+logger = logging.getLogger(__name__)
+
+INGEST_COLUMNS = (
+    "authors", "year", "title", "doi", "open_access", "abstract",
+    "id", "source", "language", "country", "database", "journal",
+)
+
+_DOI_PREFIX = re.compile(r'^(https?://(dx\.)?doi\.org/|doi:\s*)', re.IGNORECASE)
+
+
+def normalise_doi(doi: Any) -> str:
+    """Python twin of the SQL normalisation ('' for missing DOIs)."""
+    if doi is None or (isinstance(doi, float) and math.isnan(doi)):
+        return ''
+    return _DOI_PREFIX.sub('', str(doi).strip()).lower()
+
+
+def _normalised_sql(column: str) -> str:
+    # Immutable functions only, so the same expression can back an index
+    return (f"lower(regexp_replace(btrim(coalesce({column}, '')), "
+            f"'^(https?://(dx\\.)?doi\\.org/|doi:\\s*)', '', 'i'))")
+
+
+class BulkIngest:
+    """
+    Insert only records whose DOI is new to `table`.
+
+    Example:
+        inserted = BulkIngest().ingest(upload_df)
+        # [{'primary_id': 1042, 'doi': '10.1000/xyz'}, ...]
+    """
+
+    # (database url, table) pairs whose DOI index is known to exist, per process
+    _indexed: set = set()
+    _index_lock = threading.Lock()
+
+    def __init__(self, table: str = "all_db", columns: Sequence[str] = INGEST_COLUMNS,
+                 key_column: str = "primary_id", doi_column: str = "doi",
+                 pool: Optional[ConnectionPool] = None):
+        self.table = table
+        self.columns = list(columns)
+        self.key_column = key_column
+        self.doi_column = doi_column
+        self.pool = pool or get_pool()
+
+    @property
+    def index_name(self) -> str:
+        return f"{self.table}_doi_normalised_idx"
+
+    def ensure_doi_index(self) -> None:
+        """
+        Expression index the anti-join probes, checked once per table and
+        process. Built outside any ingest transaction (slow only the first time).
+        """
+        key = (str(self.pool.engine.url), self.table)
+        if key in self._indexed:
+            return
+        with self._index_lock:
+            if key in self._indexed:
+                return
+            exists = self.pool.fetch_all(
+                "SELECT 1 FROM pg_indexes WHERE tablename = %s AND indexname = %s",
+                (self.table, self.index_name), label="bulk_ingest_index",
+            )
+            if not exists:
+                self._create_index_concurrently()
+            # Also after a failed build: retrying would slow down every upload
+            BulkIngest._indexed.add(key)
+
+    def _create_index_concurrently(self) -> None:
+        # CONCURRENTLY can't run inside a transaction block, hence autocommit
+        conn = self.pool.engine.raw_connection()
+        driver = conn.driver_connection
+        try:
+            conn.rollback()  # autocommit can only be switched while idle
+            driver.autocommit = True
+            cursor = driver.cursor()
+            try:
+                cursor.execute("SET statement_timeout = 0")
+                cursor.execute(
+                    f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{self.index_name}" '
+                    f'ON "{self.table}" ({_normalised_sql(self._quote(self.doi_column))})'
+                )
+                logger.info(f"Created index {self.index_name}")
+            except Exception as e:
+                logger.error(f"Could not create index {self.index_name}, ingests will scan {self.table}: {e}")
+                # A failed concurrent build leaves an INVALID index behind
+                cursor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{self.index_name}"')
+            finally:
+                cursor.execute("RESET statement_timeout")
+                cursor.close()
+        finally:
+            driver.autocommit = False
+            conn.close()  # back to the pool
+
+    def ingest(self, records: pd.DataFrame, timeout_ms: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Insert the new rows of `records` and return their primary ids and DOIs.
+
+        Column names are matched case-insensitively, with spaces read as
+        underscores ("Open Access" -> open_access).
+        """
+        rows = self._prepare(records)
+        if not rows:
+            return []
+
+        staging = f"_ingest_{self.table}"
+        column_list = ", ".join(self._quote(c) for c in self.columns)
+        doi = self._quote(self.doi_column)
+
+        self.ensure_doi_index()
+        with self.pool.cursor("bulk_ingest", timeout_ms) as cursor:
+            cursor.execute(
+                f'CREATE TEMP TABLE "{staging}" ON COMMIT DROP AS '
+                f'SELECT {column_list} FROM "{self.table}" WITH NO DATA'
+            )
+            cursor.execute(f'ALTER TABLE "{staging}" ADD COLUMN _ord bigint, ADD COLUMN _doi_key text')
+
+            with cursor.copy(f'COPY "{staging}" ({column_list}, _ord) FROM STDIN') as copy:
+                for position, row in enumerate(rows):
+                    copy.write_row((*row, position))
+
+            cursor.execute(f'UPDATE "{staging}" SET _doi_key = {_normalised_sql(doi)}')
+            cursor.execute(f'ANALYZE "{staging}"')
+            # Held until commit; the INSERT's snapshot then sees the rows of earlier ingests
+            cursor.execute("SELECT pg_advisory_xact_lock(%s::regclass::oid::bigint)", (self._quote(self.table),))
+            cursor.execute(f"""
+                INSERT INTO "{self.table}" ({column_list})
+                SELECT {column_list}
+                FROM (
+                    SELECT s.*, row_number() OVER (PARTITION BY s._doi_key ORDER BY s._ord) AS _rank
+                    FROM "{staging}" s
+                ) s
+                WHERE s._doi_key = ''
+                   OR (s._rank = 1 AND NOT EXISTS (
+                        SELECT 1 FROM "{self.table}" t
+                        WHERE {_normalised_sql('t.' + doi)} = s._doi_key
+                   ))
+                ORDER BY s._ord
+                RETURNING {self._quote(self.key_column)}, {doi}
+            """)
+            inserted = [{self.key_column: key, self.doi_column: value} for key, value in cursor.fetchall()]
+
+        logger.info(f"Bulk ingest into {self.table}: {len(inserted)} of {len(rows)} rows were new")
+        return inserted
+
+    def _prepare(self, records: pd.DataFrame) -> List[tuple]:
+        renamed = {c: str(c).strip().lower().replace(" ", "_") for c in records.columns}
+        records = records.rename(columns=renamed)
+        missing = [c for c in self.columns if c not in records.columns]
+        if missing:
+            raise ValueError(f"Missing required columns in records DataFrame: {missing}")
+        # NaN -> NULL; integral floats (CSV columns with gaps) -> int for integer columns
+        return [
+            tuple(self._to_db_value(value) for value in row)
+            for row in records[self.columns].itertuples(index=False, name=None)
+        ]
+
+    @staticmethod
+    def _to_db_value(value: Any) -> Any:
+        if value is None or value is pd.NA or (isinstance(value, float) and math.isnan(value)):
+            return None
+        if hasattr(value, 'item'):  # numpy scalar
+            value = value.item()
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        return value
+
+    @staticmethod
+    def _quote(name: str) -> str:
+        return '"' + name.replace('"', '""') + '"'
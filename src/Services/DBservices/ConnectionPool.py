@@ -0,0 +1,234 @@
+# src/Services/DBservices/ConnectionPool.py
+"""
+Pooled database access without the Flask app
+
+Pipeline scripts, Celery tasks and CLI tools used to import `app` just to
+borrow `db.engine`, and opened a fresh raw connection for every call. This
+module keeps one SQLAlchemy engine (and so one connection pool) per
+database URL and process:
+
+    pool = ConnectionPool()                        # DATABASE_URL
+    rows = pool.fetch_all("SELECT doi FROM all_db", label="existing_dois")
+    with pool.cursor("bulk_insert", timeout_ms=600_000) as cursor:
+        cursor.executemany(query, values)          # committed on success
+
+- connections are reused (pool_size / max_overflow, pre-ping, recycle)
+- every statement runs under a statement timeout on PostgreSQL
+  (DB_STATEMENT_TIMEOUT_MS as the session default, overridable per
+  call with SET LOCAL; 0 disables it)
+- each call is timed and recorded in `metrics` under its label;
+  calls slower than DB_SLOW_QUERY_MS are logged
+- pools are discarded in forked children (Celery prefork workers) so a
+  connection is never shared across processes
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+DEFAULT_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+DEFAULT_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+DEFAULT_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '300000'))
+SLOW_QUERY_MS = float(os.getenv('DB_SLOW_QUERY_MS', '5000'))
+
+_engines: Dict[str, Engine] = {}
+_engines_lock = threading.Lock()
+
+
+def database_url(url: Optional[str] = None) -> str:
+    """
+    Resolve the connection URL: explicit value, DATABASE_URL, or the
+    DB_USER/DB_PASSWORD/DB_HOST/DB_PORT/DB_NAME settings.
+    """
+    url = url or os.getenv('DATABASE_URL')
+    if not url and os.getenv('DB_HOST') and os.getenv('DB_NAME'):
+        url = (f"postgresql://{os.getenv('DB_USER', '')}:{os.getenv('DB_PASSWORD', '')}"
+               f"@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT', '5432')}/{os.getenv('DB_NAME')}")
+    if not url:
+        raise ValueError("Database URL must be provided or set in DATABASE_URL environment variable.")
+    if url.startswith('postgresql://'):
+        url = url.replace('postgresql://', 'postgresql+psycopg://', 1)
+    return url
+
+
+def get_engine(url: Optional[str] = None) -> Engine:
+    """Process-wide engine (and connection pool) for `url`."""
+    url = database_url(url)
+    engine = _engines.get(url)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(url)
+            if engine is None:
+                kwargs = {'pool_pre_ping': True}
+                if not url.startswith('sqlite'):
+                    kwargs.update(
+                        pool_size=DEFAULT_POOL_SIZE,
+                        max_overflow=DEFAULT_MAX_OVERFLOW,
+                        pool_recycle=DEFAULT_POOL_RECYCLE,
+                    )
+                if url.startswith('postgresql'):
+                    # Session default; ORM users of the engine get it too
+                    kwargs['connect_args'] = {'options': f'-c statement_timeout={DEFAULT_STATEMENT_TIMEOUT_MS}'}
+                engine = create_engine(url, **kwargs)
+                _engines[url] = engine
+    return engine
+
+
+def dispose_engines(close: bool = True) -> None:
+    """Drop every pooled connection (close=False leaves them to the parent process)."""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose(close=close)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=lambda: dispose_engines(close=False))
+
+
+class QueryMetrics:
+    """Thread-safe per-label call counts and latencies."""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._window = window
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats = defaultdict(lambda: {'calls': 0, 'errors': 0, 'rows': 0,
+                                               'total_ms': 0.0, 'max_ms': 0.0})
+            self._recent = defaultdict(lambda: deque(maxlen=self._window))
+
+    def record(self, label: str, elapsed_ms: float, rows: int = 0, error: bool = False) -> None:
+        with self._lock:
+            stats = self._stats[label]
+            stats['calls'] += 1
+            stats['errors'] += int(error)
+            stats['rows'] += rows
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+            self._recent[label].append(elapsed_ms)
+        if elapsed_ms >= SLOW_QUERY_MS:
+            logger.warning(f"Slow database call '{label}': {elapsed_ms:.0f} ms")
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Per-label totals plus mean/p50/p95 over the most recent calls."""
+        with self._lock:
+            result = {}
+            for label, stats in self._stats.items():
+                recent = sorted(self._recent[label])
+                result[label] = dict(
+                    stats,
+                    mean_ms=stats['total_ms'] / stats['calls'],
+                    p50_ms=recent[len(recent) // 2],
+                    p95_ms=recent[min(len(recent) - 1, int(len(recent) * 0.95))],
+                )
+            return result
+
+
+metrics = QueryMetrics()
+
+
+class ConnectionPool:
+    """
+    DB-API access on top of the shared engine pool.
+
+    Connections come from and go back to the pool; they are never opened
+    per call. Every call commits on success and rolls back on error.
+    """
+
+    def __init__(self, url: Optional[str] = None, statement_timeout_ms: Optional[int] = None,
+                 query_metrics: Optional[QueryMetrics] = None):
+        self.engine = get_engine(url)
+        self.statement_timeout_ms = (DEFAULT_STATEMENT_TIMEOUT_MS if statement_timeout_ms is None
+                                     else statement_timeout_ms)
+        self.metrics = query_metrics or metrics
+        self._is_postgres = self.engine.dialect.name == 'postgresql'
+
+    @contextmanager
+    def connection(self, timeout_ms: Optional[int] = None) -> Iterator[Any]:
+        """Pooled DB-API connection; committed on success, rolled back on error."""
+        conn = self.engine.raw_connection()
+        try:
+            self._apply_timeout(conn, timeout_ms)
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()  # back to the pool
+
+    @contextmanager
+    def cursor(self, label: str = 'query', timeout_ms: Optional[int] = None) -> Iterator[Any]:
+        """Timed cursor on a pooled connection, recorded under `label`."""
+        started = time.perf_counter()
+        failed = False
+        rows = 0
+        try:
+            with self.connection(timeout_ms) as conn:
+                cursor = conn.cursor()
+                try:
+                    yield cursor
+                finally:
+                    rows = max(cursor.rowcount or 0, 0)
+                    cursor.close()
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.metrics.record(label, (time.perf_counter() - started) * 1000, rows=rows, error=failed)
+
+    def execute(self, query: str, params: Any = None, many: bool = False,
+                label: str = 'execute', timeout_ms: Optional[int] = None) -> Optional[List[tuple]]:
+        """Run one statement (or executemany); returns rows when it produces any."""
+        with self.cursor(label, timeout_ms) as cursor:
+            if many:
+                cursor.executemany(query, params or [])
+            else:
+                cursor.execute(query, params or ())
+            return cursor.fetchall() if cursor.description is not None else None
+
+    def fetch_all(self, query: str, params: Any = None, label: str = 'fetch_all',
+                  timeout_ms: Optional[int] = None) -> List[tuple]:
+        return self.execute(query, params, label=label, timeout_ms=timeout_ms) or []
+
+    def fetch_dicts(self, query: str, params: Any = None, label: str = 'fetch_dicts',
+                    timeout_ms: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self.cursor(label, timeout_ms) as cursor:
+            cursor.execute(query, params or ())
+            column_names = [desc[0] for desc in cursor.description]
+            return [dict(zip(column_names, row)) for row in cursor.fetchall()]
+
+    def _apply_timeout(self, conn, timeout_ms: Optional[int]) -> None:
+        timeout_ms = self.statement_timeout_ms if timeout_ms is None else timeout_ms
+        if not self._is_postgres or timeout_ms == DEFAULT_STATEMENT_TIMEOUT_MS:
+            return  # the connection already carries the default
+        cursor = conn.cursor()
+        try:
+            # SET LOCAL only lasts for this transaction, so pooled connections stay clean
+            cursor.execute(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+        finally:
+            cursor.close()
+
+
+_pools: Dict[str, ConnectionPool] = {}
+
+
+def get_pool(url: Optional[str] = None) -> ConnectionPool:
+    """Shared ConnectionPool for `url` (DATABASE_URL by default)."""
+    key = database_url(url)
+    pool = _pools.get(key)
+    if pool is None:
+        pool = _pools.setdefault(key, ConnectionPool(key))
+    return pool
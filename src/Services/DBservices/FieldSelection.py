@@ -0,0 +1,104 @@
+# src/Services/DBservices/FieldSelection.py
+"""
+Field Selection - Sparse fieldsets for record responses
+
+Resolves the `fields` / `exclude` / `preset` request parameters into the
+list of columns to fetch, so list views don't pull every column of all_db
+(abstracts, hundreds of __hash__ tag columns) just to show a few of them.
+
+Presets:
+    'list'    - the handful of columns a result list shows
+    'summary' - everything except the large text columns (deferred)
+    'detail'  - every column (default, same as no preset)
+"""
+
+import logging
+from typing import Iterable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+class FieldSelection:
+    """Turns projection parameters into a concrete column list."""
+
+    KEY_COLUMN = 'primary_id'
+
+    # Long free-text columns; only loaded for detail views
+    LARGE_TEXT_COLUMNS = (
+        'abstract', 'highlighted_abstract', 'head_abstracts_abstracts',
+        'keywords', 'full_text_content', 'screening_info', 'threads',
+    )
+
+    PRESETS = {
+        'list': (
+            'primary_id', 'title', 'authors', 'year', 'journal', 'doi',
+            'country', 'region', 'language', 'amstar_label', 'open_access',
+            'research_notes', 'topic_notes', 'notes',
+        ),
+        'summary': None,
+        'detail': None,
+    }
+
+    @staticmethod
+    def parse(value: Union[str, Iterable[str], None]) -> List[str]:
+        """Accept 'a,b,c' (query string) or ['a', 'b'] (JSON body)."""
+        if not value:
+            return []
+        if isinstance(value, str):
+            value = value.split(',')
+        return [str(v).strip() for v in value if v and str(v).strip()]
+
+    @classmethod
+    def resolve(cls, columns: Iterable[str], fields=None, exclude=None,
+                preset: Optional[str] = None, with_key: bool = True) -> Optional[List[str]]:
+        """
+        Work out which columns to fetch.
+
+        Args:
+            columns: Columns of the table, in table order
+            fields: Columns to include (overrides the preset's list)
+            exclude: Columns to leave out
+            preset: 'list', 'summary' or 'detail'
+            with_key: Always include KEY_COLUMN (record listings). Leave it
+                off for grouped/aggregated queries, where an extra
+                non-grouped column would make the SQL invalid
+
+        Returns:
+            Column names in table order, or None when every column is needed
+        """
+        columns = list(columns)
+        by_lower = {c.lower(): c for c in columns}
+        fields = cls.parse(fields)
+        excluded = {by_lower[f.lower()] for f in cls.parse(exclude) if f.lower() in by_lower}
+
+        if preset and preset not in cls.PRESETS:
+            logger.warning(f"Unknown field preset '{preset}', returning all columns")
+            preset = None
+
+        # Explicit fields win over the preset ('*' or no valid name: use the preset)
+        wanted = set() if '*' in fields else {by_lower[f.lower()] for f in fields if f.lower() in by_lower}
+        if not wanted:
+            if preset == 'summary':
+                wanted = set(columns) - set(cls.LARGE_TEXT_COLUMNS)
+            elif preset and cls.PRESETS[preset] is not None:
+                wanted = set(cls.PRESETS[preset]) & set(columns)
+            else:
+                wanted = set(columns)
+
+        wanted -= excluded
+        if with_key and cls.KEY_COLUMN in by_lower.values():
+            wanted.add(cls.KEY_COLUMN)
+
+        if len(wanted) == len(columns):
+            return None
+        return [c for c in columns if c in wanted]
+
+    @classmethod
+    def from_request(cls, columns: Iterable[str], params) -> Optional[List[str]]:
+        """resolve() with the parameters read from a request dict / args."""
+        return cls.resolve(
+            columns,
+            fields=params.get('fields'),
+            exclude=params.get('exclude'),
+            preset=params.get('preset'),
+        )
@@ -9,6 +9,7 @@ from datetime import datetime, date, time
 from decimal import Decimal
 from typing import Any, Dict, List
 from sqlalchemy import inspect
+from src.Services.DBservices.SerializerCompiler import SerializerCompiler
 
 
 class ModelSerializer:
@@ -67,6 +68,13 @@ class ModelSerializer:
         if exclude_fields is None:
             exclude_fields = []
         
+        if not include_relationships:
+            try:
+                # Precompiled per-model serializer (see SerializerCompiler)
+                return SerializerCompiler.compile(obj.__class__, exclude=exclude_fields)(obj)
+            except Exception:
+                pass  # fall back to the attribute-by-attribute path below
+        
         result = {}
         
         try:
@@ -120,7 +128,8 @@ class ModelSerializer:
             return {'error': f'Failed to serialize: {str(e)}'}
     
     @staticmethod
-    def serialize_list(items: List[Any], include_relationships: bool = False) -> List[Dict]:
+    def serialize_list(items: List[Any], include_relationships: bool = False,
+                       columns: List[str] = None) -> List[Dict]:
         """
         Convert list of models to list of dicts
         
@@ -129,8 +138,19 @@ class ModelSerializer:
         Args:
             items: List of model instances
             include_relationships: Whether to include related objects
+            columns: Only serialize these columns (sparse fieldsets)
             
         Returns:
             List of dictionaries
         """
-        return [ModelSerializer.to_dict(item, include_relationships=include_relationships) for item in items]
\ No newline at end of file
+        if not items:
+            return []
+        if include_relationships and not columns:
+            return [ModelSerializer.to_dict(item, include_relationships=include_relationships) for item in items]
+        
+        model_class = items[0].__class__
+        serialize = SerializerCompiler.compile(model_class, columns=columns)
+        try:
+            return [serialize(item) for item in items]
+        except Exception:
+            return [ModelSerializer.to_dict(item) for item in items]
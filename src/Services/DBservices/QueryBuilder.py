@@ -5,7 +5,7 @@ Enhanced Laravel-style Query Builder with advanced features
 
 from typing import Any, List, Union, Optional, Callable, Dict
 from sqlalchemy import and_, or_, not_, func, cast, String
-from sqlalchemy.orm import Query, joinedload
+from sqlalchemy.orm import Query, joinedload, load_only
 from database import db
 
 
@@ -36,6 +36,7 @@ class QueryBuilder:
         self._or_filters = []
         self._relations = []
         self._select_fields = None
+        self._only_fields = None
         self._group_by_fields = []
         self._having_conditions = []
         self._order_by_list = []
@@ -317,6 +318,22 @@ class QueryBuilder:
         self._select_fields = [getattr(self.model_class, f) for f in fields]
         return self
     
+    def only(self, *fields: str) -> 'QueryBuilder':
+        """
+        Load only these columns, still returning model instances.
+        
+        Unlike select(), results stay ORM objects; the other columns are
+        not fetched (accessing them later issues a separate query).
+        
+        Args:
+            *fields: Field names
+            
+        Returns:
+            Self for chaining
+        """
+        self._only_fields = list(fields) if fields else None
+        return self
+    
     def distinct(self, *columns: str) -> 'QueryBuilder':
         """
         Select distinct values.
@@ -631,6 +648,12 @@ class QueryBuilder:
         if self._select_fields:
             self._query = self._query.with_entities(*self._select_fields)
         
+        # Apply column projection (sparse fieldsets)
+        if self._only_fields:
+            self._query = self._query.options(load_only(*[
+                getattr(self.model_class, f) for f in self._only_fields
+            ]))
+        
         # Apply GROUP BY
         if self._group_by_fields:
             self._query = self._query.group_by(*self._group_by_fields)
@@ -668,6 +691,7 @@ class QueryBuilder:
         clone._or_filters = self._or_filters.copy()
         clone._relations = self._relations.copy()
         clone._select_fields = self._select_fields
+        clone._only_fields = self._only_fields
         clone._group_by_fields = self._group_by_fields.copy()
         clone._having_conditions = self._having_conditions.copy()
         clone._order_by_list = self._order_by_list.copy()
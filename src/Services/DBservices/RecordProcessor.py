@@ -40,11 +40,15 @@ class RecordProcessor:
         ]
     }
     
+    # Artificial columns that can be materialised in the table at write time
+    MATERIALISED_COLUMNS = ('research_notes', 'topic_notes', 'notes')
+    
     def __init__(self, include_empty: bool = False):
         """Initialize processor."""
         self.logger = logger
         self.include_empty = include_empty
         self._field_cache: Dict[str, Set[str]] = {}
+        self._fields_by_keys: Dict[tuple, Dict[str, List[str]]] = {}
     
     def add_artificial_columns(self, records: List[Dict]) -> List[Dict]:
         """Add artificial columns by dynamically discovering __hash__ fields only."""
@@ -61,6 +65,10 @@ class RecordProcessor:
             if not record:
                 continue
             
+            # Already materialised at write time: nothing to extract
+            if self.has_materialised_columns(record):
+                continue
+            
             try:
                 # Dynamically extract for each group
                 research_notes = self._extract_for_group(record, 'research_notes')
@@ -88,6 +96,30 @@ class RecordProcessor:
         
         return records
     
+    def has_materialised_columns(self, record: Dict) -> bool:
+        """True when the record carries stored values for all artificial columns."""
+        return all(record.get(col) is not None for col in self.MATERIALISED_COLUMNS)
+    
+    def compute_artificial_columns(self, record: Dict) -> Dict[str, str]:
+        """
+        Compute the artificial columns for one record at write time.
+        
+        Fields are discovered from this record's own keys, so rows with
+        different column sets can be materialised with one processor.
+        Always returns all three columns (empty string when nothing matched)
+        so NULL keeps meaning "not materialised yet".
+        """
+        keys = tuple(record.keys())
+        discovered = self._fields_by_keys.get(keys)
+        if discovered is None:
+            discovered = self._discover_fields(record)
+            self._fields_by_keys[keys] = discovered
+        self._discovered_fields = discovered
+        return {
+            group: self._extract_for_group(record, group)
+            for group in self.MATERIALISED_COLUMNS
+        }
+    
     def _discover_fields(self, sample_record: Dict) -> Dict[str, List[str]]:
         """
      FIXED: Discover ONLY __hash__ fields, exclude metadata.
@@ -10,8 +10,10 @@ Safe Registry Initialization - FIXED VERSION
 from typing import List, Optional, Dict, Any
 from sqlalchemy import inspect
 import logging
+import threading
 
 from src.models_.ModelRegistry import ModelRegistry
+from src.Services.DBservices.SchemaSnapshot import SchemaSnapshot
 
 logger = logging.getLogger(__name__)
 
@@ -145,6 +147,117 @@ def initialize_registry_safely(app, table_names: List[str] = None) -> Dict[str,
         }
 
 
+def initialize_registry_from_snapshot(app, table_names: List[str], snapshot_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Fast-start variant of initialize_registry_safely
+    
+    Builds the models from the on-disk schema snapshot after one cheap
+    catalog query instead of reflecting every table. Falls back to
+    initialize_registry_safely when there is no usable snapshot. The result
+    carries the snapshot and the tables whose live schema no longer matches
+    it; refresh_snapshot_in_background() takes care of those.
+    """
+    from database.db import db
+    
+    try:
+        snapshot = SchemaSnapshot(db.engine, snapshot_path)
+        check = snapshot.validate(table_names) if snapshot.load() else None
+    except Exception as e:
+        logger.warning(f"Schema snapshot check failed, reflecting instead: {str(e)}")
+        snapshot, check = None, None
+    
+    if check is None:
+        result = initialize_registry_safely(app, table_names=table_names)
+        result.update({'snapshot': snapshot, 'stale_tables': [], 'filters_valid': False, 'from_snapshot': False})
+        return result
+    
+    try:
+        registry = ModelRegistry(db)
+        tables = snapshot.tables()
+        loaded, failed = 0, []
+        for table_name in table_names:
+            if table_name not in tables:
+                failed.append(f"Table '{table_name}' not in snapshot")
+                continue
+            registry.register_table(tables[table_name])
+            loaded += 1
+    except Exception as e:
+        logger.error(f"Failed to load registry from snapshot: {str(e)}", exc_info=True)
+        result = initialize_registry_safely(app, table_names=table_names)
+        result.update({'snapshot': snapshot, 'stale_tables': [], 'filters_valid': False, 'from_snapshot': False})
+        return result
+    
+    if check['stale_tables']:
+        logger.warning(f"Schema snapshot is stale for {check['stale_tables']}, refreshing in background")
+    
+    return {
+        'success': loaded > 0,
+        'registry': registry,
+        'reflected_count': loaded,
+        'failed': failed,
+        'message': f"Registry loaded from snapshot with {loaded}/{len(table_names)} tables",
+        'snapshot': snapshot,
+        'stale_tables': check['stale_tables'],
+        'filters_valid': check['filters_valid'],
+        'from_snapshot': True,
+    }
+
+
+def refresh_snapshot_in_background(app, result: Dict[str, Any], filter_service=None,
+                                   table_names: List[str] = None) -> Optional[threading.Thread]:
+    """
+    Finish a fast boot off the request path
+    
+    - seeds the filter cache from the snapshot when it is still current
+    - otherwise (or when tables are stale / there was no snapshot) reflects
+      the stale tables, rebuilds the filter structure and rewrites the
+      snapshot in a daemon thread
+    
+    Returns:
+        The started thread, or None when nothing had to be refreshed
+    """
+    snapshot = result.get('snapshot')
+    registry = result.get('registry')
+    if snapshot is None or not isinstance(registry, ModelRegistry):
+        return None
+    
+    if result.get('filters_valid') and filter_service is not None:
+        filter_service._cache = snapshot.filters
+    
+    if result.get('from_snapshot') and not result.get('stale_tables') and result.get('filters_valid'):
+        return None
+    
+    table_names = table_names or list(registry.get_all_tables())
+    
+    def _refresh():
+        from database.db import db
+        with app.app_context():
+            try:
+                if result.get('from_snapshot'):
+                    db.create_all()
+                for table_name in result.get('stale_tables', []):
+                    try:
+                        registry.refresh(table_name)
+                        logger.info(f"Re-reflected stale table: {table_name}")
+                    except Exception as e:
+                        logger.error(f"Failed to re-reflect '{table_name}': {str(e)}")
+                filters = None
+                if filter_service is not None:
+                    filter_service.invalidate_cache()
+                    filters = filter_service.get_all_filters(bypass_cache=True)
+                tables = {
+                    name: registry.get_by_table(name).__table__
+                    for name in table_names if registry.get_by_table(name) is not None
+                }
+                snapshot.save(tables, filters)
+            except Exception as e:
+                logger.error(f"Background schema refresh failed: {str(e)}", exc_info=True)
+    
+    thread = threading.Thread(target=_refresh, name='schema-snapshot-refresh', daemon=True)
+    thread.start()
+    return thread
+
+
 def _get_available_tables(db) -> List[str]:
     """Get all available tables from database"""
     try:
@@ -0,0 +1,227 @@
+# src/Services/DBservices/SchemaSnapshot.py
+"""
+Schema Snapshot - Persisted reflected metadata for fast application boot
+
+Reflecting all_db (several hundred columns) and building the filter
+structure happens in every web worker, Celery worker and script that does
+`from app import app`. The snapshot stores both on disk so a worker can
+rebuild its models without reflection:
+
+    {
+        "version": 1,
+        "tables": {"all_db": {"fingerprint": "...", "columns": [...]}},
+        "data_version": {"all_db": 12345},
+        "filters": {...}
+    }
+
+Validation is a single catalog query (column names/types per table) that is
+compared with the stored fingerprints. The filter structure depends on the
+data, so it is only reused while the table's write counter is unchanged.
+"""
+
+import hashlib
+import importlib
+import json
+import logging
+import os
+import tempfile
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Column, MetaData, Table, inspect, text
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+DEFAULT_SNAPSHOT_PATH = os.path.join('temp', 'schema_snapshot.json')
+
+# Type constructor arguments worth keeping (everything else uses defaults)
+_TYPE_ARGS = ('length', 'precision', 'scale', 'timezone', 'asdecimal')
+
+
+class SchemaSnapshot:
+    """Reads, validates and writes the on-disk schema snapshot."""
+
+    def __init__(self, engine, path: Optional[str] = None):
+        self.engine = engine
+        self.path = path or os.getenv('SCHEMA_SNAPSHOT_PATH', DEFAULT_SNAPSHOT_PATH)
+        self.data: Optional[Dict[str, Any]] = None
+
+    # ------------------------------------------------------------------
+    # Loading / validation
+    # ------------------------------------------------------------------
+
+    def load(self) -> bool:
+        """Read the snapshot file. False if missing, unreadable or another version."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as handle:
+                data = json.load(handle)
+        except FileNotFoundError:
+            logger.info(f"No schema snapshot at {self.path}")
+            return False
+        except (OSError, ValueError) as e:
+            logger.warning(f"Unreadable schema snapshot {self.path}: {e}")
+            return False
+
+        if data.get('version') != SNAPSHOT_VERSION:
+            logger.info(f"Schema snapshot version {data.get('version')} != {SNAPSHOT_VERSION}, ignoring")
+            return False
+
+        self.data = data
+        return True
+
+    def validate(self, table_names: List[str]) -> Dict[str, Any]:
+        """
+        Compare the snapshot with the live schema.
+
+        Returns:
+            {'valid': bool, 'stale_tables': [...], 'filters_valid': bool}
+        """
+        tables = (self.data or {}).get('tables', {})
+        live = self.fingerprints(table_names)
+        stale = [
+            name for name in table_names
+            if name not in tables or tables[name].get('fingerprint') != live.get(name)
+        ]
+        data_version = self.data_versions(table_names)
+        filters_valid = (
+            not stale
+            and (self.data or {}).get('filters') is not None
+            and None not in data_version.values()
+            and data_version == (self.data or {}).get('data_version')
+        )
+        return {'valid': not stale, 'stale_tables': stale, 'filters_valid': filters_valid}
+
+    def tables(self, metadata: Optional[MetaData] = None) -> Dict[str, Table]:
+        """Rebuild Table objects from the snapshot (no database round-trip)."""
+        metadata = metadata or MetaData()
+        result = {}
+        for name, spec in (self.data or {}).get('tables', {}).items():
+            columns = [self._column_from_spec(col) for col in spec['columns']]
+            result[name] = Table(name, metadata, *columns, extend_existing=True)
+        return result
+
+    @property
+    def filters(self) -> Optional[Dict[str, Any]]:
+        return (self.data or {}).get('filters')
+
+    # ------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------
+
+    def save(self, tables: Dict[str, Table], filters: Optional[Dict[str, Any]] = None) -> bool:
+        """Write the snapshot atomically (temp file + rename)."""
+        names = list(tables)
+        data = {
+            'version': SNAPSHOT_VERSION,
+            'tables': {},
+            'data_version': self.data_versions(names),
+            'filters': filters,
+        }
+        fingerprints = self.fingerprints(names)
+        for name, table in tables.items():
+            data['tables'][name] = {
+                'fingerprint': fingerprints.get(name),
+                'columns': [self._column_spec(col) for col in table.columns],
+            }
+
+        try:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as handle:
+                json.dump(data, handle, default=str)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not write schema snapshot {self.path}: {e}")
+            return False
+
+        self.data = data
+        logger.info(f"Schema snapshot written to {self.path} ({len(names)} tables)")
+        return True
+
+    # ------------------------------------------------------------------
+    # Live schema checks
+    # ------------------------------------------------------------------
+
+    def fingerprints(self, table_names: List[str]) -> Dict[str, str]:
+        """Hash of (column name, type) per table, from one catalog query."""
+        if not table_names:
+            return {}
+
+        columns: Dict[str, List[str]] = {}
+        if self.engine.dialect.name == 'postgresql':
+            query = text(
+                "SELECT table_name, column_name, data_type, character_maximum_length "
+                "FROM information_schema.columns "
+                "WHERE table_schema = current_schema() AND table_name = ANY(:tables) "
+                "ORDER BY table_name, ordinal_position"
+            )
+            with self.engine.connect() as conn:
+                for row in conn.execute(query, {'tables': list(table_names)}):
+                    columns.setdefault(row[0], []).append(f"{row[1]}:{row[2]}:{row[3]}")
+        else:
+            inspector = inspect(self.engine)
+            existing = set(inspector.get_table_names())
+            for name in table_names:
+                if name in existing:
+                    columns[name] = [f"{c['name']}:{c['type']}" for c in inspector.get_columns(name)]
+
+        return {
+            name: hashlib.md5(','.join(cols).encode('utf-8')).hexdigest()
+            for name, cols in columns.items()
+        }
+
+    def data_versions(self, table_names: List[str]) -> Dict[str, Optional[int]]:
+        """Cumulative write counters per table (None when unavailable)."""
+        versions: Dict[str, Optional[int]] = {name: None for name in table_names}
+        if self.engine.dialect.name != 'postgresql' or not table_names:
+            return versions
+        query = text(
+            "SELECT relname, n_tup_ins + n_tup_upd + n_tup_del "
+            "FROM pg_stat_user_tables WHERE relname = ANY(:tables)"
+        )
+        try:
+            with self.engine.connect() as conn:
+                for row in conn.execute(query, {'tables': list(table_names)}):
+                    versions[row[0]] = int(row[1])
+        except Exception as e:
+            logger.debug(f"Table statistics unavailable: {e}")
+        return versions
+
+    # ------------------------------------------------------------------
+    # Column (de)serialisation
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _column_spec(column) -> Dict[str, Any]:
+        type_cls = type(column.type)
+        spec = {
+            'name': column.name,
+            'type': f"{type_cls.__module__}:{type_cls.__qualname__}",
+            'type_args': {
+                arg: getattr(column.type, arg)
+                for arg in _TYPE_ARGS
+                if getattr(column.type, arg, None) is not None
+            },
+            'nullable': column.nullable,
+            'primary_key': column.primary_key,
+        }
+        if column.server_default is not None and hasattr(column.server_default, 'arg'):
+            spec['server_default'] = str(getattr(column.server_default.arg, 'text', column.server_default.arg))
+        return spec
+
+    @staticmethod
+    def _column_from_spec(spec: Dict[str, Any]) -> Column:
+        module_name, _, qualname = spec['type'].partition(':')
+        if not module_name.startswith('sqlalchemy.'):
+            raise ValueError(f"Refusing to load column type from {module_name}")
+        type_cls = getattr(importlib.import_module(module_name), qualname)
+        try:
+            column_type = type_cls(**spec.get('type_args', {}))
+        except TypeError:
+            column_type = type_cls()
+
+        kwargs = {'nullable': spec.get('nullable', True), 'primary_key': spec.get('primary_key', False)}
+        if spec.get('server_default') is not None:
+            kwargs['server_default'] = text(spec['server_default'])
+        return Column(spec['name'], column_type, **kwargs)
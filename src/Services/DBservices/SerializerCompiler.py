@@ -0,0 +1,149 @@
+# src/Services/DBservices/SerializerCompiler.py
+"""
+Serializer Compiler - Precompiled row-to-dict functions per model
+
+ModelSerializer.to_dict walks the mapper and type-checks every value on every
+row. For wide tables (all_db has several hundred columns) that dominates the
+response time. The compiler inspects the mapper once per (model, column subset,
+profile), picks a converter per column from its SQL type, and returns a
+function that:
+
+    1. reads all loaded attributes with one operator.itemgetter call (C loop),
+    2. builds the dict with dict(zip(...)),
+    3. converts only the columns whose type needs it (dates, decimals, ...).
+
+Profiles:
+    'model'  - same output as ModelSerializer.to_dict (columns only)
+    'record' - raw values with datetimes as ISO strings, numpy scalars unwrapped
+               (FilterSearchResource._serialize_record)
+"""
+
+import threading
+from datetime import datetime, date, time
+from decimal import Decimal
+from operator import attrgetter, itemgetter
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import inspect
+from sqlalchemy import types as sqltypes
+
+
+def _datetime_iso(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _numpy_to_python(value):
+    """numpy scalars expose .item(); everything else passes through."""
+    item = getattr(value, 'item', None)
+    return item() if callable(item) and type(value).__module__ == 'numpy' else value
+
+
+class SerializerCompiler:
+    """Builds and caches specialised serializers per model."""
+
+    _cache: Dict[Tuple, Callable[[Any], Dict]] = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def compile(cls, model_class, columns: Optional[Iterable[str]] = None,
+                exclude: Optional[Iterable[str]] = None, profile: str = 'model') -> Callable[[Any], Dict]:
+        """
+        Get (or build) the serializer for a model.
+
+        Args:
+            model_class: SQLAlchemy model class
+            columns: Only serialize these columns (None = all)
+            exclude: Column names to leave out
+            profile: 'model' or 'record' (see module docstring)
+
+        Returns:
+            Function taking a model instance and returning a dict
+        """
+        key = (
+            model_class,
+            tuple(columns) if columns is not None else None,
+            tuple(sorted(exclude)) if exclude else (),
+            profile,
+        )
+        serializer = cls._cache.get(key)
+        if serializer is None:
+            with cls._lock:
+                serializer = cls._cache.get(key)
+                if serializer is None:
+                    serializer = cls._build(model_class, key[1], set(key[2]), profile)
+                    cls._cache[key] = serializer
+        return serializer
+
+    @classmethod
+    def clear_cache(cls):
+        """Drop compiled serializers (e.g. after the schema was reflected again)."""
+        with cls._lock:
+            cls._cache.clear()
+
+    @classmethod
+    def _build(cls, model_class, columns, exclude, profile) -> Callable[[Any], Dict]:
+        mapper = inspect(model_class)
+        selected = [
+            column for column in mapper.columns
+            if column.name not in exclude and (columns is None or column.name in columns)
+        ]
+        names = tuple(column.name for column in selected)
+        keys = tuple(mapper.get_property_by_column(column).key for column in selected)
+        converters = tuple(
+            (name, converter)
+            for name, converter in (
+                (column.name, cls._converter_for(column.type, profile)) for column in selected
+            )
+            if converter is not None
+        )
+
+        if not names:
+            return lambda obj: {}
+
+        # Loaded column values live in the instance __dict__; reading them
+        # there skips the descriptor protocol. Expired/deferred attributes
+        # are missing from it, so those rows go through getattr (which loads).
+        state_getter = itemgetter(*keys)
+        attr_getter = attrgetter(*keys)
+        single = len(names) == 1
+
+        def serialize(obj) -> Dict:
+            try:
+                values = state_getter(obj.__dict__)
+            except KeyError:
+                values = attr_getter(obj)
+            result = dict(zip(names, (values,) if single else values))
+            for name, converter in converters:
+                value = result[name]
+                if value is not None:
+                    result[name] = converter(value)
+            return result
+
+        serialize.__name__ = f"serialize_{model_class.__name__}_{profile}"
+        serialize.columns = names
+        return serialize
+
+    @staticmethod
+    def _converter_for(sql_type, profile) -> Optional[Callable[[Any], Any]]:
+        """Pick the conversion for a column type (None = keep value as is)."""
+        from src.Services.DBservices.ModelSerializer import ModelSerializer
+        generic = ModelSerializer.serialize_value
+
+        if profile == 'record':
+            if isinstance(sql_type, sqltypes.DateTime):
+                return _datetime_iso
+            if isinstance(sql_type, (sqltypes.String, sqltypes.Integer, sqltypes.Boolean)):
+                return None
+            return lambda v: _datetime_iso(_numpy_to_python(v))
+
+        # 'model' profile: reproduce ModelSerializer.serialize_value per type,
+        # with the generic path only for unexpected value types.
+        if isinstance(sql_type, sqltypes.String):
+            return lambda v: v if type(v) is str else generic(v)
+        if isinstance(sql_type, (sqltypes.DateTime, sqltypes.Date, sqltypes.Time)):
+            return lambda v: v.isoformat() if isinstance(v, (datetime, date, time)) else generic(v)
+        if isinstance(sql_type, sqltypes.Numeric) and getattr(sql_type, 'asdecimal', False):
+            return lambda v: float(v) if type(v) is Decimal else generic(v)
+        if isinstance(sql_type, (sqltypes.Integer, sqltypes.Float, sqltypes.Boolean)):
+            return lambda v: str(_numpy_to_python(v))
+        return generic
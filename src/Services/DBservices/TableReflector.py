@@ -138,23 +138,40 @@ class TableReflector:
                 extend_existing=True
             )
             
-            # Create a dynamic model class with exact table name
-            class_dict = {
-                '__tablename__': table_name,
-                '__table__': table,
-                '__module__': 'dynamic_models'
-            }
-            
-            # Use exact table name as class name
-            model_class = type(table_name, (self.db.Model,), class_dict)
-            
-            logger.debug(f"Created model class: {model_class.__name__} for table: {table_name}")
-            return model_class
+            return self._model_for_table(table)
         
         except Exception as e:
             logger.error(f"Failed to create model for '{table_name}': {str(e)}", exc_info=True)
             raise
     
+    def _model_for_table(self, table: Table) -> Type:
+        """Create the dynamic model class for an already built Table."""
+        # Create a dynamic model class with exact table name
+        class_dict = {
+            '__tablename__': table.name,
+            '__table__': table,
+            '__module__': 'dynamic_models'
+        }
+        
+        # Use exact table name as class name
+        model_class = type(table.name, (self.db.Model,), class_dict)
+        
+        logger.debug(f"Created model class: {model_class.__name__} for table: {table.name}")
+        return model_class
+    
+    def load_table(self, table: Table) -> Type:
+        """
+        Create and cache a model from a Table built elsewhere (e.g. a schema
+        snapshot), without reflecting it from the database.
+        """
+        if table.name in self._reflected_models:
+            return self._reflected_models[table.name]
+        
+        model_class = self._model_for_table(table)
+        self._reflected_models[table.name] = model_class
+        logger.info(f"Loaded model from snapshot: {model_class.__name__} -> {table.name}")
+        return model_class
+    
     def reflect_many(self, table_names: List[str]) -> Dict[str, Type]:
         """Reflect multiple tables"""
         results = {}
@@ -0,0 +1,226 @@
+# src/Services/DBservices/WorkLeases.py
+"""
+Lease-based claiming of pipeline work
+
+Several pipeline processes (or Celery workers) can work through the same
+source without processing a record twice. Every record id of a source gets
+a row in a work table; a worker claims a batch of pending rows with
+SELECT ... FOR UPDATE SKIP LOCKED, so concurrent claims never overlap and
+never wait on each other, and holds them under a time-limited lease:
+
+    leases = WorkLeases()
+    leases.enqueue("Cochrane", query)                 # idempotent
+    while batch := leases.claim("Cochrane", worker_id, batch_size=100):
+        with leases.heartbeat("Cochrane", worker_id, batch):
+            outcome = process(batch)                  # lease renewed meanwhile
+        leases.complete("Cochrane", worker_id, batch, failed_ids=outcome["failed_ids"])
+
+A worker that dies stops renewing; once its lease expires the rows are
+claimable again (up to `max_attempts` times, after which they are marked
+failed). Rows whose host is unavailable are deferred: they stay leased to
+no one until the delay runs out. Status values: pending, leased, done,
+skipped, failed.
+"""
+
+import logging
+import os
+import socket
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from src.Services.DBservices.ConnectionPool import ConnectionPool, get_pool
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEASE_SECONDS = int(os.getenv("WORK_LEASE_SECONDS", "600"))
+
+
+def worker_identity() -> str:
+    """host:pid:random, unique per process (and per restart)."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class WorkLeases:
+    def __init__(self, table: str = "processing_work", pool: Optional[ConnectionPool] = None,
+                 lease_seconds: int = DEFAULT_LEASE_SECONDS, max_attempts: int = 3):
+        self.table = table
+        self.pool = pool or get_pool()
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._table_ready = False
+
+    def ensure_table(self) -> None:
+        if self._table_ready:
+            return
+        with self.pool.cursor("work_ensure_table") as cursor:
+            cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.table} (
+                source_name VARCHAR(255) NOT NULL,
+                record_id BIGINT NOT NULL,
+                status VARCHAR(20) NOT NULL DEFAULT 'pending',
+                lease_owner VARCHAR(255),
+                lease_expires_at TIMESTAMP,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (source_name, record_id)
+            )
+            """)
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {self.table}_claim_idx "
+                f"ON {self.table} (source_name, status, record_id)"
+            )
+        self._table_ready = True
+
+    def enqueue(self, source_name: str, query: str, exclude_ids: Iterable[int] = ()) -> int:
+        """
+        Add the primary_ids of `query` that are not queued yet (and not in
+        `exclude_ids`, e.g. already processed). Returns the number added.
+        """
+        self.ensure_table()
+        with self.pool.cursor("work_enqueue") as cursor:
+            cursor.execute(f"""
+            INSERT INTO {self.table} (source_name, record_id)
+            SELECT %s, q.primary_id FROM ({query}) AS q
+            WHERE q.primary_id IS NOT NULL AND NOT (q.primary_id = ANY(%s::bigint[]))
+            ON CONFLICT (source_name, record_id) DO NOTHING
+            """, (source_name, [int(i) for i in exclude_ids]))
+            return cursor.rowcount
+
+    def retry_unfinished(self, source_name: str) -> int:
+        """Put failed and skipped rows back in the pool (new run of a source)."""
+        self.ensure_table()
+        with self.pool.cursor("work_retry") as cursor:
+            cursor.execute(f"""
+            UPDATE {self.table}
+            SET status = 'pending', attempts = 0, lease_owner = NULL, lease_expires_at = NULL,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE source_name = %s AND status IN ('failed', 'skipped')
+            """, (source_name,))
+            return cursor.rowcount
+
+    def claim(self, source_name: str, owner: str, batch_size: int = 100,
+              lease_seconds: Optional[int] = None) -> List[int]:
+        """
+        Atomically lease up to `batch_size` pending (or lease-expired) ids.
+        Rows locked by a concurrent claim are skipped, not waited on.
+        """
+        self.ensure_table()
+        lease_seconds = lease_seconds or self.lease_seconds
+        with self.pool.cursor("work_claim") as cursor:
+            # Leases that ran out too often are given up on
+            cursor.execute(f"""
+            UPDATE {self.table} SET status = 'failed', lease_owner = NULL, updated_at = CURRENT_TIMESTAMP
+            WHERE source_name = %s AND status = 'leased'
+              AND lease_expires_at < CURRENT_TIMESTAMP AND attempts >= %s
+            """, (source_name, self.max_attempts))
+            cursor.execute(f"""
+            WITH picked AS (
+                SELECT record_id FROM {self.table}
+                WHERE source_name = %s
+                  AND (status = 'pending' OR (status = 'leased' AND lease_expires_at < CURRENT_TIMESTAMP))
+                ORDER BY record_id
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            UPDATE {self.table} w
+            SET status = 'leased', lease_owner = %s, attempts = w.attempts + 1,
+                lease_expires_at = CURRENT_TIMESTAMP + make_interval(secs => %s),
+                updated_at = CURRENT_TIMESTAMP
+            FROM picked
+            WHERE w.source_name = %s AND w.record_id = picked.record_id
+            RETURNING w.record_id
+            """, (source_name, batch_size, owner, lease_seconds, source_name))
+            return sorted(row[0] for row in cursor.fetchall())
+
+    def renew(self, source_name: str, owner: str, ids: Iterable[int],
+              lease_seconds: Optional[int] = None) -> int:
+        """Extend the lease on `ids`; returns how many are still held by `owner`."""
+        lease_seconds = lease_seconds or self.lease_seconds
+        with self.pool.cursor("work_renew") as cursor:
+            cursor.execute(f"""
+            UPDATE {self.table}
+            SET lease_expires_at = CURRENT_TIMESTAMP + make_interval(secs => %s), updated_at = CURRENT_TIMESTAMP
+            WHERE source_name = %s AND lease_owner = %s AND status = 'leased' AND record_id = ANY(%s::bigint[])
+            """, (lease_seconds, source_name, owner, [int(i) for i in ids]))
+            return cursor.rowcount
+
+    def complete(self, source_name: str, owner: str, ids: Iterable[int],
+                 failed_ids: Iterable[int] = (), skipped_ids: Iterable[int] = ()) -> int:
+        """Finish a claimed batch; ids not failed or skipped are done."""
+        failed, skipped = {int(i) for i in failed_ids}, {int(i) for i in skipped_ids}
+        done = [int(i) for i in ids if int(i) not in failed and int(i) not in skipped]
+        updated = 0
+        with self.pool.cursor("work_complete") as cursor:
+            for status, group in (("done", done), ("failed", sorted(failed)), ("skipped", sorted(skipped))):
+                if not group:
+                    continue
+                cursor.execute(f"""
+                UPDATE {self.table}
+                SET status = %s, lease_owner = NULL, lease_expires_at = NULL, updated_at = CURRENT_TIMESTAMP
+                WHERE source_name = %s AND lease_owner = %s AND record_id = ANY(%s::bigint[])
+                """, (status, source_name, owner, group))
+                updated += cursor.rowcount
+        return updated
+
+    def release(self, source_name: str, owner: str, ids: Iterable[int]) -> int:
+        """Hand claimed ids back unprocessed (e.g. on shutdown)."""
+        with self.pool.cursor("work_release") as cursor:
+            cursor.execute(f"""
+            UPDATE {self.table}
+            SET status = 'pending', lease_owner = NULL, lease_expires_at = NULL,
+                attempts = GREATEST(attempts - 1, 0), updated_at = CURRENT_TIMESTAMP
+            WHERE source_name = %s AND lease_owner = %s AND status = 'leased' AND record_id = ANY(%s::bigint[])
+            """, (source_name, owner, [int(i) for i in ids]))
+            return cursor.rowcount
+
+    def defer(self, source_name: str, owner: str, ids: Iterable[int], delay_seconds: float) -> int:
+        """
+        Hand claimed ids back to be retried after `delay_seconds` (their host
+        is unavailable); the attempt does not count towards `max_attempts`.
+        """
+        with self.pool.cursor("work_defer") as cursor:
+            cursor.execute(f"""
+            UPDATE {self.table}
+            SET status = 'leased', lease_owner = 'deferred',
+                lease_expires_at = CURRENT_TIMESTAMP + make_interval(secs => %s),
+                attempts = GREATEST(attempts - 1, 0), updated_at = CURRENT_TIMESTAMP
+            WHERE source_name = %s AND lease_owner = %s AND status = 'leased' AND record_id = ANY(%s::bigint[])
+            """, (float(delay_seconds), source_name, owner, [int(i) for i in ids]))
+            return cursor.rowcount
+
+    def counts(self, source_name: str) -> Dict[str, int]:
+        self.ensure_table()
+        rows = self.pool.fetch_all(
+            f"SELECT status, COUNT(*) FROM {self.table} WHERE source_name = %s GROUP BY status",
+            (source_name,), label="work_counts"
+        )
+        return {status: count for status, count in rows}
+
+    @contextmanager
+    def heartbeat(self, source_name: str, owner: str, ids: List[int],
+                  lease_seconds: Optional[int] = None) -> Iterator[threading.Event]:
+        """
+        Renew the lease on `ids` every third of the lease period while the
+        block runs. The yielded event is set if the lease was lost.
+        """
+        lease_seconds = lease_seconds or self.lease_seconds
+        stop, lost = threading.Event(), threading.Event()
+
+        def _renew():
+            while not stop.wait(max(lease_seconds / 3, 0.1)):
+                try:
+                    if self.renew(source_name, owner, ids, lease_seconds) < len(ids):
+                        lost.set()
+                        logger.warning(f"Lease lost on part of a {source_name} batch held by {owner}")
+                except Exception as e:
+                    logger.error(f"Lease renewal failed for {source_name}: {str(e)}")
+
+        thread = threading.Thread(target=_renew, name="work-lease-heartbeat", daemon=True)
+        thread.start()
+        try:
+            yield lost
+        finally:
+            stop.set()
+            thread.join()
@@ -1,66 +1,50 @@
 import numpy as np
 import pandas as pd
+from src.Services.DBservices.ConnectionPool import get_pool
+
+
 class DatabaseHandler:
-    def __init__(self, query=None):
+    def __init__(self, query=None, database_url=None, params=None):
         self.query = query
+        self.params = params
+        self._database_url = database_url
+        self._pool = None
+
+    @property
+    def pool(self):
+        """Shared pooled connection source; no Flask app needed."""
+        if self._pool is None:
+            self._pool = get_pool(self._database_url)
+        return self._pool
 
     def fetch_papers(self):
         """
         Fetches papers using the predefined query.
         """
-        from app import db, app
-        with app.app_context():
-            conn = db.engine.raw_connection()
-            cursor = conn.cursor()
-            cursor.execute(self.query)
-            papers = cursor.fetchall()
-            cursor.close()
-            conn.close()
-            return papers
+        return self.pool.fetch_all(self.query, self.params, label="fetch_papers")
         
     def fetch_papers_with_column_names(self):
         """
         Fetches papers using the predefined query and maps data to column names.
         """
-        from app import db, app
-        with app.app_context():
-            # Establish a raw database connection
-            conn = db.engine.raw_connection()
-            cursor = conn.cursor()
-
-            try:
-                # Execute the query
-                cursor.execute(self.query)
-
-                # Fetch all rows
-                rows = cursor.fetchall()
-
-                # Get column names from cursor description
-                column_names = [desc[0] for desc in cursor.description]
-
-                # Map rows to column names
-                papers = [dict(zip(column_names, row)) for row in rows]
-
-                return papers
-            finally:
-                # Ensure resources are released
-                cursor.close()
-                conn.close()
+        return self.pool.fetch_dicts(self.query, self.params, label="fetch_papers_with_column_names")
     
     
-    def update_query(self, new_query):
+    def update_query(self, new_query, params=None):
         """
-        Updates the query for this DatabaseHandler instance.
+        Updates the query (and its bound parameters) for this DatabaseHandler instance.
         """
         self.query = new_query
+        self.params = params
         
-    def execute_query(self, query, params=None, use_executemany=False):
+    def execute_query(self, query, params=None, use_executemany=False, label=None):
         """
         Executes a general-purpose SQL query with optional parameters.
 
         :param query: SQL query string
         :param params: Optional parameters for the query (list of tuples for executemany or a single tuple for execute)
         :param use_executemany: Whether to use executemany for batch inserts
+        :param label: Name the call's latency is recorded under in the pool metrics
         :return: Fetched results for SELECT queries, otherwise None
         """
         def convert_params(params):
@@ -76,36 +60,20 @@ class DatabaseHandler:
                 ] if isinstance(params, list) else tuple(None if pd.isna(v) else v for v in params)
             return params
 
-        from app import db, app
-        with app.app_context():
-            conn = db.engine.raw_connection()
-            cursor = conn.cursor()
-            try:
-                # Convert params before executing query
-                sanitized_params = convert_params(params)
-                # print(f"Sanitized Params: {sanitized_params}")
-                # print(f"Query: {query}")
-
-                if use_executemany:
-                    cursor.executemany(query, sanitized_params or [])
-                else:
-                    cursor.execute(query, sanitized_params or ())
-
-                if query.strip().lower().startswith("select"):
-                    results = cursor.fetchall()
-                    return results
-                else:
-                    conn.commit()  # Commit for non-SELECT queries
-            except Exception as e:
-                import traceback
-                traceback.print_exc()
-                print(f"Error executing query: {e}")
-                # print(f"Query: {query}")
-                # print(f"Params: {params}")
-                conn.rollback()  # Rollback in case of an error
-            finally:
-                cursor.close()
-                conn.close()
+        try:
+            # Convert params before executing query
+            sanitized_params = convert_params(params)
+            # Rows for SELECT queries; other statements are committed by the pool
+            results = self.pool.execute(
+                query, sanitized_params, many=use_executemany, label=label or "execute_query"
+            )
+            if query.strip().lower().startswith("select"):
+                return results
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            print(f"Error executing query: {e}")
+            # The pool has already rolled back the transaction
 
     def fetch_existing_dois(self):
         """
@@ -113,7 +81,7 @@ class DatabaseHandler:
         :return: A list of DOIs.
         """
         query = "SELECT DOI FROM all_db"
-        results = self.execute_query(query)
+        results = self.execute_query(query, label="fetch_existing_dois")
         print(f"Fetched {len(results)} existing DOIs from the database.")
         return [row[0] for row in results]
 
@@ -147,9 +115,21 @@ class DatabaseHandler:
             for record in values
         ]
 
-        self.execute_query(query, params=sanitized_values, use_executemany=True)
+        self.execute_query(query, params=sanitized_values, use_executemany=True, label="insert_records")
         print(f"Inserted {len(records)} new records into the database.")
 
+    def insert_new_records(self, records, table="all_db"):
+        """
+        Inserts only the records whose DOI is not in the table yet; the
+        comparison runs in the database (see BulkIngest).
+        :param records: A pandas DataFrame with the upload columns.
+        :return: A list of {"primary_id": ..., "doi": ...} for the inserted rows.
+        """
+        from src.Services.DBservices.BulkIngest import BulkIngest
+        inserted = BulkIngest(table=table, pool=self.pool).ingest(records)
+        print(f"Inserted {len(inserted)} new records into the database.")
+        return inserted
+
     def fetch_new_records(self, dois):
         """
         Fetches records from the database based on a list of DOIs.
@@ -161,6 +141,6 @@ class DatabaseHandler:
         FROM all_db
         WHERE doi IN ({','.join(['%s'] * len(dois))})
         """
-        results = self.execute_query(query, params=dois)
+        results = self.execute_query(query, params=dois, label="fetch_new_records")
         column_names = ["authors", "year", "title", "doi", "open_access", "abstract", "id", "source", "language", "country", "database", "journal"]
         return [dict(zip(column_names, row)) for row in results]
@@ -0,0 +1,491 @@
+# src/Services/FacetIndex.py
+"""
+In-process bitmap facet index over all_db.
+
+Every distinct (column, value) pair of the facet columns (year, country,
+language, region, amstar_label and all __hash__ tag columns) owns one bitmap
+with a bit per record. Filter counts then become bitmap intersections and
+popcounts instead of table scans. Bitmaps are packed Python ints, so AND/OR
+and int.bit_count() run in C over 64-bit words.
+
+The index is optional: set FACET_INDEX_ENABLED=1 to turn it on. Callers use
+get_facet_index() and fall back to SQL when it returns None or when a filter
+cannot be answered from the index (mask_for() returns None).
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from src.Utils.tag_codes import parse_tag_codes
+
+logger = logging.getLogger(__name__)
+
+
+def bitmap_from_positions(positions: Iterable[int], size: int) -> int:
+    """Packs a list of bit positions into an int bitmap."""
+    buffer = bytearray((size >> 3) + 1)
+    for pos in positions:
+        buffer[pos >> 3] |= 1 << (pos & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def value_as_text(value: Any) -> str:
+    """Text form of a value, matching CAST(value AS TEXT) for the common types."""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class FacetIndex:
+    """Bitmap index of facet values for one table."""
+
+    SIMPLE_COLUMNS = ('year', 'country', 'language', 'region', 'amstar_label')
+    TAG_MARKER = '__hash__'
+    VERSION_CHECK_INTERVAL = 30  # seconds between data-version checks
+    FETCH_CHUNK_SIZE = 5000
+    REBUILD_RATIO = 0.1  # rebuild instead of patching when more rows changed
+
+    def __init__(self, db_service, table: str = 'all_db', id_column: str = 'primary_id'):
+        self.db_service = db_service
+        self.table = table
+        self.id_column = id_column
+        self._lock = threading.RLock()
+        self._refresh_guard = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._refreshed = False
+        self._reset()
+
+    def _reset(self):
+        self.positions: Dict[Any, int] = {}      # record id -> bit position
+        self.alive = 0                            # bitmap of indexed records
+        self.values: Dict[str, Dict[Any, int]] = {}   # column -> {raw value: bitmap}
+        self.tag_codes: Dict[str, Dict[str, int]] = {}  # tag column -> {tag code: bitmap}
+        self.tag_raw: Dict[str, Dict[str, Any]] = {}    # tag column -> {tag code: first raw value}
+        self.columns: List[str] = []              # indexed facet columns
+        self.table_columns: List[str] = []        # all columns of the table
+        self.has_updated_at = False
+        self.version: Optional[Tuple] = None
+        self.updated_watermark = None
+        self._last_check = 0.0
+        self._next_position = 0
+
+    # ==================== BUILD / REFRESH ====================
+
+    def build(self):
+        """
+        Full (re)build of the index from the database. The rows are read into
+        new structures without holding the lock, so readers keep using the
+        current index until the finished one is swapped in.
+        """
+        started = time.perf_counter()
+        state = self._load()
+        with self._lock:
+            for name, value in state.items():
+                setattr(self, name, value)
+        with self._refresh_guard:
+            self._last_check = time.monotonic()
+
+        logger.info(
+            f"Facet index built for {self.table}: {len(self.positions)} records, "
+            f"{self.bitmap_count()} bitmaps, {self.memory_bytes() / 1e6:.1f} MB "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+        return self
+
+    def _load(self) -> Dict[str, Any]:
+        """Reads the table into a complete set of index structures."""
+        table_columns = self.db_service.get_column_names(self.table)
+        has_updated_at = 'updated_at' in table_columns
+        columns = [c for c in table_columns if c in self.SIMPLE_COLUMNS or self.TAG_MARKER in c]
+        positions: Dict[Any, int] = {}
+        positions_by_value: Dict[str, Dict[Any, List[int]]] = {c: {} for c in columns}
+
+        for row in self._stream_rows(columns):
+            pos = len(positions)
+            positions[row[self.id_column]] = pos
+            for column in columns:
+                value = row.get(column)
+                if value is not None:
+                    positions_by_value[column].setdefault(value, []).append(pos)
+
+        size = len(positions)
+        values = {
+            column: {value: bitmap_from_positions(pos_list, size) for value, pos_list in by_value.items()}
+            for column, by_value in positions_by_value.items()
+        }
+        # One bitmap per (tag column, code): each distinct raw value is parsed once
+        tag_codes: Dict[str, Dict[str, int]] = {}
+        tag_raw: Dict[str, Dict[str, Any]] = {}
+        for column in columns:
+            if self.TAG_MARKER not in column:
+                continue
+            codes, raw_by_code = tag_codes.setdefault(column, {}), tag_raw.setdefault(column, {})
+            for value, bitmap in values[column].items():
+                for code in parse_tag_codes(str(value)):
+                    codes[code] = codes.get(code, 0) | bitmap
+                    raw_by_code.setdefault(code, value)
+
+        version = self._fetch_version(has_updated_at)
+        return {
+            'table_columns': table_columns, 'has_updated_at': has_updated_at, 'columns': columns,
+            'positions': positions, 'alive': bitmap_from_positions(range(size), size), 'values': values,
+            'tag_codes': tag_codes, 'tag_raw': tag_raw, '_next_position': size,
+            'version': version, 'updated_watermark': version[1] if version else None,
+        }
+
+    def refresh_if_stale(self, force: bool = False, wait: bool = False):
+        """
+        Checks the data version (rate-limited) and applies changes incrementally.
+
+        The check and the update run in a background thread, so a request
+        never waits on the database here and keeps using the current index;
+        at most one refresh runs at a time. Returns True when a refresh was
+        started, or with `wait` set, when the index changed.
+        """
+        with self._refresh_guard:
+            now = time.monotonic()
+            if not force and now - self._last_check < self.VERSION_CHECK_INTERVAL:
+                return False
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return False
+            self._last_check = now
+            self._refreshed = False
+            thread = self._refresh_thread = threading.Thread(
+                target=self._refresh_in_background, name="facet-index-refresh", daemon=True)
+            thread.start()
+        if not wait:
+            return True
+        thread.join()
+        return self._refreshed
+
+    def _refresh_in_background(self):
+        try:
+            version = self._fetch_version()
+            if version != self.version:
+                self._apply_changes(version)
+                self._refreshed = True
+        except Exception as e:
+            logger.warning(f"Facet index refresh failed, keeping the current index: {e}")
+
+    def join_refresh(self, timeout: Optional[float] = None):
+        """Waits for a background refresh started by refresh_if_stale()."""
+        thread = self._refresh_thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _fetch_version(self, has_updated_at: Optional[bool] = None) -> Tuple:
+        """
+        (row count, max(updated_at), write counter) identifies the data version.
+        The write counter from pg_stat_user_tables catches updates and
+        delete+insert pairs that leave the row count unchanged.
+        """
+        if has_updated_at is None:
+            has_updated_at = self.has_updated_at
+        updated = 'MAX("updated_at")' if has_updated_at else 'NULL'
+        rows = self.db_service.execute_raw_query(
+            f'SELECT COUNT(*) AS n, {updated} AS updated, '
+            f'(SELECT n_tup_ins + n_tup_upd + n_tup_del FROM pg_stat_user_tables '
+            f'WHERE relname = :table) AS writes FROM "{self.table}"',
+            {"table": self.table})
+        row = rows[0] if rows else {}
+        return (row.get('n'), row.get('updated'), row.get('writes'))
+
+    def _apply_changes(self, version: Tuple):
+        """
+        Adds new records, re-indexes updated ones and drops deleted ones. The
+        database is read without holding the lock; only the bitmap updates do.
+        """
+        id_col = self.db_service._quote(self.id_column)
+        columns = f'{id_col}, "updated_at"' if self.has_updated_at else id_col
+        current = self.db_service.execute_raw_query(
+            f'SELECT {columns} FROM "{self.table}"')
+
+        known = dict(self.positions)
+        current_ids = set()
+        changed_ids = []
+        for row in current:
+            record_id = row[self.id_column]
+            current_ids.add(record_id)
+            if record_id not in known:
+                changed_ids.append(record_id)
+            elif (self.has_updated_at and self.updated_watermark is not None
+                    and row.get('updated_at') is not None
+                    and row['updated_at'] > self.updated_watermark):
+                changed_ids.append(record_id)
+
+        removed_ids = [rid for rid in known if rid not in current_ids]
+        if len(changed_ids) + len(removed_ids) > self.REBUILD_RATIO * max(len(known), 1):
+            self.build()
+            return
+
+        rows = []
+        for start in range(0, len(changed_ids), self.FETCH_CHUNK_SIZE):
+            rows.extend(self._fetch_rows_by_ids(changed_ids[start:start + self.FETCH_CHUNK_SIZE]))
+
+        with self._lock:
+            for record_id in removed_ids + [rid for rid in changed_ids if rid in self.positions]:
+                self._clear_position(self.positions[record_id])
+            for record_id in removed_ids:
+                del self.positions[record_id]
+            for row in rows:
+                self._set_row(row)
+
+            self.version = version
+            self.updated_watermark = version[1]
+        logger.info(
+            f"Facet index refreshed for {self.table}: +{len(changed_ids)} "
+            f"upserted, -{len(removed_ids)} removed"
+        )
+
+    def _clear_position(self, pos: int):
+        mask = ~(1 << pos)
+        self.alive &= mask
+        for by_value in list(self.values.values()) + list(self.tag_codes.values()):
+            for value, bitmap in list(by_value.items()):
+                if bitmap >> pos & 1:
+                    bitmap &= mask
+                    if bitmap:
+                        by_value[value] = bitmap
+                    else:
+                        del by_value[value]
+
+    def _set_row(self, row: Dict):
+        record_id = row[self.id_column]
+        pos = self.positions.get(record_id)
+        if pos is None:
+            pos = self._next_position
+            self._next_position += 1
+            self.positions[record_id] = pos
+        bit = 1 << pos
+        self.alive |= bit
+        for column in self.columns:
+            value = row.get(column)
+            if value is not None:
+                by_value = self.values[column]
+                by_value[value] = by_value.get(value, 0) | bit
+                if self.TAG_MARKER in column:
+                    codes, raw_by_code = self.tag_codes[column], self.tag_raw[column]
+                    for code in parse_tag_codes(str(value)):
+                        codes[code] = codes.get(code, 0) | bit
+                        raw_by_code.setdefault(code, value)
+
+    def _select_sql(self, columns: Optional[List[str]] = None) -> str:
+        quote = self.db_service._quote
+        cols = ", ".join(quote(c) for c in [self.id_column] + (self.columns if columns is None else columns))
+        return f'SELECT {cols} FROM "{self.table}"'
+
+    def _stream_rows(self, columns: List[str]):
+        with self.db_service.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True).execute(text(self._select_sql(columns)))
+            for partition in result.mappings().partitions(self.FETCH_CHUNK_SIZE):
+                for row in partition:
+                    yield row
+
+    def _fetch_rows_by_ids(self, ids: List) -> List[Dict]:
+        sql = f'{self._select_sql()} WHERE {self.db_service._quote(self.id_column)} = ANY(:ids)'
+        return self.db_service.execute_raw_query(sql, {"ids": list(ids)})
+
+    # ==================== FILTER MASKS ====================
+
+    def mask_for(self, node) -> Optional[int]:
+        """
+        Evaluates a filter tree to a bitmap of matching records.
+
+        A node is either ("AND" | "OR", [child nodes]) or a leaf
+        (column, op, value). Supported ops: eq, ne, in, not_in, like_any,
+        starts_with, ends_with, between, gt, gte, lt, lte, is_null, is_not_null.
+        Returns None when any leaf cannot be answered from the index.
+        """
+        with self._lock:
+            return self._mask_for(node)
+
+    def _mask_for(self, node) -> Optional[int]:
+        if node is None:
+            return self.alive
+
+        if len(node) == 2:
+            logic, children = node
+            masks = [self._mask_for(child) for child in children]
+            if any(m is None for m in masks):
+                return None
+            if not masks:
+                return self.alive
+            result = masks[0]
+            for m in masks[1:]:
+                result = result | m if logic.upper() == 'OR' else result & m
+            return result
+
+        column, op, value = node
+        by_value = self.values.get(column)
+        if by_value is None:
+            return None
+
+        predicate = self._predicate(op, value)
+        if predicate is None:
+            if op == 'is_null':
+                return self.alive & ~self._union(by_value.values())
+            if op == 'is_not_null':
+                return self._union(by_value.values())
+            return None
+
+        return self._union(bm for raw, bm in by_value.items() if predicate(raw))
+
+    @staticmethod
+    def _union(bitmaps: Iterable[int]) -> int:
+        result = 0
+        for bm in bitmaps:
+            result |= bm
+        return result
+
+    @staticmethod
+    def _predicate(op: str, value: Any):
+        """Python equivalent of the SQL operator applied to a raw column value."""
+        def text_of(v):
+            return value_as_text(v).lower()
+
+        def number(v):
+            try:
+                return float(v)
+            except (TypeError, ValueError):
+                return None
+
+        def compare(check):
+            target = number(value)
+
+            def _cmp(raw):
+                raw_num = number(raw)
+                if raw_num is not None and target is not None:
+                    return check(raw_num, target)
+                return check(value_as_text(raw), value_as_text(value))
+            return _cmp
+
+        if op == 'eq':
+            return lambda raw: raw == value or value_as_text(raw) == value_as_text(value)
+        if op == 'ne':
+            return lambda raw: not (raw == value or value_as_text(raw) == value_as_text(value))
+        if op in ('in', 'not_in'):
+            wanted = {value_as_text(v) for v in (value or [])}
+            if op == 'in':
+                return lambda raw: value_as_text(raw) in wanted
+            return lambda raw: value_as_text(raw) not in wanted
+        if op == 'like_any':
+            needles = [text_of(v) for v in (value or [])]
+            return lambda raw: any(n in text_of(raw) for n in needles)
+        if op == 'starts_with':
+            return lambda raw: text_of(raw).startswith(text_of(value))
+        if op == 'ends_with':
+            return lambda raw: text_of(raw).endswith(text_of(value))
+        if op == 'between':
+            low, high = value
+            low_num, high_num = number(low), number(high)
+
+            def _between(raw):
+                raw_num = number(raw)
+                if raw_num is not None and low_num is not None and high_num is not None:
+                    return low_num <= raw_num <= high_num
+                return value_as_text(low) <= value_as_text(raw) <= value_as_text(high)
+            return _between
+        if op == 'gt':
+            return compare(lambda a, b: a > b)
+        if op == 'gte':
+            return compare(lambda a, b: a >= b)
+        if op == 'lt':
+            return compare(lambda a, b: a < b)
+        if op == 'lte':
+            return compare(lambda a, b: a <= b)
+        return None
+
+    # ==================== COUNTS ====================
+
+    def count(self, mask: int) -> int:
+        return (mask & self.alive).bit_count()
+
+    def value_counts(self, column: str, mask: int) -> Dict[Any, int]:
+        """{raw value: count} of a column within the mask (zero counts dropped)."""
+        counts = {}
+        with self._lock:
+            for value, bitmap in self.values.get(column, {}).items():
+                n = (bitmap & mask).bit_count()
+                if n:
+                    counts[value] = n
+        return counts
+
+    def category_counts(self, categories: Dict[str, str], mask: int) -> Dict[str, List[Dict]]:
+        """
+        Same shape as JSONService.get_contextual_filter_counts():
+        {display name: [{"value": text, "count": n}]}.
+        """
+        result = {}
+        lookup = {c.lower(): c for c in self.values}
+        for display_name, column in categories.items():
+            column = lookup.get(column.lower())
+            if column is None:
+                continue
+            items = [
+                {"value": value_as_text(value), "count": n}
+                for value, n in self.value_counts(column, mask).items()
+            ]
+            if items:
+                result[display_name] = items
+        return result
+
+    def tag_code_counts(self, column: str, mask: int) -> Dict[str, Tuple[int, Any]]:
+        """{tag code: (count, first raw value)} for a hash column within the mask."""
+        counts = {}
+        with self._lock:
+            raw_by_code = self.tag_raw.get(column, {})
+            for code, bitmap in self.tag_codes.get(column, {}).items():
+                n = (bitmap & mask).bit_count()
+                if n:
+                    counts[code] = (n, raw_by_code.get(code))
+        return counts
+
+    # ==================== STATS ====================
+
+    def bitmap_count(self) -> int:
+        return sum(len(v) for v in self.values.values()) + sum(len(v) for v in self.tag_codes.values())
+
+    def memory_bytes(self) -> int:
+        """Approximate footprint of the bitmaps and id map."""
+        total = sys.getsizeof(self.alive) + sys.getsizeof(self.positions)
+        for by_value in list(self.values.values()) + list(self.tag_codes.values()):
+            total += sys.getsizeof(by_value)
+            total += sum(sys.getsizeof(bm) for bm in by_value.values())
+        return total
+
+
+_facet_index: Optional[FacetIndex] = None
+_facet_index_lock = threading.Lock()
+
+
+def facet_index_enabled() -> bool:
+    return os.getenv('FACET_INDEX_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+
+
+def get_facet_index(table: str = 'all_db') -> Optional[FacetIndex]:
+    """
+    Returns the shared, up-to-date index for all_db, or None when disabled or
+    unavailable (callers then use SQL).
+    """
+    global _facet_index
+    if table != 'all_db' or not facet_index_enabled():
+        return None
+
+    try:
+        if _facet_index is None:
+            with _facet_index_lock:
+                if _facet_index is None:
+                    from src.Services.PostgresService import PostgresService
+                    _facet_index = FacetIndex(PostgresService(), table=table).build()
+        else:
+            _facet_index.refresh_if_stale()
+        return _facet_index
+    except Exception as e:
+        logger.warning(f"Facet index unavailable, falling back to SQL: {e}")
+        return None
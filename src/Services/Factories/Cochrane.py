@@ -6,17 +6,24 @@ import pandas as pd
 from app import db, app
 from bs4 import BeautifulSoup
 from src.Commands.DOIEnricher import DOIEnricher
+from src.Services.PagedFetch import PAGE_WORKERS, PagedFetch, page_files
 from src.Services.Service import Service
+from src.Services.SourceSync import SourceSync, read_rows, upsert_csv
+from src.Services.StreamMerge import merge_files
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
 
+# Newest first, so an incremental sync can stop early
+SYNC_ORDER_BY = os.getenv("COCHRANE_SYNC_ORDER_BY", "displayDate-true")
+
 
 class Cochrane(Service):
-    def __init__(self, pageSize=50):
+    def __init__(self, pageSize=50, workers=PAGE_WORKERS):
         self.session = requests.Session()  # Initialize a Session
         self.pageSize = pageSize
+        self.workers = workers  # result pages fetched concurrently
         self.post_url = "https://www.cochranelibrary.com/en/c/portal/render_portlet?p_l_id=20907&p_p_id=scolarissearchresultsportlet_WAR_scolarissearchresults&p_p_lifecycle=0&p_t_lifecycle=0&p_p_state=normal&p_p_mode=view&p_p_col_id=column-1&p_p_col_pos=1&p_p_col_count=2&p_p_isolated=1&currentURL=%2Fadvanced-search%2Fsearch-manager"
         self.driver = None
         self.session.headers.update({
@@ -31,6 +38,9 @@ class Cochrane(Service):
             "x-requested-with": "XMLHttpRequest"
         })
        
+        # Open access fields come from Unpaywall, not from Cochrane
+        self.sync = SourceSync("cochrane", key="cd_identifier", ignore=("year", "journal", "open_access"))
+
         self.JSESSIONID = self.get_url_from_config("JSESSIONID")
         self.cookies = None
         self.cookies = {"JSESSIONID": self.JSESSIONID}
@@ -73,7 +83,50 @@ class Cochrane(Service):
         self.make_request_with_cookies(output_csv)
 
     def make_request_with_cookies(self, output_dir):
-        """Make a GET request using captured cookies."""
+        """
+        Fetches the result pages concurrently using the captured cookies and
+        saves them in page order, resuming after the last page saved.
+        """
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+
+        if self.sync.has_watermark():
+            return self.sync_changes()
+
+        first_page = self.get_last_saved_page(output_dir) + 1
+
+        def fetch_page(page_number):
+            response = self.request_page(page_number)
+            response.raise_for_status()
+            data_found, _, max_page_num = self.extract_csv_from_html(response.text)
+            return data_found, max_page_num
+
+        # The pagination of the first page fetched gives the page count
+        pages = PagedFetch(fetch_page, count_pages=lambda result: result[1],
+                           is_empty=lambda result: result[0].empty, workers=self.workers)
+        complete = True
+        try:
+            for page_number, (data_found, _) in pages.run(first_page):
+                output_file = os.path.join(
+                    output_dir, f"cochrane_page_{page_number}.csv"
+                )
+                data_found.to_csv(output_file, index=False)
+                print(f"Page {page_number} saved to {output_file}")
+        except requests.RequestException as req_err:
+            complete = False
+            print(f"Request failed with error: {req_err}; the next run resumes after the last saved page.")
+        print(f"Fetched {pages.stats['pages']} pages with {pages.workers} workers")
+
+        if pages.stats["pages"]:
+            self.combine_csv_files(
+                output_dir, "Data/Cochrane/cochrane_combined_output.csv"
+            )
+        if complete:
+            files = page_files(output_dir, "cochrane_page_")
+            self.sync.baseline(read_rows(files), {"pages": len(files)})
+
+    def request_page(self, page_number, order_by="relevancy"):
+        """One page of the review search results (HTML)."""
         url = "https://www.cochranelibrary.com/en/c/portal/render_portlet"
 
         headers = {
@@ -92,77 +145,68 @@ class Cochrane(Service):
             "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36",
             "X-Requested-With": "XMLHttpRequest",
         }
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
+        params = {
+            "p_l_id": "20907",
+            "p_p_id": "scolarissearchresultsportlet_WAR_scolarissearchresults",
+            "p_p_lifecycle": "0",
+            "p_t_lifecycle": "0",
+            "p_p_state": "normal",
+            "p_p_mode": "view",
+            "p_p_col_id": "column-1",
+            "p_p_col_pos": "1",
+            "p_p_col_count": "2",
+            "p_p_isolated": "1",
+            "currentURL": "/advanced-search/search-manager",
+            "min_year": "",
+            "max_year": "",
+            "custom_min_year": "",
+            "custom_max_year": "",
+            "searchBy": "-1",
+            "searchText": "",
+            "selectedType": "review",
+            "isWordVariations": "",
+            "resultPerPage": f"{self.pageSize}",
+            "searchType": "searchManager",
+            "orderBy": order_by,
+            "publishDateTo": "",
+            "publishDateFrom": "",
+            "publishYearTo": "",
+            "publishYearFrom": "",
+            "displayText": "",
+            "forceTypeSelection": "true",
+            "cur": f"{page_number}",
+            "pathname": "/advanced-search/search-manager",
+        }
+        return requests.get(url, headers=headers, cookies=self.cookies, params=params)
 
-        page_number = self.get_last_saved_page(output_dir) + 1
-
-        while True:
-            params = {
-                "p_l_id": "20907",
-                "p_p_id": "scolarissearchresultsportlet_WAR_scolarissearchresults",
-                "p_p_lifecycle": "0",
-                "p_t_lifecycle": "0",
-                "p_p_state": "normal",
-                "p_p_mode": "view",
-                "p_p_col_id": "column-1",
-                "p_p_col_pos": "1",
-                "p_p_col_count": "2",
-                "p_p_isolated": "1",
-                "currentURL": "/advanced-search/search-manager",
-                "min_year": "",
-                "max_year": "",
-                "custom_min_year": "",
-                "custom_max_year": "",
-                "searchBy": "-1",
-                "searchText": "",
-                "selectedType": "review",
-                "isWordVariations": "",
-                "resultPerPage": f"{self.pageSize}",
-                "searchType": "searchManager",
-                "orderBy": "relevancy",
-                "publishDateTo": "",
-                "publishDateFrom": "",
-                "publishYearTo": "",
-                "publishYearFrom": "",
-                "displayText": "",
-                "forceTypeSelection": "true",
-                "cur": f"{page_number}",
-                "pathname": "/advanced-search/search-manager",
-            }
-            try:
-                # Make the request
-                response = requests.get(
-                    url, headers=headers, cookies=self.cookies, params=params
-                )
-                
+    def sync_changes(self, combined_file="Data/Cochrane/cochrane_combined_output.csv"):
+        """
+        Walks the results newest first until the pages stop changing, writes
+        new and updated reviews to a delta file and folds them into the
+        combined output.
+        """
+        max_page = {}
 
-                if response.status_code == 200 or response.status_code == 201:
-                    print("Request was successful!")
-                    response_text = response.text
-                    data_found, page_numbers, max_page_num = self.extract_csv_from_html(
-                        response_text
-                    )
-                    # self.combine_csv_files(output_dir, "Cochrane/cochrane_combined_output.csv")
-                    if page_number > max_page_num:
-                        print("No more pages.")
-                        break
-
-                    output_file = os.path.join(
-                        output_dir, f"cochrane_page_{page_number}.csv"
-                    )
-                    data_found.to_csv(output_file, index=False)
-                    print(f"Page {page_number} saved to {output_file}")
-                    self.combine_csv_files(
-                        output_dir, "Data/Cochrane/cochrane_combined_output.csv"
-                    )
-                else:
-                    print(f"Request failed with status code: {response.status_code}")
-            except requests.RequestException as req_err:
-                print(f"Request failed with error: {req_err}")
-                break
-
-            page_number += 1
+        def fetch_page(page_number):
+            if page_number > max_page.get("n", page_number):
+                return []
+            response = self.request_page(page_number, order_by=SYNC_ORDER_BY)
+            response.raise_for_status()
+            data_found, _, max_page["n"] = self.extract_csv_from_html(response.text)
+            return data_found.to_dict("records")
+
+        try:
+            delta = self.sync.walk(fetch_page)
+        except requests.RequestException as req_err:
+            print(f"Cochrane sync aborted, watermark unchanged: {req_err}")
+            return
+        last_modified = max((row.get("modified_date") or "" for row in delta), default="")
+        watermark = {"last_modified": last_modified} if last_modified else {}
+        if delta:
+            upsert_csv(combined_file, delta, key="cd_identifier")
+        delta_path = self.sync.commit(delta, watermark)
+        print(f"Cochrane sync: {self.sync.stats['pages']} pages, {self.sync.stats['records']} reviews checked, "
+              f"{len(delta)} new or updated" + (f" -> {delta_path}" if delta_path else ""))
 
     def get_last_saved_page(self, output_dir):
         """Returns the last saved page number based on existing files in the output directory."""
@@ -341,24 +385,10 @@ class Cochrane(Service):
     def combine_csv_files(
         self, input_directory, output_filename="cochrane_combined_output.csv"
     ):
-        # List to store each CSV file's DataFrame
-        data_frames = []
-
-        # Iterate over all files in the input directory
-        for filename in os.listdir(input_directory):
-            # Check if the file is a CSV
-            if filename.endswith(".csv"):
-                file_path = os.path.join(input_directory, filename)
-                # Read the CSV file and append the DataFrame to the list
-                df = pd.read_csv(file_path)
-                data_frames.append(df)
-
-        # Concatenate all DataFrames into a single DataFrame
-        combined_df = pd.concat(data_frames, ignore_index=True)
-
-        # Save the combined DataFrame to a CSV file
-        combined_df.to_csv(output_filename, index=False)
-        print(f"Combined CSV file saved as '{output_filename}'")
+        # Stream the page files, in page order, into the combined file
+        stats = merge_files(page_files(input_directory, "cochrane_page_"), output_filename)
+        print(f"Combined CSV file saved as '{output_filename}' ({stats['rows']} rows"
+              + (f", {stats['duplicates']} duplicate DOIs dropped" if stats["duplicates"] else "") + ")")
 
         print("Starting enrichment for the combined file (Cochrane)...")
         output_file = "Data/Cochrane/cochrane_combined_output_enriched.csv"
@@ -305,13 +305,23 @@ import time
 import math
 import pandas as pd
 from glob import glob
-from datetime import datetime
+from datetime import datetime, timezone
 
 from src.Commands.DOIEnricher import DOIEnricher  # optional, not invoked here
+from src.Services.PagedFetch import PAGE_WORKERS, PagedFetch, page_files
 from src.Services.Service import Service
+from src.Services.SourceSync import SourceSync, read_rows, upsert_csv
+from src.Services.StreamMerge import merge_files
 from src.Request.ApiRequest import ApiRequest
 from src.Utils.Helpers import create_directory_if_not_exists
 
+# The L·OVE API documents no sort by date added or updated, only by year, so
+# a sync that stops after unchanged pages misses new references with an older
+# year and edits beyond the first pages. Every LOVE_RECONCILE_DAYS the sync
+# therefore walks all pages. Set LOVE_SYNC_SORT_BY if the API gains such a sort.
+SYNC_SORT_BY = os.getenv("LOVE_SYNC_SORT_BY", "year")
+RECONCILE_DAYS = float(os.getenv("LOVE_RECONCILE_DAYS", "7"))
+
 # -------------------- DOI helpers --------------------
 
 _DOI_RE = re.compile(r'(10\.\d{4,9}/[-._;()/:A-Z0-9]+)', re.IGNORECASE)
@@ -422,14 +432,19 @@ def _classification_contains_sr(val) -> bool:
 # -------------------- Main class --------------------
 
 class LoveV(Service):
-    def __init__(self, pageSize=500, max_retries=4, base_sleep=1.0, request_timeout=60):
+    def __init__(self, pageSize=500, max_retries=4, base_sleep=1.0, request_timeout=60, workers=PAGE_WORKERS,
+                 reconcile_days=None):
         """
         pageSize:        items per API page
         max_retries:     max attempts per API request
         base_sleep:      base sleep seconds for backoff, grows exponentially
         request_timeout: seconds to wait for API before giving up (if ApiRequest supports it)
+        workers:         pages fetched concurrently during a full harvest
+        reconcile_days:  days between syncs that walk every page (LOVE_RECONCILE_DAYS)
         """
         self.pageSize = int(pageSize)
+        self.workers = int(workers)
+        self.reconcile_days = float(RECONCILE_DAYS if reconcile_days is None else reconcile_days)
         self.max_retries = int(max_retries)
         self.base_sleep = float(base_sleep)
         self.request_timeout = int(request_timeout)
@@ -446,6 +461,9 @@ class LoveV(Service):
         # API endpoint (adjust domain/path as needed)
         self.api_url = "https://api.iloveevidence.com/v2.1/loves/5e6fdb9669c00e4ac072701d/references"
 
+        # Incremental runs once a full harvest has been recorded
+        self.sync = SourceSync("love", key="id")
+
         # Default payload “template” — mutate per-call with page/size
         self._payload_base = {
             "sort_by": "year",
@@ -481,7 +499,7 @@ class LoveV(Service):
 
     # --------------- API call with retries ----------------
 
-    def _call_api(self, page: int):
+    def _call_api(self, page: int, sort_by=None):
         """
         Calls the L·OVE API with retries and exponential backoff.
         Returns the parsed 'data' dict or None.
@@ -489,6 +507,8 @@ class LoveV(Service):
         payload = dict(self._payload_base)
         payload["page"] = int(page)
         payload["size"] = self.pageSize
+        if sort_by:
+            payload["sort_by"] = sort_by
 
         attempt = 0
         while True:
@@ -522,45 +542,94 @@ class LoveV(Service):
 
     def executeRetrieveData(self, max_pages=None):
         """
-        Streams pages from the API, writes each page CSV to the date folder,
-        then merges everything into Data/L-OVE/LOVE.csv (overwrites).
+        Fetches the pages concurrently (PagedFetch), writes each page CSV to the
+        date folder in page order, then merges everything into Data/L-OVE/LOVE.csv (overwrites).
+        Once a full harvest has been recorded, only fetches the changes (see sync_changes).
         """
+        if self.sync.has_watermark():
+            return self.sync_changes()
+
         # Resume from last saved page in this date folder
         last_page = get_max_page_file(self.data_dir) or 0
-        page = last_page + 1
-
-        pages_written = 0
-        while True:
-            if max_pages and pages_written >= max_pages:
-                print(f"Reached max_pages={max_pages}. Stopping.")
-                break
+        first_page = last_page + 1
 
+        def fetch_page(page):
             data = self._call_api(page)
-            if not data:
-                print("No data returned (API error or empty). Stopping.")
-                break
-
-            items = data.get("items") or []
-            if len(items) == 0:
-                print("No more items reported by API. Stopping.")
-                break
-
-            # Save page to CSV
-            df = pd.DataFrame(items)
-            page_path = os.path.join(self.data_dir, f"love_page_{page}.csv")
-            df.to_csv(page_path, index=False, encoding="utf-8")
-            print(f"Saved page {page} -> {page_path} ({len(df)} rows)")
-
-            pages_written += 1
-            page += 1
+            if not isinstance(data, dict):
+                raise RuntimeError(f"page {page} could not be fetched")
+            return data
+
+        def count_pages(data):
+            # Only if the API reports a total; otherwise the engine probes for the last page
+            total = data.get("total")
+            return math.ceil(total / self.pageSize) if isinstance(total, int) else None
+
+        pages = PagedFetch(fetch_page, count_pages=count_pages,
+                           is_empty=lambda data: not data.get("items"), workers=self.workers)
+        last = first_page + max_pages - 1 if max_pages else None
+        complete = True
+        try:
+            for page, data in pages.run(first_page, last):
+                # Save page to CSV, in page order, so the next run resumes after the last one saved
+                df = pd.DataFrame(data["items"])
+                page_path = os.path.join(self.data_dir, f"love_page_{page}.csv")
+                df.to_csv(page_path, index=False, encoding="utf-8")
+                print(f"Saved page {page} -> {page_path} ({len(df)} rows)")
+        except RuntimeError as e:
+            complete = False
+            print(f"[ERROR] {e}. Stopping; the next run resumes after the last saved page.")
+        print(f"Fetched {pages.stats['pages']} pages ({pages.stats['requests']} requests, "
+              f"{pages.stats['probes']} to find the last page) with {pages.workers} workers")
 
         # Merge all and overwrite the final file
         print("Merging snapshot into Data/L-OVE/LOVE.csv ...")
         merge_pages_and_overwrite(self.data_dir, self.merged_out)
         print(f"Done. Overwritten: {self.merged_out}")
 
+        if complete and not max_pages:
+            files = page_files(self.data_dir, "love_page_")
+            self.sync.baseline(read_rows(files), {"page_size": self.pageSize, "pages": len(files),
+                                                  "reconciled_at": datetime.now(timezone.utc).isoformat()})
         return self
 
+    def sync_changes(self):
+        """
+        Walks the pages newest first until they stop changing, writes the new
+        and changed references to a delta file and folds them into LOVE.csv.
+        Every `reconcile_days` the walk covers all pages (see SYNC_SORT_BY).
+        """
+        reconcile = self._reconcile_due()
+
+        def fetch_page(page):
+            data = self._call_api(page, sort_by=SYNC_SORT_BY)
+            if not isinstance(data, dict):
+                raise RuntimeError(f"page {page} could not be fetched")
+            return data.get("items") or []
+
+        try:
+            delta = self.sync.walk(fetch_page, full=reconcile)
+        except RuntimeError as e:
+            print(f"[ERROR] L·OVE sync aborted, watermark unchanged: {e}")
+            return self
+        if delta:
+            upsert_csv(self.merged_out, delta, key="id")
+        watermark = {"page_size": self.pageSize}
+        if reconcile:
+            watermark["reconciled_at"] = datetime.now(timezone.utc).isoformat()
+        delta_path = self.sync.commit(delta, watermark)
+        print(f"L·OVE {'full reconcile' if reconcile else 'sync'}: {self.sync.stats['pages']} pages, "
+              f"{self.sync.stats['records']} records checked, "
+              f"{len(delta)} new or changed" + (f" -> {delta_path}" if delta_path else ""))
+        return self
+
+    def _reconcile_due(self):
+        """True when the last walk over every page (harvest or reconcile) is `reconcile_days` old."""
+        last = self.sync.watermark.get("reconciled_at")
+        if not last:
+            return True
+        age = datetime.now(timezone.utc) - datetime.fromisoformat(last)
+        return age.total_seconds() >= self.reconcile_days * 86400
+
 # --------------- helpers ----------------
 
 def get_max_page_file(directory):
@@ -585,41 +654,23 @@ def get_max_page_file(directory):
 
 def merge_pages_and_overwrite(data_dir, output_file_path):
     """
-    Robust merge:
-      1) Concatenate all love_page_*.csv in the date folder
-      2) Write a raw snapshot next to the pages (for auditing)
-      3) Normalize classification/year/doi
-      4) Filter to SR + year>=2011 + has DOI
-      5) Overwrite Data/L-OVE/LOVE.csv
-      6) Print diagnostics
+    Streaming merge (see StreamMerge.merge_files):
+      1) Append all love_page_*.csv in the date folder, in page order, row by row
+      2) Reconcile the page headers (union of columns, first-seen order)
+      3) Optionally drop repeated DOIs (MERGE_DEDUPE_DOI)
+      4) Overwrite Data/L-OVE/LOVE.csv
+      5) Print diagnostics
+    The normalisation/filter steps below are kept for reference (disabled).
     """
-    files = sorted(glob(os.path.join(data_dir, "love_page_*.csv")))
+    files = page_files(data_dir, "love_page_")
     if not files:
         print(f"No page files found in {data_dir}. Writing empty output.")
         pd.DataFrame().to_csv(output_file_path, index=False, encoding="utf-8")
         return
 
-    frames = []
-    unreadable = 0
-    for p in files:
-        try:
-            frames.append(pd.read_csv(p))
-        except Exception as e:
-            unreadable += 1
-            print(f"[WARN] Skipping unreadable file: {p} ({e})")
-
-    if not frames:
-        print("[WARN] No readable CSVs. Writing empty output.")
-        pd.DataFrame().to_csv(output_file_path, index=False, encoding="utf-8")
-        return
-
-    merged = pd.concat(frames, ignore_index=True)
-    merged_out = os.path.join("Data", "L-OVE", "LOVE.csv")
-    # raw_snapshot = os.path.join(data_dir, "LOVE_raw_snapshot.csv")
-    merged.to_csv(merged_out, index=False, encoding="utf-8")
-    print(f"Raw snapshot written: {merged_out} ({len(merged)} rows). Unreadable files: {unreadable}")
-
-    df = merged.copy()
+    stats = merge_files(files, output_file_path)
+    print(f"Raw snapshot written: {output_file_path} ({stats['rows']} rows). "
+          f"Unreadable files: {len(stats['skipped'])}. Duplicate DOIs dropped: {stats['duplicates']}")
 
     # # ---- derive year ----
     # df["_year_norm"] = _normalize_year(df)
@@ -4,17 +4,194 @@ import json
 import time
 import random
 import string
+import logging
+import threading
+import xml.etree.ElementTree as ET
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
 from io import StringIO
 
 import pandas as pd
 import requests
 from tqdm import tqdm
-from Bio import Entrez, Medline
 
 from src.Commands.DOIEnricher import DOIEnricher  # Progress bar library
+from src.Commands.OpenAccessUpdate import BulkOpenAccessResolver
+from src.Services.DBservices.BulkIngest import normalise_doi
+from src.Services.HostHealth import host_health
+from src.Services.HttpClient import get_http_client
+from src.Services.SourceSync import SourceSync, upsert_csv
+from src.Utils.lazy_import import lazy_import
+
+# Only the Bio.Entrez based search_medline / fetch_details need Biopython
+Entrez = lazy_import("Bio.Entrez")
+Medline = lazy_import("Bio.Medline")
+
+logger = logging.getLogger(__name__)
+
+EUTILS_URL = os.getenv("ENTREZ_URL", "https://eutils.ncbi.nlm.nih.gov/entrez/eutils")
+ENTREZ_BATCH = int(os.getenv("ENTREZ_BATCH", "500"))          # records per efetch
+ENTREZ_IN_FLIGHT = int(os.getenv("ENTREZ_IN_FLIGHT", "3"))    # concurrent efetch requests
+
+
+def _text(elem):
+    """All text of an element, inline markup (<i>, <sub>, ...) included."""
+    return "".join(elem.itertext()).strip() if elem is not None else ""
+
+
+def _medline_record(article):
+    """A PubmedArticle element as the MEDLINE-style dict Bio.Medline produces."""
+    citation = article.find("MedlineCitation")
+    journal_article = citation.find("Article")
+    record = {"PMID": _text(citation.find("PMID"))}
+
+    title = _text(journal_article.find("ArticleTitle"))
+    if title:
+        record["TI"] = title
+    sections = [
+        f"{part.get('Label')}: {_text(part)}" if part.get("Label") else _text(part)
+        for part in journal_article.findall("Abstract/AbstractText")
+    ]
+    if sections:
+        record["AB"] = " ".join(sections)
+
+    authors = []
+    for author in journal_article.findall("AuthorList/Author"):
+        name = author.findtext("CollectiveName") or " ".join(
+            filter(None, [author.findtext("LastName"), author.findtext("Initials")]))
+        if name:
+            authors.append(name)
+    if authors:
+        record["AU"] = authors
+
+    date = journal_article.find("Journal/JournalIssue/PubDate")
+    if date is not None:
+        record["DP"] = date.findtext("MedlineDate") or " ".join(
+            filter(None, [date.findtext("Year"), date.findtext("Month"), date.findtext("Day")]))
+    for key, value in (("JT", journal_article.findtext("Journal/Title")),
+                       ("PL", citation.findtext("MedlineJournalInfo/Country"))):
+        if value:
+            record[key] = value
+
+    lists = {
+        "LA": [_text(language) for language in journal_article.findall("Language")],
+        "MH": ["/".join([_text(heading.find("DescriptorName"))] +
+                        [_text(qualifier) for qualifier in heading.findall("QualifierName")])
+               for heading in citation.findall("MeshHeadingList/MeshHeading")],
+        "PT": [_text(kind) for kind in journal_article.findall("PublicationTypeList/PublicationType")],
+        "AID": [f"{_text(aid)} [{aid.get('IdType')}]"
+                for aid in article.findall("PubmedData/ArticleIdList/ArticleId")
+                if aid.get("IdType") in ("doi", "pii")],
+    }
+    if not any(aid.endswith("[doi]") for aid in lists["AID"]):
+        lists["AID"] += [f"{_text(eid)} [doi]" for eid in journal_article.findall("ELocationID")
+                         if eid.get("EIdType") == "doi"]
+    record.update({key: values for key, values in lists.items() if values})
+    return record
+
+
+def parse_pubmed_xml(stream):
+    """
+    Yields one MEDLINE-style record per PubmedArticle while `stream` is
+    read; finished articles are dropped from the tree as we go.
+    """
+    context = ET.iterparse(stream, events=("start", "end"))
+    _, root = next(context)
+    for event, elem in context:
+        if event == "end" and elem.tag == "PubmedArticle":
+            yield _medline_record(elem)
+            root.clear()
+
+
+class EntrezHarvester:
+    """
+    PubMed records for a query through the Entrez history server.
+
+    One esearch (usehistory=y) keeps the result set on NCBI's side; efetch
+    then pages through it by retstart with up to ENTREZ_IN_FLIGHT requests
+    in flight, within NCBI's rate (3 requests/s, 10 with an API key,
+    enforced by the host's token bucket in HostHealth). Responses are
+    parsed while they stream in (see parse_pubmed_xml).
+
+    Example:
+        harvester = EntrezHarvester(api_key=key, email=email)
+        for record in harvester.records('"systematic review"[pt] AND covid'):
+            record["PMID"], record.get("TI"), record.get("AID")
+    """
+
+    def __init__(self, base_url=EUTILS_URL, api_key=None, email=None, batch_size=ENTREZ_BATCH,
+                 in_flight=ENTREZ_IN_FLIGHT, rate=None, http=None):
+        self.base_url = base_url.rstrip("/")
+        self.params = {"db": "pubmed", "tool": "SenseBackend"}
+        if api_key:
+            self.params["api_key"] = api_key
+        if email:
+            self.params["email"] = email
+        self.batch_size = batch_size
+        self.in_flight = in_flight
+        self.http = http or get_http_client()
+        self.stats = {"requests": 0, "records": 0, "failed_batches": 0}
+        self._lock = threading.Lock()
+        host_health.configure(self.base_url, rate=rate or (10 if api_key else 3), burst=1)
+
+    def _get(self, utility, stream=False, **params):
+        with self._lock:
+            self.stats["requests"] += 1
+        return self.http.get(f"{self.base_url}/{utility}.fcgi", params={**self.params, **params},
+                             timeout=(5, 120), stream=stream)
+
+    def search(self, query, **filters):
+        """
+        (count, WebEnv, query_key) of the query's result set on the history
+        server; `filters` are extra esearch parameters (datetype, mindate, ...).
+        """
+        response = self._get("esearch", term=query, usehistory="y", retmax=0, retmode="json", **filters)
+        response.raise_for_status()
+        result = response.json().get("esearchresult") or {}
+        return int(result.get("count") or 0), result.get("webenv"), result.get("querykey")
+
+    def fetch_batch(self, webenv, query_key, retstart):
+        response = self._get("efetch", stream=True, WebEnv=webenv, query_key=query_key,
+                             retstart=retstart, retmax=self.batch_size, retmode="xml")
+        try:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            return list(parse_pubmed_xml(response.raw))
+        finally:
+            response.close()
+
+    def records(self, query, **filters):
+        """Yields the query's records, batch by batch in completion order."""
+        count, webenv, query_key = self.search(query, **filters)
+        print(f"Total IDs retrieved: {count}")
+        starts = iter(range(0, count, self.batch_size))
+        with ThreadPoolExecutor(max_workers=self.in_flight, thread_name_prefix="efetch") as executor:
+            running = {}
+
+            def submit():
+                start = next(starts, None)
+                if start is not None:
+                    running[executor.submit(self.fetch_batch, webenv, query_key, start)] = start
+
+            for _ in range(self.in_flight):
+                submit()
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    start = running.pop(future)
+                    submit()
+                    try:
+                        batch = future.result()
+                    except (requests.exceptions.RequestException, ET.ParseError) as e:
+                        logger.warning(f"efetch batch at {start} failed: {str(e)}")
+                        self.stats["failed_batches"] += 1
+                        continue
+                    self.stats["records"] += len(batch)
+                    yield from batch
+
 
 class MedlineClass:
-    def __init__(self):
+    def __init__(self, harvester=None, oa_resolver=None, output_dir="Data/MedlineData"):
         """
         Initializes the MedlineClass with email and API key for Entrez.
         """
@@ -30,12 +207,15 @@ class MedlineClass:
         oa_required=True 
         english_only=True
         
-        Entrez.email = email
-        if api_key:
-            Entrez.api_key = api_key
+        self.email = email
+        self.api_key = api_key
         self.oa_required = oa_required
         self.english_only = english_only
-        self.output_dir = "Data/MedlineData"
+        self.harvester = harvester or EntrezHarvester(api_key=api_key, email=email)
+        self.oa_resolver = oa_resolver
+        # Later runs only ask for records modified since the last one
+        self.sync = SourceSync("medline", key="pmid", ignore=("is_oa", "best_oa_url"))
+        self.output_dir = output_dir
         os.makedirs(self.output_dir, exist_ok=True)
 
     # -------------------- utilities --------------------
@@ -94,6 +274,22 @@ class MedlineClass:
             s = str(lang_field).lower()
         return ("eng" in s) or ("english" in s)
 
+    def _configure_entrez(self):
+        Entrez.email = self.email
+        if self.api_key:
+            Entrez.api_key = self.api_key
+
+    def _resolve_open_access(self, df):
+        """Unpaywall status of the first DOI of each row, looked up concurrently and cached."""
+        if self.oa_resolver is None:
+            self.oa_resolver = BulkOpenAccessResolver(services=("unpaywall",))
+        first_dois = df["doi"].fillna("").str.split(";").str[0].str.strip().map(normalise_doi)
+        results = self.oa_resolver.resolve(first_dois[first_dois != ""])
+        found = first_dois.map(lambda doi: results.get(doi) or {})
+        df["is_oa"] = found.map(lambda result: bool(result.get("is_oa", False)))
+        df["best_oa_url"] = found.map(lambda result: result.get("url"))
+        return df
+
     def _fetch_unpaywall(self, doi):
         """
         Query Unpaywall for OA info.
@@ -126,6 +322,7 @@ class MedlineClass:
         """
         Return all matching PMIDs for the query (handles pagination).
         """
+        self._configure_entrez()
         all_ids = []
         retmax = 10000
         retstart = 0
@@ -153,6 +350,7 @@ class MedlineClass:
         Fetch MEDLINE details for IDs. Returns list of Medline dicts.
         Retries missing IDs in smaller batches if needed.
         """
+        self._configure_entrez()
         records = []
         id_list = list(dict.fromkeys(id_list))  # preserve order, dedupe
 
@@ -193,31 +391,23 @@ class MedlineClass:
 
     def fetch(self, queries):
         """
-        Run queries, fetch details, enrich with Unpaywall, filter, and save CSV.
+        Run queries, fetch details, filter, enrich with Unpaywall and save CSV.
+        After the first run only records modified since the last one are
+        fetched; new and changed ones are folded into the CSV.
         """
         all_rows = []
+        incremental = self.sync.has_watermark()
+        started = datetime.now(timezone.utc).strftime("%Y/%m/%d")
+        filters = {}
+        if incremental:
+            filters = {"datetype": "mdat", "mindate": self.sync.watermark["date"], "maxdate": started}
 
         for query in queries:
             if not self.validate_query(query):
                 continue
             # print(f"\n=== Running query ===\n{query}\n=====================")
-            id_list = self.search_medline(query)
-            if not id_list:
-                print("No results for query.")
-                continue
-
-            records = self.fetch_details(id_list)
-
-            print("📝 Processing / enriching records...")
-            for r in tqdm(records, desc="🛠 Processing", unit="rec"):
-                doi_clean = self._clean_doi_from_aid_list(r.get("AID", []))
-
-                oa_info = {}
-                if self.oa_required and doi_clean:
-                    # Use first DOI if multiple
-                    first_doi = doi_clean.split(";")[0].strip()
-                    oa_info = self._fetch_unpaywall(first_doi)
-
+            print("📝 Processing records...")
+            for r in tqdm(self.harvester.records(query, **filters), desc="🛠 Processing", unit="rec"):
                 row = {
                     "pmid": r.get("PMID", ""),
                     "title": r.get("TI", ""),
@@ -229,18 +419,23 @@ class MedlineClass:
                     "language_raw": "; ".join(r.get("LA", [])) if r.get("LA") else "",
                     "mesh_terms": "; ".join(r.get("MH", [])) if r.get("MH") else "",
                     "publication_type_raw": "; ".join(r.get("PT", [])) if r.get("PT") else "",
-                    "doi": doi_clean,
-                    "is_oa": bool(oa_info.get("is_oa", False)),
-                    "best_oa_url": (oa_info.get("best_oa_location") or {}).get("url") if oa_info else None,
+                    "doi": self._clean_doi_from_aid_list(r.get("AID", [])),
+                    "is_oa": False,
+                    "best_oa_url": None,
                 }
                 all_rows.append(row)
 
+        # Only new or changed records from here on (all of them on the first run)
+        all_rows = self.sync.changed(all_rows)
+
         # Build dataframe
         df = pd.DataFrame(all_rows)
         self._diag(df, "raw collected")
 
         if df.empty:
             print("No data to save.")
+            if incremental:
+                self.sync.commit(None, {"date": started})
             return
 
         # Normalize column names a bit
@@ -263,11 +458,12 @@ class MedlineClass:
         # Keep only SRs (Publication Type OR TI/AB cues)
         before = len(df)
         sr_mask = df.apply(lambda x: self._is_systematic_review_row(x.get("title"), x.get("abstract"), x.get("publication_type")), axis=1)
-        df = df[sr_mask]
+        df = df[sr_mask] if len(df) else df
         print(f"[DIAG] SR/MA filter: {before} -> {len(df)}")
 
-        # Open Access-only (optional)
+        # Open Access-only (optional); only the records kept so far are looked up
         if self.oa_required:
+            df = self._resolve_open_access(df.copy())
             before = len(df)
             df = df[df["is_oa"] == True]
             print(f"[DIAG] open access filter: {before} -> {len(df)}")
@@ -283,5 +479,11 @@ class MedlineClass:
 
         # Save
         out_path = os.path.join(self.output_dir, "medline_results.csv")
-        df.to_csv(out_path, index=False)
-        print(f"Saved {len(df)} records to {out_path}")
\ No newline at end of file
+        if incremental:
+            upsert_csv(out_path, df, key="pmid")
+            delta_path = self.sync.commit(df, {"date": started})
+            print(f"Synced {len(df)} new or changed records into {out_path} (delta: {delta_path})")
+        else:
+            df.to_csv(out_path, index=False)
+            self.sync.commit(None, {"date": started})
+            print(f"Saved {len(df)} records to {out_path}")
\ No newline at end of file
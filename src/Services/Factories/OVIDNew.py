@@ -1,6 +1,6 @@
 import csv
 import os
-import glob
+import shutil
 import requests
 import pandas as pd
 from app import db, app
@@ -9,6 +9,9 @@ from bs4 import BeautifulSoup
 from urllib.parse import urlencode
 from src.Commands.DOIEnricher import DOIEnricher
 from src.Services.Service import Service
+from src.Services.PagedFetch import page_files
+from src.Services.SourceSync import SourceSync, read_rows, upsert_csv
+from src.Services.StreamMerge import merge_files
 from urllib.parse import urlparse, parse_qs, urlencode
 
 class OvidJournalDataFetcher(Service):
@@ -20,8 +23,10 @@ class OvidJournalDataFetcher(Service):
         self.date_str = datetime.now().strftime("%Y-%m-%d")
         self.data_dir = f"Data/OVIDNew/data_{self.date_str}"
         os.makedirs(self.data_dir, exist_ok=True)
+        self.merged_filename = os.path.join("Data/OVIDNew", f"merged_journal_data_{self.date_str}.csv")
         self.max_pages = max_pages
         self.url = self.get_url_from_config("ovid_url")
+        self.sync = SourceSync("ovid", key="publication_accession_number")
 
     def authenticate(self, headers):
         self.auth_headers = headers
@@ -111,7 +116,8 @@ class OvidJournalDataFetcher(Service):
         return fallback
 
 
-    def fetch(self):
+    def _paging(self):
+        """(params, set_id, results_per_page) of the configured saved search."""
         # Parse the configured URL into params + base
         params, self.base_url = self.extract_params_from_url(self.url)
 
@@ -126,29 +132,52 @@ class OvidJournalDataFetcher(Service):
 
         # Lock the set id once and reuse everywhere
         set_id = self._extract_set_id(params, fallback="S.sh.80")
+        return params, set_id, results_per_page
 
-        page_number = 1
-        while page_number <= self.max_pages:
-            start_record = (page_number - 1) * results_per_page + 1
+    def fetch_page(self, params, set_id, results_per_page, page_number):
+        """(records, has_next) of one page of the saved search."""
+        start_record = (page_number - 1) * results_per_page + 1
+
+        # First page uses 'G'; subsequent pages use 'F'
+        flag = "G" if page_number == 1 else "F"
+
+        # Build the *consistent* Ovid paging params
+        params["Get Bib Display"]       = f"Titles|{flag}|{set_id}|{start_record}|{results_per_page}"
+        params["startRecord"]           = str(start_record)
+        params["startRecord_subfooter"] = str(start_record)
+
+        # Keep all of these aligned to the *same* set & page slice
+        params["WebLinkReturn"] = f"Titles={set_id}|{start_record}|{results_per_page}"
+        params["CitManPrev"]    = f"{set_id}|{start_record}|{results_per_page}"
+        params["Datalist"]      = f"{set_id}|{start_record}|{results_per_page}"
+        params["SELECT"]        = f"{set_id}|"
 
-            # First page uses 'G'; subsequent pages use 'F'
-            flag = "G" if page_number == 1 else "F"
+        # (Optional) Make sure FORMAT/FIELDS are reasonable defaults
+        params.setdefault("FORMAT", "title")
+        params.setdefault("FIELDS", "SELECTED")
 
-            # Build the *consistent* Ovid paging params
-            params["Get Bib Display"]       = f"Titles|{flag}|{set_id}|{start_record}|{results_per_page}"
-            params["startRecord"]           = str(start_record)
-            params["startRecord_subfooter"] = str(start_record)
+        # Build URL and fetch
+        url = self.rebuild_url(self.base_url, params)
+        print(f"Fetching page {page_number}: {url}")
 
-            # Keep all of these aligned to the *same* set & page slice
-            params["WebLinkReturn"] = f"Titles={set_id}|{start_record}|{results_per_page}"
-            params["CitManPrev"]    = f"{set_id}|{start_record}|{results_per_page}"
-            params["Datalist"]      = f"{set_id}|{start_record}|{results_per_page}"
-            params["SELECT"]        = f"{set_id}|"
+        # Include auth headers if provided via authenticate()
+        resp = self.session.get(url, headers=getattr(self, "auth_headers", None))
+        resp.raise_for_status()
 
-            # (Optional) Make sure FORMAT/FIELDS are reasonable defaults
-            params.setdefault("FORMAT", "title")
-            params.setdefault("FIELDS", "SELECTED")
+        soup = BeautifulSoup(resp.text, "html.parser")
 
+        # Detect presence of a "Next" button
+        next_button = soup.select_one('.n-mb .next-prev input.titles-nav-button[aria-label="Next"]')
+        return self._extract_data(soup), bool(next_button)
+
+    def fetch(self):
+        if self.sync.has_watermark():
+            return self.sync_changes()
+
+        params, set_id, results_per_page = self._paging()
+
+        page_number = 1
+        while page_number <= self.max_pages:
             # Skip if we already saved this page
             filename = os.path.join(self.data_dir, f"journal_data_page_{page_number}.csv")
             if os.path.exists(filename):
@@ -156,27 +185,16 @@ class OvidJournalDataFetcher(Service):
                 page_number += 1
                 continue
 
-            # Build URL and fetch
-            url = self.rebuild_url(self.base_url, params)
-            print(f"Fetching page {page_number}: {url}")
-
-            # Include auth headers if provided via authenticate()
-            resp = self.session.get(url, headers=getattr(self, "auth_headers", None))
-            resp.raise_for_status()
-
-            soup = BeautifulSoup(resp.text, "html.parser")
-
             # Extract & persist
-            journals = self._extract_data(soup)
+            journals, has_next = self.fetch_page(params, set_id, results_per_page, page_number)
             if not journals:
                 print(f"No records found on page {page_number}. Stopping.")
                 break
 
             self._save_to_csv(journals, filename)
 
-            # Detect presence of a "Next" button; stop if none
-            next_button = soup.select_one('.n-mb .next-prev input.titles-nav-button[aria-label="Next"]')
-            if not next_button:
+            # Stop if there is no "Next" button
+            if not has_next:
                 print("No more pages available.")
                 break
 
@@ -184,6 +202,38 @@ class OvidJournalDataFetcher(Service):
 
         # Merge all pages
         self.merge_csv_files()
+        files = page_files(self.data_dir, "journal_data_page_")
+        self.sync.baseline(read_rows(files), {"output": self.merged_filename})
+
+    def sync_changes(self):
+        """
+        Walks the saved search until its pages stop changing, writes new and
+        updated records to a delta file and folds them into today's merged file.
+        """
+        params, set_id, results_per_page = self._paging()
+        more = {"pages": True}
+
+        def fetch_page(page_number):
+            if not more["pages"] or page_number > self.max_pages:
+                return []
+            journals, more["pages"] = self.fetch_page(params, set_id, results_per_page, page_number)
+            return journals
+
+        try:
+            delta = self.sync.walk(fetch_page)
+        except requests.RequestException as e:
+            print(f"Ovid sync aborted, watermark unchanged: {e}")
+            return
+        previous = self.sync.watermark.get("output")
+        if previous and previous != self.merged_filename and os.path.exists(previous):
+            shutil.copyfile(previous, self.merged_filename)
+        if delta:
+            upsert_csv(self.merged_filename, delta, key="publication_accession_number")
+        last_update = max((row.get("update_date") or "" for row in delta), default="")
+        watermark = {"output": self.merged_filename, **({"last_update": last_update} if last_update else {})}
+        delta_path = self.sync.commit(delta, watermark)
+        print(f"Ovid sync: {self.sync.stats['pages']} pages, {self.sync.stats['records']} records checked, "
+              f"{len(delta)} new or updated" + (f" -> {delta_path}" if delta_path else ""))
 
     # def fetch(self):
     #     params, self.base_url = self.extract_params_from_url(self.url)
@@ -430,19 +480,13 @@ class OvidJournalDataFetcher(Service):
 
     def merge_csv_files(self):
         # Define the output file for the merged CSV with date
-        merged_filename = os.path.join("Data/OVIDNew", f"merged_journal_data_{self.date_str}.csv")
-
-        # Collect all individual CSV files in the date directory
-        all_files = glob.glob(os.path.join(self.data_dir, "*.csv"))
-
-        # Combine all CSV files into one DataFrame
-        df_list = [pd.read_csv(file) for file in all_files]
-        if (len(df_list) > 0):
-            merged_df = pd.concat(df_list, ignore_index=True)
+        merged_filename = self.merged_filename
 
-            # Save the merged DataFrame to a single CSV file
-            merged_df.to_csv(merged_filename, index=False, encoding="utf-8")
-            print(f"All CSV files merged into {merged_filename}")
+        # Stream the page files, in page order, into the merged file
+        all_files = page_files(self.data_dir, "journal_data_page_")
+        if (len(all_files) > 0):
+            stats = merge_files(all_files, merged_filename)
+            print(f"All CSV files merged into {merged_filename} ({stats['rows']} rows)")
 
             # not needed since we have language
             # print("Starting enrichment for the combined file (OVID DB)...")
@@ -1,6 +1,6 @@
 from PIL import Image, ImageOps, ImageFilter, ImageEnhance
 import pytesseract
-import requests
+from src.Services.HttpClient import get_http_client
 from io import BytesIO
 from bs4 import BeautifulSoup, Tag
 import re
@@ -187,7 +187,7 @@ class PrismaImageScraper:
         """
         try:
             # Download the image from the URL
-            response = requests.get(image_url, stream=True)
+            response = get_http_client().get(image_url)
             response.raise_for_status()  # Raise an error for HTTP issues
             img = Image.open(BytesIO(response.content))
 
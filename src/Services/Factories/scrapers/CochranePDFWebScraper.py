@@ -1,3 +1,4 @@
+import logging
 import random
 import string
 import time
@@ -15,6 +16,8 @@ from src.Services.Factories.Sections.ArticleExtractorFactory import (
 )
 import PyPDF2
 
+logger = logging.getLogger(__name__)
+
 
 class CochranePDFWebScraper(GeneralPDFWebScraper):
     """
@@ -67,25 +70,25 @@ class CochranePDFWebScraper(GeneralPDFWebScraper):
                 }
             )
         except requests.exceptions.RequestException as e:
-            print(f"Error initializing Cochrane session: {e}")
+            logger.warning(f"Error initializing Cochrane session: {e}")
 
     def fetch_pdf_urls(self):
         """Returns the PDF URL directly, as Cochrane URLs are straightforward."""
         try:
             redirected_url = self.fetch_redirected_url()
             if not redirected_url:
-                print(f"Failed to fetch redirected URL for {redirected_url}")
+                logger.warning(f"Failed to fetch redirected URL for {redirected_url}")
                 return []
             return [redirected_url]
         except requests.exceptions.RequestException as e:
-            print(f"Error fetching PDF URLs: {e}")
+            logger.warning(f"Error fetching PDF URLs: {e}")
             return []
         
     def generate_random_email(self, domain="gmail.com"):
         """Generates a random email address for Unpaywall API access."""
         local_part = ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
         email = f"{local_part}@{domain}"
-        print(f"Generated email: {email}")
+        logger.debug(f"Generated email: {email}")
         return email
     
     def convert_cochrane_pdf_to_full_text(self, pdf_url):
@@ -1,3 +1,4 @@
+import logging
 import re
 import time
 import random
@@ -13,6 +14,9 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
 from webdriver_manager.chrome import ChromeDriverManager
 from src.Commands.SeleniumPool import PDFDownloader
+from src.Services.HttpClient import get_http_client
+from src.Services.HostHealth import host_health
+from src.Services.ResolutionCache import DEAD_STATUSES, get_resolution_cache
 from src.Utils.Helpers import (
     get_final_url,
     get_final_redirected_url,
@@ -25,6 +29,8 @@ from src.Services.Factories.Sections.ArticleExtractorFactory import (
     ArticleExtractorFactory,
 )
 
+logger = logging.getLogger(__name__)
+
 
 class GeneralPDFWebScraper:
     """
@@ -35,30 +41,37 @@ class GeneralPDFWebScraper:
         url (str): The initial URL to scrape.
         DB_name (str): Optional name of the database or source (e.g., "Cochrane").
         session (requests.Session): A session for making HTTP requests.
+        resolution_cache (ResolutionCache): Remembers landing pages and PDF URLs across runs.
     """
 
-    def __init__(self, DB_name=None, session=None):
+    def __init__(self, DB_name=None, session=None, resolution_cache=None):
         self.DB_name = DB_name
         self.session = session or requests.Session()
+        self.resolution_cache = resolution_cache or get_resolution_cache()
 
     def set_doi_url(self, url):
         self.url = url
         return self
 
     def fetch_redirected_url(self, url=None):
-        """Fetches the final URL after redirections."""
+        """Fetches the final URL after redirections (cached, see ResolutionCache)."""
         set_url = url if url else self.url
+        return self.resolution_cache.landing_page(set_url, lambda: self._resolve_redirected_url(set_url))
 
+    def _resolve_redirected_url(self, set_url):
         final_url = get_final_url(set_url)
+        if final_url is None:
+            return None  # the lookup failed; ResolutionCache doesn't keep it
         try:
             if "linkinghub" in final_url:
                 return convert_elsevier_to_sciencedirect(final_url)
             elif final_url == "" or final_url is None:
+                self.resolution_cache.note_selenium()
                 return get_final_redirected_url(final_url)
             else:
                 return final_url
         except requests.exceptions.RequestException as e:
-            print(f"Error fetching redirected URL: {e}")
+            logger.warning(f"Error fetching redirected URL: {e}")
             return final_url
 
     def extract_doi_from_url(self, url):
@@ -79,67 +92,77 @@ class GeneralPDFWebScraper:
             else:
                 return self.get_doi_from_any_url_with_selenium(url)
         except Exception as e:
-            print(f"Error extracting DOI from URL: {e}")
+            logger.warning(f"Error extracting DOI from URL: {e}")
             return None
 
     def fetch_pdf_urls_2(self):
         """
         Fetches all PDF URLs from the redirected URL by parsing HTML content.
         Handles special cases like 'linkinghub' URLs with Unpaywall support.
+        Results are cached; failed lookups are not.
 
         Returns:
             list: List of URLs pointing to PDF files.
         """
-        pdfs = []
         try:
-            redirected_url = self.fetch_redirected_url()
-            if not redirected_url:
-                print(f"Failed to fetch redirected URL for {self.url}")
-                return []
+            return self.resolution_cache.pdf_urls(self.url, self._discover_pdf_urls_2)
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Error fetching PDF URLs-fetch_pdf_urls_2: {e}")
+            return []
+        except Exception as e:
+            logger.warning(f"An unexpected error occurred: {e}")
+            return []
+
+    def _discover_pdf_urls_2(self):
+        pdfs = []
+        redirected_url = self.fetch_redirected_url()
+        if not redirected_url:
+            logger.warning(f"Failed to fetch redirected URL for {self.url}")
+            return []
 
-            if "linkinghub" in redirected_url:
-                doi = self.extract_doi_from_url(self.url)
+        if "linkinghub" in redirected_url:
+            doi = self.extract_doi_from_url(self.url)
 
-                if doi:
-                    pdf_urls = self.fetch_from_unpaywall(doi)
-                    pdfs = pdf_urls if pdf_urls else [doi]
+            if doi:
+                pdf_urls = self.fetch_from_unpaywall(doi)
+                pdfs = pdf_urls if pdf_urls else [doi]
 
-            elif redirected_url:
+        elif redirected_url:
+            # Selenium; skipped at once while the host's circuit is open
+            with host_health.guard(redirected_url):
+                self.resolution_cache.note_selenium()
                 pdf_links = extract_pdf_links(redirected_url)
-                pdfs = pdf_links
+            pdfs = pdf_links
 
+        else:
+            doi = self.extract_doi_from_url(self.url)
+            if doi:
+                pdfs = self.fetch_from_unpaywall(doi)
             else:
-                doi = self.extract_doi_from_url(self.url)
-                if doi:
-                    pdfs = self.fetch_from_unpaywall(doi)
-                else:
-                    pdfs = []
-
-            if len(pdfs) == 0:
-                doi = self.extract_doi_from_url(self.url)
-                if doi:
-                    pdfs = self.fetch_from_unpaywall(doi)
-                else:
-                    pdfs = []
+                pdfs = []
 
-            return pdfs
+        if len(pdfs) == 0:
+            doi = self.extract_doi_from_url(self.url)
+            if doi:
+                pdfs = self.fetch_from_unpaywall(doi)
+            else:
+                pdfs = []
 
-        except requests.exceptions.RequestException as e:
-            print(f"Error fetching PDF URLs-fetch_pdf_urls_2: {e}")
-            return []
-        except Exception as e:
-            print(f"An unexpected error occurred: {e}")
-            return []
+        return pdfs
 
     def fetch_pdf_content(self, pdf_url):
         """Fetches the PDF content from a given URL."""
         try:
-            response = self.session.get(pdf_url)
+            with host_health.guard(pdf_url) as outcome:
+                response = self.session.get(pdf_url)
+                outcome.response(response)
+            # A cached PDF URL that is gone is looked up again next time
+            self.resolution_cache.report_status(self.url, response.status_code, landing=False)
             response.raise_for_status()
             content_type = response.headers.get("Content-Type", "")
             return response.content, content_type
         except requests.exceptions.RequestException as e:
-            print(f"Error fetching PDF content from {pdf_url}: {e}")
+            logger.warning(f"Error fetching PDF content from {pdf_url}: {e}")
             return b"", ""
 
     def extract_text_from_pdf(self, pdf_content):
@@ -149,7 +172,7 @@ class GeneralPDFWebScraper:
             text = "".join(page.extract_text() for page in pdf_reader.pages)
             return text
         except Exception as e:
-            print(f"Error extracting text from PDF: {e}")
+            logger.warning(f"Error extracting text from PDF: {e}")
             return ""
 
     def fetch_from_unpaywall(self, doi):
@@ -165,7 +188,7 @@ class GeneralPDFWebScraper:
         email = self.generate_random_email()
         try:
             unpaywall_api_url = f"https://api.unpaywall.org/v2/{doi}?email={email}"
-            response = requests.get(unpaywall_api_url)
+            response = get_http_client().get(unpaywall_api_url)
             response.raise_for_status()
             data = response.json()
             if data.get("best_oa_location") and data["best_oa_location"].get(
@@ -177,14 +200,14 @@ class GeneralPDFWebScraper:
             ):
                 return [data["first_oa_location"]["url_for_pdf"]]
             elif data.get("best_oa_location") and data["best_oa_location"].get("url"):
-                print(
+                logger.info(
                     f"No open access PDF found for DOI: {doi}. Checking the HTML link..."
                 )
                 return [self.fetch_redirected_url(data["best_oa_location"]["url"])]
 
             return [self.fetch_redirected_url()]
         except requests.exceptions.RequestException as e:
-            print(f"Error fetching from Unpaywall: {e}")
+            logger.warning(f"Error fetching from Unpaywall: {e}")
             return [self.fetch_redirected_url()]
 
     def fetch_pdf_urls(self):
@@ -192,32 +215,38 @@ class GeneralPDFWebScraper:
         """
         Fetches PDF URLs based on the specified database or website.
         This method can be customized by inheriting classes to handle specific websites.
+        Results are cached; failed lookups are not.
         """
-        redirected_url = self.fetch_redirected_url()
         try:
-
-            if not redirected_url:
-                print(f"Failed to fetch redirected URL for {self.url}")
-                return []
-
-            response = self.session.get(redirected_url)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, "html.parser")
-            pdf_urls = [
-                urljoin(redirected_url, link["href"])
-                for link in soup.find_all("a", href=True)
-                if link["href"].endswith(".pdf")
-            ]
-            if len(pdf_urls) > 0:
-                return pdf_urls
-            return []
+            return self.resolution_cache.pdf_urls(self.url, self._discover_pdf_urls)
         except requests.exceptions.RequestException as e:
-            print(f"Error fetching PDF URLs - fetch_pdf_urls: {e}")
+            logger.warning(f"Error fetching PDF URLs - fetch_pdf_urls: {e}")
             return []
         except Exception as e:
-            print(f"An error occurred: {e}")
+            logger.warning(f"An error occurred: {e}")
+            return []
+
+    def _discover_pdf_urls(self):
+        redirected_url = self.fetch_redirected_url()
+        if not redirected_url:
+            logger.warning(f"Failed to fetch redirected URL for {self.url}")
             return []
 
+        with host_health.guard(redirected_url) as outcome:
+            response = self.session.get(redirected_url)
+            outcome.response(response)
+        # Validate the (possibly cached) landing page on use
+        self.resolution_cache.report_status(self.url, response.status_code)
+        response.raise_for_status()
+        if response.history:
+            self.resolution_cache.report_moved(self.url, redirected_url, response.url)
+        soup = BeautifulSoup(response.content, "html.parser")
+        return [
+            urljoin(redirected_url, link["href"])
+            for link in soup.find_all("a", href=True)
+            if link["href"].endswith(".pdf")
+        ]
+
     def get_doi_from_any_url_with_selenium(self, url):
         """
         Use Selenium to extract DOI from the webpage if it is not directly available in the URL.
@@ -227,7 +256,13 @@ class GeneralPDFWebScraper:
         options.add_argument("--disable-gpu")
         options.add_argument("--no-sandbox")
 
+        # Don't launch a browser for a host that is failing anyway
+        if host_health.is_open(url):
+            host_health.note_rejection(url)
+            return None
+
         # Automatically manage Chromedriver
+        self.resolution_cache.note_selenium()
         driver = webdriver.Chrome(
             service=Service(ChromeDriverManager().install()), options=options
         )
@@ -270,13 +305,18 @@ class GeneralPDFWebScraper:
             redirected_url = manual_url
         else:
             redirected_url = self.fetch_redirected_url()
-        print("url redirect from: " + self.url + " to " + redirected_url)
+        logger.debug("url redirect from: " + self.url + " to " + redirected_url)
         from src.Utils.Helpers import get_contents
 
         if not redirected_url:
-            print(f"Failed to fetch redirected URL for {self.url}")
+            logger.warning(f"Failed to fetch redirected URL for {self.url}")
+            return ""
+        try:
+            with host_health.guard(redirected_url):
+                return get_contents(redirected_url)
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Error fetching HTML for {redirected_url}: {e}")
             return ""
-        return get_contents(redirected_url)
 
     def fetch_and_extract_first_valid_pdf_text(self):
         # Update headers for better compression handling
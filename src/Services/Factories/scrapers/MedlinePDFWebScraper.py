@@ -1,3 +1,4 @@
+import logging
 import random
 import string
 import requests
@@ -10,6 +11,9 @@ from src.Utils.Helpers import extract_pdf_links, clean_special_characters
 from src.Services.Factories.scrapers.GeneralPDFWebScraper import GeneralPDFWebScraper
 import PyPDF2
 
+logger = logging.getLogger(__name__)
+
+
 class MedlinePDFWebScraper(GeneralPDFWebScraper):
     """
     A base class for web scraping PDF links, handling redirects, and extracting PDF or HTML content.
@@ -40,5 +44,5 @@ class MedlinePDFWebScraper(GeneralPDFWebScraper):
         """Generates a random email address for Unpaywall API access."""
         local_part = ''.join(random.choices(string.ascii_lowercase + string.digits, k=8))
         email = f"{local_part}@{domain}"
-        print(f"Generated email: {email}")
+        logger.debug(f"Generated email: {email}")
         return email
@@ -0,0 +1,320 @@
+# src/Services/HostHealth.py
+"""
+Per-host health for scraping: circuit breaker and adaptive rate limit
+
+When a publisher host is slow or blocking, every paper on it used to burn
+its timeouts (and a Selenium launch) on the critical path. Every outgoing
+request, through HttpClient or wrapped in `host_health.guard(url)`, now
+goes through the host's:
+
+- circuit breaker: HOST_FAILURE_THRESHOLD consecutive failures (connection
+  errors, timeouts, 403/5xx, answers slower than HOST_SLOW_SECONDS) open
+  it for HOST_OPEN_SECONDS; then a single half-open probe is let through,
+  which closes it again or doubles the open period (up to
+  HOST_MAX_OPEN_SECONDS). While open, requests fail at once with
+  HostUnavailable.
+- token bucket: HOST_RATE requests/s with bursts of HOST_BURST; the rate
+  halves on 429/503 (and pauses for Retry-After) and creeps back up by
+  HOST_RATE_STEP per success, up to HOST_MAX_RATE.
+
+HostUnavailable is a requests.ConnectionError, so existing
+`except requests.RequestException` handlers treat it as a failed fetch.
+Papers whose host was unavailable are reported as deferred by
+PaperProcessor (see `track_rejections`) and re-queued instead of being
+marked skipped.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from urllib.parse import urlparse
+
+import requests
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+FAILURE_THRESHOLD = int(os.getenv("HOST_FAILURE_THRESHOLD", "5"))
+OPEN_SECONDS = float(os.getenv("HOST_OPEN_SECONDS", "120"))
+MAX_OPEN_SECONDS = float(os.getenv("HOST_MAX_OPEN_SECONDS", "1800"))
+SLOW_SECONDS = float(os.getenv("HOST_SLOW_SECONDS", "20"))
+RATE = float(os.getenv("HOST_RATE", "10"))
+BURST = float(os.getenv("HOST_BURST", "20"))
+MIN_RATE = float(os.getenv("HOST_MIN_RATE", "0.2"))
+MAX_RATE = float(os.getenv("HOST_MAX_RATE", "50"))
+RATE_STEP = float(os.getenv("HOST_RATE_STEP", "0.5"))
+MAX_WAIT_SECONDS = float(os.getenv("HOST_MAX_WAIT_SECONDS", "30"))
+
+THROTTLE_STATUSES = frozenset({429, 503})
+FAILURE_STATUSES = frozenset({403, 500, 502, 503, 504})
+
+
+class HostUnavailable(requests.ConnectionError):
+    """The host's circuit is open (or its rate limit would block too long)."""
+
+    def __init__(self, host: str, retry_in: float, reason: str = "circuit open"):
+        super().__init__(f"{host} unavailable ({reason}); retry in {retry_in:.0f} s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+def host_of(url: str) -> str:
+    return (urlparse(url).netloc or url or "").lower()
+
+
+class AdaptiveTokenBucket:
+    """Token bucket whose rate halves on throttling and grows additively on success."""
+
+    def __init__(self, rate: float = RATE, burst: float = BURST, min_rate: float = MIN_RATE,
+                 max_rate: float = MAX_RATE, step: float = RATE_STEP, now: Optional[float] = None):
+        self.rate, self.burst = rate, burst
+        self.min_rate, self.max_rate, self.step = min_rate, max_rate, step
+        self.tokens = burst
+        self.updated = time.monotonic() if now is None else now
+        self.paused_until = 0.0
+
+    def reserve(self, now: float) -> float:
+        """Take a token; returns how long the caller has to wait for it (0 if none)."""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        wait = max(self.paused_until - now, 0.0)
+        if self.tokens < 0:
+            wait = max(wait, -self.tokens / self.rate)
+        return wait
+
+    def release(self) -> None:
+        """Give back a reserved token that was not used."""
+        self.tokens = min(self.burst, self.tokens + 1)
+
+    def success(self) -> None:
+        self.rate = min(self.max_rate, self.rate + self.step)
+
+    def throttled(self, now: float, retry_after: Optional[float] = None) -> None:
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = min(self.tokens, 0)
+        self.paused_until = max(self.paused_until, now + (retry_after if retry_after else 1 / self.rate))
+
+
+class CircuitBreaker:
+    def __init__(self, threshold: int = FAILURE_THRESHOLD, open_seconds: float = OPEN_SECONDS,
+                 max_open_seconds: float = MAX_OPEN_SECONDS):
+        self.threshold = threshold
+        self.base_open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.open_for = open_seconds
+        self.opened_at = 0.0
+        self.probing = False
+
+    def retry_in(self, now: float) -> float:
+        return max(self.opened_at + self.open_for - now, 0.0) if self.state == OPEN else 0.0
+
+    def allow(self, now: float) -> bool:
+        if self.state == OPEN and now >= self.opened_at + self.open_for:
+            self.state, self.probing = HALF_OPEN, False
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self.probing:
+            self.probing = True  # exactly one probe at a time
+            return True
+        return False
+
+    def success(self) -> None:
+        self.state, self.failures, self.probing = CLOSED, 0, False
+        self.open_for = self.base_open_seconds
+
+    def failure(self, now: float) -> None:
+        if self.state == HALF_OPEN:
+            self.open_for = min(self.open_for * 2, self.max_open_seconds)
+            self.state, self.opened_at, self.probing = OPEN, now, False
+            return
+        self.failures += 1
+        if self.state == CLOSED and self.failures >= self.threshold:
+            self.state, self.opened_at = OPEN, now
+
+    def abandon_probe(self) -> None:
+        self.probing = False
+
+
+class _Host:
+    def __init__(self, health: "HostHealth"):
+        self.lock = threading.Lock()
+        self.breaker = CircuitBreaker(health.threshold, health.open_seconds, health.max_open_seconds)
+        self.bucket = AdaptiveTokenBucket(health.rate, health.burst, health.min_rate, health.max_rate, health.step,
+                                          now=health.clock())
+        self.stats = {"requests": 0, "failures": 0, "throttled": 0, "rejected": 0, "waited_s": 0.0}
+
+
+class Outcome:
+    """What a guarded call reports back: the response (or status), if any."""
+
+    def __init__(self):
+        self.status: Optional[int] = None
+        self.retry_after: Optional[float] = None
+
+    def response(self, response) -> None:
+        self.status = response.status_code
+        self.retry_after = parse_retry_after(response.headers.get("Retry-After"))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    return float(value) if value and value.strip().isdigit() else None
+
+
+class HostHealth:
+    def __init__(self, threshold: int = FAILURE_THRESHOLD, open_seconds: float = OPEN_SECONDS,
+                 max_open_seconds: float = MAX_OPEN_SECONDS, slow_seconds: float = SLOW_SECONDS,
+                 rate: float = RATE, burst: float = BURST, min_rate: float = MIN_RATE,
+                 max_rate: float = MAX_RATE, step: float = RATE_STEP, max_wait: float = MAX_WAIT_SECONDS,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        self.threshold, self.open_seconds, self.max_open_seconds = threshold, open_seconds, max_open_seconds
+        self.slow_seconds = slow_seconds
+        self.rate, self.burst, self.min_rate, self.max_rate, self.step = rate, burst, min_rate, max_rate, step
+        self.max_wait = max_wait
+        # Injectable, so the limiter can be checked without waiting in real time
+        self.clock, self.sleep = clock, sleep
+        self._hosts: Dict[str, _Host] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _host(self, host: str) -> _Host:
+        entry = self._hosts.get(host)
+        if entry is None:
+            with self._lock:
+                entry = self._hosts.setdefault(host, _Host(self))
+        return entry
+
+    def configure(self, url: str, rate: Optional[float] = None, burst: Optional[float] = None) -> None:
+        """
+        Per-service limits for the host of `url`, e.g. an API's documented
+        rate: the bucket starts at `rate` and never grows beyond it.
+        """
+        entry = self._host(host_of(url))
+        with entry.lock:
+            bucket = entry.bucket
+            if rate is not None:
+                bucket.rate = bucket.max_rate = rate
+                bucket.min_rate = min(bucket.min_rate, rate)
+            if burst is not None:
+                bucket.burst = burst
+                bucket.tokens = min(bucket.tokens, burst)
+
+    def is_open(self, url: str) -> bool:
+        """True while requests to the host of `url` would be rejected."""
+        entry = self._hosts.get(host_of(url))
+        if entry is None:
+            return False
+        with entry.lock:
+            return entry.breaker.state == OPEN and entry.breaker.retry_in(self.clock()) > 0
+
+    def acquire(self, url: str) -> str:
+        """
+        Admit one request to the host of `url`: raises HostUnavailable when the
+        circuit is open, otherwise waits for the rate limit. Returns the host.
+        """
+        host = host_of(url)
+        entry = self._host(host)
+        with entry.lock:
+            now = self.clock()
+            if not entry.breaker.allow(now):
+                entry.stats["rejected"] += 1
+                self.note_rejection(host)
+                raise HostUnavailable(host, entry.breaker.retry_in(now))
+            wait = entry.bucket.reserve(now)
+            if wait > self.max_wait:
+                entry.bucket.release()
+                if entry.breaker.state == HALF_OPEN:
+                    entry.breaker.abandon_probe()
+                entry.stats["rejected"] += 1
+                self.note_rejection(host)
+                raise HostUnavailable(host, wait, reason="rate limited")
+            entry.stats["waited_s"] += wait
+        if wait:
+            self.sleep(wait)
+        return host
+
+    def record(self, host: str, status: Optional[int] = None, error: bool = False,
+               elapsed: float = 0.0, retry_after: Optional[float] = None) -> None:
+        entry = self._host(host)
+        with entry.lock:
+            now = self.clock()
+            entry.stats["requests"] += 1
+            if status in THROTTLE_STATUSES:
+                entry.stats["throttled"] += 1
+                entry.bucket.throttled(now, retry_after)
+            if error or status in FAILURE_STATUSES or elapsed >= self.slow_seconds:
+                entry.stats["failures"] += 1
+                entry.breaker.failure(now)
+            else:
+                if status not in THROTTLE_STATUSES:
+                    entry.bucket.success()
+                entry.breaker.success()
+
+    @contextmanager
+    def guard(self, url: str) -> Iterator[Outcome]:
+        """
+        Wrap one request (HTTP or Selenium) to `url`. Exceptions from the
+        block count as failures; report the response through the outcome.
+        """
+        host = self.acquire(url)
+        outcome = Outcome()
+        started = self.clock()
+        try:
+            yield outcome
+        except Exception:
+            self.record(host, error=True, elapsed=self.clock() - started)
+            raise
+        self.record(host, status=outcome.status, elapsed=self.clock() - started,
+                    retry_after=outcome.retry_after)
+
+    @contextmanager
+    def track_rejections(self) -> Iterator[List[str]]:
+        """Collects the hosts that rejected a request in this thread during the block."""
+        previous = getattr(self._local, "rejections", None)
+        self._local.rejections = rejected = []
+        try:
+            yield rejected
+        finally:
+            self._local.rejections = previous
+            if previous is not None:
+                previous.extend(rejected)
+
+    def note_rejection(self, url: str) -> None:
+        """Report a request skipped because its host is unavailable (see track_rejections)."""
+        rejections = getattr(self._local, "rejections", None)
+        if rejections is not None:
+            rejections.append(host_of(url))
+
+    def retry_in(self, hosts) -> float:
+        """Seconds until the first of `hosts` accepts requests again."""
+        now = self.clock()
+        waits = []
+        for host in hosts:
+            entry = self._hosts.get(host)
+            if entry is not None:
+                with entry.lock:
+                    waits.append(max(entry.breaker.retry_in(now), entry.bucket.paused_until - now, 0.0))
+        return min(waits) if waits else 0.0
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        result = {}
+        for host, entry in list(self._hosts.items()):
+            with entry.lock:
+                result[host] = dict(entry.stats, state=entry.breaker.state,
+                                    rate=round(entry.bucket.rate, 2),
+                                    retry_in=round(entry.breaker.retry_in(self.clock()), 1))
+        return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hosts = {}
+
+
+host_health = HostHealth()
+
+if hasattr(os, "register_at_fork"):
+    # Locks may have been held by another thread at fork time
+    os.register_at_fork(after_in_child=host_health.reset)
@@ -0,0 +1,229 @@
+# src/Services/HttpClient.py
+"""
+Shared pooled HTTP client for scrapers and enrichment services
+
+The scrapers and the enrichment services called bare `requests.get` /
+`requests.head`, so every call paid DNS, TCP and TLS setup again. This
+module keeps one connection pool per host and process:
+
+    http = get_http_client()
+    response = http.get(f"https://api.crossref.org/works/{doi}")   # reused connection
+    response.raise_for_status()
+
+- one urllib3 pool per host (HTTP_POOL_HOSTS hosts, HTTP_POOL_MAXSIZE
+  connections each), kept alive between calls and shared by all threads
+- default timeouts (HTTP_CONNECT_TIMEOUT / HTTP_READ_TIMEOUT seconds)
+  unless the caller passes its own
+- idempotent requests (GET, HEAD, OPTIONS, PUT, DELETE) are retried on
+  connection errors, timeouts and 429/5xx answers, up to HTTP_RETRIES
+  times with jittered exponential backoff (Retry-After is honoured)
+- per-host request counts, errors, retries and latency in `metrics`
+- every attempt is admitted by the host's circuit breaker and adaptive
+  rate limit (see HostHealth); an open circuit fails fast with
+  HostUnavailable and is not retried
+- pools are discarded in forked children (Celery prefork workers)
+
+Responses and exceptions are the usual `requests` ones, so existing
+`raise_for_status()` / `except requests.RequestException` code is unchanged.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.Services.HostHealth import HostHealth, host_health, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_HOSTS = int(os.getenv('HTTP_POOL_HOSTS', '50'))
+DEFAULT_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', '20'))
+DEFAULT_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '5'))
+DEFAULT_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '30'))
+DEFAULT_RETRIES = int(os.getenv('HTTP_RETRIES', '3'))
+DEFAULT_BACKOFF = float(os.getenv('HTTP_BACKOFF', '0.5'))
+MAX_BACKOFF = 30.0
+
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class HostMetrics:
+    """Thread-safe per-host request counts, errors, retries and latencies."""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._window = window
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stats = defaultdict(lambda: {'requests': 0, 'errors': 0, 'retries': 0,
+                                               'total_ms': 0.0, 'max_ms': 0.0})
+            self._recent = defaultdict(lambda: deque(maxlen=self._window))
+
+    def record(self, host: str, elapsed_ms: float, error: bool = False) -> None:
+        with self._lock:
+            stats = self._stats[host]
+            stats['requests'] += 1
+            stats['errors'] += int(error)
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+            self._recent[host].append(elapsed_ms)
+
+    def record_retry(self, host: str) -> None:
+        with self._lock:
+            self._stats[host]['retries'] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Per-host totals plus mean/p50/p95 over the most recent requests."""
+        with self._lock:
+            result = {}
+            for host, stats in self._stats.items():
+                recent = sorted(self._recent[host])
+                result[host] = dict(stats)
+                if recent:
+                    result[host].update(
+                        mean_ms=stats['total_ms'] / stats['requests'],
+                        p50_ms=recent[len(recent) // 2],
+                        p95_ms=recent[min(len(recent) - 1, int(len(recent) * 0.95))],
+                    )
+            return result
+
+
+metrics = HostMetrics()
+
+
+class HttpClient:
+    """
+    `requests` with shared keep-alive pools, default timeouts and retries.
+
+    Each thread gets its own Session (cookies and headers are not shared
+    between threads); all sessions mount the same adapter and so draw on
+    the same per-host connection pools.
+    """
+
+    def __init__(self, pool_hosts: int = DEFAULT_POOL_HOSTS, pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+                 timeout: Any = (DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT),
+                 retries: int = DEFAULT_RETRIES, backoff: float = DEFAULT_BACKOFF,
+                 headers: Optional[Dict[str, str]] = None, host_metrics: Optional[HostMetrics] = None,
+                 health: Optional[HostHealth] = host_health):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.headers = dict(headers or {})
+        self.metrics = host_metrics or metrics
+        self.health = health
+        # Retries are done here (with metrics), not inside urllib3
+        self.adapter = HTTPAdapter(pool_connections=pool_hosts, pool_maxsize=pool_maxsize,
+                                   max_retries=0, pool_block=False)
+        self._local = threading.local()
+
+    @property
+    def session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.mount('http://', self.adapter)
+            session.mount('https://', self.adapter)
+            session.headers.update(self.headers)
+            self._local.session = session
+        return session
+
+    def request(self, method: str, url: str, retries: Optional[int] = None, **kwargs) -> requests.Response:
+        """
+        Like `requests.request`. Idempotent methods are retried; the last
+        response (or exception) is returned (or raised) as is.
+        """
+        method = method.upper()
+        kwargs.setdefault('timeout', self.timeout)
+        host = urlparse(url).netloc or 'unknown'
+        attempts = 1 + (self.retries if retries is None else retries) if method in IDEMPOTENT_METHODS else 1
+
+        for attempt in range(1, attempts + 1):
+            if self.health is not None:
+                self.health.acquire(url)  # HostUnavailable propagates
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                elapsed = time.perf_counter() - started
+                self.metrics.record(host, elapsed * 1000, error=True)
+                if self.health is not None:
+                    self.health.record(host.lower(), error=True, elapsed=elapsed)
+                if attempt == attempts:
+                    raise
+                delay = self._backoff(attempt)
+                logger.debug(f"{method} {host} failed ({e.__class__.__name__}); retry {attempt} in {delay:.2f} s")
+            except Exception:
+                # Not retried (TooManyRedirects, InvalidURL, ...), but still a failure:
+                # otherwise a half-open breaker would wait for its probe forever
+                elapsed = time.perf_counter() - started
+                self.metrics.record(host, elapsed * 1000, error=True)
+                if self.health is not None:
+                    self.health.record(host.lower(), error=True, elapsed=elapsed)
+                raise
+            else:
+                elapsed = time.perf_counter() - started
+                failed = response.status_code >= 500 or response.status_code == 429
+                self.metrics.record(host, elapsed * 1000, error=failed)
+                if self.health is not None:
+                    self.health.record(host.lower(), status=response.status_code, elapsed=elapsed,
+                                       retry_after=parse_retry_after(response.headers.get('Retry-After')))
+                if response.status_code not in RETRY_STATUSES or attempt == attempts:
+                    return response
+                delay = self._backoff(attempt, response.headers.get('Retry-After'))
+                logger.debug(f"{method} {host} answered {response.status_code}; retry {attempt} in {delay:.2f} s")
+                response.close()
+            self.metrics.record_retry(host)
+            time.sleep(delay)
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Full jitter: uniform(0, backoff * 2^(attempt-1)), or the server's Retry-After."""
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), MAX_BACKOFF)
+        return random.uniform(0, min(self.backoff * 2 ** (attempt - 1), MAX_BACKOFF))
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault('allow_redirects', False)  # as requests.head
+        return self.request('HEAD', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def close(self) -> None:
+        self.adapter.close()
+
+
+_client: Optional[HttpClient] = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """Process-wide client (and connection pools)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
+
+
+def _reset_in_child() -> None:
+    # Sockets inherited from the parent must not be shared; start with empty pools
+    global _client
+    _client = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_in_child)
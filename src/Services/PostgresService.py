@@ -2,10 +2,11 @@ import os
 import math
 import logging
 from sqlalchemy.exc import NoResultFound
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.sql import Executable
 from utils.errors import DatabaseError, RecordNotFoundError
+from src.Services.DBservices.ConnectionPool import get_engine
 
 logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(levelname)s - %(message)s')
@@ -19,8 +20,8 @@ class PostgresService:
         if not db_url:
             raise ValueError(
                 "Database URL must be provided or set in DATABASE_URL environment variable.")
-        db_url = db_url.replace("postgresql://", "postgresql+psycopg://")
-        self.engine = create_engine(db_url, pool_size=10, max_overflow=20)
+        # Instances share one pool per URL instead of one pool each
+        self.engine = get_engine(db_url)
         self.reset_query()
 
     def reset_query(self):
@@ -185,6 +186,21 @@ class PostgresService:
         self._conditions.append(("", ")"))
         return self
 
+    def build_where_clause(self):
+        """
+        Returns the WHERE clause for the current conditions (or an empty string).
+        Values stay bound as named parameters in self._params.
+        """
+        if not self._conditions:
+            return ""
+
+        conj, clause = self._conditions[0]
+        parts = [f"WHERE {clause}"]
+        for conj, clause in self._conditions[1:]:
+            conj = conj if conj else ""
+            parts.append(f"{conj} {clause}")
+        return " ".join(parts)
+
     def _build_query(self, is_count=False):
         """Builds the final query string, now with validation for DISTINCT/ORDER BY conflicts."""
 
@@ -195,14 +211,9 @@ class PostgresService:
         cols = "COUNT(*)" if is_count else self._columns
         query = [f"SELECT {cols} FROM {self._table}"]
 
-        if self._conditions:
-            conj, clause = self._conditions[0]
-            query.append(f"WHERE {clause}")
-
-            for i in range(1, len(self._conditions)):
-                conj, clause = self._conditions[i]
-                conj = conj if conj else ""
-                query.append(f"{conj} {clause}")
+        where_clause = self.build_where_clause()
+        if where_clause:
+            query.append(where_clause)
 
         if not is_count:
             if self._group_by:
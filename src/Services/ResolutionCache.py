@@ -0,0 +1,295 @@
+# src/Services/ResolutionCache.py
+"""
+Persistent cache of DOI -> landing page -> PDF URL resolutions
+
+GeneralPDFWebScraper followed the redirect chain of every DOI (and often
+started Selenium for it) on every run, although DOI -> landing page
+mappings hardly ever change. Resolutions are now kept per source URL:
+
+    cache = get_resolution_cache()
+    landing = cache.landing_page(doi_url, lambda: resolve(doi_url))   # "" if known dead
+    pdfs = cache.pdf_urls(doi_url, lambda: discover(landing))
+
+- landing pages are kept for RESOLUTION_TTL_DAYS, discovered PDF URLs for
+  RESOLUTION_PDF_TTL_DAYS
+- dead links (nothing resolved, 404/410 on the landing page) are cached
+  negatively for RESOLUTION_NEGATIVE_TTL_HOURS, so they fail at once;
+  failed lookups (timeouts, unavailable hosts: the resolver returns None)
+  are not cached at all
+- validated on use: an entry that turns out stale (the landing page or
+  a PDF answers 404/410, or now redirects elsewhere) is dropped or
+  corrected by `report_status` / `report_moved`
+- two tiers: an LRU in process memory (RESOLUTION_CACHE_MEMORY entries) in
+  front of the `url_resolution_cache` table, shared by every pipeline
+  process and run; without a database only the memory tier is used
+- `stats` counts the redirect lookups and Selenium launches avoided
+
+Resolvers report the Selenium browsers they started through
+`note_selenium()`, so a hit knows how many launches it saved.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from src.Services.DBservices.ConnectionPool import ConnectionPool, get_pool
+
+logger = logging.getLogger(__name__)
+
+TTL_SECONDS = float(os.getenv("RESOLUTION_TTL_DAYS", "30")) * 86400
+PDF_TTL_SECONDS = float(os.getenv("RESOLUTION_PDF_TTL_DAYS", "7")) * 86400
+NEGATIVE_TTL_SECONDS = float(os.getenv("RESOLUTION_NEGATIVE_TTL_HOURS", "24")) * 3600
+MEMORY_ENTRIES = int(os.getenv("RESOLUTION_CACHE_MEMORY", "10000"))
+
+DEAD_STATUSES = frozenset({404, 410})
+
+
+def is_resolved_url(url: Any) -> bool:
+    """An absolute http(s) URL (the helpers return error strings on failure)."""
+    if not isinstance(url, str):
+        return False
+    parsed = urlparse(url)
+    return parsed.scheme in ("http", "https") and bool(parsed.netloc)
+
+
+class ResolutionCache:
+    def __init__(self, pool: Optional[ConnectionPool] = None, table: str = "url_resolution_cache",
+                 persistent: bool = True, ttl: float = TTL_SECONDS, pdf_ttl: float = PDF_TTL_SECONDS,
+                 negative_ttl: float = NEGATIVE_TTL_SECONDS, memory_entries: int = MEMORY_ENTRIES):
+        self.table = table
+        self.ttl, self.pdf_ttl, self.negative_ttl = ttl, pdf_ttl, negative_ttl
+        self.memory_entries = memory_entries
+        self.persistent = persistent
+        self._pool = pool
+        self._table_ready = False
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._from_cache = set()  # source URLs answered from the cache in this process
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.stats = {"landing_hits": 0, "landing_misses": 0, "pdf_hits": 0, "pdf_misses": 0,
+                      "negative_hits": 0, "redirect_lookups_avoided": 0, "selenium_avoided": 0,
+                      "selenium_launches": 0, "invalidated": 0}
+
+    # --- storage -------------------------------------------------------------
+    @property
+    def pool(self) -> Optional[ConnectionPool]:
+        if not self.persistent:
+            return None
+        if self._pool is None:
+            self._pool = get_pool()
+        return self._pool
+
+    def ensure_table(self) -> bool:
+        if self._table_ready:
+            return True
+        try:
+            with self.pool.cursor("resolution_ensure_table") as cursor:
+                cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    source_url TEXT PRIMARY KEY,
+                    final_url TEXT,
+                    final_expires DOUBLE PRECISION,
+                    final_selenium INTEGER NOT NULL DEFAULT 0,
+                    pdf_urls TEXT,
+                    pdf_expires DOUBLE PRECISION,
+                    pdf_selenium INTEGER NOT NULL DEFAULT 0,
+                    pdf_lookups INTEGER NOT NULL DEFAULT 0,
+                    dead_until DOUBLE PRECISION,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+                """)
+        except Exception as e:
+            # Scraping goes on with the memory tier only
+            logger.warning(f"Resolution cache table unavailable, caching in memory only: {str(e)}")
+            self.persistent = False
+            return False
+        self._table_ready = True
+        return True
+
+    def _load(self, source_url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._memory.get(source_url)
+            if entry is not None:
+                self._memory.move_to_end(source_url)
+                return entry
+        if not self.persistent or not self.ensure_table():
+            return None
+        try:
+            rows = self.pool.fetch_dicts(
+                f"SELECT final_url, final_expires, final_selenium, pdf_urls, pdf_expires, pdf_selenium, pdf_lookups, dead_until "
+                f"FROM {self.table} WHERE source_url = %s", (source_url,), label="resolution_get"
+            )
+        except Exception as e:
+            logger.warning(f"Resolution cache lookup failed for {source_url}: {str(e)}")
+            return None
+        if not rows:
+            return None
+        entry = dict(rows[0])
+        entry["pdf_urls"] = json.loads(entry["pdf_urls"]) if entry.get("pdf_urls") else None
+        self._remember(source_url, entry)
+        return entry
+
+    def _remember(self, source_url: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._memory[source_url] = entry
+            self._memory.move_to_end(source_url)
+            while len(self._memory) > self.memory_entries:
+                evicted, _ = self._memory.popitem(last=False)
+                self._from_cache.discard(evicted)
+
+    def _save(self, source_url: str, **fields) -> None:
+        entry = dict(self._load(source_url) or {})
+        entry.update(fields)
+        self._remember(source_url, entry)
+        if not self.persistent or not self.ensure_table():
+            return
+        columns = ("final_url", "final_expires", "final_selenium", "pdf_urls", "pdf_expires",
+                   "pdf_selenium", "pdf_lookups", "dead_until")
+        values = []
+        for column in columns:
+            value = entry.get(column)
+            if column == "pdf_urls" and value is not None:
+                value = json.dumps(value)
+            values.append(value or 0 if column.endswith(("_selenium", "_lookups")) else value)
+        try:
+            self.pool.execute(f"""
+            INSERT INTO {self.table} (source_url, {', '.join(columns)})
+            VALUES (%s, {', '.join(['%s'] * len(columns))})
+            ON CONFLICT (source_url) DO UPDATE SET
+                {', '.join(f'{c} = EXCLUDED.{c}' for c in columns)}, updated_at = CURRENT_TIMESTAMP
+            """, (source_url, *values), label="resolution_put")
+        except Exception as e:
+            logger.warning(f"Resolution cache write failed for {source_url}: {str(e)}")
+
+    # --- work accounting -----------------------------------------------------
+    def note_selenium(self) -> None:
+        """Called by resolvers right before they start a browser."""
+        self._local.launches = getattr(self._local, "launches", 0) + 1
+        with self._lock:
+            self.stats["selenium_launches"] += 1
+
+    def _run(self, resolver: Callable[[], Any]) -> Tuple[Any, int, int]:
+        """Call `resolver`; returns its value, Selenium launches and redirect lookups."""
+        launches, lookups = getattr(self._local, "launches", 0), getattr(self._local, "lookups", 0)
+        value = resolver()
+        return (value, getattr(self._local, "launches", 0) - launches,
+                getattr(self._local, "lookups", 0) - lookups)
+
+    def _count(self, **increments) -> None:
+        with self._lock:
+            for name, value in increments.items():
+                self.stats[name] += value
+
+    # --- lookups -------------------------------------------------------------
+    def landing_page(self, source_url: str, resolve: Callable[[], Optional[str]]) -> str:
+        """
+        The final landing page of `source_url`, from the cache or `resolve()`.
+        Returns "" for a link known to be dead, and (without caching
+        anything) when `resolve()` returns None because the lookup failed.
+        """
+        now = time.time()
+        entry = self._load(source_url)
+        if entry and (entry.get("dead_until") or 0) > now:
+            self._count(negative_hits=1, redirect_lookups_avoided=1)
+            return ""
+        if entry and entry.get("final_url") and (entry.get("final_expires") or 0) > now:
+            self._count(landing_hits=1, redirect_lookups_avoided=1, selenium_avoided=entry.get("final_selenium") or 0)
+            self._from_cache.add(source_url)
+            return entry["final_url"]
+
+        self._count(landing_misses=1)
+        self._local.lookups = getattr(self._local, "lookups", 0) + 1
+        final_url, launches, _ = self._run(resolve)
+        if final_url is None:
+            # Timeout, host unavailable...: says nothing about the link, try again next time
+            self._from_cache.discard(source_url)
+            return ""
+        if is_resolved_url(final_url):
+            self._save(source_url, final_url=final_url, final_expires=now + self.ttl,
+                       final_selenium=launches, dead_until=None)
+        else:
+            self._save(source_url, final_url=None, dead_until=now + self.negative_ttl)
+        self._from_cache.discard(source_url)
+        return final_url
+
+    def pdf_urls(self, source_url: str, discover: Callable[[], List[str]]) -> List[str]:
+        """PDF URLs found for `source_url`, from the cache or `discover()`."""
+        now = time.time()
+        entry = self._load(source_url)
+        if entry and entry.get("pdf_urls") is not None and (entry.get("pdf_expires") or 0) > now:
+            self._count(pdf_hits=1, selenium_avoided=entry.get("pdf_selenium") or 0,
+                        redirect_lookups_avoided=entry.get("pdf_lookups") or 0)
+            self._from_cache.add(source_url)
+            return list(entry["pdf_urls"])
+
+        self._count(pdf_misses=1)
+        urls, launches, lookups = self._run(discover)
+        urls = [u for u in (urls or []) if is_resolved_url(u)]
+        # Nothing found is remembered for the negative TTL only
+        self._save(source_url, pdf_urls=urls, pdf_selenium=launches, pdf_lookups=lookups,
+                   pdf_expires=now + (self.pdf_ttl if urls else self.negative_ttl))
+        return urls
+
+    # --- validation on use ---------------------------------------------------
+    def report_status(self, source_url: str, status: int, landing: bool = True) -> None:
+        """
+        The landing page (or a PDF) of `source_url` answered `status`. A stale
+        cached entry is dropped; a freshly resolved one that is dead is cached
+        negatively.
+        """
+        if status not in DEAD_STATUSES:
+            return
+        if source_url in self._from_cache:
+            self.invalidate(source_url)
+        elif landing:
+            self._save(source_url, final_url=None, pdf_urls=None, dead_until=time.time() + self.negative_ttl)
+        else:
+            self._save(source_url, pdf_urls=None)
+
+    def report_moved(self, source_url: str, cached_url: str, actual_url: str) -> None:
+        """The cached landing page now redirects to `actual_url`: keep that instead."""
+        if actual_url and actual_url != cached_url and is_resolved_url(actual_url):
+            self._save(source_url, final_url=actual_url, final_expires=time.time() + self.ttl)
+
+    def invalidate(self, source_url: str) -> None:
+        self._count(invalidated=1)
+        self._from_cache.discard(source_url)
+        self._save(source_url, final_url=None, final_expires=None, pdf_urls=None, pdf_expires=None,
+                   dead_until=None)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats)
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._from_cache.clear()
+
+
+_cache: Optional[ResolutionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_resolution_cache() -> ResolutionCache:
+    """Process-wide cache (RESOLUTION_CACHE=memory keeps it out of the database)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResolutionCache(persistent=os.getenv("RESOLUTION_CACHE", "database") != "memory")
+    return _cache
+
+
+def _reset_in_child() -> None:
+    global _cache
+    _cache = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_in_child)
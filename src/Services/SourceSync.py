@@ -0,0 +1,190 @@
+# src/Services/SourceSync.py
+"""
+Incremental source synchronisation with a per-source high-water mark
+
+The harvesters behind ServiceFactory re-fetched every source from scratch
+on each run. SourceSync keeps state per source so periodic runs only pick
+up what is new or changed:
+
+    sync = SourceSync("love", key="id")
+    if sync.has_watermark():
+        delta = sync.walk(fetch_page)          # newest first; stops once pages stop changing
+        sync.commit(delta, {"page_size": 500})
+        upsert_csv("Data/L-OVE/LOVE.csv", delta, key="id")
+    else:
+        ...full harvest...
+        sync.baseline(read_rows(page_files))
+
+- state lives in $SYNC_DIR/<source>.json: the high-water mark (last
+  update date, last id or page cursor, whatever the source offers) and a
+  fingerprint per record key, so changed records are found as well as new
+  ones; fields derived from other services can be left out (`ignore`)
+- a sync with changes writes $SYNC_DIR/<source>/delta_<UTC time>.csv
+- the delta file is written before the state and both are renamed into
+  place, so an interrupted run keeps the previous watermark and is simply
+  repeated
+"""
+
+import hashlib
+import json
+import math
+import os
+import tempfile
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+SYNC_DIR = os.getenv("SYNC_DIR", os.path.join("Data", "sync"))
+SYNC_STOP_PAGES = int(os.getenv("SYNC_STOP_PAGES", "2"))  # unchanged pages in a row that end a walk
+
+
+def _plain(value: Any) -> str:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    text = str(value)
+    # 2021 and 2021.0 (an int column with gaps, written by pandas) are the same value
+    return text[:-2] if text.endswith(".0") and text[:-2].lstrip("-").isdigit() else text
+
+
+def fingerprint(row: Dict[str, Any], ignore: Iterable[str] = ()) -> str:
+    """
+    Content hash of a record. Empty fields don't count, so a row parsed
+    from a page and the same row read back from its CSV agree.
+    """
+    values = {str(k): _plain(v) for k, v in row.items() if k not in ignore}
+    values = {k: v for k, v in values.items() if v != ""}
+    return hashlib.sha1(json.dumps(values, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def read_rows(paths: Iterable[str], chunksize: int = 10000) -> Iterable[Dict[str, str]]:
+    """Rows of CSV files as strings ('' for empty cells), a chunk at a time."""
+    for path in paths:
+        try:
+            for chunk in pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunksize):
+                yield from chunk.to_dict("records")
+        except pd.errors.EmptyDataError:
+            continue
+
+
+def _atomic_write(path: str, write: Callable) -> None:
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as handle:
+            write(handle)
+        os.replace(temporary, path)
+    except BaseException:
+        try:
+            os.unlink(temporary)
+        except OSError:
+            pass
+        raise
+
+
+def upsert_csv(path: str, delta, key: str) -> None:
+    """Replace the rows of the CSV at `path` whose `key` is in `delta` and append the rest."""
+    frame = delta if isinstance(delta, pd.DataFrame) else pd.DataFrame(list(delta))
+    if os.path.exists(path) and os.path.getsize(path):
+        current = pd.read_csv(path, dtype=str, keep_default_na=False)
+        if key in current.columns and key in frame.columns:
+            current = current[~current[key].isin(frame[key].map(_plain))]
+        frame = pd.concat([current, frame], ignore_index=True)
+    _atomic_write(path, lambda handle: frame.to_csv(handle, index=False))
+
+
+class SourceSync:
+    def __init__(self, source: str, key: str, directory: Optional[str] = None,
+                 ignore: Iterable[str] = (), stop_after: int = SYNC_STOP_PAGES):
+        directory = directory or SYNC_DIR
+        self.source = source
+        self.key = key
+        self.ignore = frozenset(ignore)
+        self.stop_after = stop_after
+        self.path = os.path.join(directory, f"{source}.json")
+        self.delta_dir = os.path.join(directory, source)
+        self.state = self._load()
+        self.stats = {"pages": 0, "records": 0, "changed": 0}
+        self._staged: Dict[str, str] = {}
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, encoding="utf-8") as handle:
+                state = json.load(handle)
+        except (OSError, ValueError):
+            state = {}
+        state.setdefault("records", {})
+        return state
+
+    @property
+    def watermark(self) -> Dict[str, Any]:
+        return self.state.get("watermark") or {}
+
+    def has_watermark(self) -> bool:
+        return bool(self.state.get("synced_at"))
+
+    def changed(self, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """The rows that are new or differ from the last sync; their fingerprints are kept for commit()."""
+        known = self.state["records"]
+        result = []
+        for row in rows:
+            self.stats["records"] += 1
+            digest = fingerprint(row, self.ignore)
+            key = _plain(row.get(self.key)) or f"#{digest}"
+            if known.get(key) != digest and self._staged.get(key) != digest:
+                self._staged[key] = digest
+                result.append(row)
+        self.stats["changed"] += len(result)
+        return result
+
+    def walk(self, fetch_page: Callable[[int], Optional[List[Dict[str, Any]]]],
+             first_page: int = 1, last_page: Optional[int] = None, full: bool = False) -> List[Dict[str, Any]]:
+        """
+        Changed rows of fetch_page(first_page), fetch_page(first_page + 1), ...
+        for a source listed newest first. Stops at an empty page, after
+        `last_page`, or after `stop_after` pages in a row without changes
+        (unless `full`: a reconcile of every page, for sources that can't be
+        listed by update time).
+        """
+        delta, unchanged, page = [], 0, first_page
+        while last_page is None or page <= last_page:
+            rows = fetch_page(page)
+            if not rows:
+                break
+            self.stats["pages"] += 1
+            changed = self.changed(rows)
+            delta.extend(changed)
+            unchanged = 0 if changed else unchanged + 1
+            if not full and unchanged >= self.stop_after:
+                break
+            page += 1
+        return delta
+
+    def commit(self, delta=None, watermark: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """
+        Writes `delta` (rows or a DataFrame) to a new delta file, then the
+        state with the new fingerprints and `watermark` merged in. Returns
+        the delta file's path (None if nothing changed).
+        """
+        now = datetime.now(timezone.utc)
+        frame = delta if isinstance(delta, pd.DataFrame) else pd.DataFrame(list(delta or []))
+        path = None
+        if len(frame):
+            path = os.path.join(self.delta_dir, f"delta_{now.strftime('%Y%m%dT%H%M%S%fZ')}.csv")
+            _atomic_write(path, lambda handle: frame.to_csv(handle, index=False))
+
+        state = dict(self.state)
+        state["records"] = {**self.state["records"], **self._staged}
+        state["watermark"] = {**self.watermark, **(watermark or {})}
+        state["synced_at"] = now.isoformat()
+        state["runs"] = self.state.get("runs", 0) + 1
+        state["last_run"] = dict(self.stats, delta=path, delta_rows=len(frame))
+        _atomic_write(self.path, lambda handle: json.dump(state, handle))
+        self.state, self._staged = state, {}
+        return path
+
+    def baseline(self, rows: Iterable[Dict[str, Any]], watermark: Optional[Dict[str, Any]] = None) -> None:
+        """Record the rows of a full harvest as the starting point (no delta file)."""
+        self.changed(rows)
+        self.commit(None, watermark)
@@ -0,0 +1,196 @@
+# src/Services/StreamMerge.py
+"""
+Streaming merge of harvested page files
+
+Cochrane, L·OVE and Ovid saved their pages as separate CSVs and merged
+them by loading every page into pandas and concatenating, so the memory
+needed grew with the size of the harvest. merge_files streams the rows
+instead:
+
+    stats = merge_files(page_files("Data/L-OVE/data_2024-05-01", "love_page_"),
+                        "Data/L-OVE/LOVE.csv", dedupe_doi=True)
+    # {'files': 120, 'skipped': [], 'rows': 59812, 'duplicates': 188, 'columns': 31}
+
+- headers are reconciled up front from the first line of each file: the
+  output has every column in the order first seen, and rows of a page
+  without some column get an empty cell
+- rows are copied as text (no type inference, so a year column with gaps
+  stays 2021, not 2021.0) in batches of MERGE_BATCH rows
+- with `dedupe_doi` only the first row per normalised DOI is kept; the
+  DOIs seen so far live in a temporary SQLite file, not in memory. Rows
+  without a DOI are always kept
+- output ending in .parquet is written as Parquet (string columns, one
+  row group per batch; needs pyarrow), anything else as CSV
+- the output is written to a temporary file and renamed into place, so an
+  interrupted merge leaves the previous output intact
+"""
+
+import csv
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from src.Services.DBservices.BulkIngest import normalise_doi
+from src.Utils.lazy_import import lazy_import
+
+pa = lazy_import("pyarrow")
+pq = lazy_import("pyarrow.parquet")
+
+logger = logging.getLogger(__name__)
+
+MERGE_BATCH = int(os.getenv("MERGE_BATCH", "20000"))
+MERGE_DEDUPE_DOI = os.getenv("MERGE_DEDUPE_DOI", "false").lower() in ("1", "true", "yes")
+
+# Abstracts and author lists can be longer than the csv module's default limit
+csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))
+
+
+def read_header(path: str) -> Optional[List[str]]:
+    """The first line of a CSV file (None if the file is empty or unreadable)."""
+    try:
+        with open(path, encoding="utf-8", newline="") as handle:
+            return next(csv.reader(handle)) or None
+    except (OSError, StopIteration, csv.Error, UnicodeDecodeError):
+        return None
+
+
+class DOIKeySet:
+    """Set of normalised DOIs kept in a SQLite file, for merges too large to hold them in memory."""
+
+    def __init__(self, directory: Optional[str] = None):
+        fd, self.path = tempfile.mkstemp(suffix=".doikeys", dir=directory)
+        os.close(fd)
+        self.db = sqlite3.connect(self.path)
+        # Throwaway file: no journal, no fsync, a small fixed page cache
+        self.db.execute("PRAGMA journal_mode=OFF")
+        self.db.execute("PRAGMA synchronous=OFF")
+        self.db.execute("PRAGMA cache_size=-16384")
+        self.db.execute("CREATE TABLE keys (doi TEXT PRIMARY KEY) WITHOUT ROWID")
+
+    def add(self, doi: str) -> bool:
+        """Adds `doi`; False if it was already there."""
+        return self.db.execute("INSERT OR IGNORE INTO keys VALUES (?)", (doi,)).rowcount == 1
+
+    def close(self) -> None:
+        self.db.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _CsvSink:
+    def __init__(self, path: str, columns: List[str]):
+        self.handle = open(path, "w", encoding="utf-8", newline="")
+        self.writer = csv.writer(self.handle)
+        if columns:
+            self.writer.writerow(columns)
+
+    def write(self, rows: List[List[str]]) -> None:
+        self.writer.writerows(rows)
+
+    def close(self) -> None:
+        self.handle.close()
+
+
+class _ParquetSink:
+    def __init__(self, path: str, columns: List[str]):
+        self.schema = pa.schema([(name, pa.string()) for name in columns])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, rows: List[List[str]]) -> None:
+        arrays = [pa.array([row[i] or None for row in rows], type=pa.string())
+                  for i in range(len(self.schema))]
+        self.writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+def merge_files(paths: Iterable[str], output: str, dedupe_doi: bool = MERGE_DEDUPE_DOI,
+                doi_column: str = "doi", columns: Sequence[str] = (),
+                batch_size: int = MERGE_BATCH) -> Dict[str, object]:
+    """
+    Appends the rows of the CSV files at `paths` (in that order) to a new
+    `output`. `columns` come first in the output, followed by the other
+    columns as they are first seen. `doi_column` is matched ignoring case.
+    """
+    headers = [(path, read_header(path)) for path in paths]
+    skipped = [path for path, header in headers if not header]
+    for path in skipped:
+        logger.warning("Skipping empty or unreadable file %s", path)
+
+    names = list(columns)
+    seen = set(names)
+    for _, header in headers:
+        for name in header or ():
+            if name not in seen:
+                seen.add(name)
+                names.append(name)
+    doi_index = next((i for i, name in enumerate(names) if name.lower() == doi_column.lower()), None)
+    keys = DOIKeySet(os.path.dirname(output) or None) if dedupe_doi and doi_index is not None else None
+
+    stats = {"files": len(headers) - len(skipped), "skipped": skipped, "rows": 0,
+             "duplicates": 0, "columns": len(names)}
+    directory = os.path.dirname(output) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    try:
+        sink = (_ParquetSink if output.endswith(".parquet") else _CsvSink)(temporary, names)
+        try:
+            batch = []
+            for path, header in headers:
+                if not header:
+                    continue
+                position = {name: i for i, name in enumerate(header)}
+                index = [position.get(name) for name in names]
+                width = len(header) if header == names else -1  # rows that can be copied as they are
+                with open(path, encoding="utf-8", newline="") as handle:
+                    reader = csv.reader(handle)
+                    next(reader)
+                    for row in reader:
+                        if not row:
+                            continue
+                        if len(row) == width:
+                            out = row
+                        else:
+                            out = [row[i] if i is not None and i < len(row) else "" for i in index]
+                        if keys is not None:
+                            doi = normalise_doi(out[doi_index])
+                            if doi and not keys.add(doi):
+                                stats["duplicates"] += 1
+                                continue
+                        batch.append(out)
+                        if len(batch) >= batch_size:
+                            sink.write(batch)
+                            stats["rows"] += len(batch)
+                            batch = []
+            if batch:
+                sink.write(batch)
+                stats["rows"] += len(batch)
+        finally:
+            sink.close()
+        os.replace(temporary, output)
+    except BaseException:
+        try:
+            os.unlink(temporary)
+        except OSError:
+            pass
+        raise
+    finally:
+        if keys is not None:
+            keys.close()
+
+    logger.info("Merged %d files into %s: %d rows, %d duplicate DOIs dropped",
+                stats["files"], output, stats["rows"], stats["duplicates"])
+    return stats
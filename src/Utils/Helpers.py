@@ -8,22 +8,30 @@ import requests
 import unicodedata
 import pycountry
 import pandas as pd
-import cloudscraper
 from bs4 import BeautifulSoup
 from pandas import json_normalize
 import xml.etree.ElementTree as ET
 from src.Utils.Reexpr import searchRegEx
 # from PyPDF2 import PdfReader, PdfFileReader, errors
-from pypdf import PdfReader, PdfReader, errors
 from src.Utils.data import population_acronyms
 from src.Utils.Reexpr import pattern_dict_regex
 from urllib.parse import urlparse, parse_qs, urlencode, urljoin
 from src.Utils.ResolvedReturn import ourColumns, preprocessResolvedData
-from src.Services.Factories.Sections.ArticleExtractorFactory import (
-    ArticleExtractorFactory,
-)
-from src.Services.Factories.Sections.PrismaImageScraper import PrismaImageScraper
 import urllib.parse
+from src.Utils.lazy_import import lazy_import
+from src.Services.HttpClient import get_http_client
+from src.Services.CrossrefClient import get_crossref_client
+
+# Scraping/OCR/PDF stacks are only loaded when a scraping helper runs
+cloudscraper = lazy_import("cloudscraper")
+PdfReader = lazy_import("pypdf", "PdfReader")
+errors = lazy_import("pypdf.errors")
+ArticleExtractorFactory = lazy_import(
+    "src.Services.Factories.Sections.ArticleExtractorFactory", "ArticleExtractorFactory"
+)
+PrismaImageScraper = lazy_import(
+    "src.Services.Factories.Sections.PrismaImageScraper", "PrismaImageScraper"
+)
 
 
 def format_text_to_json(content):
@@ -509,6 +517,8 @@ def process_data_valid(data, key="doi"):
             # new_data[column] = data[column_]
     # check if url exist
     if not "full_text_URL" in new_data.columns:
+        # Look the DOIs up concurrently first; getDOI then reads the cache
+        get_crossref_client().works(new_data[key].dropna().astype(str).str.split("doi.org/").str[-1])
         # Apply the getDOI function to the 'doi' column
         result = new_data[key].apply(lambda row: getDOI(row))
 
@@ -687,18 +697,17 @@ def get_region_by_country_name(country_name):
 
 
 def getDOI(doi):
-    # Construct the CrossRef API URL
+    # Crossref record through the shared client (cached on disk, rate limited)
     crossref_api_url = f"https://api.crossref.org/works/{doi}"
+    try:
+        work = get_crossref_client().work(str(doi).split("doi.org/")[-1])
+    except requests.exceptions.RequestException as e:
+        return f"Failed to resolve DOI {doi}. {e}", "None"
 
-    # Send a GET request to the CrossRef API
-    response = requests.get(crossref_api_url)
-
-    # Check if the request was successful (status code 200)
     data_url = ""
     type = ""
-    if response.status_code == 200:
-        # Parse the JSON response
-        data = response.json()
+    if work:
+        data = {"message": work}
 
         if "message" in data and "resource" in data["message"]:
             # Extract the URL from the response
@@ -741,7 +750,7 @@ def getDOI(doi):
         else:
             print("No Links for: " + crossref_api_url)
     else:
-        data_url = f"Failed to resolve DOI {doi}. Status code: {response.status_code}"
+        data_url = f"Failed to resolve DOI {doi}. Not found in Crossref"
         type = "None"
     return data_url, type
 
@@ -1291,6 +1300,8 @@ def get_final_url(url):
     """
     Follows all redirects from a starting URL to find the final destination,
     correctly handling both absolute and relative redirect paths.
+    Returns None when a request fails or the redirects loop, so callers
+    don't mistake the starting URL (or a hop) for the landing page.
     """
     # Use a set to detect redirect loops
     visited_urls = set()
@@ -1304,14 +1315,14 @@ def get_final_url(url):
                 #  print(f"An error occurred: Invalid URL '{url}': No scheme or host supplied.")
                  return url # Return the invalid URL for upstream handling
 
-            response = requests.get(url, allow_redirects=False, timeout=10)
+            response = get_http_client().get(url, allow_redirects=False, timeout=10)
 
             # Check for redirect status codes
             if response.status_code in (301, 302, 303, 307, 308):
                 new_location = response.headers.get("Location")
                 if not new_location:
                     # No Location header, stop here
-                    break
+                    return url
                 
                 # Use urljoin to handle both absolute and relative paths
                 url = urljoin(url, new_location)
@@ -1320,13 +1331,12 @@ def get_final_url(url):
                 # Not a redirect, we are at the final URL
                 return url
         
-        # If we break the loop (e.g., due to a redirect loop)
-        print(f"Redirect loop detected or final URL reached: {url}")
-        return url
+        print(f"Redirect loop detected: {url}")
+        return None
 
     except requests.exceptions.RequestException as e:
         print(f"An error occurred during request: {e}")
-        return url 
+        return None
     
 
 def guess_host(relative_path):
@@ -1343,7 +1353,8 @@ def guess_host(relative_path):
         test_url = host + relative_path
         try:
             # Check if the URL is valid and accessible
-            response = requests.head(test_url, allow_redirects=True, timeout=5)
+            # probing; a miss is expected, so no retries
+            response = get_http_client().head(test_url, allow_redirects=True, timeout=5, retries=0)
             if response.status_code == 200:
                 return test_url
         except requests.RequestException:
@@ -1354,11 +1365,11 @@ def guess_host(relative_path):
     )
 
 
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from webdriver_manager.chrome import ChromeDriverManager
+webdriver = lazy_import("selenium.webdriver")
+Service = lazy_import("selenium.webdriver.chrome.service", "Service")
+By = lazy_import("selenium.webdriver.common.by", "By")
+Options = lazy_import("selenium.webdriver.chrome.options", "Options")
+ChromeDriverManager = lazy_import("webdriver_manager.chrome", "ChromeDriverManager")
 
 
 def extract_pdf_links(url, headless=True):
@@ -1673,8 +1684,7 @@ def clean_special_characters(text):
     return text
 
 
-import undetected_chromedriver as uc
-from selenium.webdriver.common.by import By
+uc = lazy_import("undetected_chromedriver")
 import json
 import time
 
@@ -1693,8 +1703,8 @@ def load_cookies(driver, cookies_file):
             driver.add_cookie(cookie)
 
 
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+WebDriverWait = lazy_import("selenium.webdriver.support.ui", "WebDriverWait")
+EC = lazy_import("selenium.webdriver.support.expected_conditions")
 
 
 def fetch_all_content_for_linked(url, cookies_file):
@@ -1781,7 +1791,9 @@ def process_prisma_images(soup, url):
     return None
 
 
-from src.Services.Factories.Sections.DocumentExtractor import DocumentExtractor
+DocumentExtractor = lazy_import(
+    "src.Services.Factories.Sections.DocumentExtractor", "DocumentExtractor"
+)
 
 
 def get_contents(url):
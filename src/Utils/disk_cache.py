@@ -0,0 +1,92 @@
+# src/Utils/disk_cache.py
+"""
+JSON response cache on local disk
+
+Keeps API responses between runs (and between processes on one machine)
+so re-running an enrichment or open-access pass doesn't ask the services
+again:
+
+    cache = DiskCache("openalex")                   # $API_CACHE_DIR/openalex/
+    data = cache.get(doi)
+    if data is DiskCache.MISSING:
+        data = fetch(doi)
+        cache.set(doi, data)                        # negative=True for "not found"
+
+- one file per key, under a two-level sha1 fan-out (ab/cd/<sha1>.json)
+- entries expire after API_CACHE_TTL_DAYS (found) or
+  API_CACHE_NEGATIVE_TTL_HOURS (not found)
+- writes go to a temporary file that is renamed into place, so readers
+  never see a partial entry and concurrent writers don't corrupt it
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, Optional
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+CACHE_DIR = os.getenv("API_CACHE_DIR", os.path.join("Data", "cache"))
+TTL_SECONDS = float(os.getenv("API_CACHE_TTL_DAYS", "30")) * 86400
+NEGATIVE_TTL_SECONDS = float(os.getenv("API_CACHE_NEGATIVE_TTL_HOURS", "24")) * 3600
+
+
+class DiskCache:
+    MISSING = object()
+
+    def __init__(self, namespace: str, directory: Optional[str] = None,
+                 ttl: float = TTL_SECONDS, negative_ttl: float = NEGATIVE_TTL_SECONDS):
+        self.directory = os.path.join(directory or CACHE_DIR, namespace)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest[2:4], f"{digest}.json")
+
+    def get(self, key: str) -> Any:
+        """The cached value, or DiskCache.MISSING if absent or expired."""
+        try:
+            with open(self._path(key), "rb") as handle:
+                entry = orjson.loads(handle.read()) if orjson is not None else json.load(handle)
+        except (OSError, ValueError):
+            self.misses += 1
+            return self.MISSING
+        if entry.get("expires", 0) < time.time() or entry.get("key") != key:
+            self.misses += 1
+            return self.MISSING
+        self.hits += 1
+        return entry.get("value")
+
+    def set(self, key: str, value: Any, negative: bool = False) -> None:
+        path = self._path(key)
+        entry = {"key": key, "value": value,
+                 "expires": time.time() + (self.negative_ttl if negative else self.ttl)}
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                if orjson is not None:
+                    handle.write(orjson.dumps(entry, default=str))
+                else:
+                    handle.write(json.dumps(entry, default=str).encode("utf-8"))
+            os.replace(temporary, path)
+        except BaseException:
+            try:
+                os.unlink(temporary)
+            except OSError:
+                pass
+            raise
+
+    def delete(self, key: str) -> None:
+        try:
+            os.unlink(self._path(key))
+        except OSError:
+            pass
@@ -0,0 +1,39 @@
+# src/Utils/json_provider.py
+"""
+Fast JSON provider for Flask responses
+
+Uses orjson when it is installed and falls back to Flask's standard
+provider otherwise (or for anything orjson cannot encode, e.g. ints
+wider than 64 bit). Dates keep Flask's HTTP-date format because they are
+passed through to the same `default` hook Flask uses.
+"""
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """DefaultJSONProvider with an orjson fast path for dumps()."""
+
+    _FAST_KWARGS = {'separators', 'indent'}
+
+    def dumps(self, obj, **kwargs) -> str:
+        if orjson is None or not self._FAST_KWARGS.issuperset(kwargs) \
+                or kwargs.get('indent') not in (None, 2):
+            return super().dumps(obj, **kwargs)
+
+        option = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+                  | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS)
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+
+        try:
+            return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+        except TypeError:
+            return super().dumps(obj, **kwargs)
@@ -0,0 +1,91 @@
+# src/Utils/lazy_import.py
+"""
+Lazy imports for heavy optional stacks
+
+The web process imports every route module, and through them the ML
+(transformers, spaCy, torch), scraping (Selenium, cloudscraper, PyMuPDF)
+and charting (Altair, matplotlib) stacks, although read-only API workers
+never touch them. These proxies defer the real import to first use:
+
+    alt = lazy_import('altair')                        # import altair as alt
+    By = lazy_import('selenium.webdriver.common.by', 'By')  # from ... import By
+
+Attribute access, calls and isinstance/issubclass checks go to the real
+object once it is loaded. A missing package only raises (ImportError) when
+the code path that needs it runs.
+"""
+
+import importlib
+import sys
+import threading
+from typing import Any, Optional
+
+_lock = threading.RLock()
+
+
+class LazyObject:
+    """Stand-in for a module (or a name inside one) imported on first use."""
+
+    __slots__ = ('_lazy_module', '_lazy_attribute', '_lazy_target')
+
+    def __init__(self, module: str, attribute: Optional[str] = None):
+        object.__setattr__(self, '_lazy_module', module)
+        object.__setattr__(self, '_lazy_attribute', attribute)
+        object.__setattr__(self, '_lazy_target', None)
+
+    def _load(self) -> Any:
+        target = object.__getattribute__(self, '_lazy_target')
+        if target is None:
+            with _lock:
+                target = object.__getattribute__(self, '_lazy_target')
+                if target is None:
+                    target = importlib.import_module(object.__getattribute__(self, '_lazy_module'))
+                    attribute = object.__getattribute__(self, '_lazy_attribute')
+                    if attribute:
+                        target = getattr(target, attribute)
+                    object.__setattr__(self, '_lazy_target', target)
+        return target
+
+    @property
+    def is_loaded(self) -> bool:
+        return object.__getattribute__(self, '_lazy_target') is not None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._load(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._load(), name, value)
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+    def __instancecheck__(self, instance) -> bool:
+        return isinstance(instance, self._load())
+
+    def __subclasscheck__(self, subclass) -> bool:
+        return issubclass(subclass, self._load())
+
+    def __getitem__(self, key):
+        return self._load()[key]
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __repr__(self) -> str:
+        module = object.__getattribute__(self, '_lazy_module')
+        attribute = object.__getattribute__(self, '_lazy_attribute')
+        state = 'loaded' if self.is_loaded else 'not loaded'
+        name = f"{module}.{attribute}" if attribute else module
+        return f"<lazy {name} ({state})>"
+
+
+def lazy_import(module: str, attribute: Optional[str] = None) -> Any:
+    """
+    Return `module` (or `module.attribute`) without importing it yet.
+
+    Already imported modules are returned directly.
+    """
+    loaded = sys.modules.get(module)
+    if loaded is not None:
+        return getattr(loaded, attribute) if attribute else loaded
+    return LazyObject(module, attribute)
@@ -0,0 +1,250 @@
+# src/Utils/logging_setup.py
+"""
+Non-blocking, structured logging
+
+The ingestion and update loops used to print (and log) once per row,
+writing synchronously to stdout and the rotating log files from the loop
+itself. After `setup_logging()`:
+
+- the root logger only has a QueueHandler; the real handlers (console,
+  files) run in a QueueListener thread, so a log call costs a queue put
+- records are written as JSON lines (LOG_FORMAT=json, the default) or
+  plain text (LOG_FORMAT=text); `extra=` fields are kept as keys
+- levels can be set per module: LOG_LEVELS="src.Commands=WARNING,src.Services.DBservices=DEBUG"
+- a message repeated from the same call site is emitted at most
+  LOG_RATE_LIMIT times per LOG_RATE_WINDOW seconds; the next one that
+  gets through carries the number suppressed
+- `BatchSummary` counts per-row outcomes and logs one line per batch;
+  summaries are already aggregated, so the rate limit never drops them
+
+    summary = BatchSummary(logger, "update_columns", table="all_db")
+    for row in rows:
+        summary.add("updated", record_id)
+    summary.log()        # {"msg": "update_columns: 1000 rows", "updated": 1000, "rows_per_s": ...}
+"""
+
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter, defaultdict
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+_target: Optional[logging.Logger] = None
+_setup_lock = threading.Lock()
+
+
+class StructuredFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message and extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts":     round(record.created, 3),
+            "level":  record.levelname,
+            "logger": record.name,
+            "msg":    record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        if orjson is not None:
+            try:
+                return orjson.dumps(entry, default=str).decode("utf-8")
+            except TypeError:
+                pass
+        return json.dumps(entry, default=str)
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets at most `limit` records per call site (logger, file, line) through
+    per `window` seconds. Errors and above, and batch summaries, are never
+    dropped.
+    """
+
+    def __init__(self, limit: int = 20, window: float = 60.0):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self._sites: Dict[tuple, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR or getattr(record, "_batch_summary", False):
+            return True
+        site = (record.name, record.pathname, record.lineno)
+        with self._lock:
+            started, count, suppressed = self._sites.get(site, (record.created, 0, 0))
+            if record.created - started >= self.window:
+                started, count = record.created, 0
+            if count >= self.limit:
+                self._sites[site] = (started, count, suppressed + 1)
+                return False
+            self._sites[site] = (started, count + 1, 0)
+        if suppressed:
+            record.suppressed = suppressed
+            record.msg = f"{record.msg} [{suppressed} similar messages suppressed]"
+        return True
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that keeps `extra=` fields and exception text on the queued record."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.message = record.getMessage()
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+
+def parse_module_levels(spec: str) -> Dict[str, int]:
+    """"a.b=DEBUG,c=WARNING" -> {"a.b": 10, "c": 30}; unknown levels are ignored."""
+    levels = {}
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        name, _, level = item.partition("=")
+        value = logging.getLevelName(level.strip().upper())
+        if name.strip() and isinstance(value, int):
+            levels[name.strip()] = value
+    return levels
+
+
+def setup_logging(level: Optional[str] = None, module_levels: Optional[Dict[str, Any]] = None,
+                  structured: Optional[bool] = None, rate_limit: Optional[int] = None,
+                  rate_window: Optional[float] = None, logger: Optional[logging.Logger] = None) -> QueueListener:
+    """
+    Move the handlers of `logger` (the root logger by default) behind a
+    queue. Safe to call more than once; later calls only update levels
+    until `stop_logging()`.
+    """
+    global _listener, _queue_handler, _target
+    target = logger or logging.getLogger()
+    level = level or os.getenv("LOG_LEVEL")
+    structured = os.getenv("LOG_FORMAT", "json").lower() == "json" if structured is None else structured
+    rate_limit = int(os.getenv("LOG_RATE_LIMIT", "20")) if rate_limit is None else rate_limit
+    rate_window = float(os.getenv("LOG_RATE_WINDOW", "60")) if rate_window is None else rate_window
+
+    if level:
+        target.setLevel(level.upper() if isinstance(level, str) else level)
+    levels = parse_module_levels(os.getenv("LOG_LEVELS", ""))
+    levels.update(module_levels or {})
+    for name, value in levels.items():
+        logging.getLogger(name).setLevel(value)
+
+    with _setup_lock:
+        if _listener is not None:
+            return _listener
+
+        handlers = [h for h in target.handlers if not isinstance(h, QueueHandler)] or [logging.StreamHandler()]
+        for handler in handlers:
+            target.removeHandler(handler)
+            if structured:
+                handler.setFormatter(StructuredFormatter())
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = _NonBlockingQueueHandler(log_queue)
+        if rate_limit:
+            queue_handler.addFilter(RateLimitFilter(rate_limit, rate_window))
+        target.addHandler(queue_handler)
+
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        _queue_handler, _target = queue_handler, target
+        atexit.register(stop_logging)
+        return _listener
+
+
+def stop_logging() -> None:
+    """Flush the queue, stop the listener thread and give the handlers back to the logger."""
+    global _listener, _queue_handler, _target
+    with _setup_lock:
+        if _listener is None:
+            return
+        _target.removeHandler(_queue_handler)
+        _listener.stop()
+        for handler in _listener.handlers:
+            _target.addHandler(handler)
+        _listener = _queue_handler = _target = None
+
+
+def _restart_in_child() -> None:
+    """A forked child (Celery prefork, gunicorn) gets its own queue and listener thread."""
+    global _listener
+    if _listener is None:
+        return
+    log_queue = queue.SimpleQueue()
+    _queue_handler.queue = log_queue
+    _listener = QueueListener(log_queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_in_child)
+
+
+class BatchSummary:
+    """
+    Counts per-row outcomes of a batch and logs them as one record.
+    Keeps the first few ids of every outcome for troubleshooting.
+    """
+
+    def __init__(self, logger: logging.Logger, operation: str, level: int = logging.INFO,
+                 sample_size: int = 5, **fields):
+        self.logger = logger
+        self.operation = operation
+        self.level = level
+        self.sample_size = sample_size
+        self.fields = fields
+        self.counts: Counter = Counter()
+        self.samples: Dict[str, list] = defaultdict(list)
+        self.started = time.perf_counter()
+
+    def add(self, outcome: str, record_id: Any = None, count: int = 1) -> None:
+        self.counts[outcome] += count
+        if record_id is not None and len(self.samples[outcome]) < self.sample_size:
+            self.samples[outcome].append(record_id)
+
+    def extend(self, outcome: str, record_ids: Iterable[Any]) -> None:
+        for record_id in record_ids:
+            self.add(outcome, record_id)
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def log(self, message: Optional[str] = None, level: Optional[int] = None) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.started
+        summary = {
+            **self.fields,
+            **self.counts,
+            "rows": self.total,
+            "elapsed_s": round(elapsed, 3),
+            "rows_per_s": round(self.total / elapsed, 1) if elapsed > 0 else None,
+        }
+        if self.samples:
+            summary["sample_ids"] = {k: [str(i) for i in v] for k, v in self.samples.items()}
+        outcomes = ", ".join(f"{count} {outcome}" for outcome, count in self.counts.items()) or "nothing to do"
+        # stacklevel: the record points at the caller, not at this line
+        self.logger.log(level or self.level, message or f"{self.operation}: {self.total} rows ({outcomes})",
+                        extra={**summary, "_batch_summary": True}, stacklevel=2)
+        return summary
@@ -6,6 +6,7 @@ Standardized API Response Handler
 from flask import jsonify
 from typing import Dict, Any, Optional, List
 from flask import jsonify, make_response
+from src.middlewares.record_processor_middleware import jsonify_records
 
 
 class ApiResponse:
@@ -29,7 +30,7 @@ class ApiResponse:
             'message': message,
             'data': data
         }
-        return make_response(jsonify(response), status_code)
+        return jsonify_records(response, status_code)
     
     @staticmethod
     def error(message: str = "Error occurred", errors: Any = None, status_code: int = 400) -> tuple:
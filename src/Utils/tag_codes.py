@@ -0,0 +1,34 @@
+from typing import Any, List
+
+
+def parse_tag_codes(value: Any) -> List[str]:
+    """
+    Parse hash field values to extract tag codes.
+
+    Shared by the SQL filter search and the facet index, so both read tags
+    the same way.
+
+    Examples:
+    - "influenza:infl" → ["infl"]
+    - "HPV:hpv; Human papillomavirus:hpv" → ["hpv"]
+    - "death:dea; mortality:dea" → ["dea"]
+    """
+    if not value or not isinstance(value, str):
+        return []
+
+    tag_codes = set()
+
+    # Split by semicolon first (handles multiple entries)
+    for part in value.split(';'):
+        part = part.strip()
+
+        # Look for "text:code" pattern
+        if ':' not in part:
+            continue
+        tag_code = part.split(':')[-1].strip()
+
+        # Only add valid tag codes (short, not just numbers)
+        if tag_code and len(tag_code) <= 10 and not tag_code.replace('_', '').isdigit():
+            tag_codes.add(tag_code)
+
+    return list(tag_codes)
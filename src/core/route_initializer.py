@@ -2,6 +2,7 @@ from flask import Flask, Blueprint
 from flask_restful import Api
 from src.Journals.routes import journal_routes
 from src.Pages.routes import pages_routes
+from src.middlewares.record_processor_middleware import output_json
 
 class RouteInitialization:
     def __init__(self):
@@ -25,6 +26,8 @@ class RouteInitialization:
     def init_app(self, flask_app: Flask):
         for blueprint in self.blueprints:
             init_route = Api(blueprint.get("blueprint"))
+            # Add artificial record columns while serialising, not after
+            init_route.representations['application/json'] = output_json
             blueprint.get("register_callback")(init_route)
             flask_app.register_blueprint(blueprint.get("blueprint"), url_prefix=blueprint.get("url_prefix"))
 
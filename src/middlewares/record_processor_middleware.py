@@ -2,7 +2,7 @@
 """
 Middleware to automatically add artificial columns to all API responses.
 """
-from flask import request, jsonify
+from flask import request, jsonify, make_response
 from src.Services.DBservices.RecordProcessor import RecordProcessor
 import logging
 
@@ -12,6 +12,9 @@ logger = logging.getLogger(__name__)
 class RecordProcessorMiddleware:
     """Automatically processes records in API responses."""
     
+    # Set on responses whose records were processed before serialisation
+    PROCESSED_ATTR = 'records_processed'
+    
     def __init__(self, app=None):
         self.processor = RecordProcessor(include_empty=False)
         if app:
@@ -21,8 +24,24 @@ class RecordProcessorMiddleware:
         """Initialize middleware with Flask app."""
         app.after_request(self.process_response)
     
+    def prepare_payload(self, data) -> bool:
+        """
+        Serialisation-time hook: add artificial columns to a response payload
+        before it is turned into JSON, so the body is built only once.
+        """
+        if data and isinstance(data, dict):
+            try:
+                return self._process_data(data)
+            except Exception as e:
+                logger.warning(f"Error in RecordProcessorMiddleware.prepare_payload: {e}")
+        return False
+    
     def process_response(self, response):
         """Process response and add artificial columns."""
+        # Already handled by the serialisation hook: skip the re-parse.
+        if getattr(response, self.PROCESSED_ATTR, False):
+            return response
+        
         try:
             if response.status_code == 200 and response.is_json:
                 data = response.get_json()
@@ -85,4 +104,27 @@ class RecordProcessorMiddleware:
             return value
         if isinstance(value, str):
             return [v.strip() for v in value.split(',') if v.strip()]
-        return []
\ No newline at end of file
+        return []
+
+
+# Shared instance used by the serialisation hooks below
+record_processor_middleware = RecordProcessorMiddleware()
+
+
+def jsonify_records(payload, status_code: int = 200):
+    """
+    Build a JSON response with artificial columns added before serialisation.
+    The response is marked so the after_request pass does not re-parse it.
+    """
+    if status_code == 200:
+        record_processor_middleware.prepare_payload(payload)
+    response = make_response(jsonify(payload), status_code)
+    setattr(response, RecordProcessorMiddleware.PROCESSED_ATTR, True)
+    return response
+
+
+def output_json(data, code, headers=None):
+    """flask-restful JSON representation that applies the serialisation hook."""
+    response = jsonify_records(data, code)
+    response.headers.extend(headers or {})
+    return response
@@ -106,6 +106,37 @@ class ModelRegistry:
             logger.error(f"Failed to reflect '{table_name}': {str(e)}", exc_info=True)
             raise
     
+    def register_table(self, table) -> Type:
+        """
+        Register a model for a Table that was not reflected (schema snapshot).
+        
+        Args:
+            table: SQLAlchemy Table
+            
+        Returns:
+            Model class
+        """
+        model_class = self.reflector.load_table(table)
+        self.models[model_class.__name__] = model_class
+        self._table_map[table.name] = model_class.__name__
+        return model_class
+    
+    def refresh(self, table_name: str) -> Type:
+        """
+        Reflect a table again (schema changed) and swap the registered model.
+        
+        Args:
+            table_name: Table name to reflect
+            
+        Returns:
+            New model class
+        """
+        self.reflector._reflected_models.pop(table_name, None)
+        model_class = self.reflect(table_name)
+        self._repositories.pop(table_name, None)
+        self._repositories.pop(model_class.__name__, None)
+        return model_class
+    
     def reflect_many(self, table_names: List[str]) -> Dict[str, Type]:
         """
         Reflect and register multiple tables.
@@ -0,0 +1,117 @@
+import os
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from celery import Celery
+from celery.contrib.testing.worker import start_worker
+from flask import Flask
+from flask_restful import Api
+from kombu import Queue
+from werkzeug.datastructures import MultiDict
+from src.Journals.views import tasks, task_status_api
+from src.Journals.views.task_index import TaskIndex
+from src.Journals.views.paper_processor_api import PaperProcessorExecute
+from src.Journals.views.task_status_api import TaskStatusAPI, TaskResultDownloadAPI
+from src.Services.Factories.Sections.SectionExtractor import SectionExtractor
+
+"""
+    Tests for the asynchronous PaperProcessorExecute endpoint
+"""
+SUBMISSIONS = int(os.getenv("EXECUTE_BENCH_SUBMISSIONS", "16"))
+PAPERS = int(os.getenv("EXECUTE_BENCH_PAPERS", "5"))
+PAPER_SECONDS = float(os.getenv("EXECUTE_BENCH_PAPER_SECONDS", "0.1"))
+
+
+class StubTagger:
+    tagged = []
+
+    def load_document(self, text):
+        time.sleep(PAPER_SECONDS)  # spaCy / regex tagging stand-in
+        StubTagger.tagged.append(text)
+        self.sections = SectionExtractor(text)  # what Tagging.load_document sets
+
+    def extract_last_literature_search_dates(self):
+        return ["2020"]
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(tasks, "Tagging", StubTagger)
+    monkeypatch.setattr(tasks, "get_worker_tagger", StubTagger)
+    monkeypatch.setattr(tasks, "EXECUTE_OUTPUT_DIR", str(tmp_path))
+    monkeypatch.setattr(task_status_api, "EXECUTE_OUTPUT_DIR", str(tmp_path))
+    StubTagger.tagged = []
+
+    celery = Celery("execute-tests", broker="memory://", backend="cache+memory://")
+    celery.conf.task_queues = (Queue("interactive"), Queue("bulk"))
+    celery.conf.task_default_queue = "interactive"
+    celery.conf.broker_transport_options = {"polling_interval": 0.005}
+    celery.set_current()
+    celery.set_default()  # submissions come from other threads
+    monkeypatch.setattr(task_status_api, "celery", celery)
+    monkeypatch.setattr(task_status_api, "_task_index", TaskIndex())
+
+    app = Flask(__name__)
+    api = Api(app)
+    api.add_resource(PaperProcessorExecute, '/api/process-papers')
+    api.add_resource(TaskStatusAPI, '/api/tasks/<string:task_id>')
+    api.add_resource(TaskResultDownloadAPI, '/api/tasks/<string:task_id>/download')
+    yield app.test_client(), celery
+    # The memory broker is shared by the whole process: drop anything left
+    # queued so a later test's worker doesn't run it without the stubs
+    celery.control.purge()
+
+
+def occupancy(client, mode):
+    """Mean time a web worker spends on one submission of PAPERS papers."""
+    contexts = [f"paper {i}" for i in range(PAPERS)]
+
+    def submit(_):
+        started = time.perf_counter()
+        if mode == 'sync':
+            # the synchronous endpoint tags one context per request
+            forms = [MultiDict([('context', context), ('lastSearch', '1'), ('mode', mode)]) for context in contexts]
+        else:
+            forms = [MultiDict([('context', context) for context in contexts] + [('lastSearch', '1')])]
+        responses = [client.post('/api/process-papers', data=form) for form in forms]
+        return time.perf_counter() - started, responses
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        outcomes = list(pool.map(submit, range(SUBMISSIONS)))
+    return sum(elapsed for elapsed, _ in outcomes) / SUBMISSIONS, [r for _, rs in outcomes for r in rs]
+
+
+def test_execute_returns_task_id_and_serves_result(client):
+    client, celery = client
+    sync_busy, sync_responses = occupancy(client, 'sync')
+    assert all(r.status_code == 200 for r in sync_responses)
+    assert len(StubTagger.tagged) == SUBMISSIONS * PAPERS  # tagged inside the request
+
+    StubTagger.tagged = []
+    async_busy, async_responses = occupancy(client, 'async')
+    print(f"web worker time per submission of {PAPERS} papers: "
+          f"{sync_busy * 1000:.1f} ms sync vs {async_busy * 1000:.1f} ms async")
+    # No worker is running yet: every submission was answered before any tagging
+    assert all(r.status_code == 202 for r in async_responses)
+    assert StubTagger.tagged == []
+
+    task_ids = [r.get_json()['data']['task_id'] for r in async_responses]
+    task_id = task_ids[0]
+    pending = client.get(f'/api/tasks/{task_id}/download')
+    assert pending.status_code == 202
+
+    with start_worker(celery, pool="threads", concurrency=4, perform_ping_check=False,
+                      queues=["interactive", "bulk"], loglevel="WARNING"):
+        started = time.perf_counter()
+        while (any(celery.AsyncResult(i).state != "SUCCESS" for i in task_ids)
+               and time.perf_counter() - started < 60):
+            time.sleep(0.02)
+
+    assert all(celery.AsyncResult(i).state == "SUCCESS" for i in task_ids)
+    assert len(StubTagger.tagged) == SUBMISSIONS * PAPERS
+    status = client.get(f'/api/tasks/{task_id}').get_json()['data']
+    assert status['papers'] == PAPERS and status['failed'] == 0
+    download = client.get(f'/api/tasks/{task_id}/download')
+    assert download.status_code == 200
+    results = download.get_json()
+    assert len(results) == PAPERS and results[0]['tagging_results'] == {'lastSearch': ['2020']}
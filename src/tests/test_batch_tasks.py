@@ -0,0 +1,99 @@
+import os
+import time
+import threading
+import pytest
+from celery import Celery
+from celery.contrib.testing.worker import start_worker
+from kombu import Queue
+from src.Journals.views import batch_tasks
+
+"""
+    Tests for the coordinator / per-batch / aggregation task topology
+"""
+BATCHES = int(os.getenv("BATCH_BENCH_BATCHES", "40"))
+BATCH_SECONDS = float(os.getenv("BATCH_BENCH_SECONDS", "0.05"))
+
+
+class StubPipeline:
+    completed = []
+
+    def __init__(self, table_name, column_mapping):
+        pass
+
+    def pending_id_batches(self, query, db_name, batch_size=100):
+        return [list(range(start, start + batch_size)) for start in range(1, BATCHES * batch_size, batch_size)]
+
+    def update_tracker(self, db_handler, db_name, *args, status="in_progress"):
+        StubPipeline.completed.append((db_name, status))
+
+
+def fake_batch(batch_ids, query, csv_file_path, db_name):
+    time.sleep(BATCH_SECONDS)  # scraping + tagging stand-in
+    return {"processed": len(batch_ids) - 1, "failed": 1}
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(batch_tasks, "PaperProcessorPipeline", StubPipeline)
+    monkeypatch.setattr(batch_tasks, "DatabaseHandler", lambda *args: None)
+    monkeypatch.setattr(batch_tasks, "run_tag_batch", fake_batch)
+    app = Celery("batch-tests", broker="memory://", backend="cache+memory://")
+    app.conf.task_queues = (Queue("interactive"), Queue("bulk"))
+    app.conf.task_default_queue = "interactive"
+    app.conf.broker_transport_options = {"polling_interval": 0.005}
+    # The in-memory transport only refills prefetch every 2 s; keep it out of the measurement
+    app.conf.worker_prefetch_multiplier = 100
+    app.set_current()
+    return app
+
+
+def run_source(app, workers):
+    StubPipeline.completed.clear()
+    with start_worker(app, pool="threads", concurrency=workers, perform_ping_check=False,
+                      queues=["interactive", "bulk"], loglevel="WARNING"):
+        started = time.perf_counter()
+        parent = app.tasks["tag_source_task"].apply_async(args=["SELECT 1", "out.csv", "Bench"])
+        while parent.state != "SUCCESS" and time.perf_counter() - started < 60:
+            time.sleep(0.02)
+        return parent, time.perf_counter() - started
+
+
+def test_batches_fan_out_and_aggregate_into_coordinator(app):
+    rates = {}
+    for workers in (1, 4, 8):
+        parent, elapsed = run_source(app, workers)
+        rates[workers] = BATCHES / elapsed * 60
+        assert parent.state == "SUCCESS"
+        assert parent.result["batches"] == BATCHES and parent.result["failed"] == BATCHES
+        assert StubPipeline.completed == [("Bench", "completed")]
+    print("batches/min by workers: " + ", ".join(f"{w}: {r:,.0f}" for w, r in rates.items()))
+    assert rates[8] > rates[1] * 2
+
+
+def test_deferred_records_are_waited_for_by_the_coordinator(app, monkeypatch):
+    seen, lock = set(), threading.Lock()
+
+    def deferring_batch(batch_ids, query, csv_file_path, db_name):
+        # Every tenth record's host is unavailable the first time; record 1's always is
+        with lock:
+            deferred = [i for i in batch_ids if i == 1 or (i % 10 == 0 and i not in seen)]
+            seen.update(deferred)
+        return {"processed": len(batch_ids) - len(deferred), "failed": 0,
+                "deferred_ids": deferred, "retry_in": 0.0}
+
+    monkeypatch.setattr(batch_tasks, "run_tag_batch", deferring_batch)
+    monkeypatch.setattr(batch_tasks, "AGGREGATE_POLL_SECONDS", 0.05)
+    parent, _ = run_source(app, 8)
+
+    assert parent.state == "SUCCESS"
+    # 40 batches, 40 follow-ups, then record 1 alone for the remaining rounds
+    assert parent.result["batches"] == 2 * BATCHES + batch_tasks.HOST_DEFER_ROUNDS - 1
+    assert parent.result["processed"] == BATCHES * 100 - 1
+    assert parent.result["failed"] == 0 and parent.result["deferred"] == 1
+    assert StubPipeline.completed == [("Bench", "completed")]
+
+
+def test_tasks_are_routed_to_their_queues():
+    assert batch_tasks.tag_batch_task.queue == "bulk"
+    assert batch_tasks.tag_source_task.queue == "interactive"
+    assert batch_tasks.tag_batch_task.acks_late
@@ -0,0 +1,182 @@
+import os
+import time
+import pytest
+import threading
+import numpy as np
+from contextlib import contextmanager
+import pandas as pd
+from src.Services.DBservices.BulkIngest import BulkIngest, normalise_doi, INGEST_COLUMNS
+
+"""
+    Tests for server-side DOI de-duplication on ingest
+"""
+EXISTING_ROWS = int(os.getenv("INGEST_BENCH_EXISTING", "1000000"))
+UPLOAD_ROWS = int(os.getenv("INGEST_BENCH_UPLOAD", "100000"))
+TABLE = "bulk_ingest_test"
+
+
+def upload_frame(dois):
+    return pd.DataFrame({
+        "Authors": "A. Author", "Year": 2021.0, "Title": [f"Title {d}" for d in dois], "DOI": dois,
+        "Open Access": "yes", "Abstract": "", "Id": range(len(dois)), "Source": "upload",
+        "Language": "en", "Country": "DE", "Database": "upload", "Journal": "J",
+    })
+
+
+def test_normalise_doi():
+    assert normalise_doi(" https://doi.org/10.1000/ABC ") == "10.1000/abc"
+    assert normalise_doi("doi: 10.1000/abc") == "10.1000/abc"
+    assert normalise_doi(float("nan")) == "" and normalise_doi(None) == ""
+
+
+def test_prepare_maps_upload_columns_and_values():
+    ingest = BulkIngest.__new__(BulkIngest)
+    ingest.columns = list(INGEST_COLUMNS)
+    frame = upload_frame(["10.1/a", None])
+    frame.loc[1, "Year"] = np.nan
+    rows = ingest._prepare(frame)
+    assert rows[0][:4] == ("A. Author", 2021, "Title 10.1/a", "10.1/a")
+    assert rows[1][1] is None and rows[1][3] is None
+
+    with pytest.raises(ValueError):
+        ingest._prepare(frame.drop(columns=["DOI"]))
+
+
+class RecordingCursor:
+    """Stands in for a psycopg cursor and keeps the statements it was given."""
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, sql, params=None):
+        self.statements.append((" ".join(sql.split()), params))
+
+    @contextmanager
+    def copy(self, sql):
+        self.statements.append((sql, None))
+        yield type("Copy", (), {"write_row": lambda self, row: None})()
+
+    def fetchall(self):
+        return [(1, "10.1/a")]
+
+
+class RecordingPool:
+    """Pool stand-in: one recording cursor per transaction, plus the autocommit connection."""
+
+    def __init__(self, url="postgresql+psycopg://test/ingest", indexes=()):
+        self.cursors, self.autocommit_cursor = [], None
+        self.indexes = list(indexes)
+        self.engine = type("Engine", (), {"url": url, "raw_connection": lambda _: self._raw_connection()})()
+
+    @contextmanager
+    def cursor(self, label, timeout=None):
+        self.cursors.append(RecordingCursor())
+        yield self.cursors[-1]
+
+    def fetch_all(self, query, params=None, label=None):
+        return [(1,)] if params[1] in self.indexes else []
+
+    def _raw_connection(self):
+        driver = AutocommitDriver()
+        self.autocommit_cursor = driver.recorded
+        return type("Conn", (), {"driver_connection": driver, "rollback": lambda _: None,
+                                 "close": lambda _: None})()
+
+
+class AutocommitDriver:
+    """psycopg connection stand-in that records statements with the autocommit mode they ran in."""
+
+    def __init__(self):
+        self.autocommit = False
+        self.recorded = RecordingCursor()
+
+    def cursor(self):
+        driver = self
+
+        class Cursor:
+            def execute(self, sql, params=None):
+                driver.recorded.execute(sql, driver.autocommit)
+
+            def close(self):
+                pass
+
+        return Cursor()
+
+
+def test_insert_runs_under_a_table_advisory_lock():
+    pool = RecordingPool(indexes=["all_db_doi_normalised_idx"])
+    assert BulkIngest(table="all_db", pool=pool).ingest(upload_frame(["10.1/a"])) == [
+        {"primary_id": 1, "doi": "10.1/a"}]
+
+    cursor = pool.cursors[0]
+    sql = [statement for statement, _ in cursor.statements]
+    lock = next(i for i, statement in enumerate(sql) if "pg_advisory_xact_lock" in statement)
+    insert = next(i for i, statement in enumerate(sql) if statement.startswith('INSERT INTO "all_db"'))
+    assert lock == insert - 1 and cursor.statements[lock][1] == ('"all_db"',)
+
+
+def test_doi_index_is_built_concurrently_outside_the_ingest_transaction():
+    pool = RecordingPool(url="postgresql+psycopg://test/new_index")
+    BulkIngest(table="uploads", pool=pool).ingest(upload_frame(["10.1/a"]))
+    BulkIngest(table="uploads", pool=pool).ingest(upload_frame(["10.1/b"]))
+
+    built = [statement for statement, _ in pool.autocommit_cursor.statements]
+    assert any(s.startswith('CREATE INDEX CONCURRENTLY IF NOT EXISTS "uploads_doi_normalised_idx"') for s in built)
+    assert all(autocommit for _, autocommit in pool.autocommit_cursor.statements)
+    # Checked once per process, and never inside an ingest transaction
+    assert sum(s.startswith("CREATE INDEX") for s in built) == 1
+    assert not any("INDEX" in statement for cursor in pool.cursors for statement, _ in cursor.statements)
+
+
+@pytest.mark.skipif(not os.getenv("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL not set")
+def test_concurrent_ingests_insert_a_doi_once():
+    from src.Services.DBservices.ConnectionPool import ConnectionPool
+    pool = ConnectionPool(os.environ["TEST_DATABASE_URL"])
+    columns = ", ".join(f'"{c}" TEXT' for c in INGEST_COLUMNS if c != "year")
+    pool.execute(f'DROP TABLE IF EXISTS {TABLE}')
+    pool.execute(f'CREATE TABLE {TABLE} (primary_id SERIAL PRIMARY KEY, year INTEGER, {columns})')
+    frame = upload_frame([f"10.7777/{i}" for i in range(2000)])
+    results, start = [], threading.Barrier(4)
+
+    def upload():
+        start.wait()
+        results.append(BulkIngest(table=TABLE, pool=pool).ingest(frame))
+
+    try:
+        threads = [threading.Thread(target=upload) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(len(inserted) for inserted in results) == [0, 0, 0, 2000]
+        assert pool.fetch_all(f"SELECT COUNT(*) FROM {TABLE}") == [(2000,)]
+    finally:
+        pool.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+
+@pytest.mark.skipif(not os.getenv("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL not set")
+def test_anti_join_ingest_against_large_table():
+    from src.Services.DBservices.ConnectionPool import ConnectionPool
+    pool = ConnectionPool(os.environ["TEST_DATABASE_URL"])
+    columns = ", ".join(f'"{c}" TEXT' for c in INGEST_COLUMNS if c != "year")
+    pool.execute(f'DROP TABLE IF EXISTS {TABLE}')
+    pool.execute(f'CREATE TABLE {TABLE} (primary_id SERIAL PRIMARY KEY, year INTEGER, {columns})')
+    pool.execute(f"INSERT INTO {TABLE} (doi, title) "
+                 f"SELECT '10.5555/' || g, 'existing' FROM generate_series(1, {EXISTING_ROWS}) g")
+
+    # Half the upload already exists (with a different spelling), half is new, plus in-file duplicates
+    half = UPLOAD_ROWS // 2
+    dois = ([f"https://doi.org/10.5555/{i}" for i in range(1, half + 1)]
+            + [f"10.6666/{i}" for i in range(UPLOAD_ROWS - half)])
+    frame = upload_frame(dois + ["10.6666/0", "10.6666/1", None])
+    try:
+        started = time.perf_counter()
+        inserted = BulkIngest(table=TABLE, pool=pool).ingest(frame)
+        elapsed = time.perf_counter() - started
+        print(f"ingest {len(frame)} rows against {EXISTING_ROWS} existing: {elapsed:.2f} s, {len(inserted)} new")
+
+        assert len(inserted) == UPLOAD_ROWS - half + 1
+        assert inserted[0]["doi"] == "10.6666/0" and inserted[-1]["doi"] is None
+        assert BulkIngest(table=TABLE, pool=pool).ingest(frame.iloc[:-1]) == []
+    finally:
+        pool.execute(f'DROP TABLE IF EXISTS {TABLE}')
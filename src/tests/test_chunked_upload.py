@@ -0,0 +1,103 @@
+import os
+import time
+import tracemalloc
+import pandas as pd
+from src.Commands.ChunkedUpload import ChunkedUploadProcessor, UPLOAD_COLUMNS
+from src.Journals.views.task_progress import TaskProgress
+
+"""
+    Tests for chunked upload processing and aggregated sub-task progress
+"""
+UPLOAD_ROWS = int(os.getenv("UPLOAD_BENCH_ROWS", "200000"))
+
+
+class InMemoryIngest:
+    """Stands in for BulkIngest: every even-numbered DOI already exists."""
+
+    def __init__(self):
+        self.next_id = 1
+
+    def __call__(self, chunk):
+        inserted = []
+        for doi in chunk["DOI"]:
+            if int(doi.rsplit("/", 1)[1]) % 2:
+                inserted.append({"primary_id": self.next_id, "doi": doi})
+                self.next_id += 1
+        return inserted
+
+
+class RecordingBackend:
+    def __init__(self):
+        self.states = []
+
+    def store_result(self, task_id, meta, state):
+        self.states.append((state, meta))
+
+
+def write_upload(path, rows):
+    frame = pd.DataFrame({column: "x" * 40 for column in UPLOAD_COLUMNS}, index=range(rows))
+    frame["DOI"] = [f"10.1000/{i}" for i in range(rows)]
+    frame["Abstract"] = "lorem ipsum " * 80
+    frame.to_csv(path, index=False)
+
+
+def test_chunked_upload_memory_and_throughput(tmp_path):
+    upload, output = tmp_path / "upload.csv", tmp_path / "out" / "processed.csv"
+    write_upload(upload, UPLOAD_ROWS)
+
+    tracemalloc.start()
+    pd.read_csv(upload)
+    full_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    processor = ChunkedUploadProcessor(chunk_size=5000, batch_size=100, ingest=InMemoryIngest())
+    tracemalloc.start()
+    started = time.perf_counter()
+    batches = list(processor.iter_batches(str(upload), str(output)))
+    elapsed = time.perf_counter() - started
+    chunked_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{UPLOAD_ROWS} rows: {UPLOAD_ROWS / elapsed:,.0f} rows/s, peak {chunked_peak / 2**20:.1f} MiB "
+          f"chunked vs {full_peak / 2**20:.1f} MiB whole file, {len(batches)} batches")
+
+    ids = [i for batch in batches for i in batch]
+    assert ids == list(range(1, UPLOAD_ROWS // 2 + 1))
+    assert all(len(batch) == 100 for batch in batches[:-1])
+    assert len(pd.read_csv(output)) == UPLOAD_ROWS // 2
+    assert chunked_peak < full_peak
+
+
+def test_sub_task_progress_is_aggregated_into_parent():
+    backend = RecordingBackend()
+    parent = TaskProgress(backend, "parent-1")
+    parent.ingested({"rows_read": 300, "rows_inserted": 250})
+    for _ in range(3):
+        parent.dispatched()
+    assert not parent.dispatch_finished(output_file="out.csv")
+
+    child = TaskProgress(backend, "parent-1")
+    assert not child.batch_done(processed=100)
+    assert not child.batch_done(processed=90, failed=10)
+    assert child.batch_done(processed=50)
+
+    state, meta = backend.states[-1]
+    assert state == "SUCCESS" and meta["processed"] == 240 and meta["failed"] == 10
+    assert meta["rows_inserted"] == 250 and meta["output_file"] == "out.csv"
+    assert [s for s, _ in backend.states].count("SUCCESS") == 1
+
+
+def test_follow_up_batch_dispatched_after_the_fan_out_is_waited_for():
+    backend = RecordingBackend()
+    parent = TaskProgress(backend, "parent-2")
+    parent.dispatched(2)
+    assert not parent.dispatch_finished()
+
+    child = TaskProgress(backend, "parent-2")
+    assert not child.batch_done(processed=100)
+    child.dispatched()  # the second batch defers 5 records to a follow-up batch
+    assert not child.batch_done(processed=95)
+    assert child.batch_done(processed=4, deferred=1)
+
+    state, meta = backend.states[-1]
+    assert state == "SUCCESS" and meta["processed"] == 199 and meta["deferred"] == 1
+    assert meta["batches_done"] == meta["total_batches"] == 3
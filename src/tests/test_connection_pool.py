@@ -0,0 +1,68 @@
+import sys
+import time
+import pytest
+from sqlalchemy import event
+from src.Services.DBservices.ConnectionPool import ConnectionPool, QueryMetrics, get_engine
+from src.Services.DatabaseHandler import DatabaseHandler
+from src.Commands.DatabaseUpdater import DatabaseUpdater
+
+"""
+    Tests for the standalone pooled database access layer
+"""
+CALLS = 300
+
+
+@pytest.fixture
+def url(tmp_path):
+    url = f"sqlite:///{tmp_path / 'pool.db'}"
+    pool = ConnectionPool(url)
+    pool.execute("CREATE TABLE all_db (doi TEXT PRIMARY KEY, title TEXT)")
+    pool.execute("INSERT INTO all_db VALUES (?, ?)", [("10.1/a", "A"), ("10.1/b", "B")], many=True)
+    return url
+
+
+def test_connections_are_reused_and_calls_timed(url):
+    engine = get_engine(url)
+    connects = []
+    event.listen(engine, "connect", lambda *args: connects.append(1))
+    pool = ConnectionPool(url, query_metrics=QueryMetrics())
+
+    started = time.perf_counter()
+    for _ in range(CALLS):
+        assert pool.fetch_all("SELECT doi FROM all_db ORDER BY doi", label="dois") == [("10.1/a",), ("10.1/b",)]
+    elapsed = time.perf_counter() - started
+    print(f"{CALLS} pooled calls: {elapsed * 1000:.1f} ms, {len(connects)} new connections")
+
+    assert get_engine(url) is engine and len(connects) <= 1
+    stats = pool.metrics.snapshot()["dois"]
+    assert stats["calls"] == CALLS and stats["errors"] == 0
+    assert 0 < stats["p50_ms"] <= stats["p95_ms"] <= stats["max_ms"]
+
+
+def test_failed_call_rolls_back_and_is_counted(url):
+    pool = ConnectionPool(url, query_metrics=QueryMetrics())
+    with pytest.raises(Exception):
+        with pool.cursor("bad_insert") as cursor:
+            cursor.execute("INSERT INTO all_db VALUES ('10.1/c', 'C')")
+            cursor.execute("INSERT INTO all_db VALUES ('10.1/a', 'duplicate')")
+
+    assert pool.fetch_all("SELECT COUNT(*) FROM all_db") == [(2,)]
+    assert pool.metrics.snapshot()["bad_insert"]["errors"] == 1
+
+
+def test_database_handler_works_without_flask_app(url):
+    handler = DatabaseHandler("SELECT doi, title FROM all_db ORDER BY doi", database_url=url)
+    assert handler.fetch_papers_with_column_names() == [
+        {"doi": "10.1/a", "title": "A"}, {"doi": "10.1/b", "title": "B"}]
+    assert handler.execute_query("SELECT title FROM all_db WHERE doi = ?", ("10.1/b",)) == [("B",)]
+    assert "app" not in sys.modules
+
+
+def test_closing_an_updater_keeps_the_shared_pool(url):
+    engine = get_engine(url)
+    with engine.connect():
+        pass
+    checked_in = engine.pool.checkedin()
+    updater = DatabaseUpdater("all_db", database_url=url)
+    updater.close_connection()
+    assert get_engine(url) is engine and engine.pool.checkedin() == checked_in > 0
@@ -0,0 +1,122 @@
+import os
+import re
+import json
+import time
+import threading
+import pytest
+import pandas as pd
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+from src.Commands.DOIEnricher import DOIEnricher
+from src.Services.CrossrefClient import CrossrefClient, normalise_title
+
+"""
+    Tests for concurrent, cached Crossref enrichment against a local
+    Crossref stand-in
+"""
+ROWS = int(os.getenv("CROSSREF_BENCH_ROWS", "80"))
+LATENCY = float(os.getenv("CROSSREF_BENCH_LATENCY", "0.03"))
+MAILTO = "data@example.org"
+
+
+def _work(doi):
+    return {"DOI": doi, "title": [f"Trial {doi.rsplit('.', 1)[-1]}"], "publisher": "Stand-in Press",
+            "language": "en", "is-referenced-by-count": len(doi),
+            "reference": [{"key": str(i)} for i in range(200)]}
+
+
+class Crossref(BaseHTTPRequestHandler):
+    """/works/<doi> (404 for ...7) and /works?query.bibliographic=Trial <n>"""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    requests = 0
+    agents = set()
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with Crossref.lock:
+            Crossref.requests += 1
+            Crossref.agents.add((self.headers.get("User-Agent"), parse_qs(urlparse(self.path).query).get("mailto", [""])[0]))
+        time.sleep(LATENCY)
+        url = urlparse(self.path)
+        if url.path == "/works":
+            n = re.findall(r"\d+", parse_qs(url.query)["query.bibliographic"][0])[-1]
+            return self._send(200, {"message": {"items": [_work(f"10.1000/crossref.{n}")]}})
+        doi = unquote(url.path[len("/works/"):])
+        if doi.endswith("7"):
+            return self._send(404, {"status": "error"})
+        self._send(200, {"message": _work(doi)})
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Crossref)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    Crossref.requests, Crossref.agents = 0, set()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _csv(tmp_path):
+    rows = [{"doi": f"https://doi.org/10.1000/crossref.{i}", "title": f"Trial {i}",
+             "language": "de" if i % 10 == 5 else None} for i in range(ROWS)]
+    rows[3]["doi"] = None  # found by title
+    path = tmp_path / "records.csv"
+    pd.DataFrame(rows).to_csv(path, index=False)
+    return str(path)
+
+
+def _enrich(server, tmp_path, cache, workers):
+    client = CrossrefClient(server, mailto=MAILTO, workers=workers, rate=1000, cache_dir=str(tmp_path / cache))
+    enricher = DOIEnricher(_csv(tmp_path), crossref=client)
+    started = time.perf_counter()
+    enricher.enrich_data()
+    return enricher, client, time.perf_counter() - started
+
+
+def test_concurrent_enrichment_matches_and_is_faster(server, tmp_path):
+    sequential, _, one_by_one = _enrich(server, tmp_path, "sequential", workers=1)
+    concurrent, client, pooled = _enrich(server, tmp_path, "concurrent", workers=16)
+
+    print(f"{ROWS} rows: {ROWS / one_by_one * 60:,.0f} rows/min one at a time, "
+          f"{ROWS / pooled * 60:,.0f} rows/min with {client.workers} workers")
+    pd.testing.assert_frame_equal(sequential.df, concurrent.df)
+    df = concurrent.df.set_index("title")
+    assert df.loc["Trial 3", "doi"] == "10.1000/crossref.3" and df.loc["Trial 3", "publisher"] == "Stand-in Press"
+    assert df.loc["Trial 5", "language"] == "de" and pd.isna(df.loc["Trial 5", "publisher"])
+    assert df.loc["Trial 2", "citation_count"] == len("10.1000/crossref.2")
+    assert pd.isna(df.loc["Trial 7", "publisher"]) and "10.1000/crossref.7" in concurrent.not_found_dois
+    assert Crossref.agents == {(f"SenseBackend/1.0 (mailto:{MAILTO})", MAILTO)}
+    assert pooled * 4 < one_by_one
+
+
+def test_responses_are_cached_by_doi_and_title(server, tmp_path):
+    first, _, _ = _enrich(server, tmp_path, "cache", workers=8)
+    requests = Crossref.requests
+
+    # A new run: everything (found or not) comes from disk
+    again, client, _ = _enrich(server, tmp_path, "cache", workers=8)
+    assert Crossref.requests == requests and client.requests == 0
+    pd.testing.assert_frame_equal(first.df, again.df)
+    assert "reference" not in client.work("10.1000/crossref.1")
+    assert client.title_cache.get(normalise_title("Trial 3"))["DOI"] == "10.1000/crossref.3"
+
+
+def test_title_match_must_be_close(server, tmp_path):
+    client = CrossrefClient(server, workers=1, rate=1000, cache_dir=str(tmp_path))
+    assert client.search_title("Trial  3.")["DOI"] == "10.1000/crossref.3"
+    assert client.search_title("An unrelated systematic review of trial 3") is None
+    assert normalise_title("Méta-analyse: Trial 3") == "meta analyse trial 3"
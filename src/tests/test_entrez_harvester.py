@@ -0,0 +1,198 @@
+import io
+import os
+import json
+import time
+import threading
+import pytest
+import pandas as pd
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+from src.Commands.OpenAccessUpdate import BulkOpenAccessResolver
+from src.Services.Factories.MedlineClass import EntrezHarvester, MedlineClass, parse_pubmed_xml
+from src.Services.HostHealth import host_health
+
+"""
+    Tests for history-server Entrez harvesting against local E-utilities
+    and Unpaywall stand-ins
+"""
+RECORDS = int(os.getenv("ENTREZ_BENCH_RECORDS", "1200"))
+BATCH = int(os.getenv("ENTREZ_BENCH_BATCH", "100"))
+LATENCY = float(os.getenv("ENTREZ_BENCH_LATENCY", "0.3"))  # per efetch
+
+
+def _article(pmid):
+    review = "Systematic Review" if pmid % 2 == 0 else "Randomized Controlled Trial"
+    return f"""<PubmedArticle><MedlineCitation><PMID Version="1">{pmid}</PMID><Article>
+<Journal><JournalIssue><PubDate><Year>2021</Year><Month>Mar</Month></PubDate></JournalIssue>
+<Title>Stand-in Journal</Title></Journal>
+<ArticleTitle>Masks in <i>trial</i> {pmid}</ArticleTitle>
+<Abstract><AbstractText Label="BACKGROUND">Why.</AbstractText><AbstractText Label="RESULTS">What.</AbstractText></Abstract>
+<AuthorList><Author><LastName>Lovelace</LastName><Initials>A</Initials></Author><Author><CollectiveName>Stand-in Group</CollectiveName></Author></AuthorList>
+<Language>{"eng" if pmid % 3 else "ger"}</Language>
+<PublicationTypeList><PublicationType>Journal Article</PublicationType><PublicationType>{review}</PublicationType></PublicationTypeList>
+<ELocationID EIdType="doi">10.1000/pubmed.{pmid}</ELocationID>
+</Article><MedlineJournalInfo><Country>England</Country></MedlineJournalInfo>
+<MeshHeadingList><MeshHeading><DescriptorName>Masks</DescriptorName><QualifierName>standards</QualifierName></MeshHeading></MeshHeadingList>
+</MedlineCitation><PubmedData><ArticleIdList><ArticleId IdType="pubmed">{pmid}</ArticleId><ArticleId IdType="pii">S{pmid}</ArticleId></ArticleIdList></PubmedData></PubmedArticle>"""
+
+
+class EUtils(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    efetches = []
+    searches = []
+    lock = threading.Lock()
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        if url.path.endswith("/esearch.fcgi"):
+            assert query["usehistory"] == "y"
+            EUtils.searches.append(query)
+            body = json.dumps({"esearchresult": {"count": str(RECORDS), "webenv": "MCID_1", "querykey": "1"}})
+            return self._send(body.encode(), "application/json")
+        assert query["WebEnv"] == "MCID_1" and query["query_key"] == "1"
+        with EUtils.lock:
+            EUtils.efetches.append(time.monotonic())
+        time.sleep(LATENCY)
+        start = int(query["retstart"])
+        pmids = range(start + 1, min(start + int(query["retmax"]), RECORDS) + 1)
+        body = "<?xml version=\"1.0\" ?>\n<!DOCTYPE PubmedArticleSet PUBLIC \"-//NLM//DTD PubMedArticle//EN\" " \
+               "\"https://dtd.nlm.nih.gov/ncbi/pubmed/out/pubmed_240101.dtd\">\n<PubmedArticleSet>" + \
+               "".join(_article(pmid) for pmid in pmids) + "</PubmedArticleSet>"
+        self._send(body.encode(), "text/xml")
+
+    def _send(self, payload, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class Unpaywall(EUtils):
+    def do_GET(self):
+        doi = unquote(urlparse(self.path).path[len("/v2/"):])
+        number = int(doi.rsplit(".", 1)[-1])
+        body = {"doi": doi, "is_oa": number % 4 == 0,
+                "best_oa_location": {"url": f"https://oa.example/{number}"} if number % 4 == 0 else None}
+        self._send(json.dumps(body).encode(), "application/json")
+
+
+def _serve(handler):
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+
+@pytest.fixture
+def services():
+    eutils, unpaywall = _serve(EUtils), _serve(Unpaywall)
+    EUtils.efetches, EUtils.searches = [], []
+    yield f"http://127.0.0.1:{eutils.server_address[1]}", f"http://127.0.0.1:{unpaywall.server_address[1]}/v2"
+    for httpd in (eutils, unpaywall):
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def test_pubmed_xml_becomes_medline_records():
+    xml = f"<PubmedArticleSet>{_article(4)}{_article(6)}</PubmedArticleSet>".encode()
+    first, second = parse_pubmed_xml(io.BytesIO(xml))
+    assert first == {
+        "PMID": "4", "TI": "Masks in trial 4", "AB": "BACKGROUND: Why. RESULTS: What.",
+        "AU": ["Lovelace A", "Stand-in Group"], "DP": "2021 Mar", "JT": "Stand-in Journal",
+        "PL": "England", "LA": ["eng"], "MH": ["Masks/standards"],
+        "PT": ["Journal Article", "Systematic Review"], "AID": ["S4 [pii]", "10.1000/pubmed.4 [doi]"],
+    }
+    assert second["PMID"] == "6" and second["LA"] == ["ger"]
+
+
+def test_parallel_harvest_is_faster(services):
+    eutils, _ = services
+    timings = {}
+    for in_flight in (1, 4):
+        harvester = EntrezHarvester(eutils, batch_size=BATCH, in_flight=in_flight, rate=10)
+        started = time.perf_counter()
+        pmids = [record["PMID"] for record in harvester.records("masks")]
+        timings[in_flight] = time.perf_counter() - started
+        assert sorted(pmids, key=int) == [str(pmid) for pmid in range(1, RECORDS + 1)]
+        assert harvester.stats == {"requests": 1 + -(-RECORDS // BATCH), "records": RECORDS, "failed_batches": 0}
+
+    print(f"{RECORDS} records: {RECORDS / timings[1] * 60:,.0f} records/min one efetch at a time, "
+          f"{RECORDS / timings[4] * 60:,.0f} records/min with 4 in flight")
+    assert timings[4] * 2 < timings[1]
+
+
+class FrozenClock:
+    """Injected into host_health: time stands still, so every request arrives at once and only the limiter spaces them."""
+
+    def __init__(self):
+        self.now = time.monotonic()  # not behind the real clock, in case the host was seen before
+        self.slept = []
+        self.lock = threading.Lock()
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        with self.lock:
+            self.slept.append(seconds)
+
+
+def test_efetch_stays_within_the_rate(services, monkeypatch):
+    eutils, _ = services
+    frozen = FrozenClock()
+    monkeypatch.setattr(host_health, "clock", frozen.clock)
+    monkeypatch.setattr(host_health, "sleep", frozen.sleep)
+    harvester = EntrezHarvester(eutils, batch_size=RECORDS // 4, in_flight=4, rate=5)
+    assert len(list(harvester.records("masks"))) == RECORDS
+    assert len(EUtils.efetches) == 4 and harvester.stats["requests"] == 5
+
+    # One esearch + four concurrent efetches: each admitted 1/rate after the previous one
+    admitted = sorted([frozen.now] * (harvester.stats["requests"] - len(frozen.slept))
+                      + [frozen.now + wait for wait in frozen.slept])
+    gaps = [b - a for a, b in zip(admitted, admitted[1:])]
+    assert gaps == pytest.approx([1 / 5] * 4)
+
+
+def test_fetch_filters_and_resolves_open_access_in_bulk(services, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # sync state
+    eutils, unpaywall = services
+    resolver = BulkOpenAccessResolver(services=("unpaywall",), service_urls={"unpaywall": unpaywall},
+                                      rates={"unpaywall": 1000}, cache_dir=str(tmp_path / "cache"))
+    medline = MedlineClass(harvester=EntrezHarvester(eutils, batch_size=BATCH, in_flight=4, rate=1000),
+                           oa_resolver=resolver, output_dir=str(tmp_path))
+    medline.fetch(["masks"])
+
+    df = pd.read_csv(tmp_path / "medline_results.csv")
+    # Systematic reviews (even) in English (not a multiple of 3) that are open access (multiple of 4)
+    expected = [pmid for pmid in range(1, RECORDS + 1) if pmid % 4 == 0 and pmid % 3]
+    assert sorted(df["pmid"]) == expected
+    assert df.loc[0, "best_oa_url"] == f"https://oa.example/{df.loc[0, 'pmid']}"
+    # Only the records left after the language and review filters were looked up
+    assert resolver.requests == {"unpaywall": len([p for p in range(1, RECORDS + 1) if p % 2 == 0 and p % 3])}
+
+
+def test_later_runs_only_fetch_modified_records(services, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    eutils, unpaywall = services
+    resolver = BulkOpenAccessResolver(services=("unpaywall",), service_urls={"unpaywall": unpaywall},
+                                      rates={"unpaywall": 1000}, cache_dir=str(tmp_path / "cache"))
+
+    def run():
+        harvester = EntrezHarvester(eutils, batch_size=BATCH, in_flight=4, rate=1000)
+        medline = MedlineClass(harvester=harvester, oa_resolver=resolver, output_dir=str(tmp_path))
+        medline.fetch(["masks"])
+        return medline, pd.read_csv(tmp_path / "medline_results.csv")
+
+    first, full = run()
+    again, synced = run()  # the stand-in returns the same records: nothing new or changed
+    assert "mindate" not in EUtils.searches[0]
+    assert EUtils.searches[1]["datetype"] == "mdat" and EUtils.searches[1]["mindate"] == EUtils.searches[1]["maxdate"]
+    assert first.sync.stats["changed"] == RECORDS and again.sync.stats == {"pages": 0, "records": RECORDS, "changed": 0}
+    pd.testing.assert_frame_equal(full, synced)
+    assert not os.path.exists(tmp_path / "Data" / "sync" / "medline")  # no delta file
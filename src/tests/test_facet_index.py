@@ -0,0 +1,195 @@
+import os
+import random
+import threading
+import time
+from src.Services import FacetIndex as facet_index_module
+from src.Services.FacetIndex import FacetIndex
+from src.Utils.tag_codes import parse_tag_codes
+
+"""
+    Tests for the in-memory bitmap facet index
+"""
+COLUMNS = ["primary_id", "title", "year", "country", "amstar_label",
+           "topic__hash__safety__hash__saf", "intervention__hash__vpd__hash__infl"]
+
+
+class FakeDB:
+    def __init__(self, rows):
+        self.rows = rows
+        self.writes = 0
+
+    @staticmethod
+    def _quote(identifier):
+        return f'"{identifier}"'
+
+    def get_column_names(self, table):
+        return COLUMNS
+
+    def execute_raw_query(self, query, params=None):
+        if "COUNT(*)" in query:
+            return [{"n": len(self.rows), "updated": None, "writes": self.writes}]
+        if params and "ids" in params:
+            return [r for r in self.rows if r["primary_id"] in params["ids"]]
+        return [{"primary_id": r["primary_id"]} for r in self.rows]
+
+
+def synthetic_rows(n, seed=7):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        rows.append({
+            "primary_id": str(i),
+            "year": rng.choice([2019, 2020, 2021, 2022, None]),
+            "country": rng.choice(["Germany", "Kenya", "Japan", None]),
+            "amstar_label": rng.choice(["High", "Low", None]),
+            "topic__hash__safety__hash__saf": rng.choice(["safety:saf", "adverse events:saf; safety:saf", None]),
+            "intervention__hash__vpd__hash__infl": rng.choice(["influenza:infl", None]),
+        })
+    return rows
+
+
+def make_index(rows):
+    index = FacetIndex(FakeDB(rows))
+    index._stream_rows = lambda columns: iter(list(index.db_service.rows))
+    return index.build()
+
+
+def test_mask_and_counts_match_naive_scan():
+    rows = synthetic_rows(500)
+    index = make_index(rows)
+    tree = ("AND", [
+        ("OR", [("year", "between", (2020, 2021))]),
+        ("OR", [("topic__hash__safety__hash__saf", "like_any", [":saf"]),
+                ("country", "eq", "Kenya")]),
+    ])
+    mask = index.mask_for(tree)
+
+    expected_rows = [
+        r for r in rows
+        if r["year"] is not None and 2020 <= r["year"] <= 2021
+        and ((r["topic__hash__safety__hash__saf"] or "").find(":saf") >= 0 or r["country"] == "Kenya")
+    ]
+    assert index.count(mask) == len(expected_rows)
+
+    counts = index.category_counts({"Country": "country", "Missing": "nope"}, mask)
+    expected = {}
+    for r in expected_rows:
+        if r["country"] is not None:
+            expected[r["country"]] = expected.get(r["country"], 0) + 1
+    assert {i["value"]: i["count"] for i in counts["Country"]} == expected
+    assert "Missing" not in counts
+
+
+def test_unindexed_column_is_not_answerable():
+    index = make_index(synthetic_rows(10))
+    assert index.mask_for(("AND", [("title", "like_any", ["vaccine"])])) is None
+
+
+def test_tag_code_counts(monkeypatch):
+    index = make_index(synthetic_rows(200))
+    # Answered from the per-code bitmaps, without parsing tag strings per request
+    monkeypatch.setattr(facet_index_module, "parse_tag_codes", None)
+    counts = index.tag_code_counts("topic__hash__safety__hash__saf", index.alive)
+    monkeypatch.undo()
+    with_tag = sum(1 for r in index.db_service.rows if r["topic__hash__safety__hash__saf"])
+    assert counts["saf"][0] == with_tag
+    assert parse_tag_codes("death:dea; mortality:dea") == ["dea"]
+    # One parser for the index and the SQL filter search
+    assert facet_index_module.parse_tag_codes is parse_tag_codes
+
+
+def test_incremental_refresh_adds_and_removes_records():
+    rows = synthetic_rows(100)
+    index = make_index(rows)
+    saf = index.tag_code_counts("topic__hash__safety__hash__saf", index.alive)["saf"][0]
+    removed_saf = 1 if rows[0]["topic__hash__safety__hash__saf"] else 0
+    rows.pop(0)
+    rows.append({"primary_id": "new", "year": 2030, "country": "Peru", "amstar_label": None,
+                 "topic__hash__safety__hash__saf": "safety:saf", "intervention__hash__vpd__hash__infl": None})
+    index.db_service.writes += 2
+
+    assert index.refresh_if_stale(force=True, wait=True)
+    assert index.count(index.alive) == 100
+    assert index.count(index.mask_for(("year", "eq", 2030))) == 1
+    assert "0" not in index.positions
+    assert index.tag_code_counts("topic__hash__safety__hash__saf", index.alive)["saf"][0] == saf - removed_saf + 1
+
+
+def test_refresh_runs_in_the_background():
+    rows = synthetic_rows(100)
+    index = make_index(rows)
+    scan_started, release = threading.Event(), threading.Event()
+    execute = index.db_service.execute_raw_query
+    version_checks = []
+
+    def slow_scan(query, params=None):
+        if "COUNT(*)" in query:
+            version_checks.append(threading.current_thread().name)
+        if "COUNT(*)" not in query and not params:
+            scan_started.set()
+            release.wait(5)
+        return execute(query, params)
+
+    index.db_service.execute_raw_query = slow_scan
+    rows.append({"primary_id": "new", "year": 2030, "country": "Peru", "amstar_label": None,
+                 "topic__hash__safety__hash__saf": None, "intervention__hash__vpd__hash__infl": None})
+    index.db_service.writes += 1
+
+    # Returns while the id scan is still blocked; the current index keeps answering
+    assert index.refresh_if_stale(force=True)
+    assert scan_started.wait(5)
+    assert index.count(index.mask_for(("year", "eq", 2030))) == 0
+    assert not index.refresh_if_stale(force=True)  # one refresh at a time
+    assert version_checks == ["facet-index-refresh"]  # not on the request thread
+
+    release.set()
+    index.join_refresh(5)
+    assert index.count(index.mask_for(("year", "eq", 2030))) == 1
+
+
+def test_rebuild_does_not_block_readers():
+    rows = synthetic_rows(100)
+    index = make_index(rows)
+    halfway, release = threading.Event(), threading.Event()
+
+    def slow_stream(columns):
+        for n, row in enumerate(list(rows) + [{"primary_id": "new", "year": 2030}]):
+            if n == 50:
+                halfway.set()
+                release.wait(5)
+            yield row
+
+    index._stream_rows = slow_stream
+    rebuild = threading.Thread(target=index.build)
+    rebuild.start()
+    assert halfway.wait(5)
+    answered = []
+    reader = threading.Thread(target=lambda: answered.append(index.count(index.mask_for(("year", "eq", 2030)))))
+    reader.start()
+    reader.join(1)
+    assert answered == [0]  # the old index answers while the new one is read in
+
+    release.set()
+    rebuild.join(5)
+    assert index.count(index.mask_for(("year", "eq", 2030))) == 1 and index.count(index.alive) == 101
+
+
+def test_benchmark_memory_and_p99_latency():
+    tree = ("AND", [("OR", [("year", "in", [2020, 2021])]),
+                    ("OR", [("country", "eq", "Germany")])])
+    for n in map(int, os.getenv("FACET_INDEX_BENCH_ROWS", "100000,1000000").split(",")):
+        started = time.perf_counter()
+        index = make_index(synthetic_rows(n))
+        build_seconds = time.perf_counter() - started
+        timings = []
+        for _ in range(100):
+            started = time.perf_counter()
+            mask = index.mask_for(tree)
+            index.category_counts({"Year": "year", "Country": "country", "AMSTAR": "amstar_label"}, mask)
+            index.tag_code_counts("topic__hash__safety__hash__saf", mask)
+            timings.append(time.perf_counter() - started)
+        timings.sort()
+        p99 = timings[int(len(timings) * 0.99) - 1]
+        print(f"{n:,} records: built in {build_seconds:.1f} s, {index.memory_bytes() / 1e6:.2f} MB, "
+              f"p99 {p99 * 1000:.2f} ms")
+        assert p99 < 0.1
@@ -0,0 +1,104 @@
+import os
+import json
+import time
+from sqlalchemy import create_engine, Column, Integer, String, Text
+from sqlalchemy.orm import declarative_base, Session, load_only
+from src.Services.DBservices.FieldSelection import FieldSelection
+from src.Services.DBservices.SerializerCompiler import SerializerCompiler
+from src.Services.PostgresService import PostgresService
+from src.Journals.Services.services import JSONService
+
+"""
+    Tests for sparse fieldsets and field presets
+"""
+COLUMNS = ["primary_id", "title", "abstract", "year", "country", "keywords", "topic__hash__safety__hash__saf"]
+TAG_COLUMNS = 300
+
+Base = declarative_base()
+
+
+class Review(Base):
+    __tablename__ = "all_db"
+    primary_id = Column(Integer, primary_key=True)
+    title = Column(String)
+    authors = Column(String)
+    year = Column(Integer)
+    country = Column(String)
+    abstract = Column(Text)
+    keywords = Column(Text)
+    locals().update({f"topic__hash__t{i}__hash__c{i}": Column(String) for i in range(TAG_COLUMNS)})
+
+
+def test_fields_and_exclude():
+    assert FieldSelection.resolve(COLUMNS, fields="Title, year") == ["primary_id", "title", "year"]
+    assert FieldSelection.resolve(COLUMNS, fields=["*"]) is None
+    assert FieldSelection.resolve(COLUMNS) is None
+    assert FieldSelection.resolve(COLUMNS, exclude="abstract,nope") == \
+        [c for c in COLUMNS if c != "abstract"]
+    # No valid field name: fall back to all columns rather than an empty projection
+    assert FieldSelection.resolve(COLUMNS, fields=["nope"]) is None
+
+
+def test_presets():
+    assert FieldSelection.resolve(COLUMNS, preset="list") == ["primary_id", "title", "year", "country"]
+    summary = FieldSelection.resolve(COLUMNS, preset="summary")
+    assert "abstract" not in summary and "keywords" not in summary
+    assert FieldSelection.resolve(COLUMNS, preset="detail") is None
+    assert FieldSelection.resolve(COLUMNS, preset="unknown") is None
+    assert FieldSelection.resolve(COLUMNS, preset="list", fields="abstract") == ["primary_id", "abstract"]
+
+
+def build_sql(payload):
+    service = JSONService.__new__(JSONService)
+    service.db_service = PostgresService.__new__(PostgresService)
+    service.db_service.reset_query()
+    service.db_service.execute_raw_query = lambda query, params=None: [{"column_name": c} for c in COLUMNS]
+    return service._build_from_payload({"table": "all_db", **payload}).show_sql()["query"]
+
+
+def test_key_column_only_added_to_plain_listings():
+    assert FieldSelection.resolve(COLUMNS, fields="country", with_key=False) == ["country"]
+    assert build_sql({"columns": ["title"]}).startswith('SELECT "primary_id", "title" FROM')
+
+    # Grouped: every selected column must be grouped or aggregated
+    grouped = build_sql({"columns": ["country"], "group_by": ["country"],
+                         "aggregations": [{"func": "COUNT", "column": "*", "alias": "total"}]})
+    assert "primary_id" not in grouped and 'GROUP BY "country"' in grouped
+    assert "primary_id" not in build_sql({"columns": ["year"], "aggregations": [{"func": "MAX", "column": "year"}]})
+
+
+def fetch_page(session, columns, page_size):
+    query = session.query(Review).order_by(Review.primary_id).limit(page_size)
+    if columns:
+        query = query.options(load_only(*[getattr(Review, c) for c in columns]))
+    serialize = SerializerCompiler.compile(Review, columns=columns, profile="record")
+    return json.dumps([serialize(r) for r in query.all()]).encode()
+
+
+def test_benchmark_list_preset_bytes_and_latency():
+    page_size = int(os.getenv("FIELDSET_BENCH_PAGE_SIZE", "100"))
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        for i in range(page_size):
+            record = Review(primary_id=i, title=f"Review {i}", authors="A. Author", year=2020,
+                            country="Kenya", abstract="lorem ipsum " * 200, keywords="vaccine, " * 20)
+            for t in range(0, TAG_COLUMNS, 4):
+                setattr(record, f"topic__hash__t{t}__hash__c{t}", f"tag {t}:c{t}")
+            session.add(record)
+        session.commit()
+
+    all_columns = [c.name for c in Review.__table__.columns]
+    results = {}
+    for name, columns in (("detail", None), ("list", FieldSelection.resolve(all_columns, preset="list"))):
+        timings = []
+        for _ in range(5):
+            with Session(engine) as session:
+                started = time.perf_counter()
+                body = fetch_page(session, columns, page_size)
+                timings.append(time.perf_counter() - started)
+        results[name] = (len(body), min(timings))
+        print(f"{name}: {len(body) / 1024:.1f} KiB, {min(timings) * 1000:.1f} ms per {page_size}-row page")
+
+    assert results["list"][0] < results["detail"][0] / 10
+    assert results["list"][1] < results["detail"][1]
@@ -0,0 +1,130 @@
+import os
+import time
+import pytest
+from collections import Counter
+from src.Services.PostgresService import PostgresService
+from src.Journals.Services.FilterCountEngine import FilterCountEngine
+
+"""
+    Tests for the single-scan filter count engine
+"""
+COLUMNS = ["primary_id", "year", "country", "topic__hash__safety__hash__saf"]
+CATEGORIES = {
+    "Year": "year",
+    "Country": "country",
+    "saf": "topic__hash__safety__hash__saf",
+    "Missing": "not_a_column",
+}
+
+
+def make_builder(columns=COLUMNS):
+    builder = PostgresService.__new__(PostgresService)
+    builder.reset_query()
+    builder.execute_raw_query = lambda query, params=None: [
+        {"column_name": c} for c in columns]
+    return builder.table("all_db")
+
+
+def test_count_query_is_single_statement_with_bound_params():
+    builder = make_builder()
+    builder.where("year", 2020).like("country", "ger", conjunction="AND")
+    sql, params = FilterCountEngine(builder).build_query(builder, CATEGORIES)
+
+    assert "UNION ALL" not in sql
+    assert sql.count("FROM \"all_db\"") == 1
+    assert "CROSS JOIN LATERAL" in sql
+    assert "not_a_column" not in sql
+    # Filter values and category names are parameters, never literals.
+    assert "2020" not in sql and "'Year'" not in sql
+    assert params["p1"] == 2020 and params["p2"] == "%ger%"
+    assert {"Year", "Country", "saf"} <= set(params.values())
+
+
+def test_no_valid_category_columns_returns_empty():
+    builder = make_builder()
+    engine = FilterCountEngine(builder)
+    assert engine.count(builder, {"Missing": "not_a_column"}) == {}
+    assert builder._conditions == []
+
+
+def union_all_query(builder, categories):
+    """The previous count query: one GROUP BY per category, UNION ALL over a CTE."""
+    base_query_info = builder.show_sql()
+    base_query_sql = base_query_info['query']
+    where_clause = ""
+    if ' WHERE ' in base_query_sql:
+        where_clause = " WHERE " + base_query_sql.split(" WHERE ", 1)[1]
+        where_clause = where_clause.split(" ORDER BY ")[0].split(" LIMIT ")[0]
+
+    count_subqueries = []
+    for display_name, db_column in categories.items():
+        if db_column.lower() in builder._table_columns_lower:
+            count_subqueries.append(f"""
+                SELECT
+                    '{display_name}' as category,
+                    CAST("{db_column}" AS TEXT) as value,
+                    COUNT(*) as count
+                FROM base_results
+                WHERE "{db_column}" IS NOT NULL
+                GROUP BY "{db_column}"
+            """)
+    sql = f"""
+        WITH base_results AS (
+            SELECT * FROM {builder._table}
+            {where_clause}
+        )
+        {' UNION ALL '.join(count_subqueries)};
+    """
+    return sql, base_query_info['params']
+
+
+def as_counters(rows):
+    counts = {}
+    for row in rows:
+        counts.setdefault(row["category"], Counter())[row["value"]] += row["count"]
+    return counts
+
+
+def test_single_scan_filters_like_the_union_all_query():
+    builder = make_builder()
+    builder.where("year", 2020).like("country", "ger", conjunction="AND")
+    old_sql, old_params = union_all_query(builder, CATEGORIES)
+    new_sql, new_params = FilterCountEngine(builder).build_query(builder, CATEGORIES)
+
+    # Same filtered rows: the WHERE clause and its parameters are shared
+    assert "WHERE" in builder.build_where_clause()
+    assert builder.build_where_clause() in old_sql and builder.build_where_clause() in new_sql
+    assert {k: v for k, v in new_params.items() if not k.startswith("cat_")} == old_params
+    assert old_sql.count("UNION ALL") == 2
+
+
+@pytest.mark.skipif(not os.getenv("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL not set")
+def test_counts_match_union_all_query_on_live_database():
+    from src.Journals.Services.services import JSONService
+
+    os.environ["DATABASE_URL"] = os.environ["TEST_DATABASE_URL"]
+    service = JSONService()
+    payload = {"table": "all_db", "filters": [
+        {"type": "betweenwhere", "column": "year", "value": [2015, 2022]}]}
+
+    builder = service._build_from_payload(payload)
+    categories = service._get_filter_category_mappings(builder._table_columns)
+    old_sql, old_params = union_all_query(builder, categories)
+    builder.reset_query()
+
+    def best_of(run, repeat=5):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = run()
+            timings.append(time.perf_counter() - started)
+        return result, min(timings)
+
+    old_rows, old_seconds = best_of(lambda: service.db_service.execute_raw_query(old_sql, old_params))
+    result, new_seconds = best_of(lambda: service.get_contextual_filter_counts(payload))
+    print(f"filter counts ({len(categories)} categories): UNION ALL {old_seconds * 1000:.1f} ms, "
+          f"single scan {new_seconds * 1000:.1f} ms")
+
+    assert result["success"]
+    actual = {k: Counter({i["value"]: i["count"] for i in v}) for k, v in result["data"].items()}
+    assert actual == as_counters(old_rows)
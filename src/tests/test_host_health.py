@@ -0,0 +1,206 @@
+import os
+import time
+import threading
+import requests
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.Services.HttpClient import HttpClient, HostMetrics
+from src.Services.HostHealth import (
+    AdaptiveTokenBucket, CircuitBreaker, HostHealth, HostUnavailable, OPEN, CLOSED, HALF_OPEN,
+)
+
+"""
+    Tests for per-host circuit breaking and adaptive rate limiting against a
+    local server that injects failures and delays
+"""
+PAPERS = int(os.getenv("HOST_BENCH_PAPERS", "40"))
+DELAY = float(os.getenv("HOST_BENCH_DELAY", "0.05"))
+
+
+class Flaky(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    mode = "ok"  # ok | fail | slow | throttle
+    hits = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with Flaky.lock:
+            Flaky.hits += 1
+        status, headers = 200, {}
+        if Flaky.mode in ("fail", "slow"):
+            time.sleep(DELAY)  # a publisher that is slow before it errors
+            status = 500 if Flaky.mode == "fail" else 200
+        elif Flaky.mode == "throttle":
+            status, headers = 429, {"Retry-After": "1"}
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Flaky)
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    Flaky.mode, Flaky.hits = "ok", 0
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _client(health):
+    return HttpClient(retries=0, host_metrics=HostMetrics(), health=health)
+
+
+def _scrape(client, url, papers):
+    """One request per paper, as fetch_pdf_urls does; returns the failures."""
+    failures = 0
+    for i in range(papers):
+        try:
+            if client.get(f"{url}/paper/{i}").status_code >= 400:
+                failures += 1
+        except requests.RequestException:
+            failures += 1
+    return failures
+
+
+def test_breaker_fails_fast_on_a_failing_host(server):
+    Flaky.mode = "fail"
+    started = time.perf_counter()
+    assert _scrape(_client(None), server, PAPERS) == PAPERS
+    without = time.perf_counter() - started
+    hits_without, Flaky.hits = Flaky.hits, 0
+
+    health = HostHealth(threshold=3, open_seconds=60)
+    started = time.perf_counter()
+    assert _scrape(_client(health), server, PAPERS) == PAPERS
+    with_breaker = time.perf_counter() - started
+
+    print(f"{PAPERS} papers on a failing host: {without * 1000:.0f} ms without the breaker, "
+          f"{with_breaker * 1000:.0f} ms with it ({Flaky.hits} of {hits_without} requests sent)")
+    assert Flaky.hits == 3
+    assert health.snapshot()[server.split("//")[1]]["state"] == OPEN
+    assert with_breaker * 5 < without
+
+
+def test_slow_answers_count_as_failures(server):
+    Flaky.mode = "slow"
+    health = HostHealth(threshold=2, open_seconds=60, slow_seconds=DELAY / 2)
+    client = _client(health)
+    client.get(f"{server}/a")
+    client.get(f"{server}/b")
+    with pytest.raises(HostUnavailable):
+        client.get(f"{server}/c")
+    assert Flaky.hits == 2
+
+
+def test_half_open_probe_closes_or_reopens(server):
+    Flaky.mode = "fail"
+    health = HostHealth(threshold=2, open_seconds=0.2, max_open_seconds=10)
+    client = _client(health)
+    _scrape(client, server, 4)
+    assert Flaky.hits == 2
+
+    # Still failing: one probe goes through and the open period doubles
+    time.sleep(0.25)
+    _scrape(client, server, 3)
+    assert Flaky.hits == 3
+    host = server.split("//")[1]
+    assert health.snapshot()[host]["state"] == OPEN
+    assert 0.3 < health.retry_in([host]) <= 0.4
+
+    # Recovered: the next probe closes the circuit
+    Flaky.mode = "ok"
+    time.sleep(0.45)
+    assert _scrape(client, server, 5) == 0
+    assert health.snapshot()[host]["state"] == CLOSED
+
+
+def test_any_request_error_releases_the_half_open_probe(server, monkeypatch):
+    now = [0.0]
+    health = HostHealth(threshold=1, open_seconds=1, clock=lambda: now[0])
+    client = _client(health)
+    Flaky.mode = "fail"
+    _scrape(client, server, 1)
+    host = server.split("//")[1]
+    assert health.snapshot()[host]["state"] == OPEN
+
+    # The probe dies with an error that isn't a connection error or timeout
+    def redirect_loop(*args, **kwargs):
+        raise requests.TooManyRedirects("redirect loop")
+
+    now[0] = 1.5
+    monkeypatch.setattr(requests.Session, "request", redirect_loop)
+    with pytest.raises(requests.TooManyRedirects):
+        client.get(f"{server}/probe")
+    assert health.snapshot()[host]["state"] == OPEN
+
+    # ... and the next open period ends with a new probe instead of rejecting for good
+    monkeypatch.undo()
+    Flaky.mode = "ok"
+    now[0] = 10.0
+    assert client.get(f"{server}/probe").status_code == 200
+    assert health.snapshot()[host]["state"] == CLOSED
+
+
+def test_single_probe_while_half_open():
+    breaker = CircuitBreaker(threshold=1, open_seconds=1)
+    breaker.failure(now=0.0)
+    assert breaker.state == OPEN and not breaker.allow(0.5)
+    assert breaker.allow(1.0) and breaker.state == HALF_OPEN
+    assert not breaker.allow(1.0)  # the probe is still out
+    breaker.success()
+    assert breaker.allow(1.1) and breaker.open_for == 1
+
+
+def test_bucket_backs_off_on_throttling_and_recovers():
+    bucket = AdaptiveTokenBucket(rate=10, burst=2, min_rate=1, max_rate=20, step=1)
+    now = bucket.updated
+    assert bucket.reserve(now) == 0 and bucket.reserve(now) == 0
+    assert bucket.reserve(now) == pytest.approx(0.1)  # over the burst: wait a token's time
+
+    bucket.throttled(now, retry_after=2)
+    assert bucket.rate == 5
+    assert bucket.reserve(now) >= 2  # paused for Retry-After
+    bucket.throttled(now)
+    bucket.throttled(now)
+    bucket.throttled(now)
+    assert bucket.rate == 1  # never below min_rate
+    for _ in range(30):
+        bucket.success()
+    assert bucket.rate == 20
+
+
+def test_throttled_host_waits_then_rejects(server):
+    Flaky.mode = "throttle"
+    health = HostHealth(threshold=100, max_wait=0.5)
+    client = _client(health)
+    assert client.get(f"{server}/a").status_code == 429
+    # Retry-After: 1 is longer than we are willing to wait in line
+    with pytest.raises(HostUnavailable):
+        client.get(f"{server}/b")
+    assert Flaky.hits == 1
+    host = server.split("//")[1]
+    assert health.snapshot()[host]["rate"] == 5
+    assert health.retry_in([host]) > 0.5
+
+
+def test_rejected_papers_are_reported_for_deferral(server):
+    Flaky.mode = "fail"
+    health = HostHealth(threshold=2, open_seconds=60)
+    client = _client(health)
+    outcomes = []
+    for i in range(5):
+        with health.track_rejections() as rejected:
+            _scrape(client, server, 1)
+        # PaperProcessor defers papers with rejections instead of skipping them
+        outcomes.append("deferred" if rejected else "no_text")
+    assert outcomes == ["no_text", "no_text", "deferred", "deferred", "deferred"]
+    assert health.is_open(f"{server}/any") and Flaky.hits == 2
@@ -0,0 +1,103 @@
+import os
+import time
+import threading
+import requests
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.Services.HttpClient import HttpClient, HostMetrics
+
+"""
+    Tests for the shared pooled HTTP client against a local stand-in server
+"""
+REQUESTS = int(os.getenv("HTTP_BENCH_REQUESTS", "200"))
+
+
+class StandIn(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    connections = 0
+    failures = {}  # path -> remaining 503s
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with StandIn.lock:
+            StandIn.connections += 1
+
+    def _answer(self, body=b"{}"):
+        with StandIn.lock:
+            remaining = StandIn.failures.get(self.path, 0)
+            StandIn.failures[self.path] = max(remaining - 1, 0)
+        status = 503 if remaining else 200
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_GET(self):
+        self._answer()
+
+    def do_HEAD(self):
+        self._answer()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._answer()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    StandIn.connections, StandIn.failures = 0, {}
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_pooled_client_reuses_connections(server):
+    def run(get):
+        StandIn.connections = 0
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            statuses = list(pool.map(lambda i: get(f"{server}/works/{i}").status_code, range(REQUESTS)))
+        assert statuses == [200] * REQUESTS
+        return StandIn.connections, time.perf_counter() - started
+
+    bare_connections, bare_seconds = run(lambda url: requests.get(url, timeout=5))
+    client = HttpClient(pool_maxsize=8, host_metrics=HostMetrics(), health=None)
+    pooled_connections, pooled_seconds = run(client.get)
+    print(f"{REQUESTS} requests: {bare_connections} connections in {bare_seconds * 1000:.0f} ms bare vs "
+          f"{pooled_connections} in {pooled_seconds * 1000:.0f} ms pooled")
+
+    assert bare_connections == REQUESTS
+    assert pooled_connections <= 8
+    host = server.split("//")[1]
+    assert client.metrics.snapshot()[host]["requests"] == REQUESTS
+
+
+def test_idempotent_requests_retry_with_backoff(server):
+    client = HttpClient(retries=3, backoff=0.01, host_metrics=HostMetrics(), health=None)
+    StandIn.failures = {"/flaky": 2, "/down": 10, "/submit": 1}
+
+    assert client.get(f"{server}/flaky").status_code == 200
+    assert client.get(f"{server}/down").status_code == 503  # gives up after 3 retries
+    assert client.post(f"{server}/submit", json={}).status_code == 503  # never retried
+
+    stats = client.metrics.snapshot()[server.split("//")[1]]
+    assert stats["requests"] == 3 + 4 + 1 and stats["retries"] == 2 + 3
+    assert stats["errors"] == 2 + 4 + 1
+
+
+def test_connection_errors_are_retried_then_raised():
+    client = HttpClient(retries=2, backoff=0.01, timeout=0.5, host_metrics=HostMetrics(), health=None)
+    with pytest.raises(requests.ConnectionError):
+        client.get("http://127.0.0.1:9/")  # nothing listens on the discard port
+    assert client.metrics.snapshot()["127.0.0.1:9"]["retries"] == 2
@@ -0,0 +1,34 @@
+import sys
+import pytest
+from src.Utils.lazy_import import lazy_import, LazyObject
+from src.Utils.import_budget import measure, check, WEB_ENTRYPOINT
+
+"""
+    Tests for lazy heavy-module loading and the web import budget
+"""
+
+
+def test_lazy_import_defers_until_first_use():
+    sys.modules.pop("fractions", None)
+    Fraction = lazy_import("fractions", "Fraction")
+    assert isinstance(Fraction, LazyObject) and not Fraction.is_loaded
+    assert "fractions" not in sys.modules
+
+    value = Fraction(1, 3)
+    assert Fraction.is_loaded and isinstance(value, Fraction)
+    assert lazy_import("fractions", "Fraction") is sys.modules["fractions"].Fraction
+
+
+def test_missing_package_only_fails_on_use():
+    missing = lazy_import("package_that_is_not_installed")
+    with pytest.raises(ImportError):
+        missing.anything
+
+
+def test_web_entrypoint_within_import_budget():
+    try:
+        report = measure(WEB_ENTRYPOINT)
+    except ImportError as e:
+        pytest.skip(str(e))
+    print(f"{WEB_ENTRYPOINT}: {report['elapsed_ms']:.0f} ms, peak RSS {report['rss_mb']:.0f} MB")
+    assert check(report) == []
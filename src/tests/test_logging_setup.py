@@ -0,0 +1,133 @@
+import os
+import time
+import logging
+import pandas as pd
+from sqlalchemy import text
+from src.Commands.DatabaseUpdater import DatabaseUpdater
+from src.Services.DBservices.ConnectionPool import get_engine
+from src.Utils.logging_setup import BatchSummary, RateLimitFilter, StructuredFormatter, setup_logging, stop_logging
+
+"""
+    Tests for queue-based structured logging and batch summaries
+"""
+UPDATE_ROWS = int(os.getenv("LOGGING_BENCH_ROWS", "5000"))
+
+
+class SlowHandler(logging.Handler):
+    """A file handler on a busy disk / a blocked stdout pipe."""
+
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        time.sleep(0.0002)
+        self.lines.append(self.format(record))
+
+
+def make_updater(tmp_path, rows):
+    url = f"sqlite:///{tmp_path / 'update.db'}"
+    with get_engine(url).begin() as conn:
+        conn.execute(text("CREATE TABLE all_db (primary_id INTEGER PRIMARY KEY, title TEXT, score FLOAT)"))
+        conn.execute(text("INSERT INTO all_db (primary_id) VALUES (:id)"), [{"id": i} for i in range(rows)])
+    frame = pd.DataFrame({"Id": range(rows), "title": [f"paper {i}" for i in range(rows)], "score": 0.5})
+    return DatabaseUpdater("all_db", column_mapping={"Id": "primary_id"}, database_url=url), frame
+
+
+def test_update_loop_logging_overhead(tmp_path, monkeypatch):
+    updater, frame = make_updater(tmp_path, UPDATE_ROWS)
+    stop_logging()  # in case the app module configured it already
+    root, handler = logging.getLogger(), SlowHandler()
+    saved = root.handlers[:], root.level
+    root.handlers = [handler]
+    root.setLevel(logging.INFO)  # setLevel, not .level: it clears the loggers' isEnabledFor caches
+
+    # Before: one synchronous log line per row (what the prints used to do)
+    add = BatchSummary.add
+
+    def per_row(self, outcome, record_id=None, count=1):
+        logging.getLogger("src.Commands.DatabaseUpdater").info(f"Updated record with primary_id = {record_id}")
+        add(self, outcome, record_id, count)
+
+    monkeypatch.setattr(BatchSummary, "add", per_row)
+    started = time.perf_counter()
+    updater.update_columns_for_existing_records(frame, "Id")
+    per_row_seconds = time.perf_counter() - started
+    monkeypatch.setattr(BatchSummary, "add", add)
+
+    # After: queue handler, rate limiting and one summary record per batch
+    handler.lines.clear()
+    try:
+        setup_logging(structured=True, rate_limit=20)
+        started = time.perf_counter()
+        updater.update_columns_for_existing_records(frame, "Id")
+        queued_seconds = time.perf_counter() - started
+    finally:
+        stop_logging()
+        root.handlers = saved[0]
+        root.setLevel(saved[1])
+
+    print(f"update loop, {UPDATE_ROWS} rows: {per_row_seconds:.2f} s with per-row logging vs "
+          f"{queued_seconds:.2f} s with queued batch summaries")
+    summaries = [line for line in handler.lines if "update_columns_for_existing_records" in line]
+    assert len(summaries) == 1 and f'"updated":{UPDATE_ROWS}' in summaries[0]
+    assert queued_seconds < per_row_seconds / 2
+
+
+def test_queue_handler_formats_structured_records_off_thread():
+    stop_logging()
+    root, handler = logging.getLogger(), SlowHandler()
+    saved = root.handlers[:], root.level
+    root.handlers = [handler]
+    root.setLevel(logging.DEBUG)
+    try:
+        setup_logging(structured=True, rate_limit=3, rate_window=60, module_levels={"noisy": "ERROR"})
+        log = logging.getLogger("bench")
+        started = time.perf_counter()
+        for i in range(10):
+            log.warning("row %s failed", i, extra={"source": "Cochrane"})
+        logging.getLogger("noisy").warning("hidden")
+        emit_seconds = time.perf_counter() - started
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            log.exception("batch failed")
+    finally:
+        stop_logging()
+        root.handlers = saved[0]
+        root.setLevel(saved[1])
+        logging.getLogger("noisy").setLevel(logging.NOTSET)
+
+    assert emit_seconds < 10 * 0.0002  # the slow handler ran on the listener thread
+    assert len(handler.lines) == 4  # 3 rows let through, then the exception
+    assert '"msg":"row 0 failed"' in handler.lines[0] and '"source":"Cochrane"' in handler.lines[0]
+    assert '"exc":"Traceback' in handler.lines[3]
+
+
+def test_rate_limit_reports_suppressed_count():
+    limiter = RateLimitFilter(limit=2, window=1.0)
+    record = lambda created: logging.makeLogRecord({"name": "x", "lineno": 1, "msg": "m", "created": created,
+                                                    "levelno": logging.WARNING})
+    assert [limiter.filter(record(t)) for t in (0, 0.1, 0.2, 0.3)] == [True, True, False, False]
+    late = record(1.5)
+    assert limiter.filter(late) and late.suppressed == 2
+    assert '"suppressed":2' in StructuredFormatter().format(late)
+
+
+def test_batch_summaries_are_not_rate_limited():
+    limiter, records = RateLimitFilter(limit=2, window=60.0), []
+    logger = logging.getLogger("batch-summary-test")
+    logger.addFilter(limiter)
+    logger.addHandler(type("Collect", (logging.Handler,), {"emit": lambda self, r: records.append(r)})())
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    try:
+        for batch in range(5):
+            summary = BatchSummary(logger, "update_columns", batch=batch)
+            summary.add("updated", batch)
+            summary.log()
+    finally:
+        logger.filters, logger.handlers, logger.propagate = [], [], True
+        logger.setLevel(logging.NOTSET)
+    assert [r.batch for r in records] == [0, 1, 2, 3, 4]
+    assert records[0].pathname == __file__ and "_batch_summary" not in StructuredFormatter().format(records[0])
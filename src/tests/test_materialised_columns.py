@@ -0,0 +1,121 @@
+import json
+import pandas as pd
+from flask import Flask
+from sqlalchemy import event, text
+from src.Commands.DatabaseUpdater import DatabaseUpdater
+from src.Services.DBservices.ConnectionPool import get_engine
+from src.Services.DBservices.RecordProcessor import RecordProcessor
+from src.middlewares.record_processor_middleware import RecordProcessorMiddleware, jsonify_records
+
+"""
+    Tests for research_notes, topic_notes and notes materialised at write
+    time, and for the serialisation hook that skips the after_request pass
+"""
+COVERAGE = "topic__hash__coverage__hash__vaccine_uptake"
+SAFETY = "topic__hash__safety__hash__adverse_events"
+DEATH = "outcome__hash__death__hash__mortality"
+
+
+def make_updater(tmp_path):
+    url = f"sqlite:///{tmp_path / 'notes.db'}"
+    with get_engine(url).begin() as conn:
+        conn.execute(text(f'CREATE TABLE all_db (primary_id INTEGER PRIMARY KEY, title TEXT, '
+                          f'"{COVERAGE}" TEXT, "{SAFETY}" TEXT, "{DEATH}" TEXT)'))
+        conn.execute(text(f'INSERT INTO all_db (primary_id, title, "{COVERAGE}", "{SAFETY}", "{DEATH}") '
+                          f'VALUES (1, :title, :coverage, :safety, :death)'),
+                     {"title": "Masks", "coverage": "coverage:cov", "safety": "safety:saf", "death": "death:dea"})
+        conn.execute(text("INSERT INTO all_db (primary_id, title) VALUES (2, 'Vaccines')"))
+    return DatabaseUpdater("all_db", column_mapping={"Id": "primary_id"}, database_url=url)
+
+
+def stored(updater, primary_id):
+    with updater.engine.connect() as conn:
+        row = conn.execute(text("SELECT research_notes, topic_notes, notes FROM all_db WHERE primary_id = :id"),
+                           {"id": primary_id}).mappings().first()
+    return dict(row)
+
+
+def test_compute_artificial_columns_groups_the_tag_codes():
+    processor = RecordProcessor(include_empty=True)
+    record = {"primary_id": 1, "title": "Masks", COVERAGE: "coverage:cov", SAFETY: "safety:saf; harm:saf",
+              DEATH: "death:dea", "topic__hash__other": "influenza:infl"}
+    assert processor.compute_artificial_columns(record) == {
+        "research_notes": "cov", "topic_notes": "infl, saf", "notes": "dea"}
+    # A record without tags still gets all three columns, so NULL keeps meaning "not materialised"
+    assert processor.compute_artificial_columns({"primary_id": 2, "title": "Vaccines"}) == {
+        "research_notes": "", "topic_notes": "", "notes": ""}
+
+
+def test_has_materialised_columns():
+    processor = RecordProcessor()
+    assert processor.has_materialised_columns({"research_notes": "", "topic_notes": "", "notes": ""})
+    assert not processor.has_materialised_columns({"research_notes": "cov", "topic_notes": None, "notes": ""})
+    assert not processor.has_materialised_columns({"primary_id": 1})
+
+    # Stored values are served as they are instead of being re-extracted
+    record = {"primary_id": 1, COVERAGE: "coverage:cov", "research_notes": "stored", "topic_notes": "",
+              "notes": ""}
+    assert processor.add_artificial_columns([record])[0]["research_notes"] == "stored"
+
+
+def test_jsonify_records_formats_once_and_marks_the_response():
+    app = Flask(__name__)
+    payload = {"success": True, "data": [{"primary_id": 1, COVERAGE: "coverage:cov", DEATH: "death:dea"}]}
+    with app.test_request_context():
+        response = jsonify_records(payload)
+        assert getattr(response, RecordProcessorMiddleware.PROCESSED_ATTR) is True
+        body = response.get_json()
+        assert body["data"][0]["research_notes"] == ["cov"] and body["data"][0]["notes"] == ["dea"]
+
+        # The after_request pass leaves a marked response alone
+        middleware = RecordProcessorMiddleware()
+        before = response.get_data()
+        assert middleware.process_response(response).get_data() == before
+
+        error = jsonify_records({"success": False, "data": [{"primary_id": 1}]}, 400)
+        assert "research_notes" not in json.loads(error.get_data())["data"][0]
+
+
+def test_update_writes_the_notes_with_the_tags(tmp_path):
+    updater = make_updater(tmp_path)
+    frame = pd.DataFrame({"Id": [2], "topic#coverage#vaccine_uptake": ["uptake:upt"],
+                          "outcome#death#mortality": ["death:dea"]})
+    updater.update_columns_for_existing_records(frame, "Id")
+    assert stored(updater, 2) == {"research_notes": "upt", "topic_notes": "", "notes": "dea"}
+
+
+def test_partial_tag_update_keeps_the_stored_tags_in_the_notes(tmp_path):
+    updater = make_updater(tmp_path)
+    updater.materialise_artificial_columns()
+    assert stored(updater, 1) == {"research_notes": "cov", "topic_notes": "saf", "notes": "dea"}
+
+    # Only the outcome column is re-tagged: the topic notes must survive
+    updater.update_columns_for_existing_records(pd.DataFrame({"Id": [1], DEATH: ["hospitalisation:hosp"]}), "Id")
+    assert stored(updater, 1) == {"research_notes": "cov", "topic_notes": "saf", "notes": "hosp"}
+
+
+def test_stored_tags_are_read_once_per_frame(tmp_path):
+    updater = make_updater(tmp_path)
+    with updater.engine.begin() as conn:
+        conn.execute(text("INSERT INTO all_db (primary_id) VALUES (3), (4), (5)"))
+    selects = []
+
+    def count_selects(conn, cursor, statement, *args):
+        if statement.startswith("SELECT") and "FROM all_db" in statement:
+            selects.append(statement)
+
+    event.listen(updater.engine, "before_cursor_execute", count_selects)
+    try:
+        updater.update_columns_for_existing_records(
+            pd.DataFrame({"Id": [1, 2, 3, 4, 5], DEATH: ["hospitalisation:hosp"] * 5}), "Id")
+    finally:
+        event.remove(updater.engine, "before_cursor_execute", count_selects)
+    assert len(selects) == 1
+    assert stored(updater, 1)["topic_notes"] == "saf" and stored(updater, 4)["notes"] == "hosp"
+
+
+def test_backfill_only_touches_rows_without_notes(tmp_path):
+    updater = make_updater(tmp_path)
+    assert updater.materialise_artificial_columns(batch_size=1) == 2
+    assert stored(updater, 2) == {"research_notes": "", "topic_notes": "", "notes": ""}
+    assert updater.materialise_artificial_columns() == 0
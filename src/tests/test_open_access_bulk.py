@@ -0,0 +1,153 @@
+import os
+import re
+import json
+import time
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+from src.Commands.OpenAccessUpdate import BulkOpenAccessResolver
+from src.Services.HttpClient import HttpClient
+from src.Utils.disk_cache import DiskCache
+
+"""
+    Tests for batched open access lookups against local OpenAlex, Europe PMC
+    and Unpaywall stand-ins
+"""
+DOIS = int(os.getenv("OA_BENCH_DOIS", "120"))
+LATENCY = float(os.getenv("OA_BENCH_LATENCY", "0.01"))
+FAST = {"openalex": 1000, "europepmc": 1000, "unpaywall": 1000}
+
+
+def _known(doi):
+    return not doi.endswith("7")  # ...7 is in no service
+
+
+def _service(name):
+    class StandIn(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True  # headers and body go out as separate writes
+        requests = 0
+
+        def do_GET(self):
+            type(self).requests += 1
+            time.sleep(LATENCY)
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            status, body = 200, {}
+            if name == "openalex":
+                dois = query["filter"][0][len("doi:"):].split("|")
+                body = {"results": [{"doi": f"https://doi.org/{d}", "publication_year": 2021,
+                                     "primary_location": {"source": {"display_name": "Stand-in Journal"}}}
+                                    for d in dois if _known(d)]}
+            elif name == "europepmc":
+                dois = re.findall(r'DOI:"([^"]+)"', query["query"][0])
+                body = {"resultList": {"result": [{"doi": d, "pubYear": "2021"} for d in dois if _known(d)]}}
+            else:
+                doi = unquote(url.path[len("/v2/"):])
+                if _known(doi):
+                    body = {"doi": doi, "is_oa": doi[-1] in "02468", "year": 2021,
+                            "best_oa_location": {"url_for_pdf": f"https://oa.example/{doi}.pdf"},
+                            "z_authors": [{"given": "Ada", "family": "Lovelace"}]}
+                else:
+                    status, body = 404, {"error": True}
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return StandIn
+
+
+@pytest.fixture
+def services():
+    servers, urls, handlers = [], {}, {}
+    for name, prefix in (("openalex", ""), ("europepmc", ""), ("unpaywall", "/v2")):
+        handlers[name] = _service(name)
+        httpd = ThreadingHTTPServer(("127.0.0.1", 0), handlers[name])
+        httpd.daemon_threads = True
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        servers.append(httpd)
+        urls[name] = f"http://127.0.0.1:{httpd.server_address[1]}{prefix}"
+    yield urls, handlers
+    for httpd in servers:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def _dois():
+    return [f"https://doi.org/10.1000/bench.{i}" for i in range(DOIS)]
+
+
+def test_bulk_resolution_matches_and_is_faster(services, tmp_path):
+    urls, handlers = services
+    # One DOI per request, one request at a time: the old per-record path
+    sequential = BulkOpenAccessResolver(batch_size=1, workers=1, service_urls=urls, rates=FAST,
+                                        cache_dir=str(tmp_path / "sequential"))
+    started = time.perf_counter()
+    expected = sequential.resolve(_dois())
+    one_by_one = time.perf_counter() - started
+
+    bulk = BulkOpenAccessResolver(service_urls=urls, rates=FAST, cache_dir=str(tmp_path / "bulk"))
+    started = time.perf_counter()
+    resolved = bulk.resolve(_dois())
+    batched = time.perf_counter() - started
+
+    print(f"{DOIS} DOIs: {DOIS / one_by_one * 60:,.0f} DOIs/min one by one "
+          f"({sum(sequential.requests.values())} requests), {DOIS / batched * 60:,.0f} DOIs/min batched "
+          f"({sum(bulk.requests.values())} requests)")
+    assert resolved == expected
+    assert bulk.requests["openalex"] == bulk.requests["europepmc"] == -(-DOIS // bulk.batch_size)
+    assert bulk.requests["unpaywall"] == DOIS
+    assert resolved["10.1000/bench.7"]["message"]
+    found = resolved["10.1000/bench.2"]
+    assert found["is_oa"] and found["journal_name"] == "Stand-in Journal" and found["authors"] == "Ada Lovelace"
+    assert batched * 4 < one_by_one
+
+
+def test_responses_are_cached_on_disk(services, tmp_path):
+    urls, handlers = services
+    first = BulkOpenAccessResolver(service_urls=urls, rates=FAST, cache_dir=str(tmp_path))
+    expected = first.resolve(_dois()[:20])
+    before = {name: handler.requests for name, handler in handlers.items()}
+
+    # A new process: nothing in memory, everything (found or not) on disk
+    again = BulkOpenAccessResolver(service_urls=urls, rates=FAST, cache_dir=str(tmp_path))
+    assert again.resolve(_dois()[:20]) == expected
+    assert {name: handler.requests for name, handler in handlers.items()} == before
+    assert sum(again.requests.values()) == 0
+
+
+def test_failed_lookups_are_not_cached(services, tmp_path):
+    urls, handlers = services
+    broken = dict(urls, openalex="http://127.0.0.1:1")  # nothing listens there
+    resolver = BulkOpenAccessResolver(service_urls=broken, rates=FAST, cache_dir=str(tmp_path),
+                                      http=HttpClient(retries=0, health=None))
+    resolved = resolver.resolve(_dois()[:5])
+    assert resolved["10.1000/bench.2"]["is_oa"]  # the other services still answer
+    assert resolver.caches["openalex"].get("10.1000/bench.2") is DiskCache.MISSING
+
+
+@pytest.mark.skipif(not os.getenv("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL not set")
+def test_run_writes_back_one_update_per_batch(services, tmp_path):
+    from src.Services.DBservices.ConnectionPool import ConnectionPool
+    urls, _ = services
+    pool = ConnectionPool(os.environ["TEST_DATABASE_URL"])
+    pool.execute("DROP TABLE IF EXISTS oa_test")
+    pool.execute("CREATE TABLE oa_test (primary_id BIGINT PRIMARY KEY, doi TEXT, open_access TEXT, "
+                 "authors TEXT, publication_date TEXT, year INTEGER, journal TEXT)")
+    pool.execute("INSERT INTO oa_test (primary_id, doi) VALUES (%s, %s)",
+                 [(i, doi) for i, doi in enumerate(_dois())], many=True)
+
+    resolver = BulkOpenAccessResolver(service_urls=urls, rates=FAST, cache_dir=str(tmp_path), pool=pool)
+    stats = resolver.run("oa_test", "doi", "primary_id", db_batch=50)
+    print(f"run: {stats}")
+    assert stats["records"] == DOIS and stats["updated"] == DOIS - stats["not_found"]
+    rows = dict(pool.fetch_all("SELECT primary_id, year FROM oa_test WHERE open_access IS NOT NULL"))
+    assert rows[2] == 2021 and 7 not in rows
+    assert pool.metrics.snapshot()["open_access_update"]["calls"] == -(-DOIS // 50)
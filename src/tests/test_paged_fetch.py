@@ -0,0 +1,142 @@
+import os
+import json
+import time
+import random
+import threading
+import pytest
+import pandas as pd
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.Services.PagedFetch import PagedFetch, page_files
+from src.Services.Factories.LoveV import LoveV
+
+"""
+    Tests for concurrent, ordered and resumable page retrieval, against a
+    local paginated L·OVE API stand-in with injected latency
+"""
+TOTAL = int(os.getenv("PAGES_BENCH_RECORDS", "3000"))
+PAGE_SIZE = int(os.getenv("PAGES_BENCH_PAGE_SIZE", "100"))
+LATENCY = float(os.getenv("PAGES_BENCH_LATENCY", "0.05"))  # per page
+
+
+class Love(BaseHTTPRequestHandler):
+    """POST {page, size} -> {"items": [...], "total": n} (no total unless `report_total`)"""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    items = []
+    requested = []
+    failing = set()
+    report_total = True
+    lock = threading.Lock()
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with Love.lock:
+            Love.requested.append(payload["page"])
+        time.sleep(LATENCY)
+        if payload["page"] in Love.failing:
+            return self._send(500, b"upstream error")
+        start = (payload["page"] - 1) * payload["size"]
+        data = {"items": Love.items[start:start + payload["size"]]}
+        if Love.report_total:
+            data["total"] = len(Love.items)
+        self._send(200, json.dumps(data).encode())
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def love(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Love)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    Love.items = [{"id": f"ref{n}", "title": f"Review {n}", "year": 2011 + n % 14} for n in range(1, TOTAL + 1)]
+    Love.requested, Love.failing, Love.report_total = [], set(), True
+    url = f"http://127.0.0.1:{httpd.server_address[1]}/references"
+
+    def harvest(workers):
+        harvester = LoveV(pageSize=PAGE_SIZE, max_retries=1, base_sleep=0, workers=workers)
+        harvester.api_url = url
+        started = time.perf_counter()
+        harvester.executeRetrieveData()
+        return harvester, time.perf_counter() - started
+
+    yield harvest
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _output():
+    return pd.read_csv(os.path.join("Data", "L-OVE", "LOVE.csv"))
+
+
+def _clear_pages(harvester):
+    for path in page_files(harvester.data_dir, "love_page_"):
+        os.remove(path)
+
+
+def test_concurrent_harvest_is_faster_and_keeps_the_order(love):
+    sequential, one_by_one = love(workers=1)
+    expected = _output()
+    _clear_pages(sequential)
+    os.remove(sequential.sync.path)  # full harvest again, not an incremental sync
+
+    concurrent, pooled = love(workers=8)
+    pages = -(-TOTAL // PAGE_SIZE)
+    print(f"{pages} pages of {PAGE_SIZE}: {one_by_one * 1000:.0f} ms one at a time, "
+          f"{pooled * 1000:.0f} ms with 8 workers")
+    assert list(expected["id"]) == [f"ref{n}" for n in range(1, TOTAL + 1)]  # page 2 before page 10
+    pd.testing.assert_frame_equal(expected, _output())
+    assert len(page_files(concurrent.data_dir, "love_page_")) == pages
+    assert pooled * 3 < one_by_one
+
+
+def test_interrupted_harvest_resumes_after_the_last_saved_page(love):
+    Love.failing = {7}
+    interrupted, _ = love(workers=4)
+    saved = page_files(interrupted.data_dir, "love_page_")
+    assert [os.path.basename(path) for path in saved] == [f"love_page_{n}.csv" for n in range(1, 7)]
+    assert not interrupted.sync.has_watermark()  # a partial harvest is not a baseline
+
+    Love.failing, Love.requested = set(), []
+    resumed, _ = love(workers=4)
+    assert min(Love.requested) == 7 and len(Love.requested) == len(set(Love.requested))
+    assert list(_output()["id"]) == [f"ref{n}" for n in range(1, TOTAL + 1)]
+    assert resumed.sync.has_watermark()
+
+
+def test_page_count_is_probed_when_not_reported(love):
+    Love.report_total = False
+    harvester, _ = love(workers=4)
+    pages = -(-TOTAL // PAGE_SIZE)
+    assert len(page_files(harvester.data_dir, "love_page_")) == pages
+    # Doubling then bisecting: a handful of probes, and no page fetched twice
+    assert len(Love.requested) - pages <= 2 * pages.bit_length()
+    assert len(set(Love.requested)) == len(Love.requested)
+
+
+def test_pages_are_delivered_in_order_within_the_limits():
+    in_flight, most = [0], [0]
+    lock = threading.Lock()
+
+    def fetch_page(page):
+        with lock:
+            in_flight[0] += 1
+            most[0] = max(most[0], in_flight[0])
+        time.sleep(random.uniform(0, 0.01))
+        with lock:
+            in_flight[0] -= 1
+        return [page] if page <= 75 else []
+
+    pages = PagedFetch(fetch_page, workers=5, window=10)
+    assert [page for page, _ in pages.run(first_page=3)] == list(range(3, 76))
+    assert most[0] <= 5 and pages.stats["pages"] == 73
+    assert list(pages.run(first_page=76)) == []
@@ -0,0 +1,189 @@
+import os
+import time
+import threading
+import pytest
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.Services.ResolutionCache import ResolutionCache
+import src.Services.Factories.scrapers.GeneralPDFWebScraper as scraper_module
+import src.Utils.Helpers as helpers
+
+"""
+    Tests for the DOI -> landing page -> PDF URL resolution cache
+"""
+PAPERS = int(os.getenv("RESOLUTION_BENCH_PAPERS", "30"))
+SELENIUM_SECONDS = float(os.getenv("RESOLUTION_BENCH_SELENIUM_SECONDS", "0.05"))
+
+
+class Publisher(BaseHTTPRequestHandler):
+    """/doi/<n> redirects to /article/<n>, which links its PDF; /doi/dead/<n> is gone."""
+    protocol_version = "HTTP/1.1"
+    hits = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        with Publisher.lock:
+            Publisher.hits += 1
+        if self.path.startswith("/doi/dead"):
+            return self._send(404)
+        if self.path.startswith("/doi/"):
+            return self._send(302, location=self.path.replace("/doi/", "/article/"))
+        body = f'<a href="{self.path}/fulltext.pdf">PDF</a>'.encode()
+        self._send(200, body)
+
+    def _send(self, status, body=b"", location=None):
+        self.send_response(status)
+        if location:
+            self.send_header("Location", location)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Publisher)
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    Publisher.hits = 0
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def selenium(monkeypatch):
+    """Stand-in for the browser-based PDF link extraction."""
+    launches = []
+
+    def extract_pdf_links(url, headless=True):
+        launches.append(url)
+        time.sleep(SELENIUM_SECONDS)
+        return [f"{url}/fulltext.pdf"]
+
+    monkeypatch.setattr(scraper_module, "extract_pdf_links", extract_pdf_links)
+    return launches
+
+
+def _run(cache, server, method):
+    scraper = scraper_module.GeneralPDFWebScraper("test", resolution_cache=cache)
+    started = time.perf_counter()
+    results = [getattr(scraper.set_doi_url(f"{server}/doi/{i}"), method)() for i in range(PAPERS)]
+    return results, time.perf_counter() - started
+
+
+def test_repeated_run_skips_redirects_and_selenium(server, selenium):
+    cache = ResolutionCache(persistent=False)
+    first, cold = _run(cache, server, "fetch_pdf_urls_2")
+    hits_cold, launches_cold = Publisher.hits, len(selenium)
+    second, warm = _run(cache, server, "fetch_pdf_urls_2")
+
+    stats = cache.snapshot()
+    print(f"{PAPERS} DOIs: {cold * 1000:.0f} ms cold, {warm * 1000:.0f} ms on the repeated run; "
+          f"{stats['redirect_lookups_avoided']} redirect lookups and "
+          f"{stats['selenium_avoided']} Selenium launches avoided")
+    assert first == second == [[f"{server}/article/{i}/fulltext.pdf"] for i in range(PAPERS)]
+    assert hits_cold == 2 * PAPERS and launches_cold == PAPERS
+    assert Publisher.hits == hits_cold and len(selenium) == launches_cold
+    assert stats["selenium_avoided"] == stats["redirect_lookups_avoided"] == PAPERS
+    assert warm * 5 < cold
+
+
+def test_landing_pages_are_reused_by_html_discovery(server):
+    cache = ResolutionCache(persistent=False)
+    first, _ = _run(cache, server, "fetch_pdf_urls")
+    assert first[0] == [f"{server}/article/0/fulltext.pdf"]
+    assert Publisher.hits == 3 * PAPERS  # redirect, landing, landing page GET
+    scraper = scraper_module.GeneralPDFWebScraper("test", resolution_cache=cache).set_doi_url(f"{server}/doi/0")
+    assert scraper.fetch_redirected_url() == f"{server}/article/0"
+    assert Publisher.hits == 3 * PAPERS
+    assert cache.snapshot()["redirect_lookups_avoided"] == 1
+
+
+def test_dead_links_are_cached_negatively(server):
+    cache = ResolutionCache(persistent=False, negative_ttl=0.3)
+    scraper = scraper_module.GeneralPDFWebScraper("test", resolution_cache=cache).set_doi_url(f"{server}/doi/dead/1")
+    assert scraper.fetch_pdf_urls() == []
+    hits = Publisher.hits
+    assert scraper.fetch_pdf_urls() == [] and scraper.fetch_redirected_url() == ""
+    assert Publisher.hits == hits and cache.snapshot()["negative_hits"] >= 1
+
+    time.sleep(0.35)  # negative entries expire sooner
+    scraper.fetch_pdf_urls()
+    assert Publisher.hits > hits
+
+
+def test_stale_entry_is_dropped_on_use():
+    cache = ResolutionCache(persistent=False)
+    resolutions = []
+
+    def resolve():
+        resolutions.append(1)
+        return "https://publisher.example/article/1"
+
+    assert cache.landing_page("https://doi.org/10.1/x", resolve) == "https://publisher.example/article/1"
+    cache.landing_page("https://doi.org/10.1/x", resolve)
+    assert len(resolutions) == 1
+    cache.report_status("https://doi.org/10.1/x", 200)
+    cache.landing_page("https://doi.org/10.1/x", resolve)
+    assert len(resolutions) == 1
+
+    cache.report_status("https://doi.org/10.1/x", 410)  # served from cache: looked up again, not marked dead
+    assert cache.landing_page("https://doi.org/10.1/x", resolve) == "https://publisher.example/article/1"
+    assert len(resolutions) == 2 and cache.snapshot()["invalidated"] == 1
+
+    cache.report_moved("https://doi.org/10.1/x", "https://publisher.example/article/1",
+                       "https://publisher.example/a/1")
+    assert cache.landing_page("https://doi.org/10.1/x", resolve) == "https://publisher.example/a/1"
+
+
+def test_entries_expire():
+    cache = ResolutionCache(persistent=False, ttl=0.2)
+    calls = []
+    resolve = lambda: calls.append(1) or "https://publisher.example/a"
+    cache.landing_page("https://doi.org/10.1/y", resolve)
+    cache.landing_page("https://doi.org/10.1/y", resolve)
+    time.sleep(0.25)
+    cache.landing_page("https://doi.org/10.1/y", resolve)
+    assert len(calls) == 2
+
+
+def test_failed_lookups_are_not_cached(monkeypatch):
+    class TimesOutAfterOneHop:
+        """The DOI redirects once, then the publisher times out."""
+        calls = []
+
+        def get(self, url, **kwargs):
+            self.calls.append(url)
+            if url.startswith("https://doi.org/"):
+                return type("Response", (), {"status_code": 302,
+                                             "headers": {"Location": "https://publisher.example/a/1"}})()
+            raise requests.Timeout("read timed out")
+
+    monkeypatch.setattr(helpers, "get_http_client", TimesOutAfterOneHop)
+    assert helpers.get_final_url("https://doi.org/10.1/z") is None
+
+    cache = ResolutionCache(persistent=False)
+    scraper = scraper_module.GeneralPDFWebScraper("test", resolution_cache=cache).set_doi_url("https://doi.org/10.1/z")
+    assert scraper.fetch_redirected_url() == "" and scraper.fetch_redirected_url() == ""
+    assert len(TimesOutAfterOneHop.calls) == 6  # looked up again, neither the DOI nor the hop was kept
+    assert cache.snapshot()["negative_hits"] == cache.snapshot()["landing_hits"] == 0
+
+
+@pytest.mark.skipif(not os.getenv("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL not set")
+def test_resolutions_survive_the_process(server, selenium):
+    from src.Services.DBservices.ConnectionPool import ConnectionPool
+    pool = ConnectionPool(os.environ["TEST_DATABASE_URL"])
+    pool.execute("DROP TABLE IF EXISTS resolution_test_cache")
+    _run(ResolutionCache(pool=pool, table="resolution_test_cache"), server, "fetch_pdf_urls_2")
+    hits, launches = Publisher.hits, len(selenium)
+
+    # A new run: empty memory tier, same table
+    cache = ResolutionCache(pool=pool, table="resolution_test_cache")
+    _run(cache, server, "fetch_pdf_urls_2")
+    assert Publisher.hits == hits and len(selenium) == launches
+    assert cache.snapshot()["selenium_avoided"] == PAPERS
@@ -0,0 +1,92 @@
+import time
+from flask import Flask
+from sqlalchemy import text
+from database.db import db
+from src.Services.DBservices.SchemaSnapshot import SchemaSnapshot
+from src.Services.DBservices.SafeRegistryInit import (
+    initialize_registry_safely,
+    initialize_registry_from_snapshot,
+    refresh_snapshot_in_background,
+)
+
+"""
+    Tests for fast boot from the persisted schema snapshot
+"""
+TABLE = "boot_snapshot_test"
+WIDE_COLUMNS = 400
+
+
+class StubFilterService:
+    def __init__(self):
+        self._cache = None
+        self.calls = 0
+
+    def invalidate_cache(self):
+        self._cache = None
+
+    def get_all_filters(self, bypass_cache=False):
+        self.calls += 1
+        return {"others": {"Year": {"column": "year"}}, "tag_filters": {}}
+
+
+def make_app(tmp_path):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'boot.db'}"
+    db.init_app(app)
+    with app.app_context():
+        columns = ", ".join(f'"topic__hash__c{i}" VARCHAR' for i in range(WIDE_COLUMNS))
+        with db.engine.begin() as conn:
+            conn.execute(text(f'CREATE TABLE IF NOT EXISTS {TABLE} '
+                              f'(primary_id INTEGER PRIMARY KEY, title TEXT, year INTEGER, {columns})'))
+    return app
+
+
+def test_snapshot_round_trip_and_cold_start(tmp_path):
+    app = make_app(tmp_path)
+    path = str(tmp_path / "snapshot.json")
+    with app.app_context():
+        started = time.perf_counter()
+        reflected = initialize_registry_safely(app, table_names=[TABLE])
+        reflect_time = time.perf_counter() - started
+        table = reflected["registry"].get_by_table(TABLE).__table__
+        assert SchemaSnapshot(db.engine, path).save({TABLE: table}, {"others": {}})
+
+        started = time.perf_counter()
+        result = initialize_registry_from_snapshot(app, [TABLE], snapshot_path=path)
+        snapshot_time = time.perf_counter() - started
+        print(f"{WIDE_COLUMNS + 3} columns: reflect {reflect_time * 1000:.1f} ms, "
+              f"snapshot {snapshot_time * 1000:.1f} ms")
+
+        assert result["from_snapshot"] and result["stale_tables"] == []
+        loaded = result["registry"].get_by_table(TABLE).__table__
+        assert [(c.name, type(c.type), c.primary_key) for c in loaded.columns] == \
+            [(c.name, type(c.type), c.primary_key) for c in table.columns]
+
+
+def test_stale_snapshot_is_refreshed_in_background(tmp_path):
+    app = make_app(tmp_path)
+    path = str(tmp_path / "snapshot.json")
+    with app.app_context():
+        reflected = initialize_registry_safely(app, table_names=[TABLE])
+        SchemaSnapshot(db.engine, path).save({TABLE: reflected["registry"].get_by_table(TABLE).__table__})
+        with db.engine.begin() as conn:
+            conn.execute(text(f'ALTER TABLE {TABLE} ADD COLUMN "notes" VARCHAR'))
+
+        result = initialize_registry_from_snapshot(app, [TABLE], snapshot_path=path)
+        assert result["stale_tables"] == [TABLE]
+
+    filters = StubFilterService()
+    refresh_snapshot_in_background(app, result, filter_service=filters, table_names=[TABLE]).join()
+
+    assert "notes" in result["registry"].get_by_table(TABLE).__table__.columns
+    with app.app_context():
+        fresh = SchemaSnapshot(db.engine, path)
+        assert fresh.load() and fresh.validate([TABLE])["stale_tables"] == []
+        assert fresh.filters == filters.get_all_filters()
+
+
+def test_missing_snapshot_falls_back_to_reflection(tmp_path):
+    app = make_app(tmp_path)
+    with app.app_context():
+        result = initialize_registry_from_snapshot(app, [TABLE], snapshot_path=str(tmp_path / "none.json"))
+    assert result["success"] and not result["from_snapshot"]
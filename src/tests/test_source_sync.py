@@ -0,0 +1,171 @@
+import os
+import json
+import time
+import threading
+import pytest
+import pandas as pd
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.Services.SourceSync import SourceSync, fingerprint, read_rows, upsert_csv
+from src.Services.Factories.LoveV import LoveV
+import src.Services.Factories.LoveV as love_module
+
+"""
+    Tests for watermark-based incremental synchronisation, against a local
+    L·OVE API stand-in
+"""
+TOTAL = int(os.getenv("SYNC_BENCH_RECORDS", "2000"))
+PAGE_SIZE = int(os.getenv("SYNC_BENCH_PAGE_SIZE", "100"))
+LATENCY = float(os.getenv("SYNC_BENCH_LATENCY", "0.03"))  # per page
+
+
+class Love(BaseHTTPRequestHandler):
+    """POST {page, size} -> {"items": [...]}, newest first"""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    items = []
+    pages = 0
+    failing = False
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        Love.pages += 1
+        time.sleep(LATENCY)
+        if Love.failing:
+            return self._send(500, b"upstream error")
+        start = (payload["page"] - 1) * payload["size"]
+        body = json.dumps({"items": Love.items[start:start + payload["size"]]}).encode()
+        self._send(200, body)
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _item(n):
+    item = {"id": f"ref{n}", "title": f"Review {n}", "year": 2011 + n % 14,
+            "classification": "systematic-review", "doi": f"10.1000/love.{n}"}
+    if n % 7 == 0:
+        del item["year"]  # a gap: pandas writes the column as floats
+    return item
+
+
+@pytest.fixture
+def love(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Love)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    Love.items, Love.pages, Love.failing = [_item(n) for n in range(TOTAL, 0, -1)], 0, False
+    url = f"http://127.0.0.1:{httpd.server_address[1]}/references"
+
+    def run():
+        harvester = LoveV(pageSize=PAGE_SIZE, max_retries=1, base_sleep=0)
+        harvester.api_url = url
+        before = Love.pages
+        started = time.perf_counter()
+        harvester.fetch({})
+        return harvester, Love.pages - before, time.perf_counter() - started
+
+    yield run
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _output():
+    return pd.read_csv(os.path.join("Data", "L-OVE", "LOVE.csv"), dtype=str, keep_default_na=False)
+
+
+def test_resync_without_changes_fetches_two_pages(love):
+    full, full_pages, full_seconds = love()
+    assert full.sync.has_watermark() and len(full.sync.state["records"]) == TOTAL
+
+    again, pages, seconds = love()
+    print(f"full harvest: {TOTAL} records, {full_pages} pages, {full_seconds * 1000:.0f} ms; "
+          f"no-change re-sync: {again.sync.stats['records']} records, {pages} pages, {seconds * 1000:.0f} ms")
+    assert again.sync.stats == {"pages": 2, "records": 2 * PAGE_SIZE, "changed": 0}
+    assert not os.path.exists(os.path.join("Data", "sync", "love"))  # no delta file
+    assert len(_output()) == TOTAL
+    assert seconds * 5 < full_seconds
+
+
+def test_resync_emits_new_and_changed_records(love):
+    love()
+    Love.items[3] = dict(Love.items[3], title="Review (updated)")
+    updated = Love.items[3]["id"]
+    Love.items[:0] = [_item(n) for n in range(TOTAL + 3, TOTAL, -1)]
+
+    synced, pages, _ = love()
+    deltas = os.listdir(os.path.join("Data", "sync", "love"))
+    delta = pd.read_csv(os.path.join("Data", "sync", "love", deltas[0]))
+    assert len(deltas) == 1 and sorted(delta["id"]) == sorted(["ref2003", "ref2002", "ref2001", updated])
+    assert pages == 3 and synced.sync.state["last_run"]["delta_rows"] == 4
+
+    output = _output().set_index("id")
+    assert len(output) == TOTAL + 3 and output.loc[updated, "title"] == "Review (updated)"
+
+
+def test_failed_resync_keeps_the_watermark(love):
+    first, _, _ = love()
+    state = dict(first.sync.state)
+    Love.items.insert(0, _item(TOTAL + 1))
+    Love.failing = True
+    failed, _, _ = love()
+    assert failed.sync.state == state
+
+    Love.failing = False
+    synced, _, _ = love()
+    assert synced.sync.stats["changed"] == 1 and synced.sync.state["runs"] == 2
+
+
+def test_periodic_reconcile_finds_older_years_and_deep_edits(love, monkeypatch):
+    love()
+    # Listed by year: a new reference of an old year and an edit land on the last pages
+    Love.items.append(dict(_item(TOTAL + 1), year=2011))
+    Love.items[-5] = dict(Love.items[-5], title="Review (updated)")
+
+    synced, pages, _ = love()
+    assert pages == 2 and synced.sync.stats["changed"] == 0
+
+    monkeypatch.setattr(love_module, "RECONCILE_DAYS", 0)
+    reconciled, pages, _ = love()
+    assert pages == TOTAL // PAGE_SIZE + 2  # every page, then the empty one
+    assert reconciled.sync.stats["changed"] == 2
+    output = _output().set_index("id")
+    assert len(output) == TOTAL + 1 and output.loc[Love.items[-5]["id"], "title"] == "Review (updated)"
+
+
+def test_rows_read_back_from_csv_keep_their_fingerprint(tmp_path):
+    rows = [_item(n) for n in range(1, 30)]
+    path = tmp_path / "page.csv"
+    pd.DataFrame(rows).to_csv(path, index=False)
+    assert [fingerprint(row) for row in read_rows([str(path)])] == [fingerprint(row) for row in rows]
+
+
+def test_interrupted_commit_leaves_the_state(tmp_path, monkeypatch):
+    sync = SourceSync("test", key="id", directory=str(tmp_path))
+    sync.baseline([_item(1)], {"cursor": 1})
+
+    again = SourceSync("test", key="id", directory=str(tmp_path))
+    delta = again.changed([_item(1), _item(2)])
+    assert [row["id"] for row in delta] == ["ref2"]
+    monkeypatch.setattr("src.Services.SourceSync.json.dump", lambda *args: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        again.commit(delta, {"cursor": 2})
+    monkeypatch.undo()
+
+    reloaded = SourceSync("test", key="id", directory=str(tmp_path))
+    assert reloaded.watermark == {"cursor": 1} and list(reloaded.state["records"]) == ["ref1"]
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
+
+
+def test_upsert_replaces_rows_by_key(tmp_path):
+    path = str(tmp_path / "out.csv")
+    upsert_csv(path, [{"id": "a", "v": 1}, {"id": "b", "v": 2}], key="id")
+    upsert_csv(path, [{"id": "b", "v": 3}, {"id": "c", "v": 4}], key="id")
+    assert pd.read_csv(path).to_dict("records") == [{"id": "a", "v": 1}, {"id": "b", "v": 3}, {"id": "c", "v": 4}]
@@ -0,0 +1,97 @@
+import os
+import sys
+import json
+import subprocess
+import pytest
+import pandas as pd
+from src.Services.StreamMerge import merge_files
+
+"""
+    Tests for the streaming merge of harvested page files, including a
+    bounded-memory run over a few million synthetic rows
+"""
+ROWS = int(os.getenv("MERGE_BENCH_ROWS", "2000000"))
+PAGE_ROWS = int(os.getenv("MERGE_BENCH_PAGE_ROWS", "5000"))
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _pages(directory, rows, page_rows=PAGE_ROWS, distinct_dois=None):
+    """Synthetic page files; every tenth page has an extra column, the DOIs repeat after `distinct_dois`."""
+    os.makedirs(directory, exist_ok=True)
+    paths, n = [], 0
+    for page in range(-(-rows // page_rows)):
+        path = os.path.join(directory, f"page_{page + 1}.csv")
+        extra = page % 10 == 9
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write("id,title,doi,year" + (",country\n" if extra else "\n"))
+            for _ in range(min(page_rows, rows - n)):
+                n += 1
+                doi = f"10.1000/merge.{n % distinct_dois if distinct_dois else n}"
+                handle.write(f"r{n},\"Trial {n}, a review\",{doi},{2011 + n % 14}" + (",Chad\n" if extra else "\n"))
+        paths.append(path)
+    return paths
+
+
+def _peak_merge(directory, rows, output, dedupe):
+    """Merges `rows` synthetic rows in a fresh interpreter; returns its stats with the peak RSS in MB."""
+    paths = _pages(directory, rows, distinct_dois=rows * 3 // 4)
+    script = (
+        "import json, resource, sys, time\n"
+        "from src.Services.StreamMerge import merge_files\n"
+        "started = time.perf_counter()\n"
+        "stats = merge_files(json.loads(sys.argv[1]), sys.argv[2], dedupe_doi=sys.argv[3] == '1')\n"
+        "stats['seconds'] = time.perf_counter() - started\n"
+        "stats['peak_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024\n"
+        "print(json.dumps(stats))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script, json.dumps(paths), output, "1" if dedupe else "0"],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_headers_are_reconciled_and_rows_kept_as_text(tmp_path):
+    pd.DataFrame({"id": ["a", "b"], "year": [2021, None]}).to_csv(tmp_path / "love_page_1.csv", index=False)
+    pd.DataFrame({"id": ["c"], "doi": ["10.1/C"], "year": [2022]}).to_csv(tmp_path / "love_page_2.csv", index=False)
+    (tmp_path / "love_page_3.csv").write_text("")
+
+    stats = merge_files([str(tmp_path / f"love_page_{n}.csv") for n in (1, 2, 3)], str(tmp_path / "out.csv"))
+    assert stats["rows"] == 3 and stats["columns"] == 3 and stats["skipped"] == [str(tmp_path / "love_page_3.csv")]
+    assert (tmp_path / "out.csv").read_text().splitlines() == ["id,year,doi", "a,2021.0,", "b,,", "c,2022,10.1/C"]
+
+
+def test_dedupe_keeps_the_first_row_per_doi(tmp_path):
+    rows = [{"id": 1, "DOI": "10.1/X"}, {"id": 2, "DOI": "https://doi.org/10.1/x"}, {"id": 3, "DOI": None},
+            {"id": 4, "DOI": None}, {"id": 5, "DOI": "doi: 10.1/y"}, {"id": 6, "DOI": "10.1/Y "}]
+    pd.DataFrame(rows).to_csv(tmp_path / "page.csv", index=False)
+    stats = merge_files([str(tmp_path / "page.csv")], str(tmp_path / "out.csv"), dedupe_doi=True)
+    assert stats["duplicates"] == 2 and list(pd.read_csv(tmp_path / "out.csv")["id"]) == [1, 3, 4, 5]
+    assert [name for name in os.listdir(tmp_path) if name not in ("page.csv", "out.csv")] == []  # key set removed
+
+
+def test_failed_merge_keeps_the_previous_output(tmp_path, monkeypatch):
+    paths = _pages(str(tmp_path / "pages"), 100, page_rows=10)
+    output = tmp_path / "out.csv"
+    output.write_text("previous\n")
+    monkeypatch.setattr("src.Services.StreamMerge._CsvSink.write", lambda self, rows: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        merge_files(paths, str(output), batch_size=10)
+    assert output.read_text() == "previous\n" and sorted(os.listdir(tmp_path)) == ["out.csv", "pages"]
+
+
+def test_parquet_output(tmp_path):
+    pytest.importorskip("pyarrow")
+    paths = _pages(str(tmp_path / "pages"), 1000, page_rows=100)
+    stats = merge_files(paths, str(tmp_path / "out.parquet"), batch_size=250)
+    df = pd.read_parquet(tmp_path / "out.parquet")
+    assert len(df) == stats["rows"] == 1000 and df["country"].notna().sum() == 100
+
+
+def test_memory_stays_bounded_on_millions_of_rows(tmp_path):
+    small = _peak_merge(str(tmp_path / "small"), ROWS // 100, str(tmp_path / "small.csv"), dedupe=True)
+    large = _peak_merge(str(tmp_path / "large"), ROWS, str(tmp_path / "large.csv"), dedupe=True)
+    size_mb = sum(os.path.getsize(tmp_path / "large" / name) for name in os.listdir(tmp_path / "large")) / 2 ** 20
+    print(f"{ROWS:,} rows ({size_mb:.0f} MB of pages): {ROWS / large['seconds'] * 60:,.0f} rows/min, "
+          f"{large['duplicates']:,} duplicate DOIs dropped, peak RSS {large['peak_mb']:.0f} MB "
+          f"(vs {small['peak_mb']:.0f} MB for {ROWS // 100:,} rows)")
+    assert large["rows"] + large["duplicates"] == ROWS and large["duplicates"] == ROWS - ROWS * 3 // 4
+    assert large["peak_mb"] - small["peak_mb"] < 40
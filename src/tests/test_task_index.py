@@ -0,0 +1,129 @@
+import os
+import time
+import threading
+import pytest
+from celery import Celery
+from celery.contrib.testing.worker import start_worker
+from flask import Flask
+from flask_restful import Api
+from src.Journals.views import task_status_api
+from src.Journals.views.task_index import TaskIndex, send_progress_event
+
+"""
+    Tests for the event-fed task index behind TaskListAPI / TaskStatusAPI
+"""
+INDEXED_TASKS = int(os.getenv("TASK_INDEX_BENCH_TASKS", "5000"))
+
+
+def events(task_id, name="execute_papers_task", start=1000.0):
+    return [
+        {"type": "task-sent", "uuid": task_id, "timestamp": start, "name": name, "queue": "bulk"},
+        {"type": "task-received", "uuid": task_id, "timestamp": start + 1, "name": name,
+         "args": "([],)", "hostname": "worker-1"},
+        {"type": "task-started", "uuid": task_id, "timestamp": start + 2, "hostname": "worker-1"},
+        {"type": "task-progress", "uuid": task_id, "timestamp": start + 3, "progress": {"current": 1, "total": 2}},
+        {"type": "task-succeeded", "uuid": task_id, "timestamp": start + 4, "runtime": 2.5, "result": "{}"},
+    ]
+
+
+def fill(index, count):
+    for i in range(count):
+        sequence = events(f"task-{i}", name="tag_batch_task" if i % 2 else "execute_papers_task", start=i * 10.0)
+        for event in sequence[:1 + i % 5]:  # tasks left at every stage
+            index.on_event(event)
+
+
+def check_index(index):
+    succeeded = events("done", start=-10.0)
+    for event in succeeded[:3] + [succeeded[4], succeeded[3]]:  # progress arrives after success
+        index.on_event(event)
+    record = index.get("done")
+    assert record["state"] == "SUCCESS" and record["worker"] == "worker-1" and record["queue"] == "bulk"
+    assert record["progress"] == {"current": 1, "total": 2} and record["runtime"] == 2.5
+
+    fill(index, 40)
+    page, total = index.list(page=1, per_page=15)
+    assert total == 41 and len(page) == 15 and page[0]["id"] == "task-39"
+    running, total = index.list(states=["started", "PROGRESS"], name="tag_batch_task")
+    assert total == 8 and {r["state"] for r in running} == {"STARTED", "PROGRESS"}
+    assert all(r["name"] == "tag_batch_task" for r in running)
+    received, total = index.list(states=["RECEIVED"], page=2, per_page=5)
+    assert total == 8 and [r["id"] for r in received] == ["task-11", "task-6", "task-1"]
+
+    index.max_tasks = 30
+    assert index.trim() == 11
+    assert index.get("task-0") is None and index.list()[1] == 30
+
+
+def test_index_folds_events_filters_and_trims():
+    check_index(TaskIndex(ttl=10 ** 10))
+
+
+@pytest.mark.skipif(not os.getenv("TEST_REDIS_URL"), reason="TEST_REDIS_URL not set")
+def test_index_on_redis():
+    import redis
+    client = redis.Redis.from_url(os.environ["TEST_REDIS_URL"])
+    for key in client.scan_iter("task-index:*"):
+        client.delete(key)
+    check_index(TaskIndex(client, ttl=10 ** 10))
+
+
+@pytest.fixture
+def celery_app(monkeypatch):
+    app = Celery("index-tests", broker="memory://", backend="cache+memory://")
+    app.conf.broker_transport_options = {"polling_interval": 0.005}
+    app.conf.worker_send_task_events = True
+    app.conf.task_send_sent_event = True
+    app.set_current()
+    monkeypatch.setattr(task_status_api, "celery", app)
+    return app
+
+
+def test_api_serves_index_fed_by_worker_events(celery_app, monkeypatch):
+    @celery_app.task(bind=True, name="indexed_task")
+    def indexed_task(self, n):
+        send_progress_event(self.app, self.request.id, {"current": n})
+        return n
+
+    index = TaskIndex(ttl=10 ** 10)
+    monkeypatch.setattr(task_status_api, "_task_index", index)
+
+    def consume():
+        with celery_app.connection_for_read() as connection:
+            celery_app.events.Receiver(connection, handlers={"*": index.on_event}).capture(limit=None, timeout=None)
+
+    threading.Thread(target=consume, daemon=True).start()
+    time.sleep(0.2)  # receiver queue bound before the first event
+
+    flask_app = Flask(__name__)
+    api = Api(flask_app)
+    api.add_resource(task_status_api.TaskListAPI, '/api/tasks')
+    api.add_resource(task_status_api.TaskStatusAPI, '/api/tasks/<string:task_id>')
+    client = flask_app.test_client()
+
+    with start_worker(celery_app, pool="threads", concurrency=2, perform_ping_check=False, loglevel="WARNING"):
+        results = [indexed_task.delay(n) for n in range(6)]
+        assert [r.get(timeout=10) for r in results] == list(range(6))
+        started = time.perf_counter()
+        while index.list(states=["SUCCESS"])[1] < 6 and time.perf_counter() - started < 10:
+            time.sleep(0.02)
+
+        started = time.perf_counter()
+        live = client.get('/api/tasks?live=true')
+        live_ms = (time.perf_counter() - started) * 1000
+    assert live.status_code == 200
+
+    fill(index, INDEXED_TASKS)
+    started = time.perf_counter()
+    for page in range(1, 21):
+        listed = client.get(f'/api/tasks?state=SUCCESS&name=indexed_task&page={page}&per_page=50')
+    indexed_ms = (time.perf_counter() - started) * 1000 / 20
+    print(f"TaskListAPI: {live_ms:,.0f} ms via worker broadcast vs {indexed_ms:.1f} ms from the index "
+          f"({INDEXED_TASKS + 6} indexed tasks)")
+    assert indexed_ms * 20 < live_ms
+
+    data = client.get('/api/tasks?state=SUCCESS&name=indexed_task&per_page=4').get_json()['data']
+    assert data['pagination']['total'] == 6 and len(data['items']) == 4
+    assert data['items'][0]['progress'] == {"current": 5}
+    status = client.get(f'/api/tasks/{results[0].id}').get_json()
+    assert status['data'] == 0
@@ -0,0 +1,107 @@
+import os
+import sys
+import csv
+import json
+import subprocess
+import pytest
+from src.Commands.UnifyCSV import CSVUnifier
+
+"""
+    Tests for external-memory DOI de-duplication in CSVUnifier, including a
+    run over a synthetic corpus larger than the memory the process may use
+"""
+ROWS = int(os.getenv("UNIFY_BENCH_ROWS", "1000000"))
+MEMORY_LIMIT_MB = int(os.getenv("UNIFY_BENCH_MEMORY_MB", "160"))  # address space of the unifying process
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+COMMON = ['id', 'verification_id', 'title', 'authors', 'doi', 'source', 'cleaned_doi', 'created_at']
+
+
+def _write(path, header, rows):
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return str(path)
+
+
+def _sources(tmp_path):
+    cochrane = _write(tmp_path / "cochrane.csv", ["cd_identifier", "title", "doi", "year"], [
+        ["CD1", "Masks", "https://doi.org/10.1000/A", "2020"],
+        ["CD2", "Vaccines", "", "2021"],
+        ["CD3", "Masks again", "10.1000/a", "2021"],
+    ])
+    love = _write(tmp_path / "love.csv", ["id", "title", "doi", "authors", "ignored"], [
+        ["L1", "Vaccines (L·OVE)", "http://dx.doi.org/10.1000/B", "Lovelace A", "x"],
+        ["L2", "No DOI", "", "Hopper G"],
+        ["L3", "Masks (L·OVE)", "10.1000/A", "Turing A", "y"],
+    ])
+    sources = {cochrane: "Cochrane", str(tmp_path / "missing.csv"): "Missing", love: "LOVE"}
+    rename_maps = {cochrane: {"cd_identifier": "verification_id", "title": "title", "doi": "doi", "year": "year"},
+                   love: {"id": "verification_id", "title": "title", "doi": "doi", "authors": "authors"}}
+    return CSVUnifier(sources, common_columns=COMMON, rename_maps=rename_maps)
+
+
+def _read(path):
+    with open(path, newline="", encoding="utf-8") as handle:
+        return [{k: v for k, v in row.items() if k != "created_at"} for row in csv.DictReader(handle)]
+
+
+def test_first_occurrence_wins_in_input_order(tmp_path):
+    unifier = _sources(tmp_path)
+    stats = unifier.process_and_save(str(tmp_path / "out" / "unique.csv"), str(tmp_path / "out" / "duplicates.csv"))
+    unique, duplicates = _read(tmp_path / "out" / "unique.csv"), _read(tmp_path / "out" / "duplicates.csv")
+
+    assert [row["id"] for row in unique] == ["Cochrane_1", "Cochrane_2", "LOVE_1", "LOVE_2"]
+    assert [row["id"] for row in duplicates] == ["Cochrane_3", "LOVE_3"]
+    assert unique[0] == {"id": "Cochrane_1", "verification_id": "CD1", "title": "Masks", "authors": "",
+                         "doi": "https://doi.org/10.1000/A", "source": "Cochrane", "cleaned_doi": "10.1000/a",
+                         "year": "2020"}
+    assert unique[2]["cleaned_doi"] == "10.1000/b" and unique[2]["authors"] == "Lovelace A"
+    assert stats["rows"] == 6 and stats["unique"] == 4 and stats["duplicates"] == 2
+    assert sorted(os.listdir(tmp_path / "out")) == ["duplicates.csv", "unique.csv"]  # partitions removed
+
+
+@pytest.mark.parametrize("partitions,workers", [(1, 1), (7, 2)])
+def test_result_does_not_depend_on_the_partitioning(tmp_path, partitions, workers):
+    rows = [[f"r{n}", f"Trial {n}", f"10.1000/{n % 37}" if n % 5 else ""] for n in range(500)]
+    source = _write(tmp_path / "source.csv", ["id", "title", "doi"], rows)
+    unifier = CSVUnifier({source: "S"}, common_columns=COMMON, rename_maps={source: {"id": "verification_id"}})
+    unifier.process_and_save(str(tmp_path / "a" / "u.csv"), str(tmp_path / "a" / "d.csv"))
+    unifier.process_and_save(str(tmp_path / "b" / "u.csv"), str(tmp_path / "b" / "d.csv"),
+                             partitions=partitions, workers=workers)
+    for name in ("u.csv", "d.csv"):
+        assert _read(tmp_path / "a" / name) == _read(tmp_path / "b" / name)
+    assert len(_read(tmp_path / "a" / "u.csv")) == 100 + 37
+
+
+def test_corpus_larger_than_the_memory_limit(tmp_path):
+    source = tmp_path / "corpus.csv"
+    with open(source, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["id", "title", "authors", "doi", "abstract"])
+        for n in range(ROWS):
+            writer.writerow([f"r{n}", f"Randomised trial of intervention {n}", "Lovelace A; Hopper G; Turing A",
+                             f"https://doi.org/10.1000/unify.{n % (ROWS * 4 // 5)}" if n % 20 else "",
+                             f"Background {n}. " * 6])
+    corpus_mb = os.path.getsize(source) / 2 ** 20
+
+    script = (
+        "import json, resource, sys\n"
+        "limit = int(sys.argv[3]) * 2 ** 20\n"
+        "resource.setrlimit(resource.RLIMIT_AS, (limit, limit))\n"
+        "from src.Commands.UnifyCSV import CSVUnifier\n"
+        "unifier = CSVUnifier({sys.argv[1]: 'Synthetic'}, common_columns=json.loads(sys.argv[4]))\n"
+        "stats = unifier.process_and_save(sys.argv[2] + '/unique.csv', sys.argv[2] + '/duplicates.csv')\n"
+        "stats['peak_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024\n"
+        "print(json.dumps(stats))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", script, str(source), str(tmp_path / "out"),
+                             str(MEMORY_LIMIT_MB), json.dumps(COMMON)],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    stats = json.loads(result.stdout.strip().splitlines()[-1])
+    print(f"{ROWS:,} rows ({corpus_mb:.0f} MB) under a {MEMORY_LIMIT_MB} MB limit: "
+          f"{stats['rows'] / stats['seconds'] * 60:,.0f} rows/min, peak RSS {stats['peak_mb']:.0f} MB, "
+          f"{stats['duplicates']:,} duplicates")
+    with_doi = ROWS - -(-ROWS // 20)
+    assert corpus_mb > MEMORY_LIMIT_MB and stats["rows"] == ROWS
+    assert stats["duplicates"] == with_doi - len({n % (ROWS * 4 // 5) for n in range(ROWS) if n % 20})
@@ -0,0 +1,100 @@
+import os
+import time
+import multiprocessing
+import pytest
+from src.Services.DBservices.WorkLeases import WorkLeases, worker_identity
+
+"""
+    Tests for lease-based batch claiming
+"""
+RECORDS = int(os.getenv("LEASE_BENCH_RECORDS", "2000"))
+BATCH_SECONDS = float(os.getenv("LEASE_BENCH_BATCH_SECONDS", "0.05"))
+SOURCE = "lease_test"
+requires_postgres = pytest.mark.skipif(not os.getenv("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL not set")
+
+
+def test_heartbeat_renews_and_flags_lost_lease():
+    leases = WorkLeases.__new__(WorkLeases)
+    leases.lease_seconds = 0.3
+    renewals = []
+
+    def renew(source_name, owner, ids, lease_seconds=None):
+        renewals.append(len(renewals))
+        return len(ids) if len(renewals) < 5 else len(ids) - 1  # fifth renewal loses a row
+
+    leases.renew = renew
+    with leases.heartbeat(SOURCE, "worker-a", [1, 2, 3]) as lost:
+        time.sleep(0.25)  # renewed every 0.1 s
+        assert renewals and not lost.is_set()
+        time.sleep(0.4)
+    assert lost.is_set() and len(renewals) >= 5
+
+
+def _leases(table="lease_test_work"):
+    from src.Services.DBservices.ConnectionPool import ConnectionPool
+    return WorkLeases(table=table, pool=ConnectionPool(os.environ["TEST_DATABASE_URL"]), lease_seconds=30)
+
+
+def _worker(batch_size):
+    leases, owner = _leases(), worker_identity()
+    while True:
+        batch = leases.claim(SOURCE, owner, batch_size)
+        if not batch:
+            return
+        with leases.heartbeat(SOURCE, owner, batch):
+            time.sleep(BATCH_SECONDS)  # scraping + tagging stand-in
+            leases.pool.execute("INSERT INTO lease_test_log (record_id) SELECT unnest(%s::bigint[])", (batch,))
+        leases.complete(SOURCE, owner, batch)
+
+
+def _reset():
+    leases = _leases()
+    leases.pool.execute("DROP TABLE IF EXISTS lease_test_work")
+    leases.pool.execute("DROP TABLE IF EXISTS lease_test_log")
+    leases.pool.execute("CREATE TABLE lease_test_log (record_id BIGINT)")
+    leases._table_ready = False
+    leases.enqueue(SOURCE, f"SELECT g AS primary_id FROM generate_series(1, {RECORDS}) g")
+    return leases
+
+
+@requires_postgres
+def test_parallel_workers_never_share_a_record():
+    rates = {}
+    for workers in (1, 2, 4, 8):
+        leases = _reset()
+        started = time.perf_counter()
+        processes = [multiprocessing.Process(target=_worker, args=(25,)) for _ in range(workers)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        rates[workers] = RECORDS / (time.perf_counter() - started)
+
+        total, distinct = leases.pool.fetch_all("SELECT COUNT(*), COUNT(DISTINCT record_id) FROM lease_test_log")[0]
+        assert total == distinct == RECORDS
+        assert leases.counts(SOURCE) == {"done": RECORDS}
+    print("records/s by workers: " + ", ".join(f"{w}: {r:,.0f}" for w, r in rates.items()))
+    assert rates[4] > rates[1] * 3
+
+
+@requires_postgres
+def test_expired_lease_returns_to_the_pool():
+    leases = _reset()
+    first = leases.claim(SOURCE, "crashed-worker", 10, lease_seconds=1)
+    assert leases.claim(SOURCE, "other-worker", 10, lease_seconds=1) != first
+    time.sleep(1.2)
+    reclaimed = leases.claim(SOURCE, "other-worker", 1000)
+    assert set(first) <= set(reclaimed)
+    assert leases.complete(SOURCE, "crashed-worker", first) == 0  # lost its lease
+
+
+@requires_postgres
+def test_deferred_rows_come_back_after_the_delay():
+    leases = _reset()
+    batch = leases.claim(SOURCE, "worker-a", 10)
+    assert leases.defer(SOURCE, "worker-a", batch[:4], delay_seconds=1) == 4
+    leases.complete(SOURCE, "worker-a", batch[4:])
+    assert not set(batch[:4]) & set(leases.claim(SOURCE, "worker-b", 100))
+    time.sleep(1.2)
+    again = leases.claim(SOURCE, "worker-c", 1000)
+    assert set(batch[:4]) <= set(again)